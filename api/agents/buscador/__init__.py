@@ -20,6 +20,7 @@ from .scraper import (
     MobileHomeScraper,
     BrowserManager,
 )
+from .browser_pool import BrowserPool
 
 __all__ = [
     "BuscadorAgent",
@@ -28,4 +29,5 @@ __all__ = [
     "ZillowScraper",
     "MobileHomeScraper",
     "BrowserManager",
+    "BrowserPool",
 ]
@@ -600,8 +600,8 @@ Always provide:
             logger.error(f"[BuscadorAgent] Error: {e}")
             return self._error_response(str(e))
         finally:
-            # Clean up browser
-            await BrowserManager.close()
+            # Hand idle contexts back; the pool closes the browser once idle
+            await BrowserManager.trim()
     
     async def _process_tool_calls(self, response, messages, llm_with_tools, max_iterations=5):
         """Process tool calls from LLM response."""
@@ -0,0 +1,505 @@
+"""
+Shared Playwright browser for the buscador scrapers, with pooled contexts.
+
+BrowserManager.new_page used to open a brand-new browser context for every
+page and never close it, and search_all_sources tore Chromium down at the
+end of every search — each scrape paid the launch again and leaked a
+context per page in between.
+
+`BrowserPool` keeps one warm Chromium and at most `max_contexts` contexts:
+
+  - a page is leased with `new_page()` and handed back with
+    `release(page)`: the page is closed and its context is reset (cookies
+    and permissions cleared, stray popups closed) and reused by the next
+    lease;
+  - a context is recycled (closed, replaced by a fresh one) after
+    `max_pages_per_context` pages, and the whole browser after
+    `max_pages_per_browser` — Chromium's memory only grows with use;
+  - contexts idle for `context_idle_ttl` are evicted, and the browser is
+    closed once nothing has been leased for `browser_idle_ttl`, so an idle
+    container doesn't hold ~150 MB of Chromium between scheduler runs;
+  - every page leased for a `source` gets that source's request-blocking
+    policy (resource_blocking.py: no images / fonts / media / trackers);
+  - `dedicated_page(**context_options)` is for scrapers whose context
+    carries its own state (the Facebook scraper's login cookies and
+    proxy): it shares the browser and the context budget, but the context
+    is closed on release instead of being reused;
+  - `fetch_html(url, source)` is the load-and-read-HTML path the listing
+    scrapers share: it goes through the on-disk response cache
+    (api/utils/response_cache.py), so re-running a search within the
+    host's TTL doesn't open a page at all.
+
+The defaults (3 contexts, renderer and V8 heap limits in CHROMIUM_ARGS)
+keep the whole browser within a few hundred MB, which is what a single
+Railway container can spare next to the API. All limits can be set through
+SCRAPER_* environment variables.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Playwright for browser automation
+try:
+    from playwright.async_api import async_playwright, Page, Browser, TimeoutError as PlaywrightTimeout
+except ImportError:
+    async_playwright = None  # Playwright not installed — scraping disabled
+    Page = None
+    Browser = None
+    PlaywrightTimeout = TimeoutError
+
+from api.agents.buscador.resource_blocking import ResourceStats, policy_for
+from api.agents.buscador.resource_blocking import install as install_blocking
+from api.utils import response_cache
+
+logger = logging.getLogger(__name__)
+
+MAX_CONTEXTS = int(os.getenv("SCRAPER_MAX_CONTEXTS", "3"))
+MAX_PAGES_PER_CONTEXT = int(os.getenv("SCRAPER_MAX_PAGES_PER_CONTEXT", "20"))
+MAX_PAGES_PER_BROWSER = int(os.getenv("SCRAPER_MAX_PAGES_PER_BROWSER", "200"))
+CONTEXT_IDLE_TTL = float(os.getenv("SCRAPER_CONTEXT_IDLE_TTL", "120"))
+BROWSER_IDLE_TTL = float(os.getenv("SCRAPER_BROWSER_IDLE_TTL", "600"))
+
+CHROMIUM_ARGS = [
+    '--no-sandbox',
+    '--disable-setuid-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-accelerated-2d-canvas',
+    '--disable-gpu',
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-blink-features=AutomationControlled',
+    '--mute-audio',
+    '--no-first-run',
+    # Memory ceilings: a handful of renderer processes, capped JS heap
+    f'--renderer-process-limit={MAX_CONTEXTS + 1}',
+    '--js-flags=--max-old-space-size=256',
+]
+
+CONTEXT_OPTIONS = {
+    "viewport": {'width': 1920, 'height': 1080},
+    "user_agent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+}
+
+
+async def _launch_chromium():
+    """Start Playwright + headless Chromium. Returns (playwright, browser)."""
+    if async_playwright is None:
+        raise RuntimeError("Playwright is not installed — scraping disabled")
+    playwright = await async_playwright().start()
+    try:
+        browser = await playwright.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+    except Exception:
+        await playwright.stop()
+        raise
+    return playwright, browser
+
+
+async def _close_detached(playwright, browser, reaper) -> None:
+    """Close a browser the pool no longer tracks (see _discard_browser)."""
+    if reaper is not None:
+        reaper.cancel()
+    if browser is not None:
+        try:
+            await browser.close()
+        except Exception as e:
+            logger.debug(f"[BrowserPool] Closing the previous browser failed: {e}")
+    if playwright is not None:
+        try:
+            await playwright.stop()
+        except Exception:
+            pass
+
+
+@dataclass
+class _Lease:
+    source: Optional[str]
+    resources: ResourceStats = field(default_factory=ResourceStats)
+    started: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class _Slot:
+    context: Any
+    pooled: bool = True
+    pages_served: int = 0
+    idle_since: float = field(default_factory=time.monotonic)
+
+
+class BrowserPool:
+    """One warm browser, a bounded set of reusable contexts (see module docstring)."""
+
+    def __init__(
+        self,
+        launch=None,
+        *,
+        max_contexts: int = MAX_CONTEXTS,
+        max_pages_per_context: int = MAX_PAGES_PER_CONTEXT,
+        max_pages_per_browser: int = MAX_PAGES_PER_BROWSER,
+        context_idle_ttl: float = CONTEXT_IDLE_TTL,
+        browser_idle_ttl: float = BROWSER_IDLE_TTL,
+    ):
+        self._launch = launch or _launch_chromium
+        self.max_contexts = max(1, max_contexts)
+        self.max_pages_per_context = max_pages_per_context
+        self.max_pages_per_browser = max_pages_per_browser
+        self.context_idle_ttl = context_idle_ttl
+        self.browser_idle_ttl = browser_idle_ttl
+        self.stats: Counter = Counter()
+        self._playwright = None
+        self._browser = None
+        self._browser_pages = 0
+        self._idle: List[_Slot] = []
+        self._leased: Dict[Any, Tuple[_Slot, _Lease]] = {}
+        # Requests loaded / blocked per source since start
+        self.resource_stats: Dict[str, ResourceStats] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._launch_lock: Optional[asyncio.Lock] = None
+        self._reaper: Optional[asyncio.TimerHandle] = None
+
+    # ------------------------------------------------------------------
+    # state
+    # ------------------------------------------------------------------
+
+    @property
+    def leased(self) -> int:
+        return len(self._leased)
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    def _bind_loop(self) -> None:
+        """Asyncio primitives belong to one loop. If the pool is used from a
+        new loop, its browser can't be awaited from here — close it on the
+        loop it was launched on and start over."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        if self._browser is not None or self._playwright is not None:
+            self._discard_browser(self._loop)
+        self._playwright, self._browser = None, None
+        self._idle.clear()
+        self._leased.clear()
+        self._browser_pages = 0
+        self._reaper = None
+        self._loop = loop
+        self._slots = asyncio.Semaphore(self.max_contexts)
+        self._launch_lock = asyncio.Lock()
+
+    def _discard_browser(self, old_loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """Close the browser launched on `old_loop`: on that loop if it still
+        runs (another thread), on a helper thread if it is stopped but open.
+        A closed loop can't drive Playwright any more; that browser is
+        dropped, and the warning says so."""
+        coro = _close_detached(self._playwright, self._browser, self._reaper)
+        if old_loop is not None and old_loop.is_running():
+            logger.warning("[BrowserPool] Event loop changed — closing the previous browser on its loop")
+            asyncio.run_coroutine_threadsafe(coro, old_loop)
+        elif old_loop is not None and not old_loop.is_closed():
+            logger.warning("[BrowserPool] Event loop changed — closing the previous browser")
+            threading.Thread(target=old_loop.run_until_complete, args=(coro,),
+                             name="browser-pool-close", daemon=True).start()
+        else:
+            coro.close()
+            logger.warning("[BrowserPool] Event loop changed and the previous one is closed — "
+                           "dropping its browser without closing it")
+        self.stats["browsers_discarded"] += 1
+
+    async def browser(self):
+        """The shared browser, launched on first use (or after a crash/recycle)."""
+        self._bind_loop()
+        async with self._launch_lock:
+            if self._browser is None or not self._browser.is_connected():
+                self._idle.clear()
+                self._playwright, self._browser = await self._launch()
+                self._browser_pages = 0
+                self.stats["launches"] += 1
+                logger.info("[BrowserPool] Browser launched")
+            return self._browser
+
+    # ------------------------------------------------------------------
+    # leasing
+    # ------------------------------------------------------------------
+
+    async def new_page(self, source: Optional[str] = None):
+        """Lease a page on a pooled context. Hand it back with release().
+
+        `source` selects the request-blocking policy
+        (resource_blocking.SOURCE_POLICIES); None loads everything."""
+        return await self._lease(None, source)
+
+    async def dedicated_page(self, source: Optional[str] = None, **context_options):
+        """Lease a page on a fresh context built with `context_options`;
+        the context is closed (not reused) on release()."""
+        return await self._lease(context_options, source)
+
+    async def _lease(self, context_options: Optional[dict], source: Optional[str]):
+        self._bind_loop()
+        self._cancel_reaper()
+        await self._slots.acquire()
+        try:
+            await self._evict_idle()
+            if self._browser_pages >= self.max_pages_per_browser and not self._leased:
+                logger.info(f"[BrowserPool] Recycling browser after {self._browser_pages} pages")
+                self.stats["browser_recycles"] += 1
+                await self._close_browser()
+            browser = await self.browser()
+            if context_options is None and self._idle:
+                slot = self._idle.pop()
+                self.stats["contexts_reused"] += 1
+            else:
+                options = CONTEXT_OPTIONS if context_options is None else context_options
+                slot = _Slot(await browser.new_context(**options), pooled=context_options is None)
+                self.stats["contexts_created"] += 1
+            try:
+                page = await slot.context.new_page()
+            except Exception:
+                await self._close_context(slot)
+                raise
+            lease = _Lease(source)
+            policy = policy_for(source)
+            if policy is not None:
+                try:
+                    await install_blocking(page, policy, lease.resources)
+                except Exception:
+                    await self._close_context(slot)
+                    raise
+        except BaseException:
+            self._slots.release()
+            raise
+        slot.pages_served += 1
+        self._browser_pages += 1
+        self._leased[page] = (slot, lease)
+        return page
+
+    async def release(self, page) -> None:
+        """Close a leased page and return its context to the pool (or
+        recycle it). Safe to call twice, or on a page not from the pool."""
+        leased = self._leased.pop(page, None)
+        try:
+            await page.close()
+        except Exception:
+            pass
+        if leased is None:
+            return
+        slot, lease = leased
+        self._record(lease)
+        try:
+            if not slot.pooled or slot.pages_served >= self.max_pages_per_context \
+                    or self._browser is None or not self._browser.is_connected():
+                if slot.pooled:
+                    self.stats["contexts_recycled"] += 1
+                await self._close_context(slot)
+            elif await self._reset_context(slot):
+                slot.idle_since = time.monotonic()
+                self._idle.append(slot)
+        finally:
+            self._slots.release()
+            if not self._leased:
+                self._schedule_reaper()
+
+    @asynccontextmanager
+    async def page(self, source: Optional[str] = None, **context_options):
+        """`async with pool.page() as page:` — lease + release."""
+        page = await (self.dedicated_page(source, **context_options) if context_options
+                      else self.new_page(source))
+        try:
+            yield page
+        finally:
+            await self.release(page)
+
+    async def fetch_html(
+        self,
+        url: str,
+        source: Optional[str] = None,
+        *,
+        wait_until: str = "domcontentloaded",
+        timeout: int = 30000,
+        settle: float = 0.0,
+        bypass_cache: bool = False,
+    ) -> str:
+        """Rendered HTML of `url`: from the response cache when fresh, else
+        loaded on a leased page (`settle` seconds for client-side rendering
+        after `wait_until`). Only 2xx pages are cached, so a bot-check or
+        error page is fetched again next time. The cache key includes
+        `wait_until` and `settle`: a page read after networkidle is not the
+        page read right after domcontentloaded."""
+        cache = response_cache.get_cache()
+        render = {"wait_until": wait_until, "settle": settle}
+        if not response_cache.bypassed(bypass_cache):
+            cached = cache.get(url, render)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                logger.info(f"[BrowserPool] {source or 'page'}: cached {url} ({cached.age:.0f}s old)")
+                return cached.text()
+
+        async with self.page(source) as page:
+            response = await page.goto(url, wait_until=wait_until, timeout=timeout)
+            if settle:
+                await asyncio.sleep(settle)
+            content = await page.content()
+        status = response.status if response is not None else 0
+        if 200 <= status < 300:
+            cache.put(url, content.encode("utf-8"), render, status=status)
+        return content
+
+    def _record(self, lease: _Lease) -> None:
+        if lease.source is None:
+            return
+        self.resource_stats.setdefault(lease.source, ResourceStats()).add(lease.resources)
+        r = lease.resources
+        if r.requests:
+            logger.info(
+                f"[BrowserPool] {lease.source}: {(time.monotonic() - lease.started) * 1000:.0f} ms, "
+                f"{r.requests} requests, {r.blocked_total} blocked {dict(r.blocked)}, "
+                f"{r.bytes_loaded / 1024:.0f} KB loaded")
+
+    async def _reset_context(self, slot: _Slot) -> bool:
+        """Clear what the last page left behind. False (context closed) if
+        it can't be reset."""
+        try:
+            for stray in list(slot.context.pages):
+                await stray.close()
+            await slot.context.clear_cookies()
+            await slot.context.clear_permissions()
+            return True
+        except Exception as e:
+            logger.debug(f"[BrowserPool] Context reset failed ({e}); closing it")
+            await self._close_context(slot)
+            return False
+
+    async def _close_context(self, slot: _Slot) -> None:
+        try:
+            await slot.context.close()
+        except Exception:
+            pass
+
+    async def _evict_idle(self) -> None:
+        now = time.monotonic()
+        keep = []
+        for slot in self._idle:
+            if now - slot.idle_since > self.context_idle_ttl:
+                self.stats["contexts_evicted"] += 1
+                await self._close_context(slot)
+            else:
+                keep.append(slot)
+        self._idle = keep
+
+    # ------------------------------------------------------------------
+    # shutdown
+    # ------------------------------------------------------------------
+
+    async def trim(self) -> None:
+        """Close contexts idle longer than context_idle_ttl now."""
+        if self._loop is asyncio.get_running_loop():
+            await self._evict_idle()
+
+    async def _close_browser(self) -> None:
+        for slot in self._idle:
+            await self._close_context(slot)
+        self._idle.clear()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+    async def close(self) -> None:
+        """Close every context and the browser. Pages still leased die with it."""
+        self._cancel_reaper()
+        if self._loop is not None and self._loop is not asyncio.get_running_loop():
+            return
+        had_browser = self._browser is not None
+        await self._close_browser()
+        self._leased.clear()
+        if had_browser:
+            logger.info("[BrowserPool] Browser closed")
+
+    def _schedule_reaper(self) -> None:
+        if self._loop is None or self.browser_idle_ttl <= 0 or self._browser is None:
+            return
+        self._cancel_reaper()
+        self._reaper = self._loop.call_later(
+            self.browser_idle_ttl, lambda: asyncio.ensure_future(self._reap()))
+
+    def _cancel_reaper(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+
+    async def _reap(self) -> None:
+        self._reaper = None
+        if not self._leased and self._browser is not None:
+            logger.info(f"[BrowserPool] Browser idle for {self.browser_idle_ttl:.0f}s — closing")
+            self.stats["idle_closes"] += 1
+            await self._close_browser()
+
+
+class BrowserManager:
+    """
+    Manages browser instances using Playwright.
+    Follows browser-use pattern for AI agent integration.
+
+    Every scraper in api/agents/buscador/ shares one BrowserPool: lease a
+    page with new_page() and hand it back with release_page() (or use
+    `async with BrowserManager.page() as page`).
+    """
+
+    _pool = BrowserPool()
+
+    @classmethod
+    async def get_browser(cls) -> Browser:
+        """Get or create the shared browser instance."""
+        return await cls._pool.browser()
+
+    @classmethod
+    async def new_page(cls, source: Optional[str] = None) -> Page:
+        """Lease a page from the context pool. Release it with release_page().
+
+        `source` picks what gets blocked (resource_blocking.SOURCE_POLICIES)."""
+        return await cls._pool.new_page(source)
+
+    @classmethod
+    async def dedicated_page(cls, source: Optional[str] = None, **context_options) -> Page:
+        """Lease a page on its own, never-reused context (e.g. logged-in sessions)."""
+        return await cls._pool.dedicated_page(source, **context_options)
+
+    @classmethod
+    async def release_page(cls, page: Page) -> None:
+        """Close a leased page and hand its context back to the pool."""
+        await cls._pool.release(page)
+
+    @classmethod
+    def page(cls, source: Optional[str] = None, **context_options):
+        return cls._pool.page(source, **context_options)
+
+    @classmethod
+    async def fetch_html(cls, url: str, source: Optional[str] = None, **kwargs) -> str:
+        """Rendered HTML of `url`, through the response cache (BrowserPool.fetch_html)."""
+        return await cls._pool.fetch_html(url, source, **kwargs)
+
+    @classmethod
+    async def trim(cls):
+        """Evict idle contexts; the browser itself stays warm until idle."""
+        await cls._pool.trim()
+
+    @classmethod
+    async def close(cls):
+        """Close the browser instance."""
+        await cls._pool.close()
@@ -118,15 +118,10 @@ class CraigslistScraper:
         logger.info(f"[Craigslist] Scraping: {url}")
         
         listings = []
-        page = None
         
         try:
-            page = await BrowserManager.new_page()
-            
-            await page.goto(url, wait_until="domcontentloaded", timeout=20000)
-            await asyncio.sleep(2)
-            
-            content = await page.content()
+            content = await BrowserManager.fetch_html(
+                url, "craigslist", wait_until="domcontentloaded", timeout=20000, settle=2)
             soup = BeautifulSoup(content, "html.parser")
             
             # Craigslist search results - new layout uses <li class="cl-search-result">
@@ -145,9 +140,6 @@ class CraigslistScraper:
             
         except Exception as e:
             logger.error(f"[Craigslist] Page scrape error: {e}")
-        finally:
-            if page:
-                await page.close()
         
         return listings
     
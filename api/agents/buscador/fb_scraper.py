@@ -549,33 +549,31 @@ class FacebookMarketplaceScraper:
     
     @staticmethod
     async def _create_authenticated_page():
-        """Create a Playwright page with Facebook cookies loaded and session warm-up."""
-        from playwright.async_api import async_playwright
+        """Create a Playwright page with Facebook cookies loaded and session warm-up.
+
+        The page lives on its own context in the shared buscador browser
+        (browser_pool.py) — the context carries the login cookies and proxy,
+        so it is closed rather than reused. Hand the page back with
+        BrowserManager.release_page()."""
+        from api.agents.buscador.browser_pool import BrowserManager
         from api.agents.buscador.fb_auth import FacebookAuth
         
         cookies = FacebookAuth.load_cookies()
         if not cookies:
             raise ValueError("No Facebook cookies available")
         
-        playwright = await async_playwright().start()
-        
-        # Configure proxy for Playwright if available
-        launch_args = {
-            "headless": True,
-            "args": [
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-accelerated-2d-canvas',
-                '--disable-gpu',
-                '--disable-blink-features=AutomationControlled',
-                '--disable-infobars',
-                '--window-size=1920,1080',
-            ],
+        ua = random.choice(USER_AGENTS)
+        context_args = {
+            "viewport": {'width': 1920, 'height': 1080},
+            "user_agent": ua,
+            "locale": 'en-US',
+            "timezone_id": 'America/Chicago',
+            "screen": {'width': 1920, 'height': 1080},
+            "has_touch": False,
+            "is_mobile": False,
         }
         
-        # Parse proxy URL for Playwright format
-        proxy_config = None
+        # Parse proxy URL for Playwright format (per-context proxy)
         if PROXY_URL:
             try:
                 from urllib.parse import urlparse
@@ -585,71 +583,61 @@ class FacebookMarketplaceScraper:
                     proxy_config["username"] = parsed.username
                 if parsed.password:
                     proxy_config["password"] = parsed.password
-                launch_args["proxy"] = proxy_config
+                context_args["proxy"] = proxy_config
                 logger.info(f"[FB Playwright] Using proxy: {parsed.hostname}")
             except Exception as e:
                 logger.warning(f"[FB Playwright] Failed to parse proxy URL: {e}")
         
-        browser = await playwright.chromium.launch(**launch_args)
-        
-        ua = random.choice(USER_AGENTS)
-        context_args = {
-            "viewport": {'width': 1920, 'height': 1080},
-            "user_agent": ua,
-            "locale": 'en-US',
-            "timezone_id": 'America/Chicago',
-            "screen": {'width': 1920, 'height': 1080},
-            "has_touch": False,
-            "is_mobile": False,
-        }
-        
-        context = await browser.new_context(**context_args)
+        page = await BrowserManager.dedicated_page("facebook", **context_args)
         
-        # Load saved cookies into the context
-        await context.add_cookies(cookies)
-        
-        page = await context.new_page()
-        
-        # Comprehensive anti-detection
-        await page.add_init_script("""
-            // Hide webdriver flag
-            Object.defineProperty(navigator, 'webdriver', { get: () => false });
+        try:
+            # Load saved cookies into the context
+            await page.context.add_cookies(cookies)
             
-            // Override permissions query
-            const origQuery = window.navigator.permissions.query;
-            window.navigator.permissions.query = (parameters) =>
-                parameters.name === 'notifications'
-                    ? Promise.resolve({ state: Notification.permission })
-                    : origQuery(parameters);
+            # Comprehensive anti-detection
+            await page.add_init_script("""
+                // Hide webdriver flag
+                Object.defineProperty(navigator, 'webdriver', { get: () => false });
             
-            // Hide automation-related properties
-            Object.defineProperty(navigator, 'plugins', {
-                get: () => [1, 2, 3, 4, 5],
-            });
-            Object.defineProperty(navigator, 'languages', {
-                get: () => ['en-US', 'en', 'es'],
-            });
+                // Override permissions query
+                const origQuery = window.navigator.permissions.query;
+                window.navigator.permissions.query = (parameters) =>
+                    parameters.name === 'notifications'
+                        ? Promise.resolve({ state: Notification.permission })
+                        : origQuery(parameters);
             
-            // Override chrome runtime
-            window.chrome = { runtime: {} };
-        """)
-        
-        # Warm up session: visit Facebook homepage first to establish cookies/session
-        try:
-            logger.info("[FB Marketplace] Warming up session on facebook.com...")
-            await page.goto("https://www.facebook.com/", wait_until="domcontentloaded", timeout=15000)
-            await asyncio.sleep(random.uniform(2, 4))
+                // Hide automation-related properties
+                Object.defineProperty(navigator, 'plugins', {
+                    get: () => [1, 2, 3, 4, 5],
+                });
+                Object.defineProperty(navigator, 'languages', {
+                    get: () => ['en-US', 'en', 'es'],
+                });
             
-            # Check if we're logged in (look for the c_user evidence)
-            warmup_url = page.url
-            if "/login" not in warmup_url and "checkpoint" not in warmup_url:
-                logger.info("[FB Marketplace] ✅ Session warm-up successful — logged in")
-            else:
-                logger.warning(f"[FB Marketplace] ⚠️ Session warm-up: redirected to {warmup_url}")
-        except Exception as e:
-            logger.warning(f"[FB Marketplace] Session warm-up failed: {e}")
+                // Override chrome runtime
+                window.chrome = { runtime: {} };
+            """)
+            
+            # Warm up session: visit Facebook homepage first to establish cookies/session
+            try:
+                logger.info("[FB Marketplace] Warming up session on facebook.com...")
+                await page.goto("https://www.facebook.com/", wait_until="domcontentloaded", timeout=15000)
+                await asyncio.sleep(random.uniform(2, 4))
+                
+                # Check if we're logged in (look for the c_user evidence)
+                warmup_url = page.url
+                if "/login" not in warmup_url and "checkpoint" not in warmup_url:
+                    logger.info("[FB Marketplace] ✅ Session warm-up successful — logged in")
+                else:
+                    logger.warning(f"[FB Marketplace] ⚠️ Session warm-up: redirected to {warmup_url}")
+            except Exception as e:
+                logger.warning(f"[FB Marketplace] Session warm-up failed: {e}")
+        except BaseException:
+            # Includes cancellation mid warm-up: the page holds a pool slot
+            await BrowserManager.release_page(page)
+            raise
         
-        return playwright, browser, context, page
+        return page
     
     @staticmethod
     async def _scrape_search(
@@ -671,14 +659,11 @@ class FacebookMarketplaceScraper:
         logger.info(f"[FB Marketplace] Scraping: {city} - '{query}'")
         logger.info(f"[FB Marketplace] URL: {url}")
         
-        playwright = None
-        browser = None
-        context = None
         page = None
         listings: List[FBListing] = []
         
         try:
-            playwright, browser, context, page = await FacebookMarketplaceScraper._create_authenticated_page()
+            page = await FacebookMarketplaceScraper._create_authenticated_page()
             
             # Navigate to marketplace search
             logger.info(f"[FB Marketplace] Navigating to: {url}")
@@ -717,13 +702,8 @@ class FacebookMarketplaceScraper:
             logger.error(f"[FB Marketplace] Scrape error for {city}: {e}", exc_info=True)
         finally:
             if page:
-                await page.close()
-            if context:
-                await context.close()
-            if browser:
-                await browser.close()
-            if playwright:
-                await playwright.stop()
+                from api.agents.buscador.browser_pool import BrowserManager
+                await BrowserManager.release_page(page)
         
         return listings
     
@@ -0,0 +1,163 @@
+"""
+Request interception for the headless scrapers.
+
+The buscador scrapers only read card HTML (and the <img src> attributes in
+it), but Chromium still downloaded every photo, web font, video and
+third-party tracker on the page — most of the bytes and, for pages waited
+on with 'networkidle' (Zillow ARV), most of the wall time.
+
+`BlockPolicy` decides per request: resource types (image / media / font by
+default) and tracker hosts are aborted; `allow_types` / `allow_hosts` let a
+source keep what it needs. `SOURCE_POLICIES` holds the per-source choice,
+and BrowserPool installs the policy on every page it leases for that
+source (`BrowserManager.new_page(source=...)`).
+
+`ResourceStats` counts what was blocked and how many bytes were actually
+loaded per source. How much a policy saves (bytes and wall time against
+loading everything) is measured by scripts/benchmark_resource_blocking.py.
+
+SCRAPER_BLOCK_RESOURCES=0 turns blocking off; SCRAPER_UNBLOCKED_SOURCES
+(comma-separated) turns it off for single sources.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+
+TRACKER_HOSTS: Tuple[str, ...] = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "hotjar.com",
+    "segment.io",
+    "segment.com",
+    "newrelic.com",
+    "nr-data.net",
+    "optimizely.com",
+    "quantserve.com",
+    "scorecardresearch.com",
+    "criteo.com",
+    "taboola.com",
+    "outbrain.com",
+    "adsrvr.org",
+    "bing.com",
+    "clarity.ms",
+    "tiktok.com",
+    "amazon-adsystem.com",
+)
+
+REASON_TRACKER = "tracker"
+
+
+def _host_matches(host: str, domains: Tuple[str, ...]) -> bool:
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+@dataclass(frozen=True)
+class BlockPolicy:
+    resource_types: frozenset = BLOCKED_RESOURCE_TYPES
+    hosts: Tuple[str, ...] = TRACKER_HOSTS
+    allow_types: frozenset = frozenset()
+    allow_hosts: Tuple[str, ...] = ()
+
+    def block_reason(self, resource_type: str, url: str) -> Optional[str]:
+        """Why this request should be aborted ('image', 'font', 'tracker', ...), or None."""
+        host = (urlsplit(url).hostname or "").lower()
+        if self.allow_hosts and _host_matches(host, self.allow_hosts):
+            return None
+        if resource_type in self.allow_types:
+            return None
+        if resource_type in self.resource_types:
+            return resource_type
+        if self.hosts and _host_matches(host, self.hosts):
+            return REASON_TRACKER
+        return None
+
+
+DEFAULT_POLICY = BlockPolicy()
+
+SOURCE_POLICIES: Dict[str, BlockPolicy] = {
+    "mhvillage": DEFAULT_POLICY,
+    "mobilehome": DEFAULT_POLICY,
+    "mhbay": DEFAULT_POLICY,
+    "craigslist": DEFAULT_POLICY,
+    # Zillow's bot check (PerimeterX) runs as a script from its own CDN —
+    # scripts are never blocked, only trackers and heavy assets.
+    "zillow": DEFAULT_POLICY,
+    # Facebook: skip photos/video/fonts, but leave its own telemetry alone
+    # — a logged-in session that never reports back looks like a bot.
+    "facebook": BlockPolicy(hosts=()),
+}
+
+
+def policy_for(source: Optional[str]) -> Optional[BlockPolicy]:
+    """The policy for `source`, or None when nothing should be blocked."""
+    if os.getenv("SCRAPER_BLOCK_RESOURCES", "1").lower() in ("0", "false", "no"):
+        return None
+    unblocked = {s.strip() for s in os.getenv("SCRAPER_UNBLOCKED_SOURCES", "").split(",") if s.strip()}
+    if source is None or source in unblocked:
+        return None
+    return SOURCE_POLICIES.get(source, DEFAULT_POLICY)
+
+
+@dataclass
+class ResourceStats:
+    """What one page (or, summed, one source) loaded and blocked."""
+    requests: int = 0
+    bytes_loaded: int = 0
+    blocked: Counter = field(default_factory=Counter)
+
+    @property
+    def blocked_total(self) -> int:
+        return sum(self.blocked.values())
+
+    def add(self, other: "ResourceStats") -> None:
+        self.requests += other.requests
+        self.bytes_loaded += other.bytes_loaded
+        self.blocked.update(other.blocked)
+
+    def summary(self) -> dict:
+        return {
+            "requests": self.requests,
+            "blocked": self.blocked_total,
+            "blocked_by_reason": dict(self.blocked),
+            "kb_loaded": round(self.bytes_loaded / 1024, 1),
+        }
+
+
+async def install(page, policy: BlockPolicy, stats: ResourceStats) -> None:
+    """Route every request of `page` through `policy`, counting into `stats`."""
+
+    async def _route(route, request):
+        stats.requests += 1
+        reason = policy.block_reason(request.resource_type, request.url)
+        try:
+            if reason:
+                stats.blocked[reason] += 1
+                await route.abort("blockedbyclient")
+            else:
+                await route.continue_()
+        except Exception as e:
+            # Page closed mid-request — nothing left to route
+            logger.debug(f"[ResourceBlocking] route for {request.url[:80]} failed: {e}")
+
+    def _on_response(response):
+        try:
+            stats.bytes_loaded += int(response.headers.get("content-length") or 0)
+        except (TypeError, ValueError):
+            pass
+
+    await page.route("**/*", _route)
+    page.on("response", _on_response)
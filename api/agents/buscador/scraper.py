@@ -26,21 +26,16 @@ import logging
 import re
 from typing import List, Dict, Any, Optional
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from urllib.parse import urljoin, quote
 
-# Playwright for browser automation
-try:
-    from playwright.async_api import async_playwright, Page, Browser, TimeoutError as PlaywrightTimeout
-except ImportError:
-    async_playwright = None  # Playwright not installed — scraping disabled
-    Page = None
-    Browser = None
-    PlaywrightTimeout = TimeoutError
-
 # BeautifulSoup for HTML parsing
 from bs4 import BeautifulSoup
 
+from api.agents.buscador.browser_pool import BrowserManager, PlaywrightTimeout
+from api.services.scrapers.orchestrator import SourceSpec, run_sources
+from api.utils.listing_fingerprint import listing_fingerprint
+
 logger = logging.getLogger(__name__)
 
 
@@ -70,59 +65,10 @@ class ScrapedListing:
     price_type: str = "full"
     estimated_full_price: Optional[float] = None
 
-
-# ============================================
-# BROWSER MANAGER (browser-use pattern)
-# ============================================
-
-class BrowserManager:
-    """
-    Manages browser instances using Playwright.
-    Follows browser-use pattern for AI agent integration.
-    """
-    
-    _browser: Optional[Browser] = None
-    _playwright = None
-    
-    @classmethod
-    async def get_browser(cls) -> Browser:
-        """Get or create a browser instance."""
-        if cls._browser is None or not cls._browser.is_connected():
-            cls._playwright = await async_playwright().start()
-            cls._browser = await cls._playwright.chromium.launch(
-                headless=True,
-                args=[
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-accelerated-2d-canvas',
-                    '--disable-gpu',
-                ]
-            )
-            logger.info("[BrowserManager] Browser launched")
-        return cls._browser
-    
-    @classmethod
-    async def close(cls):
-        """Close the browser instance."""
-        if cls._browser:
-            await cls._browser.close()
-            cls._browser = None
-        if cls._playwright:
-            await cls._playwright.stop()
-            cls._playwright = None
-        logger.info("[BrowserManager] Browser closed")
-    
-    @classmethod
-    async def new_page(cls) -> Page:
-        """Create a new browser page."""
-        browser = await cls.get_browser()
-        context = await browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        )
-        page = await context.new_page()
-        return page
+    @property
+    def content_hash(self) -> str:
+        """Stable fingerprint of price/photos/details (see api/utils/listing_fingerprint.py)."""
+        return listing_fingerprint(asdict(self))
 
 
 # ============================================
@@ -188,20 +134,14 @@ class MHVillageScraper:
         logger.info(f"[MHVillage] Scraping {city}, ${min_price}-${max_price}")
         
         listings = []
-        page = None
         
         try:
-            page = await BrowserManager.new_page()
             url = MHVillageScraper.build_search_url(city, min_price, max_price)
             
             logger.info(f"[MHVillage] Navigating to: {url}")
-            await page.goto(url, wait_until='domcontentloaded', timeout=30000)
-            
-            # Wait for page to fully render (SPA needs time)
-            await asyncio.sleep(3)
-            
-            # Get page content
-            content = await page.content()
+            # SPA needs ~3s to render; a fresh cached copy skips the browser
+            content = await BrowserManager.fetch_html(
+                url, "mhvillage", wait_until='domcontentloaded', timeout=30000, settle=3)
             soup = BeautifulSoup(content, 'lxml')
             
             # Find listing cards - based on actual MHVillage structure 2026
@@ -233,9 +173,6 @@ class MHVillageScraper:
             logger.error(f"[MHVillage] Timeout loading page for {city}")
         except Exception as e:
             logger.error(f"[MHVillage] Error scraping {city}: {e}")
-        finally:
-            if page:
-                await page.close()
         
         return listings
     
@@ -395,17 +332,13 @@ class MobileHomeNetScraper:
         logger.info(f"[MobileHome.net] Scraping {city}, max ${max_price}")
         
         listings = []
-        page = None
         
         try:
-            page = await BrowserManager.new_page()
             url = MobileHomeNetScraper.build_search_url(city)
             
             logger.info(f"[MobileHome.net] Navigating to: {url}")
-            await page.goto(url, wait_until='domcontentloaded', timeout=20000)
-            await asyncio.sleep(3)
-            
-            content = await page.content()
+            content = await BrowserManager.fetch_html(
+                url, "mobilehome", wait_until='domcontentloaded', timeout=20000, settle=3)
             soup = BeautifulSoup(content, 'lxml')
             
             listing_cards = soup.select('.item')
@@ -422,9 +355,6 @@ class MobileHomeNetScraper:
                     
         except Exception as e:
             logger.error(f"[MobileHome.net] Error: {e}")
-        finally:
-            if page:
-                await page.close()
         
         return listings
     
@@ -521,17 +451,13 @@ class MHBayScraper:
         logger.info(f"[MHBay] Scraping {city}, max ${max_price}")
         
         listings = []
-        page = None
         
         try:
-            page = await BrowserManager.new_page()
             url = MHBayScraper.build_search_url(city)
             
             logger.info(f"[MHBay] Navigating to: {url}")
-            await page.goto(url, wait_until='domcontentloaded', timeout=20000)
-            await asyncio.sleep(3)
-            
-            content = await page.content()
+            content = await BrowserManager.fetch_html(
+                url, "mhbay", wait_until='domcontentloaded', timeout=20000, settle=3)
             soup = BeautifulSoup(content, 'lxml')
             
             # Same structure as MobileHome.net: .item elements
@@ -550,9 +476,6 @@ class MHBayScraper:
                     
         except Exception as e:
             logger.error(f"[MHBay] Error: {e}")
-        finally:
-            if page:
-                await page.close()
         
         return listings
     
@@ -644,19 +567,14 @@ class MHBayScraper:
         logger.info(f"[MobileHome.net] Scraping {city}, max ${max_price}")
         
         listings = []
-        page = None
         
         try:
-            page = await BrowserManager.new_page()
             url = MobileHomeNetScraper.build_search_url(city)
             
             logger.info(f"[MobileHome.net] Navigating to: {url}")
-            await page.goto(url, wait_until='domcontentloaded', timeout=20000)
-            
             # Wait for content to render
-            await asyncio.sleep(3)
-            
-            content = await page.content()
+            content = await BrowserManager.fetch_html(
+                url, "mobilehome", wait_until='domcontentloaded', timeout=20000, settle=3)
             soup = BeautifulSoup(content, 'lxml')
             
             # MobileHome.net structure: listings are in .item elements
@@ -675,9 +593,6 @@ class MHBayScraper:
             
         except Exception as e:
             logger.error(f"[MobileHome.net] Error: {e}")
-        finally:
-            if page:
-                await page.close()
         
         return listings
     
@@ -799,20 +714,16 @@ class ZillowScraper:
         logger.info(f"[Zillow] Scraping mobile homes in {city}, ${min_price}-${max_price}")
         
         listings = []
-        page = None
         
         try:
-            page = await BrowserManager.new_page()
-            
             # Zillow mobile homes URL
             city_slug = city.lower().replace(" ", "-")
             url = f"{ZillowScraper.BASE_URL}/{city_slug}-tx/mobile-homes/"
             
             logger.info(f"[Zillow] Navigating to: {url}")
-            await page.goto(url, wait_until='domcontentloaded', timeout=30000)
-            await asyncio.sleep(3)  # Wait for JS to render
-            
-            content = await page.content()
+            content = await BrowserManager.fetch_html(
+                url, "zillow", wait_until='domcontentloaded', timeout=30000,
+                settle=3)  # Wait for JS to render
             soup = BeautifulSoup(content, 'lxml')
             
             # Zillow listing cards
@@ -838,9 +749,6 @@ class ZillowScraper:
             
         except Exception as e:
             logger.error(f"[Zillow] Error scraping {city}: {e}")
-        finally:
-            if page:
-                await page.close()
         
         return listings
     
@@ -919,19 +827,14 @@ class ZillowScraper:
         """
         logger.info(f"[Zillow] Getting ARV for {city}, ~{target_sqft}sqft")
         
-        page = None
-        
         try:
-            page = await BrowserManager.new_page()
-            
             # Search for recently sold mobile homes in the area
             city_slug = city.lower().replace(" ", "-")
             url = f"{ZillowScraper.BASE_URL}/{city_slug}-tx/mobile-homes/"
             
-            await page.goto(url, wait_until='networkidle', timeout=30000)
-            await asyncio.sleep(2)
-            
-            content = await page.content()
+            # Same page as ZillowScraper.scrape — usually a cache hit
+            content = await BrowserManager.fetch_html(
+                url, "zillow", wait_until='networkidle', timeout=30000, settle=2)
             soup = BeautifulSoup(content, 'lxml')
             
             # Extract prices from listings for ARV calculation
@@ -981,9 +884,6 @@ class ZillowScraper:
                 "error": str(e),
                 "confidence": 0.2,
             }
-        finally:
-            if page:
-                await page.close()
 
 
 # ============================================
@@ -1399,25 +1299,39 @@ class MobileHomeScraper:
         """
         logger.info(f"[Orchestrator] Searching all sources for {city}")
         
-        all_listings = []
-        
-        # Scrape MHVillage (primary)
-        mhvillage_listings = await MHVillageScraper.scrape(
-            city=city,
-            min_price=min_price,
-            max_price=max_price,
-        )
-        all_listings.extend(mhvillage_listings)
-        
-        # Scrape MobileHome.net (secondary)
-        mobilehome_listings = await MobileHomeNetScraper.scrape(
-            city=city,
-            max_price=max_price,
-        )
-        all_listings.extend(mobilehome_listings)
-        
-        # Get ARV estimate from Zillow
-        arv_data = await ZillowScraper.get_arv_estimate(city)
+        # All three at once, each with its own timeout; they share the one
+        # browser from BrowserManager (api/services/scrapers/orchestrator.py).
+        run = await run_sources([
+            SourceSpec(
+                "mhvillage",
+                lambda: MHVillageScraper.scrape(city=city, min_price=min_price, max_price=max_price),
+                timeout=60, browser=True,
+            ),
+            SourceSpec(
+                "mobilehome",
+                lambda: MobileHomeNetScraper.scrape(city=city, max_price=max_price),
+                timeout=45, browser=True,
+            ),
+            SourceSpec(
+                "zillow_arv",
+                lambda: ZillowScraper.get_arv_estimate(city),
+                timeout=60, browser=True,
+                count=lambda arv: arv.get("comparables_count", 0),
+            ),
+        ])
+        
+        mhvillage_listings = run.data("mhvillage", [])
+        mobilehome_listings = run.data("mobilehome", [])
+        all_listings = list(mhvillage_listings) + list(mobilehome_listings)
+        
+        # Get ARV estimate from Zillow (same fallback as a failed lookup)
+        arv_data = run.data("zillow_arv") or {
+            "city": city,
+            "estimated_arv": 50000.0,
+            "source": "fallback",
+            "error": run.results["zillow_arv"].error,
+            "confidence": 0.2,
+        }
         
         # Add ARV to all listings
         for listing in all_listings:
@@ -1426,8 +1340,8 @@ class MobileHomeScraper:
             # Estimate renovation based on age and condition
             listing_dict['estimated_renovation'] = MobileHomeScraper._estimate_renovation(listing)
         
-        # Close browser when done
-        await BrowserManager.close()
+        # Hand idle contexts back; the browser stays warm for the next search
+        await BrowserManager.trim()
         
         return {
             "city": city,
@@ -1438,6 +1352,7 @@ class MobileHomeScraper:
                 "mhvillage": len(mhvillage_listings),
                 "mobilehome": len(mobilehome_listings),
             },
+            "scrape_metrics": run.metrics(),
             "scraped_at": datetime.now().isoformat(),
         }
     
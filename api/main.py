@@ -42,6 +42,7 @@ from api.routes.public.credit_application import router as public_credit_app_rou
 
 # Services
 from api.services.scheduler_service import init_scheduler, shutdown_scheduler
+from tools.supabase_async import shutdown_executor
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +61,7 @@ async def lifespan(app: FastAPI):
         shutdown_scheduler()
     except Exception:
         pass
+    shutdown_executor()
     logger.info("👋 Maninos AI Backend stopped")
 
 
@@ -17,18 +17,28 @@ Features:
   - Export CSV
 """
 
+import asyncio
 import csv
 import io
+import itertools
 import json
 import logging
+import math
 import re
 from datetime import date, datetime, timedelta
-from typing import Optional, List
+from typing import AsyncIterator, Iterator, Optional, List
 from fastapi import APIRouter, HTTPException, Query, Request, UploadFile, File, Form
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from tools.supabase_client import sb
+from tools.supabase_async import aexecute, gather_execute, run_sync
+from api.services import ledger_snapshots, reconciliation
+from api.services.ai_pipeline import (
+    PartialAIResponse, call_with_retries, estimate_tokens, get_openai_limiter, map_bounded, map_ordered,
+)
+from api.services.classification_memo import ClassificationMemo, MemoStats
+from api.services.statement_stream import TextPreview, iter_excel_rows, iter_pdf_pages, iter_text_chunks
 
 # ── Canonical account type sets (used everywhere for consistent sign logic) ──
 INCOME_TYPES = {"Income", "Other Income", "income"}
@@ -112,6 +122,19 @@ def _fetch_all_transactions(extra_filters: dict = None) -> list:
         offset += page_size
     return rows
 
+
+def _fetch_ledger_rows(extra_filters: dict = None, full_recompute: bool = False) -> list:
+    """Rows for the balance reports (same shape and filters as
+    _fetch_all_transactions). Reads the daily balance snapshots (migration 108,
+    a few rows per account/day) and falls back to the full ledger scan when
+    asked to, or when the snapshot table can't be read."""
+    if not full_recompute and ledger_snapshots.snapshots_available():
+        try:
+            return ledger_snapshots.fetch_snapshot_rows(sb, extra_filters)
+        except Exception as e:
+            ledger_snapshots.mark_unavailable(e)
+    return _fetch_all_transactions(extra_filters)
+
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
@@ -229,31 +252,10 @@ class BudgetCreate(BaseModel):
 # HELPERS
 # ============================================================================
 
-def _max_txn_seq(prefix: str) -> int:
-    """Highest sequence number in use today, parsing the numeric part and
-    IGNORING the -D/-C suffix ledger pairs add. Max-based (not count-based)
-    so it never reissues a number when pairs leave the count desynced from
-    the real max — which would violate the UNIQUE index."""
-    try:
-        existing = sb.table("accounting_transactions") \
-            .select("transaction_number") \
-            .like("transaction_number", f"{prefix}%") \
-            .execute().data or []
-    except Exception:
-        return 0
-    hi = 0
-    for row in existing:
-        num = row.get("transaction_number") or ""
-        mid = num[len(prefix):].split("-")[0]
-        if mid.isdigit():
-            hi = max(hi, int(mid))
-    return hi
-
-
 def _generate_transaction_number() -> str:
-    today = date.today().strftime("%y%m%d")
-    prefix = f"TXN-{today}-"
-    return f"{prefix}{_max_txn_seq(prefix) + 1:03d}"
+    """Next TXN-YYMMDD-NNN (atomic counter, see ledger.allocate_transaction_numbers)."""
+    from api.services.ledger import allocate_transaction_numbers
+    return allocate_transaction_numbers(db=sb)[0]
 
 
 def _generate_invoice_number(direction: str) -> str:
@@ -409,19 +411,16 @@ async def get_accounting_dashboard(
     end_str = end_date.isoformat()
 
     # ---- Fetch accounting_transactions ----
-    transactions = []
-    try:
-        q_txn = sb.table("accounting_transactions") \
-            .select("*") \
-            .gte("transaction_date", start_str) \
-            .lte("transaction_date", end_str) \
-            .neq("status", "voided")
-        if yard_id:
-            q_txn = q_txn.eq("yard_id", yard_id)
-        txn_result = q_txn.execute()
-        transactions = txn_result.data or []
-    except Exception as e:
-        logger.warning(f"[accounting] Could not fetch accounting_transactions: {e}")
+    # The period queries are independent of each other: build them here and
+    # run them concurrently off the event loop (tools/supabase_async), so a
+    # slow PostgREST round-trip no longer stalls every other request.
+    q_txn = sb.table("accounting_transactions") \
+        .select("*") \
+        .gte("transaction_date", start_str) \
+        .lte("transaction_date", end_str) \
+        .neq("status", "voided")
+    if yard_id:
+        q_txn = q_txn.eq("yard_id", yard_id)
 
     # ---- Pull from existing tables ----
     # NB: todas las lecturas excluyen las cadenas 'manual_capital' (clientes RTO
@@ -433,20 +432,36 @@ async def get_accounting_dashboard(
         .or_(_NOT_MANUAL) \
         .gte("created_at", start_str) \
         .lte("created_at", end_str + "T23:59:59")
-    sales = (sales_q.execute()).data or []
 
     props_q = sb.table("properties") \
         .select("id, property_code, address, city, purchase_price, sale_price, status, yard_id, created_at") \
         .or_(_NOT_MANUAL) \
         .gte("created_at", start_str) \
         .lte("created_at", end_str + "T23:59:59")
-    properties = (props_q.execute()).data or []
 
     reno_q = sb.table("renovations") \
         .select("id, property_id, total_cost, status, created_at") \
         .gte("created_at", start_str) \
         .lte("created_at", end_str + "T23:59:59")
-    renovations = (reno_q.execute()).data or []
+
+    all_renos_q = sb.table("renovations").select("property_id, total_cost")
+
+    (txn_result, sales_result, props_result, reno_result, all_renos_result), accounts = await asyncio.gather(
+        gather_execute(q_txn, sales_q, props_q, reno_q, all_renos_q, return_exceptions=True),
+        run_sync(_fetch_all_accounts, active_only=False),
+    )
+
+    transactions = []
+    if isinstance(txn_result, Exception):
+        logger.warning(f"[accounting] Could not fetch accounting_transactions: {txn_result}")
+    else:
+        transactions = txn_result.data or []
+    for _res in (sales_result, props_result, reno_result):
+        if isinstance(_res, Exception):
+            raise _res
+    sales = sales_result.data or []
+    properties = props_result.data or []
+    renovations = reno_result.data or []
 
     # Per-house renovation cost is CUMULATIVE (all renovations ever done on the
     # house, possibly across many periods) — it's part of the house's total
@@ -455,15 +470,13 @@ async def get_accounting_dashboard(
     # per-house summaries (inventario / property P&L) we sum ALL renovations of
     # each house, all-time. (Fixes "only shows today's renovations".)
     reno_sum_by_property: dict = {}
-    try:
-        all_renos = (sb.table("renovations")
-                     .select("property_id, total_cost").execute()).data or []
-        for r in all_renos:
+    if isinstance(all_renos_result, Exception):
+        logger.warning(f"[dashboard] all-time renovation sum failed: {all_renos_result}")
+    else:
+        for r in all_renos_result.data or []:
             rpid = r.get("property_id")
             if rpid:
                 reno_sum_by_property[rpid] = reno_sum_by_property.get(rpid, 0.0) + float(r.get("total_cost") or 0)
-    except Exception as e:
-        logger.warning(f"[dashboard] all-time renovation sum failed: {e}")
 
     # ---- Financials ----
     # Sales income comes from the LEDGER, not the sales table's status filter
@@ -478,7 +491,7 @@ async def get_accounting_dashboard(
     # chosen by the account; Bank/AR/AP/asset legs are ignored (no double
     # count). This replaced the old cash-basis mix of ledger + `renovations`
     # table + `sales` table, which never matched the P&L and left RTO at $0.
-    _acct_meta = {a["id"]: a for a in _fetch_all_accounts(active_only=False)}
+    _acct_meta = {a["id"]: a for a in accounts}
 
     def _income_bucket(code: str) -> str:
         if code == "House Sales - RTO":
@@ -568,7 +581,7 @@ async def get_accounting_dashboard(
     # ---- Yard breakdown ----
     yard_breakdown = {}
     try:
-        yards_result = sb.table("yards").select("id, name, city").eq("is_active", True).execute()
+        yards_result = await aexecute(sb.table("yards").select("id, name, city").eq("is_active", True))
         yards_map = {y["id"]: y for y in (yards_result.data or [])}
     except Exception:
         yards_map = {}
@@ -607,10 +620,10 @@ async def get_accounting_dashboard(
             if first in ("Compra", "Renovación", "Movida", "Comisión") and " " in code:
                 concept_acct[a["id"]] = (code.split(" ", 1)[1], first, a.get("account_type", ""))
         if concept_acct:
-            crows = (sb.table("accounting_transactions")
+            crows = (await aexecute(sb.table("accounting_transactions")
                      .select("account_id, amount, is_income, status, transaction_type")
                      .in_("account_id", list(concept_acct.keys()))
-                     .neq("status", "voided").execute()).data or []
+                     .neq("status", "voided"))).data or []
             _want_tt = {"Compra": "purchase_house", "Renovación": "renovation", "Movida": "moving_transport"}
             for r in crows:
                 hc, concept, atype = concept_acct[r["account_id"]]
@@ -673,12 +686,12 @@ async def get_accounting_dashboard(
     # COGS account doesn't exist for that house.
     property_inventory = []
     try:
-        all_props = (sb.table("properties")
+        all_props = (await aexecute(sb.table("properties")
                      .select("id, property_code, address, status, purchase_price, "
                              "renovation_cost, move_cost, commission, sale_price")
                      .neq("status", "sold")
                      .or_("source.is.null,source.neq.manual_capital")
-                     .order("property_code").execute()).data or []
+                     .order("property_code"))).data or []
 
         # Per-house cost balances = ACTUAL money posted to the ledger (NOT the
         # renovation-table estimate). The Compra/Renovación/Movida accounts are
@@ -693,10 +706,10 @@ async def get_accounting_dashboard(
                      for a in _acct_meta.values()
                      if (a.get("code") or "").split(" ")[0] in ("Compra", "Renovación", "Movida", "Comisión")}
             if id_to:
-                rows = (sb.table("accounting_transactions")
+                rows = (await aexecute(sb.table("accounting_transactions")
                         .select("account_id, amount, is_income, status")
                         .in_("account_id", list(id_to.keys()))
-                        .neq("status", "voided").execute()).data or []
+                        .neq("status", "voided"))).data or []
                 for r in rows:
                     meta = id_to.get(r.get("account_id"))
                     if not meta:
@@ -718,12 +731,11 @@ async def get_accounting_dashboard(
         # RTO = enganche + financiado total).
         actual_sale_by_property = {}
         try:
-            sold_rows = (sb.table("sales")
+            sold_rows = (await aexecute(sb.table("sales")
                          .select("property_id, sale_price, status, created_at")
                          .neq("status", "cancelled")
                          .or_("source.is.null,source.neq.manual_capital")
-                         .order("created_at", desc=True)
-                         .execute()).data or []
+                         .order("created_at", desc=True))).data or []
             for s in sold_rows:
                 pid = s.get("property_id")
                 if pid and pid not in actual_sale_by_property:
@@ -788,8 +800,8 @@ async def get_accounting_dashboard(
     bank_accounts = []
     try:
         from api.services.ledger import get_all_bank_balances
-        bank_accounts = (sb.table("bank_accounts").select("*").eq("is_active", True).execute()).data or []
-        derived = get_all_bank_balances(db=sb)
+        bank_accounts = (await aexecute(sb.table("bank_accounts").select("*").eq("is_active", True))).data or []
+        derived = await run_sync(get_all_bank_balances, db=sb)
         for b in bank_accounts:
             d = derived.get(b["id"], 0.0)
             b["derived_balance"] = d
@@ -800,9 +812,9 @@ async def get_accounting_dashboard(
     # ---- Recent transactions ----
     recent_data = []
     try:
-        recent_data = (sb.table("accounting_transactions").select("*")
+        recent_data = (await aexecute(sb.table("accounting_transactions").select("*")
                        .order("transaction_date", desc=True).order("created_at", desc=True)
-                       .limit(20).execute()).data or []
+                       .limit(20))).data or []
     except Exception:
         pass
 
@@ -812,10 +824,9 @@ async def get_accounting_dashboard(
     ar_overdue = 0
     ap_overdue = 0
     try:
-        invoices_result = sb.table("accounting_invoices") \
-            .select("direction, total_amount, amount_paid, balance_due, status, due_date") \
-            .in_("status", ["draft", "sent", "partial", "overdue"]) \
-            .execute()
+        invoices_result = await aexecute(sb.table("accounting_invoices")
+            .select("direction, total_amount, amount_paid, balance_due, status, due_date")
+            .in_("status", ["draft", "sent", "partial", "overdue"]))
         for inv in (invoices_result.data or []):
             bal = float(inv.get("balance_due") or 0)
             if inv["direction"] == "receivable":
@@ -843,19 +854,18 @@ async def get_accounting_dashboard(
     # double-counts. Legacy RTO sales without such an invoice still surface.
     capfin_sale_ids = set()
     try:
-        capinv = (sb.table("accounting_invoices").select("sale_id")
+        capinv = (await aexecute(sb.table("accounting_invoices").select("sale_id")
                   .eq("direction", "receivable").ilike("notes", "%[CAPFIN:%")
-                  .neq("status", "voided").execute()).data or []
+                  .neq("status", "voided"))).data or []
         capfin_sale_ids = {r["sale_id"] for r in capinv if r.get("sale_id")}
     except Exception:
         pass
     try:
-        sr = (sb.table("sales")
+        sr = (await aexecute(sb.table("sales")
               .select("id, property_id, sale_type, status, sale_price, amount_paid, "
                       "amount_pending, financed_remaining, capital_payment_status, "
                       "created_at, clients(name), properties(address, city, property_code)")
-              .or_("source.is.null,source.neq.manual_capital")
-              .execute()).data or []
+              .or_("source.is.null,source.neq.manual_capital"))).data or []
         for s in sr:
             status = (s.get("status") or "").lower()
             if status in ("cancelled", "canceled", "refunded"):
@@ -1651,6 +1661,7 @@ async def list_accounts():
 async def get_accounts_tree(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    full_recompute: bool = False,
 ):
     """Get full hierarchical chart of accounts with computed balances from transactions."""
     accounts = _fetch_all_accounts()
@@ -1663,7 +1674,7 @@ async def get_accounts_tree(
             filters["gte_date"] = start_date
         if end_date:
             filters["lte_date"] = end_date
-        txns = _fetch_all_transactions(filters)
+        txns = _fetch_ledger_rows(filters, full_recompute)
         _atype_map = {a["id"]: a.get("account_type", "") for a in accounts}
         for t in txns:
             aid = t.get("account_id")
@@ -2997,6 +3008,7 @@ async def get_income_statement(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     yard_id: Optional[str] = None,
+    full_recompute: bool = False,
 ):
     """QuickBooks-style hierarchical Income Statement (Estado de Resultados / P&L)."""
     now = date.today()
@@ -3021,7 +3033,7 @@ async def get_income_statement(
         filters = {"gte_date": sd, "lte_date": ed}
         if yard_id:
             filters["yard_id"] = yard_id
-        txns = _fetch_all_transactions(filters)
+        txns = _fetch_ledger_rows(filters, full_recompute)
         for t in txns:
             aid = t.get("account_id")
             if aid and aid in pl_account_ids:
@@ -3106,7 +3118,8 @@ async def get_income_statement(
 
 
 @router.get("/reports/balance-sheet")
-async def get_balance_sheet(as_of_date: Optional[str] = None, yard_id: Optional[str] = None):
+async def get_balance_sheet(as_of_date: Optional[str] = None, yard_id: Optional[str] = None,
+                            full_recompute: bool = False):
     """QuickBooks-style hierarchical Balance Sheet (Balance General)."""
     as_of = as_of_date or date.today().isoformat()
 
@@ -3131,7 +3144,7 @@ async def get_balance_sheet(as_of_date: Optional[str] = None, yard_id: Optional[
         filters = {"lte_date": as_of}
         if yard_id:
             filters["yard_id"] = yard_id
-        txns = _fetch_all_transactions(filters)
+        txns = _fetch_ledger_rows(filters, full_recompute)
         for t in txns:
             aid = t.get("account_id")
             if not aid:
@@ -3252,10 +3265,11 @@ class SaveStatementRequest(BaseModel):
 
 @router.post("/reports/save")
 async def save_financial_statement(data: SaveStatementRequest):
-    """Save an immutable snapshot of the current Balance Sheet, P&L, or Cash Flow for Homes."""
+    """Save an immutable snapshot of the current Balance Sheet, P&L, or Cash Flow for Homes.
+    Saved statements are recomputed from the ledger itself, not the daily snapshots."""
     try:
         if data.report_type == "balance_sheet":
-            report = await get_balance_sheet()
+            report = await get_balance_sheet(full_recompute=True)
             record = {
                 "portal": "homes",
                 "report_type": "balance_sheet",
@@ -3272,7 +3286,7 @@ async def save_financial_statement(data: SaveStatementRequest):
             period_start = None
             period_end = report.get("as_of_date", date.today().isoformat())
         elif data.report_type == "profit_loss":
-            report = await get_income_statement()
+            report = await get_income_statement(full_recompute=True)
             sections = report.get("sections", {})
             record = {
                 "portal": "homes",
@@ -3290,7 +3304,7 @@ async def save_financial_statement(data: SaveStatementRequest):
             period_start = report.get("period", {}).get("start")
             period_end = report.get("period", {}).get("end")
         elif data.report_type == "cash_flow":
-            report = await get_cash_flow_statement()
+            report = await get_cash_flow_statement(full_recompute=True)
             record = {
                 "portal": "homes",
                 "report_type": "cash_flow",
@@ -3661,6 +3675,7 @@ async def export_balance_sheet_csv(
 async def get_cash_flow_statement(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    full_recompute: bool = False,
 ):
     """Cash Flow Statement (Estado de Flujo de Efectivo)."""
     now = date.today()
@@ -3672,7 +3687,7 @@ async def get_cash_flow_statement(
     acct_type_by_id = {a["id"]: a.get("account_type", "") for a in accounts}
     bank_acct_ids = set(a["id"] for a in accounts if a.get("account_type") in ("Bank", "asset"))
 
-    txns = _fetch_all_transactions({"gte_date": sd, "lte_date": ed})
+    txns = _fetch_ledger_rows({"gte_date": sd, "lte_date": ed}, full_recompute)
 
     # Separate P&L transactions by type for categorization
     operating_in = 0.0
@@ -3715,6 +3730,43 @@ async def get_cash_flow_statement(
     }
 
 
+@router.get("/reports/snapshots/check")
+async def check_ledger_snapshots(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    yard_id: Optional[str] = None,
+):
+    """Consistency check: per-account totals from the daily balance snapshots
+    vs a full recompute over accounting_transactions. Any mismatch means the
+    snapshots drifted — POST /reports/snapshots/rebuild fixes it."""
+    filters = {}
+    if start_date:
+        filters["gte_date"] = start_date
+    if end_date:
+        filters["lte_date"] = end_date
+    if yard_id:
+        filters["yard_id"] = yard_id
+    try:
+        snapshot_rows = await run_sync(ledger_snapshots.fetch_snapshot_rows, sb, filters)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Snapshots no disponibles (¿migración 108?): {e}")
+    ledger_rows = await run_sync(_fetch_all_transactions, filters)
+    result = ledger_snapshots.diff_balances(ledger_rows, snapshot_rows)
+    if not result["ok"]:
+        logger.warning(f"[snapshots] {len(result['mismatches'])} accounts drifted: {result['mismatches'][:5]}")
+    return {**result, "filters": filters}
+
+
+@router.post("/reports/snapshots/rebuild")
+async def rebuild_ledger_snapshots():
+    """Recompute every daily balance snapshot from the ledger."""
+    try:
+        rows = await run_sync(ledger_snapshots.rebuild_snapshots, sb)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Rebuild failed: {e}")
+    return {"ok": True, "snapshot_rows": rows}
+
+
 @router.get("/reports/pnl")
 async def get_profit_and_loss(
     start_date: Optional[str] = None, end_date: Optional[str] = None,
@@ -4392,16 +4444,35 @@ async def _parse_statement_background(
     well below the 15-30s the AI parser routinely takes for a multi-page
     statement. We fire-and-forget this so the upload request returns in
     <2s and the frontend polls /bank-statements/{id} until status flips
-    from 'parsing' to 'parsed' or 'error'."""
+    from 'parsing' to 'parsed' or 'error'.
+
+    Movements are inserted chunk by chunk as the parser produces them, and
+    total_movements is bumped after each insert, so the first page of a long
+    statement shows up on the polling frontend within seconds while the rest
+    is still being parsed."""
+    preview = TextPreview()
+    inserted = 0
+    meta = None
     try:
-        raw_text, movements = await _extract_and_parse_statement(file_content, ext, account_key)
+        async for batch in _stream_statement_movements(file_content, ext, account_key, preview):
+            if not batch:
+                continue
+            if meta is None:
+                meta = batch[0]
+            await _insert_statement_movements(
+                [_statement_movement_row(statement_id, mv, inserted + j) for j, mv in enumerate(batch)]
+            )
+            inserted += len(batch)
+            await aexecute(sb.table("bank_statements").update({
+                "total_movements": inserted,
+            }).eq("id", statement_id))
 
-        if not movements:
+        if not inserted:
             # AI couldn't find any movements. Surface a diagnostic with
             # length of text extracted so the operator can tell whether
             # the PDF was image-only / extraction failed vs. AI just
             # couldn't find structure.
-            text_len = len(raw_text or "")
+            text_len = preview.length
             if text_len < 50:
                 raise ValueError(
                     f"El archivo no tiene capa de texto extraíble "
@@ -4415,34 +4486,7 @@ async def _parse_statement_background(
                 f"estado de cuenta real, no un resumen ni un comprobante suelto."
             )
 
-        # Save raw text
-        sb.table("bank_statements").update({
-            "raw_extracted_text": raw_text[:50000] if raw_text else None,
-            "total_movements": len(movements),
-        }).eq("id", statement_id).execute()
-
-        # Insert movements
-        for i, mv in enumerate(movements):
-            mv_data = {
-                "statement_id": statement_id,
-                "movement_date": mv.get("date", date.today().isoformat()),
-                "description": mv.get("description", "")[:500],
-                "amount": float(mv.get("amount", 0)),
-                "is_credit": mv.get("is_credit", float(mv.get("amount", 0)) > 0),
-                "reference": mv.get("reference", "")[:200] if mv.get("reference") else None,
-                "payment_method": mv.get("payment_method"),
-                "counterparty": mv.get("counterparty", "")[:200] if mv.get("counterparty") else None,
-                "sort_order": i,
-                "status": "pending",
-            }
-            mv_data = {k: v for k, v in mv_data.items() if v is not None}
-            try:
-                sb.table("statement_movements").insert(mv_data).execute()
-            except Exception as e:
-                logger.warning(f"[BankStmt] Failed to insert movement {i}: {e}")
-
         # Extract period + balance metadata from first movement (set there by the AI parser)
-        meta = movements[0] if movements else {}
         period_start = meta.get("period_start") or None
         period_end = meta.get("period_end") or None
         beginning_balance = meta.get("beginning_balance")
@@ -4450,7 +4494,8 @@ async def _parse_statement_background(
 
         stmt_update = {
             "status": "parsed",
-            "total_movements": len(movements),
+            "total_movements": inserted,
+            "raw_extracted_text": preview.text or None,
             "bank_name": meta.get("bank_name") or None,
             "account_number_last4": meta.get("account_last4") or None,
             "statement_period_start": period_start,
@@ -4486,16 +4531,55 @@ async def _parse_statement_background(
             except Exception as audit_err:
                 logger.warning(f"[BankStmt] Discrepancy check failed: {audit_err}")
 
-        logger.info(f"[BankStmt] background parse complete for {statement_id}: {len(movements)} movements")
+        logger.info(f"[BankStmt] background parse complete for {statement_id}: {inserted} movements")
 
     except Exception as e:
         logger.error(f"[BankStmt] Parse error: {e}")
+        if inserted:
+            # Don't leave half a statement behind: an errored statement has
+            # no movements, same as before they were inserted incrementally.
+            try:
+                sb.table("statement_movements").delete().eq("statement_id", statement_id).execute()
+            except Exception as cleanup_err:
+                logger.warning(f"[BankStmt] Could not remove partial movements: {cleanup_err}")
         sb.table("bank_statements").update({
             "status": "error",
             "error_message": str(e)[:500],
         }).eq("id", statement_id).execute()
 
 
+def _statement_movement_row(statement_id: str, mv: dict, sort_order: int) -> dict:
+    """A parsed movement → statement_movements row."""
+    mv_data = {
+        "statement_id": statement_id,
+        "movement_date": mv.get("date", date.today().isoformat()),
+        "description": mv.get("description", "")[:500],
+        "amount": float(mv.get("amount", 0)),
+        "is_credit": mv.get("is_credit", float(mv.get("amount", 0)) > 0),
+        "reference": mv.get("reference", "")[:200] if mv.get("reference") else None,
+        "payment_method": mv.get("payment_method"),
+        "counterparty": mv.get("counterparty", "")[:200] if mv.get("counterparty") else None,
+        "sort_order": sort_order,
+        "status": "pending",
+    }
+    return {k: v for k, v in mv_data.items() if v is not None}
+
+
+async def _insert_statement_movements(rows: list) -> None:
+    """Insert a chunk of movements in one round-trip; if the batch is
+    rejected, fall back to row by row so one bad row doesn't drop the rest."""
+    try:
+        await aexecute(sb.table("statement_movements").insert(rows))
+        return
+    except Exception as e:
+        logger.warning(f"[BankStmt] Batch insert of {len(rows)} movements failed ({e}); retrying row by row")
+    for row in rows:
+        try:
+            await aexecute(sb.table("statement_movements").insert(row))
+        except Exception as e:
+            logger.warning(f"[BankStmt] Failed to insert movement {row['sort_order']}: {e}")
+
+
 @router.post("/bank-statements")
 async def upload_bank_statement(
     file: UploadFile = File(...),
@@ -4579,9 +4663,14 @@ async def upload_bank_statement(
 
 
 @router.post("/bank-statements/{statement_id}/reconcile")
-async def reconcile_statement_movements(statement_id: str):
+async def reconcile_statement_movements(
+    statement_id: str,
+    assignment: str = Query("optimal", description="optimal (best total score) | greedy (statement order)"),
+):
     """Auto-match statement movements against existing unreconciled accounting transactions.
     Returns matches with confidence scores for user confirmation."""
+    if assignment not in ("optimal", "greedy"):
+        raise HTTPException(status_code=400, detail=f"Unknown assignment mode: {assignment}")
     stmt = sb.table("bank_statements").select("*").eq("id", statement_id).execute()
     if not stmt.data:
         raise HTTPException(status_code=404, detail="Statement not found")
@@ -4616,8 +4705,11 @@ async def reconcile_statement_movements(statement_id: str):
     # Note: we do NOT early-return when there are no transactions — a movement
     # can still match an open invoice (this is how split payments reconcile via
     # facturas), so we always fall through to the invoice matcher below.
-    matches = (_match_movements_to_transactions(movements.data, unreconciled_txns)
-               if unreconciled_txns else [])
+    # "optimal" resolves contention globally so an early weak match can't
+    # steal the transaction a later movement matches perfectly.
+    matcher = (_assign_movements_to_transactions if assignment == "optimal"
+               else _match_movements_to_transactions)
+    matches = matcher(movements.data, unreconciled_txns) if unreconciled_txns else []
 
     # Also look for OPEN INVOICES that could match a movement. This lets the
     # operator auto-cobrar a factura from a bank deposit (or auto-pay an AP
@@ -4649,344 +4741,14 @@ async def reconcile_statement_movements(statement_id: str):
     }
 
 
-def _normalize_name(name: str) -> str:
-    """Normalize a counterparty name for comparison."""
-    import re
-    name = name.lower().strip()
-    # Remove common prefixes/suffixes
-    for noise in ["zelle payment from ", "wire transfer in - ", "wire transfer - ",
-                   "check #", "ach debit - ", "ach credit - ", "transfer from ",
-                   "transfer to ", "payment from ", "payment to ",
-                   "venta contado - ", "compra propiedad: ", "compra: "]:
-        name = name.replace(noise, "")
-    # Remove non-alphanumeric except spaces
-    name = re.sub(r'[^a-záéíóúñü\s]', '', name).strip()
-    return name
-
-
-def _name_similarity(name1: str, name2: str) -> float:
-    """Calculate similarity between two names (0.0 to 1.0)."""
-    n1 = _normalize_name(name1)
-    n2 = _normalize_name(name2)
-    if not n1 or not n2:
-        return 0.0
-
-    # Exact match after normalization
-    if n1 == n2:
-        return 1.0
-
-    # One contains the other
-    if n1 in n2 or n2 in n1:
-        return 0.9
-
-    # Token overlap
-    tokens1 = set(n1.split())
-    tokens2 = set(n2.split())
-    if not tokens1 or not tokens2:
-        return 0.0
-
-    overlap = len(tokens1 & tokens2)
-    total = max(len(tokens1), len(tokens2))
-    return overlap / total if total > 0 else 0.0
-
-
-def _match_signals(name_sim: float, diff_days, partial: bool) -> tuple:
-    """Build the transparency payload for a match: which signals corroborate it
-    (amount / name / date), the name-similarity %, and a short human 'reason' so
-    the reconciliation UI can show WHY it's a match and HOW sure it is — instead
-    of the app matching silently."""
-    name_ok = name_sim >= 0.4
-    date_ok = diff_days is not None and diff_days <= 3
-    signals = {
-        "amount": True,   # amount is a precondition for every match
-        "name": name_ok,
-        "date": date_ok,
-        "name_similarity": round(name_sim * 100),
-        "days_apart": diff_days,
-    }
-    parts = ["monto coincide"]
-    parts.append(f"nombre {round(name_sim*100)}%" if name_ok else "nombre no coincide")
-    if diff_days is not None:
-        parts.append("misma fecha" if diff_days == 0 else f"±{diff_days} días")
-    reason = " · ".join(parts)
-    if partial:
-        reason = "pago parcial · " + reason
-    # A caveat line the UI can surface when it's not a sure thing.
-    caveat = None
-    if not name_ok:
-        caveat = "La app NO está segura: coincide el monto pero el nombre no. Revísalo."
-    elif not date_ok and diff_days is not None:
-        caveat = "Revisa: el nombre coincide pero las fechas están algo separadas."
-    return signals, reason, caveat
-
-
-def _match_movements_to_transactions(movements: list, transactions: list) -> list:
-    """Match bank statement movements against existing accounting transactions.
-    Returns list of match dicts with scores."""
-    matches = []
-    used_txn_ids = set()
-
-    for mv in movements:
-        mv_amount = abs(float(mv.get("amount", 0)))
-        mv_is_credit = mv.get("is_credit", False)
-        mv_date_str = mv.get("movement_date", "")
-        mv_counterparty = mv.get("counterparty") or ""
-        # Also check description for counterparty clues
-        mv_description = mv.get("description") or ""
-
-        best_match = None
-        best_score = 0
-        best_name_sim = 0.0
-        best_diff_days = None
-
-        for txn in transactions:
-            if txn["id"] in used_txn_ids:
-                continue
-
-            score = 0
-            txn_amount = abs(float(txn.get("amount", 0)))
-            txn_is_income = txn.get("is_income", False)
-
-            # Direction match — must agree (credit=income, debit=expense)
-            if mv_is_credit != txn_is_income:
-                continue
-
-            # Amount must match within 1% — a bigger gap is not the same payment.
-            if mv_amount <= 0 or txn_amount <= 0:
-                continue
-            diff_pct = abs(mv_amount - txn_amount) / max(mv_amount, txn_amount)
-            if abs(mv_amount - txn_amount) < 0.01:
-                score += 50
-            elif diff_pct < 0.01:
-                score += 35
-            else:
-                continue  # amount too different → not a candidate
-
-            # Date proximity
-            diff_days = None
-            try:
-                mv_date = datetime.strptime(mv_date_str, "%Y-%m-%d").date() if mv_date_str else None
-                txn_date_str = txn.get("transaction_date", "")
-                txn_date = datetime.strptime(txn_date_str, "%Y-%m-%d").date() if txn_date_str else None
-                if mv_date and txn_date:
-                    diff_days = abs((mv_date - txn_date).days)
-                    if diff_days == 0:
-                        score += 30
-                    elif diff_days <= 1:
-                        score += 25
-                    elif diff_days <= 3:
-                        score += 15
-                    elif diff_days <= 7:
-                        score += 8
-                    elif diff_days <= 14:
-                        score += 3
-            except Exception:
-                pass
-
-            # Counterparty similarity (name in either field of either side)
-            txn_counterparty = txn.get("counterparty_name") or ""
-            txn_description = txn.get("description") or ""
-            name_sim = 0.0
-            for mv_name in [mv_counterparty, mv_description]:
-                for txn_name in [txn_counterparty, txn_description]:
-                    if mv_name and txn_name:
-                        name_sim = max(name_sim, _name_similarity(mv_name, txn_name))
-            score += int(20 * name_sim)
-
-            if score > best_score:
-                best_score = score
-                best_match = txn
-                best_name_sim = name_sim
-                best_diff_days = diff_days
-
-        # RELIABILITY RULE: a matching AMOUNT is necessary but NEVER sufficient
-        # on its own (two different payments can share an amount). Require at
-        # least one CORROBORATING signal — the counterparty name is similar, or
-        # the dates are very close. Amount-only "matches" are dropped so the
-        # wizard never proposes a coincidence that isn't a real match.
-        if not best_match:
-            continue
-        name_ok = best_name_sim >= 0.4
-        date_ok = best_diff_days is not None and best_diff_days <= 3
-        if not (name_ok or date_ok):
-            continue  # amount-only → not offered
-
-        used_txn_ids.add(best_match["id"])
-        # High confidence (auto-selectable) only with a STRONG signal: a clear
-        # name match, or a same-day exact-amount hit. Otherwise it's a
-        # suggestion the operator must confirm.
-        strong = best_name_sim >= 0.7 or (best_name_sim >= 0.4 and best_diff_days == 0)
-        confidence = "high" if strong else "medium"
-        signals, reason, caveat = _match_signals(best_name_sim, best_diff_days, False)
-        matches.append({
-            "movement_id": mv["id"],
-            "transaction_id": best_match["id"],
-            "target_type": "transaction",
-            "score": best_score,
-            "confidence": confidence,
-            "signals": signals,
-            "reason": reason,
-            "caveat": caveat,
-            "movement": mv,
-            "transaction": best_match,
-        })
-
-    return matches
-
-
-def _match_movements_to_invoices(movements: list, invoices: list) -> list:
-    """Match bank statement movements against open invoices (AR or AP), including
-    SPLIT / PARTIAL payments.
-
-    Why invoices (and not the transaction matcher) unlock split payments: the
-    exact-amount transaction matcher can't reconcile "$500 + $500 = a $1000
-    factura" because each $500 is 50% off the target. An invoice, however,
-    carries a `balance_due` and natively accumulates `amount_paid`, so it can
-    absorb several movements until it's settled. Each invoice therefore keeps a
-    running `remaining` balance that is decremented as movements are allocated,
-    letting one invoice take multiple movements in a single pass without
-    over-allocating.
-
-    Partial matches (a movement smaller than the remaining balance) are only
-    offered when something corroborates them — the counterparty name matches, or
-    the invoice number appears in the movement text — so a random small deposit
-    is never glued onto a large unrelated invoice. Matches carry a `partial`
-    flag so the UI can label them and skip auto-selecting them.
-
-    Returns match dicts with `target_type='invoice'` and `invoice_id` so
-    reconcile-confirm can branch on it (that endpoint already re-reads the
-    invoice per pair and accumulates amount_paid, so N partials settle correctly).
-    """
-    matches: list = []
-    # Running unallocated balance per invoice, decremented as we allocate.
-    remaining = {inv["id"]: float(inv.get("balance_due") or 0) for inv in invoices}
-
-    for mv in movements:
-        mv_amount = abs(float(mv.get("amount", 0)))
-        if mv_amount <= 0:
-            continue
-        mv_is_credit = mv.get("is_credit", False)  # True=deposit, False=withdrawal
-        mv_date_str = mv.get("movement_date", "")
-        mv_counterparty = mv.get("counterparty") or ""
-        mv_description = mv.get("description") or ""
-
-        best_match = None
-        best_score = 0
-        best_is_partial = False
-        best_name_sim_win = 0.0
-        best_diff_days_win = None
-
-        for inv in invoices:
-            rem = remaining.get(inv["id"], 0.0)
-            if rem <= 0.01:
-                continue  # already fully allocated by earlier movements
-
-            # Direction must agree:
-            #   deposit (is_credit=True)  → receivable (we get paid)
-            #   withdrawal (is_credit=False) → payable (we pay a bill)
-            direction = (inv.get("direction") or "").lower()
-            if mv_is_credit and direction != "receivable":
-                continue
-            if not mv_is_credit and direction != "payable":
-                continue
-
-            # Corroboration signals (name similarity / invoice number in text).
-            inv_counterparty = inv.get("counterparty_name") or ""
-            inv_num = (inv.get("invoice_number") or "").lower()
-            best_name_sim = 0.0
-            for mv_name in (mv_counterparty, mv_description):
-                if mv_name and inv_counterparty:
-                    best_name_sim = max(best_name_sim, _name_similarity(mv_name, inv_counterparty))
-                if inv_num and mv_name and inv_num in mv_name.lower():
-                    best_name_sim = max(best_name_sim, 1.0)
-
-            # ---- Amount scoring against the REMAINING balance ----
-            score = 0
-            is_partial = False
-            diff = abs(mv_amount - rem)
-            diff_pct = diff / max(mv_amount, rem)
-            if diff < 0.01:
-                score += 50            # settles the remaining balance exactly
-            elif diff_pct < 0.01:
-                score += 35
-            elif diff_pct < 0.05:
-                score += 15
-            elif mv_amount < rem:
-                # PARTIAL payment: only a candidate when corroborated, so we
-                # never glue an unrelated small deposit onto a large invoice.
-                if best_name_sim >= 0.5:
-                    score += 25
-                    is_partial = True
-                else:
-                    continue
-            else:
-                continue  # movement bigger than the remaining balance → not this invoice
-
-            # ---- Date proximity vs due_date or issue_date (best of the two) ----
-            this_diff_days = None
-            try:
-                mv_date = datetime.strptime(mv_date_str, "%Y-%m-%d").date() if mv_date_str else None
-                for cmp_str in (inv.get("due_date"), inv.get("issue_date")):
-                    if not cmp_str or not mv_date:
-                        continue
-                    cmp_date = datetime.strptime(cmp_str, "%Y-%m-%d").date()
-                    dd = abs((mv_date - cmp_date).days)
-                    this_diff_days = dd if this_diff_days is None else min(this_diff_days, dd)
-                if this_diff_days is not None:
-                    if this_diff_days == 0:
-                        score += 30
-                    elif this_diff_days <= 3:
-                        score += 20
-                    elif this_diff_days <= 14:
-                        score += 10
-                    elif this_diff_days <= 30:
-                        score += 5
-            except Exception:
-                pass
-
-            score += int(20 * best_name_sim)
-
-            if score > best_score:
-                best_score = score
-                best_match = inv
-                best_is_partial = is_partial
-                best_name_sim_win = best_name_sim
-                best_diff_days_win = this_diff_days
-
-        # RELIABILITY RULE: never match a movement to an invoice on AMOUNT alone.
-        # Partials already require a name match above; for full/near-full matches
-        # require corroboration too — similar counterparty name, the invoice
-        # number in the movement text, or a date within a few days of the
-        # invoice. Otherwise two unrelated payments of the same amount would be
-        # matched by coincidence.
-        if best_match:
-            name_ok = best_name_sim_win >= 0.4
-            date_ok = best_diff_days_win is not None and best_diff_days_win <= 3
-            if not best_is_partial and not (name_ok or date_ok):
-                best_match = None  # amount-only → not a real match
-
-        if best_match and best_score >= 50:
-            rem_before = remaining.get(best_match["id"], 0.0)
-            remaining[best_match["id"]] = rem_before - mv_amount  # allocate this movement
-            # High (auto-selectable) only with a strong signal; else a suggestion.
-            strong = best_name_sim_win >= 0.7 or (best_name_sim_win >= 0.4 and best_diff_days_win == 0)
-            confidence = "high" if (strong and not best_is_partial) else "medium"
-            signals, reason, caveat = _match_signals(best_name_sim_win, best_diff_days_win, best_is_partial)
-            matches.append({
-                "movement_id": mv["id"],
-                "invoice_id": best_match["id"],
-                "target_type": "invoice",
-                "score": best_score,
-                "confidence": confidence,
-                "partial": best_is_partial,
-                "signals": signals,
-                "reason": reason,
-                "caveat": caveat,
-                "movement": mv,
-                "invoice": best_match,
-            })
-
-    return matches
+# Matching lives in api/services/reconciliation.py (prepared names/dates and
+# an amount-sorted candidate index); these names are kept for existing callers.
+_normalize_name = reconciliation.normalize_name
+_name_similarity = reconciliation.name_similarity
+_match_signals = reconciliation.match_signals
+_match_movements_to_transactions = reconciliation.match_movements_to_transactions
+_assign_movements_to_transactions = reconciliation.assign_movements_to_transactions
+_match_movements_to_invoices = reconciliation.match_movements_to_invoices
 
 
 @router.post("/bank-statements/{statement_id}/reconcile/confirm")
@@ -5113,10 +4875,13 @@ async def confirm_reconciliation(statement_id: str, data: dict):
 
 
 @router.post("/bank-statements/{statement_id}/classify")
-async def classify_statement_movements(statement_id: str):
+async def classify_statement_movements(
+    statement_id: str,
+    resume: bool = Query(False, description="Only classify movements that have no suggestion yet"),
+):
     """Use AI to suggest accounting accounts for each movement."""
     try:
-        return await _do_classify(statement_id)
+        return await _do_classify(statement_id, resume=resume)
     except HTTPException:
         raise
     except Exception as e:
@@ -5124,7 +4889,12 @@ async def classify_statement_movements(statement_id: str):
         raise HTTPException(status_code=500, detail=f"Classification error: {str(e)[:200]}")
 
 
-async def _do_classify(statement_id: str):
+async def _do_classify(statement_id: str, resume: bool = False):
+    """Batches of movements are classified concurrently (bounded and paced by
+    the shared OpenAI limiter). Each batch is saved as soon as it comes back
+    and `bank_statements.classified_movements` is bumped, so the UI can poll
+    progress and an interrupted run can continue with `resume=True` — which
+    skips movements that already have a suggested account."""
     # Get statement + movements
     stmt = sb.table("bank_statements").select("*").eq("id", statement_id).execute()
     if not stmt.data:
@@ -5174,20 +4944,32 @@ async def _do_classify(statement_id: str):
     ])
 
     # --- Learning from human corrections ---
-    # Query past confirmed movements where the human changed the AI suggestion
+    # Past confirmed movements feed two things: the classification memo
+    # (patterns the accountant keeps confirming skip the model entirely) and
+    # the prompt's list of cases where the human changed the AI suggestion.
     corrections_ref = ""
+    memo = ClassificationMemo()
     try:
-        confirmed = (sb.table("statement_movements")
-                     .select("description, counterparty, amount, is_credit, suggested_account_code, suggested_account_id, final_account_id")
+        # The 2000 most recent confirmations, paged past PostgREST's 1000-row cap
+        confirmed: list = []
+        page_size = 1000
+        while len(confirmed) < 2000:
+            batch = (sb.table("statement_movements")
+                     .select("description, counterparty, amount, is_credit, suggested_account_code, suggested_account_id, final_account_id, final_transaction_type")
                      .in_("status", ["confirmed", "posted"])
                      .not_.is_("final_account_id", "null")
-                     .not_.is_("suggested_account_id", "null")
                      .order("updated_at", desc=True)
-                     .limit(200)
-                     .execute())
+                     .order("id")
+                     .range(len(confirmed), len(confirmed) + page_size - 1)
+                     .execute().data or [])
+            confirmed.extend(batch)
+            if len(batch) < page_size:
+                break
+        memo = ClassificationMemo.from_history(confirmed, acct_by_id)
         # Filter where human chose a different account than AI
         corrections = []
-        for cm in (confirmed.data or []):
+        reviewed = [cm for cm in confirmed if cm.get("suggested_account_id")][:200]
+        for cm in reviewed:
             if cm.get("final_account_id") and cm.get("suggested_account_id") and cm["final_account_id"] != cm["suggested_account_id"]:
                 final_acct = acct_by_id.get(cm["final_account_id"])
                 suggested_acct = acct_by_id.get(cm["suggested_account_id"])
@@ -5221,15 +5003,52 @@ async def _do_classify(statement_id: str):
         properties_list = []
     prop_by_code = {p["property_code"].upper(): p["id"] for p in properties_list if p.get("property_code")}
 
-    # Classify in small batches to avoid token limits
-    classified = 0
-    batch_size = 5
+    # Suggestion → account id without a query per movement (fall back to one
+    # for codes outside the active chart, as before).
+    acct_id_by_code = {}
+    for a in all_accounts:
+        acct_id_by_code.setdefault(a["code"], a["id"])
+
     mvs = movements.data
+    already_done = 0
+    if resume:
+        todo = [m for m in mvs if not m.get("suggested_account_code")]
+        already_done = len(mvs) - len(todo)
+        mvs = todo
+        if not mvs:
+            return {"message": "All movements already classified", "classified": already_done}
+
+    # Patterns the accountant has already confirmed consistently are answered
+    # from the memo; only the rest goes to the model.
+    memo_stats = MemoStats()
+    memo_hits, mvs = memo.split(mvs, memo_stats)
 
-    for batch_start in range(0, len(mvs), batch_size):
-        batch = mvs[batch_start:batch_start + batch_size]
-        suggestions = await _ai_classify_movements(batch, accounts_ref, accounts_list, corrections_ref)
+    # Classify in small batches to avoid token limits
+    batch_size = 5
+    batches = [mvs[i:i + batch_size] for i in range(0, len(mvs), batch_size)]
+    classified = 0
 
+    client = None
+    limiter = get_openai_limiter()
+    if batches:
+        import os
+        from openai import AsyncOpenAI
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not configured")
+        client = AsyncOpenAI(api_key=api_key, timeout=120.0, max_retries=0)
+
+    await aexecute(sb.table("bank_statements").update({
+        "status": "classifying",
+        "classified_movements": already_done,
+    }).eq("id", statement_id))
+
+    async def classify_batch(batch):
+        return await _ai_classify_movements(batch, accounts_ref, accounts_list, corrections_ref,
+                                            client=client, limiter=limiter)
+
+    async def save_batch(_i, batch, suggestions):
+        nonlocal classified
         for mv, suggestion in zip(batch, suggestions):
             update_data = {
                 "suggested_account_code": suggestion.get("account_code"),
@@ -5243,10 +5062,14 @@ async def _do_classify(statement_id: str):
             if mv.get("status") != "reconciled":
                 update_data["status"] = "suggested"
             # Try to find account ID
-            if suggestion.get("account_code"):
-                acct_match = sb.table("accounting_accounts").select("id").eq("code", suggestion["account_code"]).execute()
-                if acct_match.data:
-                    update_data["suggested_account_id"] = acct_match.data[0]["id"]
+            acct_code = suggestion.get("account_code")
+            if acct_code:
+                acct_id = acct_id_by_code.get(acct_code)
+                if acct_id is None:
+                    acct_match = await aexecute(sb.table("accounting_accounts").select("id").eq("code", acct_code))
+                    acct_id = acct_match.data[0]["id"] if acct_match.data else None
+                if acct_id:
+                    update_data["suggested_account_id"] = acct_id
 
             # Detect property_id from AI suggestion or movement description
             detected_property_id = None
@@ -5260,22 +5083,52 @@ async def _do_classify(statement_id: str):
                         detected_property_id = pid
                         break
 
-            sb.table("statement_movements").update(update_data).eq("id", mv["id"]).execute()
+            await aexecute(sb.table("statement_movements").update(update_data).eq("id", mv["id"]))
             # Try to set property_id separately (column may not exist yet)
             if detected_property_id:
                 try:
-                    sb.table("statement_movements").update({"property_id": detected_property_id}).eq("id", mv["id"]).execute()
+                    await aexecute(sb.table("statement_movements").update({"property_id": detected_property_id}).eq("id", mv["id"]))
                 except Exception:
                     pass  # Column doesn't exist yet — migration 087 pending
             classified += 1
 
+        # Progress for the UI (and the starting point of a resumed run).
+        await aexecute(sb.table("bank_statements").update({
+            "classified_movements": already_done + classified,
+        }).eq("id", statement_id))
+
+    try:
+        if memo_hits:
+            await save_batch(-1, [mv for mv, _ in memo_hits], [sug for _, sug in memo_hits])
+        await map_bounded(batches, classify_batch, limiter=limiter, on_result=save_batch)
+    except Exception:
+        # Saved batches stay saved; leave the statement reviewable and
+        # resumable instead of stuck in 'classifying'.
+        await aexecute(sb.table("bank_statements").update({
+            "status": "review",
+            "classified_movements": already_done + classified,
+        }).eq("id", statement_id))
+        raise
+
     # Update statement status
-    sb.table("bank_statements").update({
+    await aexecute(sb.table("bank_statements").update({
         "status": "review",
-        "classified_movements": classified,
-    }).eq("id", statement_id).execute()
+        "classified_movements": already_done + classified,
+    }).eq("id", statement_id))
+
+    # Rough prompt cost of what the memo avoided: the fixed part (chart +
+    # corrections + instructions) once per batch it saved, plus ~100 tokens
+    # per movement line and its answer.
+    per_batch = estimate_tokens(accounts_ref + corrections_ref) + 1000
+    memo_stats.tokens_saved = (math.ceil(memo_stats.hits / batch_size) * per_batch
+                               + memo_stats.hits * 100)
+    logger.info(f"[classify] {statement_id}: memo {memo_stats.as_dict()} ({len(memo)} learned patterns)")
 
-    return {"message": f"Classified {classified} movements", "classified": classified}
+    return {
+        "message": f"Classified {classified} movements ({memo_stats.hits} from memory)",
+        "classified": already_done + classified,
+        "memo": memo_stats.as_dict(),
+    }
 
 
 @router.patch("/bank-statements/movements/{movement_id}")
@@ -5453,6 +5306,11 @@ async def post_confirmed_movements(statement_id: str):
         'expense': 'other_expense', 'income': 'other_income',
     }
 
+    # New (unreconciled) movements are collected as ledger pairs and written
+    # in ONE insert after the loop — see insert_ledger_pairs.
+    new_pairs: list[tuple[dict, tuple[dict, dict], bool]] = []   # (movement, (debit, credit), bank_is_debit)
+    reconciled_now = datetime.utcnow().isoformat()
+
     for mv in movements.data:
         account_id = mv.get("final_account_id") or mv.get("suggested_account_id")
         raw_txn_type = mv.get("final_transaction_type") or mv.get("suggested_transaction_type") or "adjustment"
@@ -5477,40 +5335,7 @@ async def post_confirmed_movements(statement_id: str):
         bank_is_income = mv.get("is_credit", False)
 
         try:
-            abs_amount = abs(float(mv["amount"]))
-            # `common_fields` is shared between the two legs of the pair but
-            # MUST NOT include bank_account_id — that belongs ONLY to the
-            # bank leg below. Otherwise the bank balance derivation counts
-            # every movement twice (pre-fix bug: 2x effect on Cuenta Dallas).
-            common_fields = {
-                "transaction_date": mv["movement_date"],
-                "payment_method": mv.get("payment_method"),
-                "payment_reference": mv.get("reference"),
-                "counterparty_name": mv.get("counterparty"),
-                "description": mv.get("description", "")[:500],
-                "property_id": mv.get("property_id"),
-                "source": "bank_statement",
-            }
-            common_fields = {k: v for k, v in common_fields.items() if v is not None}
-
-            pnl_txn_id = None
-
-            # is_income on the P&L leg must reflect the NATURAL direction
-            # of that account so the reports (_signed_balance) give it a
-            # positive contribution:
-            #   - Deposit → income account credited → is_income=True so
-            #     House Sales etc. show +amt in the P&L.
-            #   - Withdrawal → expense account debited → is_income=False so
-            #     Office Supplies etc. show +amt (debit grows expense).
-            # In both cases this happens to equal the movement's is_credit
-            # flag — i.e., the P&L leg's is_income mirrors the bank leg's,
-            # because each leg independently asks: "is my account being
-            # grown by this entry?" and for a deposit both bank-side and
-            # income-side grow (+); for a withdrawal both bank-side and
-            # expense-side shrink/grow in opposite senses such that
-            # _signed_balance still returns +amt for the expense.
-            pnl_is_income = bank_is_income
-            if mv.get("status") == "reconciled" and mv.get("matched_transaction_id"):
+            if is_reconciled:
                 # Reconciled: the movement was MATCHED to an existing
                 # transaction from a prior flow (Test 1 sale, factura
                 # issuance, etc.). That transaction already has its own
@@ -5526,11 +5351,17 @@ async def post_confirmed_movements(statement_id: str):
                 # deletes (which key off source='bank_statement') would wrongly
                 # DELETE it — reopening the H48 vanish-bug through another door.
                 # The statement link already lives in statement_movements.
+                #
+                # No bank-side row is created here: the matched transaction
+                # was created by post_to_ledger earlier and ALREADY has its
+                # bank leg linked via linked_transaction_id. Inserting another
+                # bank-side row would duplicate the cash effect on the bank
+                # (the bug that drove Cuenta Dallas from the expected
+                # $61,675.60 to the observed $83,125 in the lifecycle test).
                 matched_id = mv["matched_transaction_id"]
                 sb.table("accounting_transactions").update({
                     "reconciled_at": mv.get("movement_date") or date.today().isoformat(),
                 }).eq("id", matched_id).execute()
-                pnl_txn_id = matched_id
                 # OPT-IN reclassify: only when the accountant EXPLICITLY picked a
                 # different account for this reconciled movement do we move the
                 # P&L/inventory leg (the non-bank leg) to her choice. Confirming
@@ -5548,95 +5379,105 @@ async def post_confirmed_movements(statement_id: str):
                         _log_audit("accounting_transactions", target_leg, "update",
                                    description="Reclasificada por Abby desde conciliación")
                         logger.info(f"[bank-stmt] reclassified leg {target_leg} → account {chosen} (reconciled override)")
-            else:
-                # Non-reconciled: create new P&L transaction
-                txn_data = {
-                    **common_fields,
-                    "transaction_number": _generate_transaction_number(),
-                    "transaction_type": txn_type,
-                    "amount": abs_amount,
-                    "is_income": pnl_is_income,
-                    "account_id": account_id,
-                    "notes": f"Importado de estado de cuenta: {stmt_label}",
-                    "status": "confirmed",
-                }
-                txn_result = sb.table("accounting_transactions").insert(txn_data).execute()
-                if txn_result.data:
-                    pnl_txn_id = txn_result.data[0]["id"]
-                else:
-                    skipped += 1
-                    errors.append(f"'{mv.get('description', '')[:60]}' — error al insertar transacción")
-                    continue
-
-            # --- Entry 2: Bank/asset side (double-entry) ---
-            # Only this leg carries bank_account_id — the balance derivation
-            # (api.services.ledger.get_bank_balance) sums signed amounts on
-            # rows where bank_account_id = X. If the P&L leg also had
-            # bank_account_id set, every movement would be counted twice.
-            #
-            # SKIP this entry for RECONCILED movements: the matched
-            # transaction (pnl_txn_id) was created by post_to_ledger earlier
-            # and ALREADY has its bank leg linked via linked_transaction_id.
-            # Inserting another bank-side row here would duplicate the cash
-            # effect on the bank (the bug that drove Cuenta Dallas from the
-            # expected $61,675.60 to the observed $83,125 in the lifecycle
-            # test). For reconciled movements we just stamp reconciled_at
-            # on the existing pair below.
-            bank_txn_id = None
-            already_paired = (mv.get("status") == "reconciled" and mv.get("matched_transaction_id"))
-            if bank_accounting_account_id and not already_paired:
-                bank_data = {
-                    **common_fields,
-                    "transaction_number": _generate_transaction_number(),
-                    "transaction_type": txn_type,
-                    "amount": abs_amount,
-                    "is_income": bank_is_income,
-                    "account_id": bank_accounting_account_id,
-                    "bank_account_id": statement.get("bank_account_id"),
-                    "linked_transaction_id": pnl_txn_id,
-                    "notes": f"Contrapartida bancaria: {stmt_label}",
-                    "status": "confirmed",
-                }
-                bank_result = sb.table("accounting_transactions").insert(bank_data).execute()
-                if bank_result.data:
-                    bank_txn_id = bank_result.data[0]["id"]
-                    # Link the P&L entry back to the bank entry
-                    sb.table("accounting_transactions").update({
-                        "linked_transaction_id": bank_txn_id,
-                    }).eq("id", pnl_txn_id).execute()
 
-            # Mark movement as posted
-            sb.table("statement_movements").update({
-                "status": "posted",
-                "transaction_id": pnl_txn_id,
-            }).eq("id", mv["id"]).execute()
+                # Mark movement as posted
+                sb.table("statement_movements").update({
+                    "status": "posted",
+                    "transaction_id": matched_id,
+                }).eq("id", mv["id"]).execute()
 
-            # Flip reconciled_at on BOTH legs of the double-entry pair. This is
-            # what removes the matched txn from "Por Conciliar" — without it,
-            # the bank leg of the pair would keep showing up forever.
-            try:
-                ids_to_flip: list[str] = []
-                if pnl_txn_id:
-                    ids_to_flip.append(pnl_txn_id)
-                if bank_txn_id:
-                    ids_to_flip.append(bank_txn_id)
-                # Also pick up the writer-created pair via linked_transaction_id
-                for tid in list(ids_to_flip):
+                # Flip reconciled_at on BOTH legs of the matched pair. This is
+                # what removes it from "Por Conciliar" — without it, the bank
+                # leg of the pair would keep showing up forever.
+                try:
+                    ids_to_flip = [matched_id]
                     row = (sb.table("accounting_transactions")
                            .select("linked_transaction_id")
-                           .eq("id", tid).single().execute().data) or {}
-                    linked = row.get("linked_transaction_id")
-                    if linked and linked not in ids_to_flip:
-                        ids_to_flip.append(linked)
-                if ids_to_flip:
+                           .eq("id", matched_id).single().execute().data) or {}
+                    if row.get("linked_transaction_id"):
+                        ids_to_flip.append(row["linked_transaction_id"])
                     sb.table("accounting_transactions").update({
                         "status": "reconciled",
-                        "reconciled_at": datetime.utcnow().isoformat(),
+                        "reconciled_at": reconciled_now,
                     }).in_("id", ids_to_flip).execute()
-            except Exception as flip_err:
-                logger.warning(f"[BankStmt] Could not flip reconciled flag: {flip_err}")
+                except Exception as flip_err:
+                    logger.warning(f"[BankStmt] Could not flip reconciled flag: {flip_err}")
+
+                posted += 1
+                continue
+
+            abs_amount = abs(float(mv["amount"]))
+            # `common_fields` is shared between the two legs of the pair but
+            # MUST NOT include bank_account_id — that belongs ONLY to the
+            # bank leg below. Otherwise the bank balance derivation counts
+            # every movement twice (pre-fix bug: 2x effect on Cuenta Dallas).
+            # New rows are born reconciled: the statement IS the match.
+            common_fields = {
+                "transaction_date": mv["movement_date"],
+                "payment_method": mv.get("payment_method"),
+                "payment_reference": mv.get("reference"),
+                "counterparty_name": mv.get("counterparty"),
+                "description": mv.get("description", "")[:500],
+                "property_id": mv.get("property_id"),
+                "source": "bank_statement",
+                "transaction_type": txn_type,
+                "amount": abs_amount,
+                "status": "reconciled",
+                "reconciled_at": reconciled_now,
+            }
+            common_fields = {k: v for k, v in common_fields.items() if v is not None}
+
+            # is_income on the P&L leg must reflect the NATURAL direction
+            # of that account so the reports (_signed_balance) give it a
+            # positive contribution:
+            #   - Deposit → income account credited → is_income=True so
+            #     House Sales etc. show +amt in the P&L.
+            #   - Withdrawal → expense account debited → is_income=False so
+            #     Office Supplies etc. show +amt (debit grows expense).
+            # In both cases this happens to equal the movement's is_credit
+            # flag — i.e., the P&L leg's is_income mirrors the bank leg's,
+            # because each leg independently asks: "is my account being
+            # grown by this entry?" and for a deposit both bank-side and
+            # income-side grow (+); for a withdrawal both bank-side and
+            # expense-side shrink/grow in opposite senses such that
+            # _signed_balance still returns +amt for the expense.
+            pnl_row = {
+                **common_fields,
+                "is_income": bank_is_income,
+                "account_id": account_id,
+                "notes": f"Importado de estado de cuenta: {stmt_label}",
+            }
+
+            if not bank_accounting_account_id:
+                # No bank chart account linked → P&L row only.
+                pnl_row["transaction_number"] = _generate_transaction_number()
+                txn_result = sb.table("accounting_transactions").insert(pnl_row).execute()
+                if not txn_result.data:
+                    skipped += 1
+                    errors.append(f"'{mv.get('description', '')[:60]}' — error al insertar transacción")
+                    continue
+                sb.table("statement_movements").update({
+                    "status": "posted",
+                    "transaction_id": txn_result.data[0]["id"],
+                }).eq("id", mv["id"]).execute()
+                posted += 1
+                continue
 
-            posted += 1
+            # --- Bank/asset side (double-entry) ---
+            # Only this leg carries bank_account_id — the balance derivation
+            # (api.services.ledger.get_bank_balance) sums signed amounts on
+            # rows where bank_account_id = X. If the P&L leg also had
+            # bank_account_id set, every movement would be counted twice.
+            bank_row = {
+                **common_fields,
+                "is_income": bank_is_income,
+                "account_id": bank_accounting_account_id,
+                "bank_account_id": statement.get("bank_account_id"),
+                "notes": f"Contrapartida bancaria: {stmt_label}",
+            }
+            # Deposit: bank debited, P&L credited. Withdrawal: the reverse.
+            pair = (bank_row, pnl_row) if bank_is_income else (pnl_row, bank_row)
+            new_pairs.append((mv, pair, bool(bank_is_income)))
 
         except Exception as e:
             full_err = str(e)
@@ -5644,6 +5485,29 @@ async def post_confirmed_movements(statement_id: str):
             skipped += 1
             errors.append(f"'{mv.get('description', '')[:60]}' — {full_err[:200]}")
 
+    if new_pairs:
+        from api.services.ledger import insert_ledger_pairs
+        try:
+            pair_ids = insert_ledger_pairs([p for _, p, _ in new_pairs], db=sb)
+        except Exception as e:
+            # One INSERT: nothing was written, every new movement stays
+            # confirmed and can be re-published.
+            full_err = str(e)
+            logger.error(f"[BankStmt] Failed to post {len(new_pairs)} movement(s) of {statement_id}: {full_err}")
+            skipped += len(new_pairs)
+            errors.extend(f"'{mv.get('description', '')[:60]}' — {full_err[:200]}" for mv, _, _ in new_pairs)
+        else:
+            for (mv, _, bank_is_debit), (debit_id, credit_id) in zip(new_pairs, pair_ids):
+                pnl_txn_id = credit_id if bank_is_debit else debit_id
+                try:
+                    sb.table("statement_movements").update({
+                        "status": "posted",
+                        "transaction_id": pnl_txn_id,
+                    }).eq("id", mv["id"]).execute()
+                except Exception as e:
+                    logger.error(f"[BankStmt] Posted movement {mv['id']} but could not mark it: {e}")
+                posted += 1
+
     # Update statement stats
     total_posted = (sb.table("statement_movements")
                     .select("id", count="exact")
@@ -5958,61 +5822,102 @@ async def delete_receipt(receipt_id: str):
 # INTERNAL: Extract text and parse movements from bank statement files
 # ============================================================================
 
+# CSV movements are inserted in batches of this many rows.
+CSV_INSERT_BATCH = 200
+
+
 async def _extract_and_parse_statement(
     file_content: bytes,
     file_type: str,
     account_key: str,
 ) -> tuple:
     """Extract text from file and parse into structured movements.
-    Returns (raw_text, list_of_movements)."""
-    import os
+    Returns (raw_text, list_of_movements) — raw_text is the first 50k chars
+    (see _stream_statement_movements for the incremental version)."""
+    preview = TextPreview()
+    movements = []
+    async for batch in _stream_statement_movements(file_content, file_type, account_key, preview):
+        movements.extend(batch)
+    return (preview.text, movements)
+
 
-    raw_text = ""
+async def _stream_statement_movements(
+    file_content: bytes,
+    file_type: str,
+    account_key: str,
+    preview: Optional[TextPreview] = None,
+) -> AsyncIterator[list]:
+    """Yield a statement's movements in statement order, one batch at a time,
+    as soon as each batch is parsed — an LLM chunk for PDF/image/Excel,
+    CSV_INSERT_BATCH rows for CSV. The text is extracted page by page (PDF) /
+    row by row (Excel, CSV), so memory stays bounded by a few chunks however
+    long the statement is. `preview` collects the raw-text preview."""
+    if preview is None:
+        preview = TextPreview()
 
     # CSV is a STRUCTURED, known format — parse it deterministically (one row =
     # one movement). Never send it to the LLM, which could invent/drop rows.
     # This is the fix for "the app added a phantom $0 movement": the extracted
     # movements are now EXACTLY the file's rows.
     if file_type == "csv":
-        raw_text, _ = _parse_csv_statement(file_content)  # for the raw-text preview
-        movements = _parse_csv_movements(file_content)
-        return (raw_text, movements)
-
-    if file_type == "pdf":
-        raw_text = _extract_text_from_pdf(file_content)
-    elif file_type in ("png", "jpg", "jpeg"):
-        raw_text = await _extract_text_from_image(file_content, file_type)
-    elif file_type in ("xlsx", "xls"):
-        raw_text, _ = _parse_excel_statement(file_content)
+        preview.add(file_content[:preview.limit].decode("utf-8-sig", errors="replace"))
+        batch = []
+        for mv in _iter_csv_movements(file_content):
+            batch.append(mv)
+            if len(batch) == CSV_INSERT_BATCH:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        return
 
-    if not raw_text or len(raw_text.strip()) < 50:
-        raise ValueError("Could not extract meaningful text from the file")
+    if file_type in ("png", "jpg", "jpeg"):
+        pieces, sep = [await _extract_text_from_image(file_content, file_type)], "\n\n"
+    elif file_type in ("xlsx", "xls"):
+        pieces, sep = _iter_excel_text(file_content), "\n"
+    else:
+        pieces, sep = _iter_pdf_text(file_content), "\n\n"
+    preview.sep = sep
 
     # PDF/image/Excel are unstructured/scanned → GPT parses the extracted text.
-    movements = await _ai_parse_movements(raw_text, account_key)
-    return (raw_text, movements)
+    chunks = _require_meaningful_text(iter_text_chunks(preview.tap(pieces), sep=sep))
+    async for movements in _ai_parse_chunks(chunks, account_key):
+        yield movements
 
 
-def _extract_text_from_pdf(file_content: bytes) -> str:
-    """Extract text from a PDF file using pypdf or PyPDF2."""
-    import io as _io
+def _require_meaningful_text(chunks: Iterator[str]) -> Iterator[str]:
+    """Pass chunks through, but fail fast when the file has (almost) no text.
+    A first chunk under 50 chars can only be the whole text — size-driven
+    cuts are never shorter than half a chunk."""
+    first = next(chunks, "")
+    if len(first.strip()) < 50:
+        raise ValueError("Could not extract meaningful text from the file")
+    yield first
+    yield from chunks
+
+
+def _iter_pdf_text(file_content: bytes) -> Iterator[str]:
     try:
-        try:
-            from pypdf import PdfReader
-        except ImportError:
-            from PyPDF2 import PdfReader
-        reader = PdfReader(_io.BytesIO(file_content))
-        pages_text = []
-        for page in reader.pages:
-            text = page.extract_text()
-            if text:
-                pages_text.append(text)
-        return "\n\n".join(pages_text)
+        yield from iter_pdf_pages(file_content)
     except Exception as e:
         logger.error(f"[BankStmt] PDF extraction error: {e}")
         raise ValueError(f"Could not read PDF: {e}")
 
 
+def _iter_excel_text(file_content: bytes) -> Iterator[str]:
+    try:
+        yield from iter_excel_rows(file_content)
+    except ImportError:
+        raise ValueError("openpyxl not installed. Run: pip install openpyxl")
+    except Exception as e:
+        raise ValueError(f"Could not read Excel file: {e}")
+
+
+def _extract_text_from_pdf(file_content: bytes) -> str:
+    """Extract text from a PDF file using pypdf or PyPDF2."""
+    return "\n\n".join(_iter_pdf_text(file_content))
+
+
 async def _extract_text_from_image(file_content: bytes, ext: str) -> str:
     """Use GPT-4 Vision to OCR a bank statement image."""
     import os
@@ -6070,27 +5975,8 @@ async def _extract_text_from_image(file_content: bytes, ext: str) -> str:
 
 def _parse_excel_statement(file_content: bytes) -> tuple:
     """Parse an Excel bank statement."""
-    try:
-        import openpyxl
-        import io as _io
-        wb = openpyxl.load_workbook(_io.BytesIO(file_content), read_only=True)
-        ws = wb.active
-
-        rows_text = []
-        movements = []
-        for row in ws.iter_rows(values_only=True):
-            row_str = " | ".join([str(c) if c is not None else "" for c in row])
-            rows_text.append(row_str)
-
-        raw_text = "\n".join(rows_text)
-
-        # Try to auto-detect columns by looking at headers
-        # We'll let AI parse it since formats vary
-        return (raw_text, [])  # Will be parsed by AI in caller
-    except ImportError:
-        raise ValueError("openpyxl not installed. Run: pip install openpyxl")
-    except Exception as e:
-        raise ValueError(f"Could not read Excel file: {e}")
+    # Let AI parse it since formats vary
+    return ("\n".join(_iter_excel_text(file_content)), [])
 
 
 def _parse_csv_statement(file_content: bytes) -> tuple:
@@ -6136,24 +6022,32 @@ def _parse_csv_movements(file_content: bytes) -> list:
     to positional columns (date, description, amount) when there's no header.
     Raises ValueError if it can't find an amount column, so the caller can
     surface a clear error rather than silently guessing."""
+    return list(_iter_csv_movements(file_content))
+
+
+def _iter_csv_movements(file_content: bytes) -> Iterator[dict]:
+    """Row-at-a-time core of _parse_csv_movements: rows are decoded and
+    parsed as they are read, never held as a list."""
     import csv as _csv
     import io as _io
 
-    text = file_content.decode("utf-8-sig", errors="replace")
+    stream = _io.TextIOWrapper(_io.BytesIO(file_content), encoding="utf-8-sig",
+                               errors="replace", newline="")
     # Detect the delimiter (comma/semicolon/tab) from the header line.
-    sample = text[:4096]
+    sample = stream.read(4096)
+    stream.seek(0)
     try:
         dialect = _csv.Sniffer().sniff(sample, delimiters=",;\t|")
         delim = dialect.delimiter
     except Exception:
         delim = ";" if sample.count(";") > sample.count(",") else ","
 
-    rows = [r for r in _csv.reader(_io.StringIO(text), delimiter=delim)]
     # Drop fully-empty rows (every cell blank) — this is where a phantom $0
     # movement used to come from.
-    rows = [r for r in rows if any((c or "").strip() for c in r)]
-    if not rows:
-        return []
+    rows = (r for r in _csv.reader(stream, delimiter=delim) if any((c or "").strip() for c in r))
+    header = next(rows, None)
+    if header is None:
+        return
 
     def norm(h):
         return (h or "").strip().lower()
@@ -6164,7 +6058,6 @@ def _parse_csv_movements(file_content: bytes) -> list:
     DEBIT_H = {"debit", "debito", "débito", "cargo", "retiro", "withdrawal", "salida"}
     CREDIT_H = {"credit", "credito", "crédito", "abono", "deposito", "depósito", "deposit", "entrada"}
 
-    header = rows[0]
     hnorm = [norm(h) for h in header]
     has_header = any(h in (DATE_H | DESC_H | AMT_H | DEBIT_H | CREDIT_H) for h in hnorm)
 
@@ -6180,14 +6073,14 @@ def _parse_csv_movements(file_content: bytes) -> list:
         ai = find(AMT_H)
         dbi = find(DEBIT_H)
         cri = find(CREDIT_H)
-        data_rows = rows[1:]
+        data_rows = rows
         ncols = len(header)
         if ai is None and dbi is None and cri is None:
             raise ValueError("El CSV no tiene una columna de monto (amount/monto) ni débito/crédito reconocible.")
     else:
         # Positional: date, description, amount
         di, ci, ai, dbi, cri = 0, 1, 2, None, None
-        data_rows = rows
+        data_rows = itertools.chain([header], rows)
         ncols = 3
 
     # When the amount is the LAST column and delimiter is comma, an unquoted
@@ -6195,7 +6088,6 @@ def _parse_csv_movements(file_content: bytes) -> list:
     # Rejoin them back into the amount so the value isn't mangled.
     amount_is_last = ai is not None and ai == ncols - 1
 
-    movements = []
     for r in data_rows:
         def cell(idx):
             return r[idx].strip() if (idx is not None and idx < len(r) and r[idx] is not None) else ""
@@ -6217,13 +6109,12 @@ def _parse_csv_movements(file_content: bytes) -> list:
         if not date_v and not desc_v and abs(amount) < 0.005:
             continue
 
-        movements.append({
+        yield {
             "date": date_v or date.today().isoformat(),
             "description": desc_v,
             "amount": amount,
             "is_credit": amount > 0,
-        })
-    return movements
+        }
 
 
 def _coerce_json(content: str):
@@ -6279,7 +6170,25 @@ def _movements_from_parsed(parsed):
 
 async def _ai_parse_movements(raw_text: str, account_key: str) -> list:
     """Use GPT-4 to parse raw bank statement text into structured movements.
-    Splits long statements into chunks and processes each separately."""
+    Splits long statements into chunks of ~6000 chars (enough for ~1 page of
+    transactions) and parses them through _ai_parse_chunks."""
+    chunks = list(iter_text_chunks([raw_text]))
+    movements = []
+    async for batch in _ai_parse_chunks(iter(chunks), account_key, total=len(chunks)):
+        movements.extend(batch)
+    return movements
+
+
+async def _ai_parse_chunks(
+    chunks: Iterator[str],
+    account_key: str,
+    total: Optional[int] = None,
+) -> AsyncIterator[list]:
+    """Parse statement text chunks concurrently through the shared OpenAI
+    limiter (api/services/ai_pipeline.py) and yield each chunk's new
+    movements in statement order as soon as it (and every chunk before it)
+    is back. `chunks` may be lazy — it is only read a few chunks ahead. The
+    metadata fields are requested from the first chunk."""
     import os
     import re
 
@@ -6288,38 +6197,16 @@ async def _ai_parse_movements(raw_text: str, account_key: str) -> list:
         raise ValueError("OPENAI_API_KEY not configured")
 
     from openai import AsyncOpenAI
-    client = AsyncOpenAI(api_key=api_key, timeout=120.0)
+    client = AsyncOpenAI(api_key=api_key, timeout=120.0, max_retries=0)
+    of_total = f"/{total}" if total else ""
 
-    # Split long text into chunks of ~6000 chars (enough for ~1 page of transactions)
-    chunk_size = 6000
-    if len(raw_text) <= chunk_size:
-        chunks = [raw_text]
-    else:
-        # Try to split at page boundaries or double newlines
-        chunks = []
-        remaining = raw_text
-        while remaining:
-            if len(remaining) <= chunk_size:
-                chunks.append(remaining)
-                break
-            # Find a good break point
-            break_at = remaining.rfind("\n\n", 0, chunk_size)
-            if break_at < chunk_size // 2:
-                break_at = remaining.rfind("\n", 0, chunk_size)
-            if break_at < chunk_size // 2:
-                break_at = chunk_size
-            chunks.append(remaining[:break_at])
-            remaining = remaining[break_at:].lstrip()
-
-    logger.info(f"[BankStmt] Parsing {len(raw_text)} chars in {len(chunks)} chunks")
-
-    all_movements = []
-    is_first_chunk = True
-    _ai_parse_errors: list[str] = []
-
-    for i, chunk in enumerate(chunks):
+    limiter = get_openai_limiter()
+
+    async def parse_chunk(item: tuple) -> tuple:
+        """One (index, chunk) → (movements, error message or None)."""
+        i, chunk = item
         metadata_instruction = ""
-        if is_first_chunk:
+        if i == 0:
             metadata_instruction = """
 Also extract these metadata fields (include them in the FIRST movement only):
 - "bank_name": the bank (e.g., "Bank of America")
@@ -6351,11 +6238,10 @@ RULES:
 Return a JSON object with a single key "movements" whose value is the array of
 transaction objects (e.g. {{"movements": [ {{...}}, {{...}} ]}}). No markdown fences.
 
-BANK STATEMENT TEXT (chunk {i+1}/{len(chunks)}):
+BANK STATEMENT TEXT (chunk {i+1}{of_total}):
 {chunk}"""
 
-        chunk_movements: list = []
-        try:
+        async def _ask() -> list:
             response = await client.chat.completions.create(
                 # gpt-4o-mini handles structured extraction from bank
                 # statement tables in 2-5s with the same accuracy as the
@@ -6375,59 +6261,71 @@ BANK STATEMENT TEXT (chunk {i+1}/{len(chunks)}):
             content_stripped = content.strip()
             finish_reason = response.choices[0].finish_reason if response.choices else "?"
             logger.info(
-                f"[BankStmt] Chunk {i+1}/{len(chunks)} GPT response: finish={finish_reason} "
+                f"[BankStmt] Chunk {i+1}{of_total} GPT response: finish={finish_reason} "
                 f"content_len={len(content_stripped)} first200={content_stripped[:200]!r}"
             )
 
             if not content_stripped:
-                _ai_parse_errors.append(
-                    f"chunk {i+1}: respuesta vacía del modelo (finish_reason={finish_reason})"
-                )
-                continue
+                raise PartialAIResponse(f"respuesta vacía del modelo (finish_reason={finish_reason})")
 
             # Clean markdown code fences
             if content_stripped.startswith("```"):
                 content_stripped = re.sub(r'^```(?:json)?\s*', '', content_stripped)
                 content_stripped = re.sub(r'\s*```$', '', content_stripped)
 
-            parsed = _coerce_json(content_stripped)
-            chunk_movements = _movements_from_parsed(parsed)
-            if chunk_movements:
-                all_movements.extend(chunk_movements)
-                logger.info(f"[BankStmt] Chunk {i+1}: parsed {len(chunk_movements)} movements")
-            is_first_chunk = False
-
-        except json.JSONDecodeError as e:
-            preview = (content_stripped or "")[:300]
-            logger.warning(f"[BankStmt] Chunk {i+1} JSON error: {e} :: response was {preview!r}")
-            _ai_parse_errors.append(
-                f"chunk {i+1}: respuesta del modelo no era JSON válido ({str(e)[:80]}); empezaba con {preview[:80]!r}"
+            try:
+                parsed = _coerce_json(content_stripped)
+            except json.JSONDecodeError as e:
+                preview = content_stripped[:300]
+                logger.warning(f"[BankStmt] Chunk {i+1} JSON error: {e} :: response was {preview!r}")
+                raise PartialAIResponse(
+                    f"respuesta del modelo no era JSON válido ({str(e)[:80]}); empezaba con {preview[:80]!r}"
+                ) from e
+            return _movements_from_parsed(parsed)
+
+        # Empty / invalid JSON answers are retried like rate limits.
+        try:
+            chunk_movements = await call_with_retries(
+                _ask, limiter=limiter, estimated_tokens=estimate_tokens(prompt, 2000),
+                label=f"BankStmt chunk {i+1}",
             )
-            continue
+        except PartialAIResponse as e:
+            return [], f"chunk {i+1}: {e}"
         except Exception as e:
             logger.warning(f"[BankStmt] Chunk {i+1} error: {e!r}")
-            _ai_parse_errors.append(f"chunk {i+1}: {type(e).__name__}: {str(e)[:160]}")
-            continue
+            return [], f"chunk {i+1}: {type(e).__name__}: {str(e)[:160]}"
+        if chunk_movements:
+            logger.info(f"[BankStmt] Chunk {i+1}: parsed {len(chunk_movements)} movements")
+        return chunk_movements, None
 
-    if not all_movements:
+    # Chunks are parsed concurrently (bounded by the shared OpenAI limiter)
+    # and handed back in statement order.
+    seen = set()
+    raw_count = 0
+    _ai_parse_errors = []
+    async for (i, _chunk), (chunk_movements, err) in map_ordered(
+            enumerate(chunks), parse_chunk, limiter=limiter):
+        if err:
+            _ai_parse_errors.append(err)
+        raw_count += len(chunk_movements)
+        # Deduplicate by (date, amount, description[:50])
+        unique = []
+        for mv in chunk_movements:
+            key = (mv.get("date", ""), mv.get("amount", 0), mv.get("description", "")[:50])
+            if key not in seen:
+                seen.add(key)
+                unique.append(mv)
+        yield unique
+
+    if not seen:
         # Surface the underlying AI failure so we know whether it's an
         # OpenAI quota issue, a finish_reason=length truncation, a JSON
         # parse failure, etc. — instead of pretending the statement is bad.
         if _ai_parse_errors:
             raise RuntimeError("AI parser falló: " + " | ".join(_ai_parse_errors[:3]))
-        return []
-
-    # Deduplicate by (date, amount, description[:50])
-    seen = set()
-    unique = []
-    for mv in all_movements:
-        key = (mv.get("date", ""), mv.get("amount", 0), mv.get("description", "")[:50])
-        if key not in seen:
-            seen.add(key)
-            unique.append(mv)
+        return
 
-    logger.info(f"[BankStmt] Total: {len(all_movements)} raw → {len(unique)} unique movements")
-    return unique
+    logger.info(f"[BankStmt] Total: {raw_count} raw → {len(seen)} unique movements")
 
 
 async def _ai_classify_movements(
@@ -6435,16 +6333,25 @@ async def _ai_classify_movements(
     accounts_reference: str,
     accounts_list: list,
     corrections_reference: str = "",
+    *,
+    client=None,
+    limiter=None,
 ) -> list:
-    """Use GPT-4 to suggest accounting accounts for a batch of movements."""
+    """Use GPT-4 to suggest accounting accounts for a batch of movements.
+
+    Rate-limit / transient errors and partial answers (invalid, truncated or
+    short JSON) are retried with backoff inside a `limiter` slot (see
+    api/services/ai_pipeline.py). Pass a shared `client` when classifying
+    several batches concurrently."""
     import os
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not configured")
+    if client is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not configured")
 
-    from openai import AsyncOpenAI
-    client = AsyncOpenAI(api_key=api_key, timeout=120.0)
+        from openai import AsyncOpenAI
+        client = AsyncOpenAI(api_key=api_key, timeout=120.0, max_retries=0)
 
     movements_lines = []
     for i, mv in enumerate(movements):
@@ -6489,7 +6396,7 @@ Return a JSON array with EXACTLY {len(movements)} objects (one per movement, in
 
 Remember: ONLY use account codes from the chart above. If you cannot find a perfect match, use the closest one."""
 
-    try:
+    async def _ask() -> list:
         response = await client.chat.completions.create(
             # Same reasoning as the parser model swap above — pick a
             # speed-optimized model for the mechanical mapping of
@@ -6502,15 +6409,35 @@ Remember: ONLY use account codes from the chart above. If you cannot find a perf
             max_completion_tokens=8192,
             temperature=0,
         )
+        content = response.choices[0].message.content or "[]"
+        finish_reason = response.choices[0].finish_reason
+        content = content.strip()
+        logger.info(f"[AI Classify] GPT response: finish_reason={finish_reason}, content_len={len(content)}, first_100={content[:100]}")
+        return _parse_classification(content, len(movements), finish_reason)
+
+    try:
+        suggestions = await call_with_retries(
+            _ask, limiter=limiter, estimated_tokens=estimate_tokens(prompt, 2000), label="AI Classify",
+        )
+    except PartialAIResponse as pe:
+        if not isinstance(pe.partial, list):
+            logger.error(f"[AI Classify] JSON parse error: {pe}")
+            return [{"account_code": "", "confidence": 0, "reasoning": f"AI parse error: {str(pe)[:50]}"}] * len(movements)
+        suggestions = pe.partial  # still short after retries — keep what we got
     except Exception as api_err:
         logger.error(f"[AI Classify] OpenAI API error: {api_err}")
         return [{"account_code": "", "confidence": 0, "reasoning": f"OpenAI error: {str(api_err)[:100]}"}] * len(movements)
 
-    content = response.choices[0].message.content or "[]"
-    finish_reason = response.choices[0].finish_reason
-    content = content.strip()
-    logger.info(f"[AI Classify] GPT response: finish_reason={finish_reason}, content_len={len(content)}, first_100={content[:100]}")
+    logger.info(f"[AI Classify] Parsed {len(suggestions)} suggestions for {len(movements)} movements")
+    # Pad or trim to match movements count
+    while len(suggestions) < len(movements):
+        suggestions.append({"account_code": "", "confidence": 0, "reasoning": "AI did not classify"})
+    return suggestions[:len(movements)]
+
 
+def _parse_classification(content: str, expected: int, finish_reason: Optional[str] = None) -> list:
+    """Model answer → list of suggestion dicts. Raises PartialAIResponse when
+    the JSON is invalid, or shorter than `expected` (truncated output)."""
     import re
     if content.startswith("```"):
         content = re.sub(r'^```(?:json)?\s*', '', content)
@@ -6518,13 +6445,11 @@ Remember: ONLY use account codes from the chart above. If you cannot find a perf
 
     try:
         suggestions = json.loads(content)
-        if not isinstance(suggestions, list):
-            suggestions = [suggestions]
-        logger.info(f"[AI Classify] Parsed {len(suggestions)} suggestions for {len(movements)} movements")
-        # Pad or trim to match movements count
-        while len(suggestions) < len(movements):
-            suggestions.append({"account_code": "", "confidence": 0, "reasoning": "AI did not classify"})
-        return suggestions[:len(movements)]
     except json.JSONDecodeError as je:
-        logger.error(f"[AI Classify] JSON parse error: {je}. Content: {content[:200]}")
-        return [{"account_code": "", "confidence": 0, "reasoning": f"AI parse error: {str(je)[:50]}"}] * len(movements)
+        raise PartialAIResponse(f"{je} (finish_reason={finish_reason}); content: {content[:200]}") from je
+    if not isinstance(suggestions, list):
+        suggestions = [suggestions]
+    if len(suggestions) < expected:
+        raise PartialAIResponse(f"{len(suggestions)}/{expected} suggestions (finish_reason={finish_reason})",
+                                partial=suggestions)
+    return suggestions
@@ -520,32 +520,10 @@ async def list_transactions(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def _max_capital_txn_seq(prefix: str) -> int:
-    """Highest sequence number in use today, parsing the numeric part and
-    IGNORING the -D/-C suffix that ledger pairs add. Count-based numbering
-    was fragile: post_to_capital_ledger writes two rows (…-D and …-C) per
-    base number, so a plain count desynced from the real max and could
-    reissue a number, violating the UNIQUE index. Max-based never reissues."""
-    try:
-        existing = sb.table("capital_transactions") \
-            .select("transaction_number") \
-            .like("transaction_number", f"{prefix}%") \
-            .execute().data or []
-    except Exception:
-        return 0
-    hi = 0
-    for row in existing:
-        num = row.get("transaction_number") or ""
-        mid = num[len(prefix):].split("-")[0]  # strip -D / -C suffix
-        if mid.isdigit():
-            hi = max(hi, int(mid))
-    return hi
-
-
 def _generate_capital_txn_number() -> str:
-    today = date.today().strftime("%y%m%d")
-    prefix = f"TXN-{today}-"
-    return f"{prefix}{_max_capital_txn_seq(prefix) + 1:03d}"
+    """Next TXN-YYMMDD-NNN (atomic counter, see ledger.allocate_transaction_numbers)."""
+    from api.services.capital_ledger import allocate_capital_transaction_numbers
+    return allocate_capital_transaction_numbers(db=sb)[0]
 
 
 @router.post("/transactions")
@@ -802,21 +780,16 @@ async def split_capital_transaction(transaction_id: str, data: dict):
         if ba.data and ba.data[0].get("accounting_account_id"):
             bank_accounting_id = ba.data[0]["accounting_account_id"]
 
-    # Seed the running sequence ONCE and increment locally — re-querying per
-    # insert would race and can reissue a number (UNIQUE violation).
-    today = date.today().strftime("%y%m%d")
-    prefix = f"TXN-{today}-"
-    seq = _max_capital_txn_seq(prefix)
-
-    def _next_number() -> str:
-        nonlocal seq
-        seq += 1
-        return f"{prefix}{seq:03d}"
+    # Reserve one block for every row we may insert (P&L child + bank
+    # counterpart per part) — one round-trip, no reissued numbers.
+    from api.services.capital_ledger import allocate_capital_transaction_numbers
+    numbers = iter(allocate_capital_transaction_numbers(
+        len(parts) * (2 if bank_accounting_id else 1), db=sb))
 
     created = []
     for pt in parts:
         child = {
-            "transaction_number": _next_number(),
+            "transaction_number": next(numbers),
             "transaction_date": p["transaction_date"],
             "transaction_type": p["transaction_type"],
             "amount": float(pt["amount"]),
@@ -845,7 +818,7 @@ async def split_capital_transaction(transaction_id: str, data: dict):
                 created.append(r.data[0])
                 if bank_accounting_id:
                     bank_child = {
-                        "transaction_number": _next_number(),
+                        "transaction_number": next(numbers),
                         "transaction_date": p["transaction_date"],
                         "transaction_type": p["transaction_type"],
                         "amount": float(pt["amount"]),
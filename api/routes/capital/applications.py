@@ -320,7 +320,7 @@ async def review_application(application_id: str, review: ApplicationReview):
                     def _send_signing_email():
                         try:
                             from api.services.email_service import _base_template
-                            from tools.email_tool import send_email
+                            from api.services.email_outbox import queue_email as send_email
                             import os
 
                             client_data = application.get("clients") or {}
@@ -351,6 +351,7 @@ async def review_application(application_id: str, review: ApplicationReview):
                                 to=[client_data.get('email', '')],
                                 subject="Tu contrato RTO está listo para firmar",
                                 html=_base_template(content),
+                                email_type="rto_contract_signing",
                             )
                             logger.info(f"[capital] Signing email sent to {client_data.get('email')} for contract {new_contract_id}")
                         except Exception as email_err:
@@ -494,7 +495,7 @@ async def send_credit_application_link(application_id: str):
             )
 
         from api.services.email_service import _base_template
-        from tools.email_tool import send_email
+        from api.services.email_outbox import queue_email as send_email
         app_url = os.getenv("APP_URL") or os.getenv("FRONTEND_URL") or "http://localhost:3000"
         link = f"{app_url}/clientes/mi-cuenta"
         content = f"""
@@ -518,6 +519,7 @@ async def send_credit_application_link(application_id: str):
             to=[email],
             subject="Completa tu solicitud de crédito — Maninos",
             html=_base_template(content),
+            email_type="credit_application_link",
         )
         if not result.get("ok", True):
             raise HTTPException(status_code=500, detail=f"No se pudo enviar el email: {result.get('error')}")
@@ -810,7 +810,7 @@ async def deliver_title(contract_id: str):
 
         # Send email to client with document links
         try:
-            from tools.email_tool import send_email as send_email_fn
+            from api.services.email_outbox import queue_email as send_email_fn
             frontend_url = os.environ.get('FRONTEND_URL') or os.environ.get('APP_URL', 'http://localhost:3000')
             docs_url = f"{frontend_url}/clientes/mi-cuenta/documentos"
             account_url = f"{frontend_url}/clientes/mi-cuenta"
@@ -865,7 +865,8 @@ async def deliver_title(contract_id: str):
                         Si tienes preguntas, contáctanos al 832-745-9600.
                     </p>
                 </div>
-                """
+                """,
+                email_type="rto_title_delivery",
             )
         except Exception as email_err:
             logger.warning(f"Could not send delivery email: {email_err}")
@@ -5,7 +5,9 @@ Capital Dashboard - KPIs, overview metrics, cartera health
 from typing import Optional
 from fastapi import APIRouter
 from tools.supabase_client import sb
+from tools.supabase_async import aexecute
 from datetime import datetime, date, timedelta
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -31,12 +33,27 @@ def _safe_date(value) -> Optional[date]:
         return None
 
 
+def _is_missing_table(e: Exception) -> bool:
+    return "PGRST205" in str(e) or "Could not find" in str(e)
+
+
 def safe_query(table: str, query_fn):
     """Execute a Supabase query, returning empty result if table doesn't exist."""
     try:
         return query_fn()
     except Exception as e:
-        if "PGRST205" in str(e) or "Could not find" in str(e):
+        if _is_missing_table(e):
+            logger.debug(f"Table {table} not found, returning empty")
+            return type('obj', (object,), {'data': []})()
+        raise
+
+
+async def asafe_query(table: str, query):
+    """Async `safe_query`: runs `query.execute()` off the event loop."""
+    try:
+        return await aexecute(query)
+    except Exception as e:
+        if _is_missing_table(e):
             logger.debug(f"Table {table} not found, returning empty")
             return type('obj', (object,), {'data': []})()
         raise
@@ -268,75 +285,55 @@ async def get_strategic_kpis():
         today_str = today.isoformat()
         month_start = today.replace(day=1).isoformat()
 
-        # ── Fetch all needed data ──
-        applications = safe_query("rto_applications", lambda:
-            sb.table("rto_applications")
-            .select("id, status, created_at")
-            .execute()
-        ).data or []
-
-        contracts = safe_query("rto_contracts", lambda:
-            sb.table("rto_contracts")
-            .select("id, client_id, status, created_at, signed_at, start_date, purchase_price")
-            .execute()
-        ).data or []
+        # ── Fetch all needed data (independent reads, run concurrently) ──
+        (
+            applications, contracts, payments_due, all_overdue,
+            investors, investments, promissory_notes, properties,
+        ) = [r.data or [] for r in await asyncio.gather(
+            asafe_query("rto_applications",
+                sb.table("rto_applications")
+                .select("id, status, created_at")),
+            asafe_query("rto_contracts",
+                sb.table("rto_contracts")
+                .select("id, client_id, status, created_at, signed_at, start_date, purchase_price")),
+            asafe_query("rto_payments",
+                sb.table("rto_payments")
+                .select("id, amount, status, due_date, paid_date, days_late")
+                .gte("due_date", month_start)
+                .lte("due_date", today_str)),
+            asafe_query("rto_payments",
+                sb.table("rto_payments")
+                .select("id, amount, status, due_date, days_late")
+                .in_("status", ["pending", "late"])
+                .lt("due_date", today_str)),
+            asafe_query("investors",
+                sb.table("investors")
+                .select("id, status, total_invested, created_at")),
+            asafe_query("investments",
+                sb.table("investments")
+                .select("id, investor_id, amount, invested_at")),
+            asafe_query("promissory_notes",
+                sb.table("promissory_notes")
+                .select("id, investor_id, annual_rate, status")),
+            asafe_query("properties",
+                sb.table("properties")
+                .select("id, status")),
+        )]
 
         # Try with KPI columns (migration 068), fallback to basic columns
         try:
-            clients = (sb.table("clients")
-                .select("id, status, kyc_verified, nps_score, referred_by")
-                .execute()).data or []
+            clients = (await aexecute(sb.table("clients")
+                .select("id, status, kyc_verified, nps_score, referred_by"))).data or []
         except Exception as col_err:
             if "42703" in str(col_err) or "does not exist" in str(col_err):
                 logger.info("KPI columns not yet migrated (068), using basic client fields")
-                clients = safe_query("clients", lambda:
+                clients = (await asafe_query("clients",
                     sb.table("clients")
                     .select("id, status, kyc_verified")
-                    .execute()
-                ).data or []
+                )).data or []
             else:
                 raise
 
-        payments_due = safe_query("rto_payments", lambda:
-            sb.table("rto_payments")
-            .select("id, amount, status, due_date, paid_date, days_late")
-            .gte("due_date", month_start)
-            .lte("due_date", today_str)
-            .execute()
-        ).data or []
-
-        all_overdue = safe_query("rto_payments", lambda:
-            sb.table("rto_payments")
-            .select("id, amount, status, due_date, days_late")
-            .in_("status", ["pending", "late"])
-            .lt("due_date", today_str)
-            .execute()
-        ).data or []
-
-        investors = safe_query("investors", lambda:
-            sb.table("investors")
-            .select("id, status, total_invested, created_at")
-            .execute()
-        ).data or []
-
-        investments = safe_query("investments", lambda:
-            sb.table("investments")
-            .select("id, investor_id, amount, invested_at")
-            .execute()
-        ).data or []
-
-        promissory_notes = safe_query("promissory_notes", lambda:
-            sb.table("promissory_notes")
-            .select("id, investor_id, annual_rate, status")
-            .execute()
-        ).data or []
-
-        properties = safe_query("properties", lambda:
-            sb.table("properties")
-            .select("id, status")
-            .execute()
-        ).data or []
-
         # ── CLIENT KPIs ──
 
         # 1. Onboarding Time: avg days from application to contract signing
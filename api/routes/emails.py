@@ -17,7 +17,8 @@ from api.services.email_service import (
     process_investor_followup_emails,
     send_client_post_purchase_email,
 )
-from api.services.scheduler_service import get_scheduler_status
+from api.services.email_outbox import metrics as outbox_metrics
+from api.services.scheduler_service import get_scheduler_status, run_job_now
 from tools.supabase_client import sb
 
 logger = logging.getLogger(__name__)
@@ -41,9 +42,10 @@ async def run_all_jobs_now():
     """
     results = {}
     
-    results["scheduled_emails"] = process_scheduled_emails()
-    results["rto_reminders"] = process_rto_reminders()
-    results["rto_overdue_alerts"] = process_rto_overdue_alerts()
+    # On the scheduler's job pool — these page through sales/payments and send mail
+    results["scheduled_emails"] = await run_job_now("process_scheduled_emails", process_scheduled_emails)
+    results["rto_reminders"] = await run_job_now("rto_payment_reminders", process_rto_reminders)
+    results["rto_overdue_alerts"] = await run_job_now("rto_overdue_alerts", process_rto_overdue_alerts)
     
     return {
         "ok": True,
@@ -59,7 +61,7 @@ async def process_pending_emails():
     
     Also runs automatically every 30 minutes via background scheduler.
     """
-    result = process_scheduled_emails()
+    result = await run_job_now("process_scheduled_emails", process_scheduled_emails)
     return result
 
 
@@ -98,8 +100,7 @@ async def process_rto_payment_reminders():
     
     Should be called daily via cron job.
     """
-    result = process_rto_reminders()
-    return result
+    return await run_job_now("rto_payment_reminders", process_rto_reminders)
 
 
 @router.post("/rto/overdue-alerts")
@@ -112,8 +113,7 @@ async def process_overdue_alerts(
     Checks for payments past the grace period (5+ days late).
     Should be called daily via cron job.
     """
-    result = process_rto_overdue_alerts(admin_email=admin_email)
-    return result
+    return await run_job_now("rto_overdue_alerts", process_rto_overdue_alerts, admin_email=admin_email)
 
 
 @router.post("/investor/test-welcome")
@@ -268,5 +268,7 @@ async def get_email_stats():
             stats["by_type"][email_type] = {"pending": 0, "sent": 0, "failed": 0}
         stats["by_type"][email_type][status] = stats["by_type"][email_type].get(status, 0) + 1
     
+    # Delivery counts and throughput of this process's outbox drains
+    stats["outbox"] = outbox_metrics()
     return stats
 
@@ -300,24 +300,24 @@ async def test_facebook_scrape():
     
     # ── Test 2: Playwright method ──
     try:
-        playwright, browser, context, page = await FacebookMarketplaceScraper._create_authenticated_page()
+        from api.agents.buscador.browser_pool import BrowserManager
+        page = await FacebookMarketplaceScraper._create_authenticated_page()
+        try:
+            test_url = "https://www.facebook.com/marketplace/houston/search?query=mobile%20home&minPrice=5000&maxPrice=80000&exact=false"
+            await page.goto(test_url, wait_until="domcontentloaded", timeout=30000)
         
-        test_url = "https://www.facebook.com/marketplace/houston/search?query=mobile%20home&minPrice=5000&maxPrice=80000&exact=false"
-        await page.goto(test_url, wait_until="domcontentloaded", timeout=30000)
-        
-        pm = diagnostics["playwright_method"]
-        pm["final_url"] = page.url[:200]
-        pm["page_title"] = await page.title()
-        pm["redirected_to_login"] = "/login" in page.url
-        
-        if not pm["redirected_to_login"]:
-            import asyncio
-            await asyncio.sleep(3)
-            cards = await page.query_selector_all('a[href*="/marketplace/item/"]')
-            pm["marketplace_links"] = len(cards)
+            pm = diagnostics["playwright_method"]
+            pm["final_url"] = page.url[:200]
+            pm["page_title"] = await page.title()
+            pm["redirected_to_login"] = "/login" in page.url
         
-        await browser.close()
-        await playwright.stop()
+            if not pm["redirected_to_login"]:
+                import asyncio
+                await asyncio.sleep(3)
+                cards = await page.query_selector_all('a[href*="/marketplace/item/"]')
+                pm["marketplace_links"] = len(cards)
+        finally:
+            await BrowserManager.release_page(page)
         
     except Exception as e:
         diagnostics["playwright_method"]["error"] = f"{type(e).__name__}: {e}"
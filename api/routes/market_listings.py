@@ -14,6 +14,10 @@ import os
 import uuid
 from supabase import create_client, Client
 from api.utils.tdhca_parser import parse_tdhca_detail_page, build_structured_tdhca_data, sanitize_tdhca_url
+from api.services.listing_dedup import (
+    MIN_ADDRESS_LEN, REASON_STATUS, SKIP_STATUSES, ListingDedupIndex, normalize_address,
+)
+from api.services.partner_ingest import fetch_existing
 
 logger = logging.getLogger(__name__)
 
@@ -30,44 +34,8 @@ supabase: Client = create_client(
 # HELPERS
 # ============================================
 
-def _normalize_address(address: str) -> str:
-    """
-    Extract and normalize the street part from an address for dedup matching.
-    Removes listing title noise like '2022 BLISS single section for sale.'
-    and normalizes all whitespace/punctuation.
-    """
-    import re
-    if not address:
-        return ""
-    
-    addr = address.strip().lower()
-    
-    # Remove common listing title noise (applied globally, not just prefix)
-    noise_words = [
-        r'for\s+sale\.?',
-        r'\bfeatured\b',
-        r'\bmobile\s+home\b',
-        r'\bsingle\s+section\b',
-        r'\bdouble\s+wide\b',
-        r'\bmanufactured\s+home\b',
-        r'^(19|20)\d{2}\s+[a-z]+\s+',  # "2022 BLISS " year prefix at start (only 1900-2099)
-    ]
-    
-    for pattern in noise_words:
-        addr = re.sub(pattern, ' ', addr, flags=re.IGNORECASE)
-    
-    # Normalize punctuation: remove dots, normalize comma-space
-    addr = addr.replace('.', ' ')
-    addr = re.sub(r'\s*,\s*', ', ', addr)  # uniform ", " after commas
-    addr = re.sub(r'\s*#\s*', ' #', addr)  # uniform " #" before unit numbers
-    
-    # Collapse all whitespace
-    addr = re.sub(r'\s+', ' ', addr).strip()
-    
-    # Remove leading/trailing commas
-    addr = addr.strip(', ')
-    
-    return addr
+# Address normalization lives with the dedup index (api/services/listing_dedup.py).
+_normalize_address = normalize_address
 
 
 def _is_already_purchased(source_url: str, address: str) -> bool:
@@ -80,8 +48,11 @@ def _is_already_purchased(source_url: str, address: str) -> bool:
     
     Address matching uses normalized street addresses to avoid false positives
     from listing titles like "2022 BLISS single section for sale."
+
+    One-off check (single create): targeted queries instead of loading the
+    whole history. Ingest runs load a ListingDedupIndex once and call
+    index.check() per listing instead.
     """
-    SKIP_STATUSES = ("purchased", "rejected", "dismissed")
     try:
         # Check 1: market_listing exists with non-available status (exact URL match)
         if source_url:
@@ -91,51 +62,35 @@ def _is_already_purchased(source_url: str, address: str) -> bool:
                 .limit(1).execute()
             if existing.data and existing.data[0].get("status") in SKIP_STATUSES:
                 return True
-        
+
+        # Only check addresses with a meaningful street (at least a number + street name)
+        normalized = _normalize_address(address)
+        if len(normalized) < MIN_ADDRESS_LEN:
+            return False
+
         # Check 2: Same address dismissed/purchased/rejected in market_listings
         # This catches cases where the source_url changed slightly between scrapes
-        if address:
-            normalized = _normalize_address(address)
-            
-            # Only check if we have a meaningful street address (at least a number + street name)
-            if len(normalized) < 10:
-                pass  # Skip address check but continue to properties check
-            else:
-                # Check dismissed/purchased/rejected listings by address
-                dismissed = supabase.table("market_listings")\
-                    .select("id, status, address")\
-                    .in_("status", list(SKIP_STATUSES))\
-                    .execute()
-                
-                if dismissed.data:
-                    for d in dismissed.data:
-                        d_normalized = _normalize_address(d.get("address", ""))
-                        if d_normalized and normalized:
-                            if normalized in d_normalized or d_normalized in normalized:
-                                logger.info(f"[Dedup] Address match (dismissed/skipped): '{normalized}' ↔ '{d_normalized}'")
-                                return True
-        
+        dismissed = supabase.table("market_listings")\
+            .select("id, status, address")\
+            .in_("status", list(SKIP_STATUSES))\
+            .execute()
+        for d in dismissed.data or []:
+            d_normalized = _normalize_address(d.get("address", ""))
+            if d_normalized and (normalized in d_normalized or d_normalized in normalized):
+                logger.info(f"[Dedup] Address match (dismissed/skipped): '{normalized}' ↔ '{d_normalized}'")
+                return True
+
         # Check 3: address exists in Maninos properties inventory
-        if address:
-            normalized = _normalize_address(address)
-            
-            if len(normalized) < 10:
-                return False
-            
-            # Get all properties and compare normalized addresses
-            props = supabase.table("properties")\
-                .select("id, address")\
-                .execute()
-            
-            if props.data:
-                for prop in props.data:
-                    prop_normalized = _normalize_address(prop.get("address", ""))
-                    # Require substantial overlap: one must contain the other
-                    if prop_normalized and normalized:
-                        if normalized in prop_normalized or prop_normalized in normalized:
-                            logger.info(f"[Dedup] Address match (property): '{normalized}' ↔ '{prop_normalized}'")
-                            return True
-        
+        props = supabase.table("properties")\
+            .select("id, address")\
+            .execute()
+        for prop in props.data or []:
+            prop_normalized = _normalize_address(prop.get("address", ""))
+            # Require substantial overlap: one must contain the other
+            if prop_normalized and (normalized in prop_normalized or prop_normalized in normalized):
+                logger.info(f"[Dedup] Address match (property): '{normalized}' ↔ '{prop_normalized}'")
+                return True
+
         return False
     except Exception as e:
         logger.warning(f"[Dedup] Error checking purchase status: {e}")
@@ -790,45 +745,31 @@ async def create_listings_bulk(listings: List[MarketListingCreate]):
     Skips listings that are already purchased or in Maninos inventory.
     """
     try:
-        # Filter out already-purchased listings
+        # Filter out already-purchased listings — and, to avoid overwriting
+        # their status, listings that exist in any other non-available status.
+        # One index per call answers every lookup in memory.
+        dedup = ListingDedupIndex.load(supabase)
         filtered = []
-        skipped = 0
         for l in listings:
-            if _is_already_purchased(l.source_url, l.address):
-                skipped += 1
+            if dedup.check(l.source_url, l.address):
+                continue
+            if dedup.existing_status(l.source_url):
+                dedup.reasons[REASON_STATUS] += 1
                 continue
             item = l.model_dump()
             item["scraped_at"] = datetime.now().isoformat()
             item["status"] = "available"
             filtered.append(item)
+        skipped = sum(dedup.reasons.values())
         
         if not filtered:
             return {
                 "created": 0,
                 "skipped": skipped,
+                "skip_reasons": dict(dedup.reasons),
                 "message": f"All {skipped} listings already purchased or in inventory",
             }
         
-        # Get existing non-available listings to avoid overwriting their status
-        source_urls = [item["source_url"] for item in filtered if item.get("source_url")]
-        if source_urls:
-            existing = supabase.table("market_listings")\
-                .select("source_url, status")\
-                .in_("source_url", source_urls)\
-                .neq("status", "available")\
-                .execute()
-            
-            non_available_urls = {r["source_url"] for r in (existing.data or [])}
-            filtered = [item for item in filtered if item["source_url"] not in non_available_urls]
-            skipped += len(non_available_urls)
-        
-        if not filtered:
-            return {
-                "created": 0,
-                "skipped": skipped,
-                "message": f"All listings already purchased or in inventory",
-            }
-        
         response = supabase.table("market_listings")\
             .upsert(filtered, on_conflict="source_url")\
             .execute()
@@ -870,6 +811,7 @@ async def create_listings_bulk(listings: List[MarketListingCreate]):
         return {
             "created": created_count,
             "skipped": skipped,
+            "skip_reasons": dict(dedup.reasons),
             "images_persisted": images_persisted,
             "message": f"Processed {len(filtered)} listings, skipped {skipped}, images persisted: {images_persisted}",
         }
@@ -1467,7 +1409,7 @@ async def scrape_and_save(
     Direct scraping endpoint - scrapes ALL sources and calculates market value.
     
     REGLA DEL 60% (Maninos — Feb 2026):
-    1. Scrapear MHVillage, MobileHome.net, MHBay
+    1. Scrapear VMF Homes + 21st Mortgage (en paralelo, con timeout por fuente)
     2. Calcular MEDIA de todos los precios = Valor de Mercado
     3. Para cada casa: ¿Precio ≤ Media × 60%? → CALIFICA
     4. Rango: $5K-$80K
@@ -1477,48 +1419,27 @@ async def scrape_and_save(
     Does NOT require LLM - direct web scraping with Playwright.
     """
     try:
-        from api.services.scrapers.partner_scrapers import VMFHomesScraper, TwentyFirstMortgageScraper
+        from api.services.scrapers.orchestrator import record_scrape_run, run_sources
+        from api.services.scrapers.partner_scrapers import partner_sources
 
         logger.info(f"[Scrape] Starting scrape for {city}, ${min_price}-${max_price}")
+        logger.info("[Scrape] Scraping VMF + 21st Mortgage concurrently (Facebook scraped separately)")
 
-        source_count = 2
-        logger.info(f"[Scrape] Will scrape {source_count} sources: VMF, 21st Mortgage (Facebook scraped separately)")
-
-        all_listings = []
-        all_prices = []
         fb_count = 0  # Facebook scraped via separate /scrape-facebook endpoint
 
-        # SOURCE 1: VMF Homes / Vanderbilt (JSON API)
-        vmf_count = 0
-        logger.info(f"[Scrape] 2/{source_count} - Scraping VMF Homes (JSON API)...")
-        try:
-            vmf_listings = await VMFHomesScraper.scrape(
-                min_price=min_price,
-                max_price=max_price,
-                max_listings=100,
-            )
-            all_listings.extend(vmf_listings)
-            all_prices.extend([l.listing_price for l in vmf_listings])
-            vmf_count = len(vmf_listings)
-            logger.info(f"[Scrape] ✅ VMF Homes: {vmf_count} mobile homes")
-        except Exception as e:
-            logger.warning(f"[Scrape] VMF Homes failed: {e}")
+        # All sources at once, each with its own timeout (api/services/scrapers/orchestrator.py)
+        run = await run_sources(partner_sources(min_price=min_price, max_price=max_price, max_listings=100))
+        record_scrape_run(supabase, run, "market_listings.scrape")
 
-        # SOURCE 3: 21st Mortgage (JSON API)
-        mortgage21_count = 0
-        logger.info(f"[Scrape] 3/{source_count} - Scraping 21st Mortgage (JSON API)...")
-        try:
-            mortgage21_listings = await TwentyFirstMortgageScraper.scrape(
-                min_price=min_price,
-                max_price=max_price,
-                max_listings=100,
-            )
-            all_listings.extend(mortgage21_listings)
-            all_prices.extend([l.listing_price for l in mortgage21_listings])
-            mortgage21_count = len(mortgage21_listings)
-            logger.info(f"[Scrape] ✅ 21st Mortgage: {mortgage21_count} mobile homes")
-        except Exception as e:
-            logger.warning(f"[Scrape] 21st Mortgage failed: {e}")
+        vmf_listings = run.data("vmf_homes", [])
+        mortgage21_listings = run.data("21st_mortgage", [])
+        vmf_count = len(vmf_listings)
+        mortgage21_count = len(mortgage21_listings)
+        logger.info(f"[Scrape] ✅ VMF Homes: {vmf_count}, 21st Mortgage: {mortgage21_count} "
+                    f"mobile homes in {run.latency_ms} ms")
+
+        all_listings = list(vmf_listings) + list(mortgage21_listings)
+        all_prices = [l.listing_price for l in all_listings]
 
         if not all_listings:
             return {
@@ -1526,6 +1447,7 @@ async def scrape_and_save(
                 "message": f"No listings found for {city}",
                 "scraped": 0,
                 "saved": 0,
+                "scrape_metrics": run.metrics(),
             }
         
         # ============================================
@@ -1595,6 +1517,17 @@ async def scrape_and_save(
         saved_count = 0
         results = []
         listings_to_persist_images = []
+        # Handled listings + inventory, loaded once for the whole run
+        dedup = ListingDedupIndex.load(supabase)
+        # Fingerprints of what's already stored: unchanged listings keep
+        # their persisted images instead of re-downloading them every run.
+        try:
+            stored, _ = fetch_existing(supabase, [l.source_url for l in all_listings if l.source_url],
+                                       "source_url, content_hash")
+        except Exception as e:
+            logger.warning(f"[Scrape] Could not load stored fingerprints: {e}")
+            stored = {}
+        unchanged_count = 0
         
         from api.utils.qualification import qualify_listing, qualification_to_db_fields
         
@@ -1653,6 +1586,7 @@ async def scrape_and_save(
                 "bathrooms": listing.bathrooms,
                 "photos": listing.photos,
                 "thumbnail_url": listing.thumbnail_url,
+                "content_hash": listing.content_hash,
                 # Qualification rules (new 60% / zone / range)
                 **db_qual,
                 "scraped_at": datetime.now().isoformat(),
@@ -1669,26 +1603,29 @@ async def scrape_and_save(
                 listing_data["market_analysis_id"] = market_analysis_id
             
             # Skip if already purchased or in Maninos inventory
-            if _is_already_purchased(listing.source_url, listing.address):
+            if dedup.check(listing.source_url, listing.address):
                 logger.info(f"[Scrape] ⏭ Skipping already-purchased: {listing.address}")
                 continue
             
             # Only set status for NEW listings (don't overwrite purchased/rejected)
             listing_data["status"] = "available"
             
+            # Already exists with purchased/rejected/expired — DON'T overwrite
+            existing_status = dedup.existing_status(listing.source_url)
+            if existing_status:
+                dedup.reasons[REASON_STATUS] += 1
+                logger.info(f"[Scrape] ⏭ Skipping (status={existing_status}): {listing.address}")
+                continue
+            
+            # Same content as stored: keep the row's persisted images (the
+            # scraped ones are expiring CDN URLs) and don't re-persist them.
+            unchanged = (stored.get(listing.source_url) or {}).get("content_hash") == listing.content_hash
+            if unchanged:
+                listing_data.pop("photos", None)
+                listing_data.pop("thumbnail_url", None)
+                unchanged_count += 1
+            
             try:
-                # Use insert with ON CONFLICT DO NOTHING for non-available listings
-                # First try to check if it exists with non-available status
-                existing = supabase.table("market_listings")\
-                    .select("id, status")\
-                    .eq("source_url", listing.source_url)\
-                    .limit(1).execute()
-                
-                if existing.data and existing.data[0].get("status") != "available":
-                    # Already exists with purchased/rejected/expired — DON'T overwrite
-                    logger.info(f"[Scrape] ⏭ Skipping (status={existing.data[0]['status']}): {listing.address}")
-                    continue
-                
                 response = supabase.table("market_listings")\
                     .upsert(listing_data, on_conflict="source_url")\
                     .execute()
@@ -1699,7 +1636,7 @@ async def scrape_and_save(
                     logger.info(f"[Scrape] ✓ Saved: {listing.address} (${listing.listing_price:,.0f})")
                     
                     # Persist images to Supabase Storage (replaces expiring CDN URLs)
-                    if saved_listing_id and (listing.thumbnail_url or listing.photos):
+                    if saved_listing_id and not unchanged and (listing.thumbnail_url or listing.photos):
                         listings_to_persist_images.append({
                             "id": saved_listing_id,
                             "thumbnail_url": listing.thumbnail_url,
@@ -1768,7 +1705,10 @@ async def scrape_and_save(
             },
             "qualified": qualified_count,
             "saved_to_db": saved_count,
+            "unchanged": unchanged_count,
+            "skip_reasons": dict(dedup.reasons),
             "images_persisted": images_persisted,
+            "scrape_metrics": run.metrics(),
             "results": sorted(results, key=lambda x: x["percent_of_market"])[:15],
         }
         
@@ -1787,6 +1727,7 @@ class TDHCALookupRequest(BaseModel):
     """Request body for TDHCA title lookup."""
     search_value: str = Field(..., description="Label/Seal Number or Serial Number")
     search_type: str = Field(default="label", description="'label' or 'serial'")
+    bypass_cache: bool = Field(default=False, description="Skip the cached result and query TDHCA live")
 
 
 @router.post("/tdhca-lookup")
@@ -1794,216 +1735,90 @@ async def tdhca_title_lookup(request: TDHCALookupRequest):
     """
     Look up a manufactured home title from the Texas TDHCA website.
     
-    Uses Playwright to:
+    Uses Playwright (api/services/tdhca_lookup.py) to:
     1. Navigate to https://mhweb.tdhca.state.tx.us/mhweb/title_view.jsp
     2. Enter the serial/label number
     3. Submit the form
     4. Navigate to the detail page (from search results)
     5. Parse the detail page and return structured data
     
+    The same title looked up again within an hour is answered from the
+    response cache; set bypass_cache to force a live lookup.
+    
     Returns the title information as structured data.
     """
-    import asyncio
-    from playwright.async_api import async_playwright
+    from api.services.tdhca_lookup import fetch_title_page
     
     logger.info(f"[TDHCA] Looking up {request.search_type}: {request.search_value}")
-    debug_log: list[str] = []  # Collect debug info for response
     
     try:
-        async with async_playwright() as pw:
-            browser = await pw.chromium.launch(headless=True)
-            page = await browser.new_page()
-            
-            # ═══ Step 1: Navigate to TDHCA search page ═══
-            await page.goto(
-                "https://mhweb.tdhca.state.tx.us/mhweb/title_view.jsp",
-                wait_until='domcontentloaded',
-                timeout=30000
-            )
-            debug_log.append(f"Step1: Loaded search page: {page.url}")
-            
-            # ═══ Step 2: Fill in the search field and submit ═══
-            if request.search_type == 'serial':
-                await page.fill('input[name="serial"]', request.search_value)
-            else:
-                await page.fill('input[name="label"]', request.search_value)
-            
-            await page.click('input[type="submit"], button[type="submit"]')
-            await page.wait_for_load_state('domcontentloaded', timeout=15000)
-            await asyncio.sleep(2)
-            
-            results_url = page.url
-            content = await page.content()
-            debug_log.append(f"Step2: After submit URL: {results_url}")
-            debug_log.append(f"Step2: Content length: {len(content)}")
-            
-            # ═══ Step 3: Check if we got results ═══
-            no_records_indicators = [
-                'No records', 'no records', 'total_rec" value="0"',
-                'No matching', 'no matching', '0 records',
-            ]
-            if any(ind in content for ind in no_records_indicators):
-                await browser.close()
-                return {
-                    "success": False,
-                    "message": f"No se encontraron registros para {request.search_type}: {request.search_value}",
-                    "data": None
-                }
-            
-            # ═══ Step 4: Detect if we're on results page or detail page ═══
-            # TDHCA detail pages typically contain "Certificate #" or "Manufacturer"
-            # as table cell labels, NOT as column headers in a results table.
-            # Results pages have multiple rows with clickable links.
-            
-            is_detail_page = False
-            
-            # Check URL patterns
-            url_lower = page.url.lower()
-            if 'title_detail' in url_lower or 'titledetail' in url_lower:
-                is_detail_page = True
-                debug_log.append("Step4: URL indicates detail page")
-            
-            # Check page structure — detail pages have KV tables with specific labels
-            if not is_detail_page:
-                from bs4 import BeautifulSoup as _BS
-                _check_soup = _BS(content, 'html.parser')
-                _cells = [td.get_text(strip=True).lower() for td in _check_soup.find_all('td')]
-                # Detail pages have these as table cell TEXT (not column headers)
-                detail_indicators = ['certificate #', 'manufacturer', 'wind zone', 'square ftg']
-                detail_hits = sum(1 for ind in detail_indicators if ind in _cells)
-                if detail_hits >= 2:
-                    is_detail_page = True
-                    debug_log.append(f"Step4: Content analysis indicates detail page (hits={detail_hits})")
-            
-            # ═══ Step 5: If on results page, navigate to detail ═══
-            if not is_detail_page:
-                debug_log.append("Step5: On results page, trying to navigate to detail...")
-                
-                # Log ALL links on the page for debugging
-                all_links = page.locator('a')
-                link_count = await all_links.count()
-                link_info = []
-                for i in range(min(link_count, 30)):
-                    href = await all_links.nth(i).get_attribute('href') or ''
-                    text = (await all_links.nth(i).text_content() or '').strip()
-                    link_info.append(f"  [{i}] text='{text[:40]}' href='{href[:80]}'")
-                debug_log.append(f"Step5: Found {link_count} links:\n" + "\n".join(link_info))
-                logger.info(f"[TDHCA] All links on page:\n" + "\n".join(link_info))
-                
-                # Try to find a detail link — prioritize links inside table cells
-                # (results table rows) over navigation links
-                clicked = False
-                
-                # Strategy A: Link in a table row with href containing detail/certnum
-                detail_in_table = page.locator('table td a[href*="title_detail"], table td a[href*="titleDetail"], table td a[href*="certnum"]')
-                if await detail_in_table.count() > 0:
-                    debug_log.append(f"Step5A: Found {await detail_in_table.count()} detail links in table cells")
-                    await detail_in_table.first.click()
-                    clicked = True
-                
-                # Strategy B: Any link with href containing title_detail (NOT just "detail")
-                if not clicked:
-                    specific_detail = page.locator('a[href*="title_detail"], a[href*="titleDetail"]')
-                    if await specific_detail.count() > 0:
-                        debug_log.append(f"Step5B: Found {await specific_detail.count()} title_detail links")
-                        await specific_detail.first.click()
-                        clicked = True
-                
-                # Strategy C: Link in a table cell with text "Detail" (not nav bar)
-                if not clicked:
-                    table_detail = page.locator('table td a:has-text("Detail")')
-                    if await table_detail.count() > 0:
-                        debug_log.append(f"Step5C: Found {await table_detail.count()} 'Detail' links in table cells")
-                        await table_detail.first.click()
-                        clicked = True
-                
-                # Strategy D: First link in a results table row (skip header row)
-                if not clicked:
-                    # Try to find any link in the 2nd+ <tr> of a table (skip header)
-                    row_links = page.locator('table tr:not(:first-child) td a')
-                    if await row_links.count() > 0:
-                        debug_log.append(f"Step5D: Found {await row_links.count()} links in table rows")
-                        await row_links.first.click()
-                        clicked = True
-                
-                if clicked:
-                    await page.wait_for_load_state('domcontentloaded', timeout=15000)
-                    await asyncio.sleep(2)
-                    content = await page.content()
-                    debug_log.append(f"Step5: After click URL: {page.url}")
-                    logger.info(f"[TDHCA] After click — page URL: {page.url}")
-                else:
-                    debug_log.append("Step5: ⚠️ Could not find any detail link to click! Parsing current page as-is.")
-                    logger.warning(f"[TDHCA] Could not find detail link! Parsing results page as fallback.")
-            else:
-                debug_log.append("Step4: Already on detail page, no click needed")
-            
-            # ═══ Step 6: Parse the page ═══
-            from bs4 import BeautifulSoup
-            import re as _re
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            page_text = soup.get_text('\n', strip=True)
-            tables_before = len(soup.find_all('table'))
-            debug_log.append(f"Step6: Page URL: {page.url}")
-            debug_log.append(f"Step6: Tables in HTML: {tables_before}")
-            debug_log.append(f"Step6: Page text (first 500): {page_text[:500]}")
-            logger.info(f"[TDHCA] Page URL: {page.url}")
-            logger.info(f"[TDHCA] Tables in raw HTML: {tables_before}")
-            logger.info(f"[TDHCA] Page text (first 1500 chars): {page_text[:1500]}")
-            
-            # Parse using centralized parser (NOTE: this modifies soup in-place via _strip_nav_elements)
-            title_data = parse_tdhca_detail_page(soup, page_text)
-            
-            # Get cleaned page_text AFTER parser stripped nav elements
-            clean_page_text = soup.get_text('\n', strip=True)
-            tables_after = len(soup.find_all('table'))
-            
-            debug_log.append(f"Step6: Tables after strip: {tables_after} (removed {tables_before - tables_after})")
-            debug_log.append(f"Step6: Parsed {len(title_data)} fields: {list(title_data.keys())}")
-            logger.info(f"[TDHCA] Tables after strip: {tables_after} (removed {tables_before - tables_after})")
-            logger.info(f"[TDHCA] Parsed fields ({len(title_data)}): {list(title_data.keys())}")
-            
-            # Get URLs for reference
-            detail_url = sanitize_tdhca_url(page.url)
-            
-            print_link = page.locator('a:has-text("Print"), a[href*="print"]')
-            print_url = None
-            if await print_link.count() > 0:
-                print_url = await print_link.first.get_attribute('href')
-                if print_url and not print_url.startswith('http'):
-                    print_url = f"https://mhweb.tdhca.state.tx.us/mhweb/{print_url}"
-                print_url = sanitize_tdhca_url(print_url)
-            
-            await browser.close()
-            
-            # Build structured response
-            structured = build_structured_tdhca_data(
-                title_data=title_data,
-                page_text=page_text,
-                detail_url=detail_url,
-                print_url=print_url,
-            )
-            
-            logger.info(f"[TDHCA] ✅ Structured: mfr='{structured['manufacturer']}', "
-                        f"mfr_addr='{structured['manufacturer_address']}', "
-                        f"mfr_csz='{structured['manufacturer_city_state_zip']}', "
-                        f"model='{structured['model']}', serial='{structured['serial_number']}', "
-                        f"label='{structured['label_seal']}', year='{structured['year']}', "
-                        f"sqft='{structured['square_feet']}', wind='{structured['wind_zone']}', "
-                        f"buyer='{structured['buyer']}', seller='{structured['seller']}', "
-                        f"county='{structured['county']}', dims={structured['width']}x{structured['length']}")
-            
+        # ═══ Steps 1-5: Search TDHCA and reach the detail page ═══
+        result = await fetch_title_page(
+            request.search_type, request.search_value, bypass_cache=request.bypass_cache
+        )
+        debug_log = result.debug_log
+        content = result.content
+        
+        if not result.found:
             return {
-                "success": True,
-                "message": f"Título encontrado para {request.search_type}: {request.search_value}",
-                "data": structured,
-                "page_text": page_text[:5000],
-                "clean_page_text": clean_page_text[:5000],
-                "debug_log": debug_log,
-                "raw_html": content,  # Full HTML for accurate debugging
+                "success": False,
+                "message": f"No se encontraron registros para {request.search_type}: {request.search_value}",
+                "data": None
             }
         
+        # ═══ Step 6: Parse the page ═══
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        page_text = soup.get_text('\n', strip=True)
+        tables_before = len(soup.find_all('table'))
+        debug_log.append(f"Step6: Page URL: {result.url}")
+        debug_log.append(f"Step6: Tables in HTML: {tables_before}")
+        debug_log.append(f"Step6: Page text (first 500): {page_text[:500]}")
+        logger.info(f"[TDHCA] Page URL: {result.url}")
+        logger.info(f"[TDHCA] Tables in raw HTML: {tables_before}")
+        logger.info(f"[TDHCA] Page text (first 1500 chars): {page_text[:1500]}")
+        
+        # Parse using centralized parser (NOTE: this modifies soup in-place via _strip_nav_elements)
+        title_data = parse_tdhca_detail_page(soup, page_text)
+        
+        # Get cleaned page_text AFTER parser stripped nav elements
+        clean_page_text = soup.get_text('\n', strip=True)
+        tables_after = len(soup.find_all('table'))
+        
+        debug_log.append(f"Step6: Tables after strip: {tables_after} (removed {tables_before - tables_after})")
+        debug_log.append(f"Step6: Parsed {len(title_data)} fields: {list(title_data.keys())}")
+        logger.info(f"[TDHCA] Tables after strip: {tables_after} (removed {tables_before - tables_after})")
+        logger.info(f"[TDHCA] Parsed fields ({len(title_data)}): {list(title_data.keys())}")
+        
+        # Build structured response
+        structured = build_structured_tdhca_data(
+            title_data=title_data,
+            page_text=page_text,
+            detail_url=sanitize_tdhca_url(result.url),
+            print_url=sanitize_tdhca_url(result.print_url),
+        )
+        
+        logger.info(f"[TDHCA] ✅ Structured: mfr='{structured['manufacturer']}', "
+                    f"mfr_addr='{structured['manufacturer_address']}', "
+                    f"mfr_csz='{structured['manufacturer_city_state_zip']}', "
+                    f"model='{structured['model']}', serial='{structured['serial_number']}', "
+                    f"label='{structured['label_seal']}', year='{structured['year']}', "
+                    f"sqft='{structured['square_feet']}', wind='{structured['wind_zone']}', "
+                    f"buyer='{structured['buyer']}', seller='{structured['seller']}', "
+                    f"county='{structured['county']}', dims={structured['width']}x{structured['length']}")
+        
+        return {
+            "success": True,
+            "message": f"Título encontrado para {request.search_type}: {request.search_value}",
+            "data": structured,
+            "page_text": page_text[:5000],
+            "clean_page_text": clean_page_text[:5000],
+            "debug_log": debug_log,
+            "raw_html": content,  # Full HTML for accurate debugging
+            "from_cache": result.from_cache,
+        }
+        
     except Exception as e:
         logger.error(f"[TDHCA] Error: {e}")
         import traceback
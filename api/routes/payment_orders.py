@@ -19,17 +19,8 @@ router = APIRouter()
 
 
 def _generate_transaction_number() -> str:
-    today = date.today().strftime("%y%m%d")
-    prefix = f"TXN-{today}-"
-    try:
-        existing = sb.table("accounting_transactions") \
-            .select("transaction_number") \
-            .like("transaction_number", f"{prefix}%") \
-            .execute()
-        count = len(existing.data) if existing.data else 0
-    except Exception:
-        count = 0
-    return f"{prefix}{count + 1:03d}"
+    from api.services.ledger import allocate_transaction_numbers
+    return allocate_transaction_numbers(db=sb)[0]
 
 
 # Concept → human label / counterparty type for the auto-generated payable bill.
@@ -33,6 +33,7 @@ from api.utils.qualification import (
     calculate_market_value,
 )
 from tools.supabase_client import sb
+from tools.supabase_async import aexecute, gather_execute
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -258,11 +259,10 @@ async def financial_summary():
     """
     try:
         # 1. All properties (excluding Capital-only legacy houses, NULL-safe)
-        props_result = sb.table("properties") \
-            .select("id, address, property_code, city, status, purchase_price, sale_price, renovation_cost, move_cost, commission, margin") \
-            .or_("source.is.null,source.neq.manual_capital") \
-            .order("created_at", desc=True) \
-            .execute()
+        props_result = await aexecute(sb.table("properties")
+            .select("id, address, property_code, city, status, purchase_price, sale_price, renovation_cost, move_cost, commission, margin")
+            .or_("source.is.null,source.neq.manual_capital")
+            .order("created_at", desc=True))
         properties = props_result.data or []
         if not properties:
             return {"ok": True, "properties": []}
@@ -276,15 +276,17 @@ async def financial_summary():
         # default commission. (The renovation estimate stays a planning guide.)
         ledger_cost_by_code = {}
         try:
-            per_house = sb.table("accounting_accounts").select("id, code, account_type") \
-                .or_("code.like.Renovación %,code.like.Movida %,code.like.Comisión %").execute().data or []
+            per_house = (await aexecute(sb.table("accounting_accounts").select("id, code, account_type")
+                .or_("code.like.Renovación %,code.like.Movida %,code.like.Comisión %"))).data or []
             id_meta = {a["id"]: (a["code"], a.get("account_type", "")) for a in per_house}
             if id_meta:
                 ids = list(id_meta.keys())
-                for i in range(0, len(ids), 200):
-                    rows = sb.table("accounting_transactions").select("account_id, amount, is_income") \
-                        .in_("account_id", ids[i:i + 200]).neq("status", "voided").execute().data or []
-                    for r in rows:
+                chunks = await gather_execute(*(
+                    sb.table("accounting_transactions").select("account_id, amount, is_income")
+                    .in_("account_id", ids[i:i + 200]).neq("status", "voided")
+                    for i in range(0, len(ids), 200)))
+                for chunk in chunks:
+                    for r in chunk.data or []:
                         code, atype = id_meta[r["account_id"]]
                         exp = atype in ("Expenses", "Other Expense", "Cost of Goods Sold")
                         val = (float(r.get("amount") or 0) if ((not r.get("is_income")) if exp else r.get("is_income"))
@@ -296,11 +298,10 @@ async def financial_summary():
         # 2. Renovation costs (latest per property)
         reno_map = {}
         try:
-            renos = sb.table("renovations") \
-                .select("property_id, total_cost, created_at") \
-                .in_("property_id", prop_ids) \
-                .order("created_at", desc=True) \
-                .execute()
+            renos = await aexecute(sb.table("renovations")
+                .select("property_id, total_cost, created_at")
+                .in_("property_id", prop_ids)
+                .order("created_at", desc=True))
             for r in (renos.data or []):
                 pid = r["property_id"]
                 if pid not in reno_map:  # Keep latest only
@@ -311,10 +312,9 @@ async def financial_summary():
         # 3. Move costs (sum per property)
         move_map = {}
         try:
-            moves = sb.table("moves") \
-                .select("property_id, quoted_cost, final_cost") \
-                .in_("property_id", prop_ids) \
-                .execute()
+            moves = await aexecute(sb.table("moves")
+                .select("property_id, quoted_cost, final_cost")
+                .in_("property_id", prop_ids))
             for m in (moves.data or []):
                 pid = m["property_id"]
                 cost = float(m.get("final_cost") or m.get("quoted_cost") or 0)
@@ -325,18 +325,17 @@ async def financial_summary():
         # 4. Sale data per property (latest active/completed sale)
         sale_map = {}
         try:
-            sales = sb.table("sales") \
-                .select("id, property_id, sale_price, sale_type, status, amount_paid, amount_pending, commission_amount, client_id") \
-                .in_("property_id", prop_ids) \
-                .neq("status", "cancelled") \
-                .order("created_at", desc=True) \
-                .execute()
+            sales = await aexecute(sb.table("sales")
+                .select("id, property_id, sale_price, sale_type, status, amount_paid, amount_pending, commission_amount, client_id")
+                .in_("property_id", prop_ids)
+                .neq("status", "cancelled")
+                .order("created_at", desc=True))
 
             # Get client names
             client_ids = list(set(s["client_id"] for s in (sales.data or []) if s.get("client_id")))
             client_map = {}
             if client_ids:
-                clients = sb.table("clients").select("id, name").in_("id", client_ids).execute()
+                clients = await aexecute(sb.table("clients").select("id, name").in_("id", client_ids))
                 client_map = {c["id"]: c["name"] for c in (clients.data or [])}
 
             for s in (sales.data or []):
@@ -358,10 +357,9 @@ async def financial_summary():
         # 5. Payment orders per property (count + total)
         po_map = {}
         try:
-            pos = sb.table("payment_orders") \
-                .select("property_id, amount, status") \
-                .in_("property_id", prop_ids) \
-                .execute()
+            pos = await aexecute(sb.table("payment_orders")
+                .select("property_id, amount, status")
+                .in_("property_id", prop_ids))
             for po in (pos.data or []):
                 pid = po["property_id"]
                 if pid not in po_map:
@@ -374,10 +372,9 @@ async def financial_summary():
         # 6. Accounting transaction count per property
         txn_map = {}
         try:
-            txns = sb.table("accounting_transactions") \
-                .select("property_id") \
-                .in_("property_id", prop_ids) \
-                .execute()
+            txns = await aexecute(sb.table("accounting_transactions")
+                .select("property_id")
+                .in_("property_id", prop_ids))
             for t in (txns.data or []):
                 pid = t.get("property_id")
                 if pid:
@@ -5,9 +5,10 @@ Read-only access to published properties + partner listings (Vanderbilt, 21st Mo
 
 import logging
 from typing import Optional, List
-from datetime import datetime
 from fastapi import APIRouter, HTTPException, Query
 from tools.supabase_client import sb
+from tools.supabase_async import aexecute, run_sync
+from api.services.partner_ingest import ingest_partner_listings, partner_listing_row
 
 logger = logging.getLogger(__name__)
 
@@ -49,7 +50,7 @@ async def list_published_properties(
             query = query.ilike("property_code", f"%{code.strip()}%")
 
         query = query.range(offset, offset + limit - 1)
-        result = query.execute()
+        result = await aexecute(query)
         
         return {
             "ok": True,
@@ -214,26 +215,20 @@ async def refresh_partner_listings():
     Both use direct JSON APIs — fast, no browser needed.
     Saves results to market_listings table.
     """
-    import asyncio
-    
     try:
-        from api.services.scrapers.partner_scrapers import VMFHomesScraper, TwentyFirstMortgageScraper
+        from api.services.scrapers.orchestrator import record_scrape_run, run_sources
+        from api.services.scrapers.partner_scrapers import partner_sources
         
         logger.info("[Partners] Refreshing partner listings (VMF + 21st)...")
         
-        # Scrape both in parallel — both are pure HTTP, no browser
-        vmf_task = VMFHomesScraper.scrape(min_price=5000, max_price=80000, max_listings=150)
-        m21_task = TwentyFirstMortgageScraper.scrape(min_price=5000, max_price=80000, max_listings=150)
-        
-        vmf_listings, m21_listings = await asyncio.gather(vmf_task, m21_task, return_exceptions=True)
-        
-        # Handle errors
-        if isinstance(vmf_listings, Exception):
-            logger.error(f"[Partners] VMF scrape error: {vmf_listings}")
-            vmf_listings = []
-        if isinstance(m21_listings, Exception):
-            logger.error(f"[Partners] 21st scrape error: {m21_listings}")
-            m21_listings = []
+        # Scrape both concurrently, each with its own timeout
+        run = await run_sources(partner_sources(min_price=5000, max_price=80000, max_listings=150))
+        await run_sync(record_scrape_run, sb, run, "public.partners_refresh")
+        for name, r in run.results.items():
+            if not r.ok:
+                logger.error(f"[Partners] {name} scrape {r.status}: {r.error}")
+        vmf_listings = run.data("vmf_homes", [])
+        m21_listings = run.data("21st_mortgage", [])
         
         all_listings = list(vmf_listings) + list(m21_listings)
         logger.info(f"[Partners] Scraped {len(vmf_listings)} VMF + {len(m21_listings)} 21st = {len(all_listings)} total")
@@ -241,52 +236,22 @@ async def refresh_partner_listings():
         if not all_listings:
             return {"ok": True, "message": "No listings found", "saved": 0, "vmf": 0, "mortgage21": 0}
         
-        # Save to database via upsert
-        saved_count = 0
-        for listing in all_listings:
-            try:
-                data = {
-                    "source": listing.source,
-                    "source_url": listing.source_url,
-                    "source_id": listing.source_id,
-                    "address": listing.address,
-                    "city": listing.city,
-                    "state": listing.state,
-                    "zip_code": listing.zip_code,
-                    "listing_price": listing.listing_price,
-                    "year_built": listing.year_built or 2000,
-                    "sqft": listing.sqft,
-                    "bedrooms": listing.bedrooms,
-                    "bathrooms": listing.bathrooms,
-                    "photos": listing.photos,
-                    "thumbnail_url": listing.thumbnail_url,
-                    "scraped_at": listing.scraped_at or datetime.now().isoformat(),
-                    "status": "available",
-                    # Partner sources are whitelisted — mark them qualified so the
-                    # public catalog filter (.eq("is_qualified", True)) picks them up.
-                    # The DB trigger combines these into is_qualified=true.
-                    "passes_70_rule": True,
-                    "passes_age_rule": True,
-                    "passes_location_rule": True,
-                    "is_qualified": True,
-                }
-                
-                # Don't overwrite purchased/rejected listings
-                existing = sb.table("market_listings") \
-                    .select("id, status") \
-                    .eq("source_url", listing.source_url) \
-                    .limit(1).execute()
-                
-                if existing.data and existing.data[0].get("status") not in ("available", None):
-                    continue
-                
-                sb.table("market_listings") \
-                    .upsert(data, on_conflict="source_url") \
-                    .execute()
-                saved_count += 1
-            except Exception as e:
-                logger.warning(f"[Partners] Error saving: {e}")
-                continue
+        # Partner sources are whitelisted — mark them qualified so the
+        # public catalog filter (.eq("is_qualified", True)) picks them up.
+        # The DB trigger combines these into is_qualified=true.
+        rows = [
+            partner_listing_row(
+                listing,
+                passes_70_rule=True,
+                passes_age_rule=True,
+                passes_location_rule=True,
+                is_qualified=True,
+            )
+            for listing in all_listings
+        ]
+        # Don't overwrite purchased/rejected listings (done in bulk)
+        ingest = await run_sync(ingest_partner_listings, sb, rows)
+        saved_count = ingest["saved"]
         
         logger.info(f"[Partners] ✅ Saved {saved_count} partner listings")
         
@@ -296,6 +261,8 @@ async def refresh_partner_listings():
             "mortgage21": len(m21_listings),
             "total_scraped": len(all_listings),
             "saved": saved_count,
+            "by_source": ingest["by_source"],
+            "scrape_metrics": run.metrics(),
         }
         
     except Exception as e:
@@ -606,7 +606,7 @@ def _now_iso() -> str:
 def _send_approval_notification(property_id: str, total: float, responsable: str):
     """Send email to admin when quote is submitted for approval."""
     try:
-        from tools.email_tool import send_email
+        from api.services.email_outbox import queue_email as send_email
         from api.services.email_service import _base_template
         admin_email = os.getenv("ADMIN_EMAIL", "sebastian@maninoshomes.com")
         app_url = os.getenv("APP_URL") or os.getenv("FRONTEND_URL") or "http://localhost:3000"
@@ -633,6 +633,7 @@ def _send_approval_notification(property_id: str, total: float, responsable: str
             to=[admin_email],
             subject=f"Cotización de renovación pendiente de aprobación — ${total:,.2f}",
             html=_base_template(content),
+            email_type="renovation_approval_request",
         )
     except Exception as e:
         logger.warning(f"[renovation] Failed to send approval notification: {e}")
@@ -641,7 +642,7 @@ def _send_approval_notification(property_id: str, total: float, responsable: str
 def _send_approved_notification(property_id: str, total: float):
     """Send email to treasury when quote is approved."""
     try:
-        from tools.email_tool import send_email
+        from api.services.email_outbox import queue_email as send_email
         from api.services.email_service import _base_template
         treasury_email = os.getenv("TREASURY_EMAIL", "abigail@maninoshomes.com")
         app_url = os.getenv("APP_URL") or os.getenv("FRONTEND_URL") or "http://localhost:3000"
@@ -667,6 +668,7 @@ def _send_approved_notification(property_id: str, total: float):
             to=[treasury_email],
             subject=f"Cotización de renovación APROBADA — ${total:,.2f}",
             html=_base_template(content),
+            email_type="renovation_approved",
         )
     except Exception as e:
         logger.warning(f"[renovation] Failed to send approved notification: {e}")
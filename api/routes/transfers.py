@@ -377,10 +377,11 @@ async def get_title_monitor_runs(limit: int = 30):
 @router.post("/title-monitor/trigger")
 async def trigger_title_monitor():
     """Manually fire the title monitor job NOW (doesn't wait for the 10am cron).
-    Used for testing / on-demand checks. Writes to scheduler_runs like a normal run."""
-    from api.services.scheduler_service import _job_title_monitor
+    Used for testing / on-demand checks. Writes to scheduler_runs like a normal run.
+    Runs on the scheduler's job pool, so the API stays responsive meanwhile."""
+    from api.services.scheduler_service import _job_title_monitor, run_job_now
     try:
-        result = _job_title_monitor()
+        result = await run_job_now("title_monitor", _job_title_monitor)
         return {"ok": True, "result": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -572,8 +573,11 @@ async def populate_transfer_tdhca(transfer_id: str):
 
 
 @router.post("/{transfer_id}/recheck-title")
-async def recheck_title(transfer_id: str):
-    """Manually trigger a TDHCA title name check for a specific transfer"""
+async def recheck_title(transfer_id: str, refresh: bool = False):
+    """Manually trigger a TDHCA title name check for a specific transfer.
+
+    A lookup of the same title within the last hour comes from the response
+    cache; ?refresh=true queries TDHCA live."""
     from api.services.title_monitor import check_single_transfer, populate_tdhca_fields_from_document_data
 
     # First ensure serial/label are populated
@@ -581,7 +585,7 @@ async def recheck_title(transfer_id: str):
     if not pop.get("ok"):
         raise HTTPException(status_code=400, detail=pop.get("error", "Could not find serial/label"))
 
-    result = await check_single_transfer(transfer_id)
+    result = await check_single_transfer(transfer_id, bypass_cache=refresh)
     if not result.get("ok"):
         raise HTTPException(status_code=500, detail=result.get("error", "TDHCA check failed"))
 
@@ -0,0 +1,239 @@
+"""
+Bounded, rate-limited fan-out for OpenAI calls.
+
+Bank-statement parsing and classification send a statement to the model in
+chunks. Sent one after another, a 300-movement statement is 60 round-trips
+and well over a minute. This module runs them in parallel without tripping
+OpenAI's per-minute limits:
+
+  - a semaphore caps the requests in flight (OPENAI_MAX_CONCURRENCY),
+  - a token bucket paces requests per minute (OPENAI_RPM),
+  - a second bucket paces estimated tokens per minute (OPENAI_TPM),
+  - `call_with_retries` retries rate-limit / transient errors and partial
+    answers (truncated or short JSON) with exponential backoff + jitter.
+
+All calls in the process share one limiter (`get_openai_limiter`), so two
+statements classified at once stay under the same budget.
+
+    limiter = get_openai_limiter()
+    results = await map_bounded(chunks, classify_chunk, limiter=limiter,
+                                on_result=save_progress)
+
+    # Or stream: results come back in input order as soon as each is ready,
+    # pulling only a few items ahead of the slowest one.
+    async for chunk, movements in map_ordered(iter_chunks(), parse_chunk, limiter=limiter):
+        insert(movements)
+
+`OPENAI_BASE_URL` (read by the openai SDK) points the calls at a local fake
+server in tests.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+from tools.supabase_async import run_sync
+
+logger = logging.getLogger(__name__)
+
+# First backoff delay in seconds (doubles per attempt).
+RETRY_BASE_DELAY = float(os.getenv("OPENAI_RETRY_BASE_DELAY", "1.0"))
+
+
+class PartialAIResponse(Exception):
+    """The model answered, but not usably (invalid / truncated / short JSON).
+    Worth another attempt; carries what was parsed, if anything."""
+
+    def __init__(self, message: str, partial: Any = None):
+        super().__init__(message)
+        self.partial = partial
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float, *, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        """Wait until `amount` tokens are available and take them. Requests
+        larger than the bucket are clamped to its capacity."""
+        amount = min(amount, self.capacity)
+        async with self._lock:  # FIFO: one waiter refills at a time
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+
+
+class OpenAILimiter:
+    """Concurrency cap + request and token pacing for one OpenAI key."""
+
+    def __init__(self, max_concurrency: int = 4, requests_per_minute: float = 300,
+                 tokens_per_minute: float = 150_000):
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._requests = TokenBucket(requests_per_minute / 60, max(1.0, requests_per_minute / 60))
+        # Allow a minute's worth of tokens as burst so one big prompt never stalls forever.
+        self._tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute)
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int = 0):
+        """Hold one in-flight request slot for the duration of the call."""
+        async with self._semaphore:
+            await self._requests.acquire()
+            if estimated_tokens:
+                await self._tokens.acquire(estimated_tokens)
+            yield
+
+
+_limiter: Optional[OpenAILimiter] = None
+_limiter_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_openai_limiter() -> OpenAILimiter:
+    """Process-wide limiter (one per event loop — asyncio primitives are loop-bound)."""
+    global _limiter, _limiter_loop
+    loop = asyncio.get_running_loop()
+    if _limiter is None or _limiter_loop is not loop:
+        _limiter = OpenAILimiter(
+            max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", "4")),
+            requests_per_minute=float(os.getenv("OPENAI_RPM", "300")),
+            tokens_per_minute=float(os.getenv("OPENAI_TPM", "150000")),
+        )
+        _limiter_loop = loop
+    return _limiter
+
+
+def estimate_tokens(prompt: str, max_completion_tokens: int = 0) -> int:
+    """Rough OpenAI token count (~4 chars/token) plus the completion budget."""
+    return len(prompt) // 4 + max_completion_tokens
+
+
+def _is_retryable(err: Exception) -> bool:
+    if isinstance(err, (PartialAIResponse, asyncio.TimeoutError)):
+        return True
+    try:
+        import openai
+    except ImportError:  # pragma: no cover - openai is a hard dependency
+        return False
+    return isinstance(err, (openai.RateLimitError, openai.APITimeoutError,
+                            openai.APIConnectionError, openai.InternalServerError))
+
+
+async def call_with_retries(
+    fn: Callable[[], Awaitable[Any]],
+    *,
+    limiter: Optional[OpenAILimiter] = None,
+    estimated_tokens: int = 0,
+    attempts: int = 3,
+    base_delay: Optional[float] = None,
+    label: str = "openai",
+) -> Any:
+    """Run `fn()` inside a limiter slot, retrying retryable failures with
+    exponential backoff (base_delay · 2^n, ±25% jitter). The last error is
+    re-raised. The slot is released while backing off."""
+    if base_delay is None:
+        base_delay = RETRY_BASE_DELAY
+    for attempt in range(1, attempts + 1):
+        try:
+            if limiter is None:
+                return await fn()
+            async with limiter.slot(estimated_tokens):
+                return await fn()
+        except Exception as e:
+            if attempt == attempts or not _is_retryable(e):
+                raise
+            delay = base_delay * (2 ** (attempt - 1)) * random.uniform(0.75, 1.25)
+            logger.warning(f"[{label}] attempt {attempt}/{attempts} failed ({type(e).__name__}: "
+                           f"{str(e)[:120]}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+
+async def map_bounded(
+    items: list,
+    fn: Callable[[Any], Awaitable[Any]],
+    *,
+    limiter: Optional[OpenAILimiter] = None,
+    on_result: Optional[Callable[[int, Any, Any], Awaitable[None]]] = None,
+) -> list:
+    """Apply async `fn` to every item concurrently and return results in
+    input order. At most `limiter.max_concurrency` items run at once (fn is
+    expected to take its own limiter slot for the API call; this cap keeps
+    the surrounding work — DB writes — bounded too). `on_result(index, item,
+    result)` runs as each item finishes, e.g. to persist progress. If any
+    item raises (or the caller is cancelled), the unfinished items are
+    cancelled before the error propagates, so no API calls keep running."""
+    width = limiter.max_concurrency if limiter else len(items) or 1
+    gate = asyncio.Semaphore(width)
+
+    async def run(i, item):
+        async with gate:
+            result = await fn(item)
+            if on_result is not None:
+                await on_result(i, item, result)
+            return result
+
+    tasks = [asyncio.ensure_future(run(i, item)) for i, item in enumerate(items)]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+_DONE = object()
+
+
+async def map_ordered(
+    items: Iterable,
+    fn: Callable[[Any], Awaitable[Any]],
+    *,
+    limiter: Optional[OpenAILimiter] = None,
+    window: Optional[int] = None,
+) -> AsyncIterator[tuple]:
+    """Stream `(item, await fn(item))` in input order while up to `window`
+    items (default 2 × max_concurrency) are in progress. `items` may be a
+    lazy, blocking iterator (PDF pages being extracted): it is advanced in
+    the I/O pool and never read more than `window` items ahead of the
+    oldest unfinished one. Unfinished work is cancelled if the consumer stops
+    early or `fn` raises."""
+    if window is None:
+        window = 2 * (limiter.max_concurrency if limiter else 4)
+    it = iter(items)
+    pending: list[tuple[Any, asyncio.Task]] = []
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < window:
+                item = await run_sync(next, it, _DONE)
+                if item is _DONE:
+                    exhausted = True
+                else:
+                    pending.append((item, asyncio.ensure_future(fn(item))))
+            if not pending:
+                return
+            item, task = pending.pop(0)
+            yield item, await task
+    finally:
+        for _, task in pending:
+            task.cancel()
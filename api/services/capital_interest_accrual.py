@@ -78,55 +78,72 @@ def _already_accrued_count(note_id: str) -> int:
         return 0
 
 
-def accrue_note(note: dict, up_to_period: int, *, as_of: Optional[str] = None) -> float:
-    """Accrue scheduled interest for periods [already_accrued, up_to_period).
-
-    Posts debit 71400 / credit 23950 per period (confirmed, idempotent). Returns
-    the total interest accrued in this call. No-op if 23950 isn't seeded yet.
-    """
-    if not accrued_account_ready():
-        return 0.0
+def _accrual_entries(note: dict, up_to_period: int, as_of: Optional[str]) -> list[dict]:
+    """post_to_capital_ledger kwargs for periods [already_accrued, up_to_period)."""
     note_id = note.get("id")
     if not note_id:
-        return 0.0
+        return []
     try:
         schedule = _schedule(note)
     except Exception as exc:
         logger.warning(f"[accrual] could not build schedule for note {note_id}: {exc}")
-        return 0.0
+        return []
 
     start = _already_accrued_count(note_id)
     end = min(int(up_to_period), len(schedule))
     if end <= start:
-        return 0.0
+        return []
 
     when = as_of or date.today().isoformat()
     investor_name = (note.get("investors") or {}).get("name") or note.get("lender_name") or ""
-    total = 0.0
-    from api.services.capital_ledger import post_to_capital_ledger
+    entries = []
     for i in range(start, end):
         interest = round(float(schedule[i].get("interest", 0) or 0), 2)
         if interest <= 0.005:
             continue
-        try:
-            post_to_capital_ledger(
-                event_type="interest_accrued",
-                amount=interest,
-                date=when,
-                counterparty_name=investor_name,
-                description_override=f"Interés devengado {investor_name} — período {i + 1} — ${interest:,.2f}",
-                notes=f"accrual|{note_id}|{i}",
-                status="confirmed",
-                created_by="auto-accrual",
-                extra_fields={"investor_id": note.get("investor_id")},
-            )
-            total += interest
-        except Exception as exc:
-            logger.error(f"[accrual] post failed for note {note_id} period {i}: {exc}")
-            break
+        entries.append({
+            "event_type": "interest_accrued",
+            "amount": interest,
+            "date": when,
+            "counterparty_name": investor_name,
+            "description_override": f"Interés devengado {investor_name} — período {i + 1} — ${interest:,.2f}",
+            "notes": f"accrual|{note_id}|{i}",
+            "status": "confirmed",
+            "created_by": "auto-accrual",
+            "extra_fields": {"investor_id": note.get("investor_id")},
+        })
+    return entries
+
+
+def _post_accruals(entries: list[dict]) -> float:
+    """Post accrual entries in one all-or-nothing batch and return the total.
+    Raises on failure; nothing is written then, so the next run retries."""
+    if not entries:
+        return 0.0
+    from api.services.capital_ledger import CAPITAL_CONFIG
+    from api.services.ledger import post_many_to_ledger
+    post_many_to_ledger(entries, db=sb, config=CAPITAL_CONFIG)
+    return round(sum(e["amount"] for e in entries), 2)
+
+
+def accrue_note(note: dict, up_to_period: int, *, as_of: Optional[str] = None) -> float:
+    """Accrue scheduled interest for periods [already_accrued, up_to_period).
+
+    Posts debit 71400 / credit 23950 per period (confirmed, idempotent) in a
+    single batch. Returns the total interest accrued in this call. No-op if
+    23950 isn't seeded yet.
+    """
+    if not accrued_account_ready():
+        return 0.0
+    entries = _accrual_entries(note, up_to_period, as_of)
+    try:
+        total = _post_accruals(entries)
+    except Exception as exc:
+        logger.error(f"[accrual] post failed for note {note.get('id')}: {exc}")
+        return 0.0
     if total:
-        logger.info(f"[accrual] note {note_id}: accrued ${total:,.2f} over periods [{start},{end})")
-    return round(total, 2)
+        logger.info(f"[accrual] note {note.get('id')}: accrued ${total:,.2f} over {len(entries)} period(s)")
+    return total
 
 
 def accrued_outstanding() -> float:
@@ -181,6 +198,8 @@ def accrue_all_active_notes(*, as_of: Optional[str] = None) -> dict:
     except Exception as exc:
         logger.error(f"[accrual] could not list notes: {exc}")
         return {"ok": False, "reason": str(exc), "accrued": 0.0, "notes": 0}
+    # One batch per note (all its periods in one insert): a note whose post
+    # fails is logged and retried next run without holding back the others.
     for nt in notes:
         got = accrue_note(nt, elapsed_periods(nt, as_of_d), as_of=as_of_d.isoformat())
         if got:
@@ -37,6 +37,7 @@ from api.services.ledger import (
     BANK,
     EventSpec,
     LedgerConfig,
+    allocate_transaction_numbers as _allocate_transaction_numbers,
     get_all_bank_balances as _get_all_bank_balances,
     get_bank_balance as _get_bank_balance,
     post_to_ledger as _post_to_ledger,
@@ -229,6 +230,7 @@ CAPITAL_CONFIG = LedgerConfig(
     property_subaccount_routing=False,
     supports_yard=False,
     balance_excluded_statuses=("voided", "pending_confirmation", "draft"),
+    ledger_key="capital",
 )
 
 # Default posting accounts for caller-chosen legs when the route has nothing
@@ -336,5 +338,9 @@ def get_capital_bank_balance(bank_account_id: str, *, as_of: Optional[str] = Non
     return _get_bank_balance(bank_account_id, as_of=as_of, db=db, config=CAPITAL_CONFIG)
 
 
-def get_all_capital_bank_balances(*, db: Any = None) -> dict[str, float]:
-    return _get_all_bank_balances(db=db, config=CAPITAL_CONFIG)
+def allocate_capital_transaction_numbers(count: int = 1, *, db: Any = None) -> list[str]:
+    return _allocate_transaction_numbers(count, db=db, config=CAPITAL_CONFIG)
+
+
+def get_all_capital_bank_balances(*, as_of: Optional[str] = None, db: Any = None) -> dict[str, float]:
+    return _get_all_bank_balances(as_of=as_of, db=db, config=CAPITAL_CONFIG)
@@ -0,0 +1,137 @@
+"""
+Deterministic classification memo for bank-statement movements.
+
+Statements repeat the same merchants every month (Home Depot, Lowes,
+VANDERBILT wires, Zelle from known buyers). Before a movement goes to the
+model, `_do_classify` looks it up here: if the accountant has already
+confirmed the same pattern — consistently — the confirmed account is reused
+and the movement never reaches OpenAI.
+
+Key: (normalized counterparty — or description when there is none,
+      direction, amount band)
+
+  - normalization is reconciliation.normalize_name (bank prefixes like
+    "ACH DEBIT - " / "ZELLE PAYMENT FROM ", digits and punctuation dropped),
+  - the amount band is a half-decade (10^(k/2)): $10 of fees and a $10,000
+    purchase from the same vendor stay apart.
+
+Learned from human-confirmed statement_movements (status confirmed/posted
+with final_account_id — the same rows `_do_classify` mines for
+corrections). A key only answers when it has at least `min_support`
+confirmations and one account holds `min_agreement` of them; anything else
+goes to the model.
+"""
+from __future__ import annotations
+
+import math
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from api.services.reconciliation import normalize_name
+
+MIN_SUPPORT = 2
+MIN_AGREEMENT = 0.8
+
+
+def amount_band(amount) -> int:
+    """Half-decade band of |amount|: 0 for < $3.16, 1 for < $10, 2 for < $31.6, ..."""
+    value = abs(float(amount or 0))
+    if value < 1:
+        return 0
+    return int(math.floor(math.log10(value) * 2))
+
+
+def memo_key(description: Optional[str], counterparty: Optional[str], is_credit, amount) -> Optional[tuple]:
+    """None when the movement has no usable name (nothing to recognize it by)."""
+    name = normalize_name(counterparty or "") or normalize_name(description or "")
+    if not name:
+        return None
+    return (name, bool(is_credit), amount_band(amount))
+
+
+@dataclass
+class MemoStats:
+    hits: int = 0
+    misses: int = 0
+    tokens_saved: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return round(self.hits / total, 3) if total else 0.0
+
+    def as_dict(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hit_rate, "tokens_saved": self.tokens_saved}
+
+
+@dataclass
+class ClassificationMemo:
+    min_support: int = MIN_SUPPORT
+    min_agreement: float = MIN_AGREEMENT
+    _votes: dict = field(default_factory=lambda: defaultdict(Counter))
+    _types: dict = field(default_factory=dict)
+    _accounts: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_history(cls, confirmed_rows: list, accounts_by_id: dict, **kwargs) -> "ClassificationMemo":
+        """Build from confirmed statement_movements rows (description,
+        counterparty, amount, is_credit, final_account_id[, final_transaction_type]).
+        Confirmations pointing at accounts outside `accounts_by_id` (inactive,
+        headers) are ignored."""
+        memo = cls(**kwargs)
+        for row in confirmed_rows:
+            account_id = row.get("final_account_id")
+            if not account_id or account_id not in accounts_by_id:
+                continue
+            key = memo_key(row.get("description"), row.get("counterparty"),
+                           row.get("is_credit"), row.get("amount"))
+            if key is None:
+                continue
+            memo._votes[key][account_id] += 1
+            if row.get("final_transaction_type"):
+                memo._types.setdefault((key, account_id), row["final_transaction_type"])
+        memo._accounts = accounts_by_id
+        return memo
+
+    def __len__(self) -> int:
+        return len(self._votes)
+
+    def lookup(self, movement: dict) -> Optional[dict]:
+        """A suggestion dict shaped like the model's, or None to ask the model."""
+        key = memo_key(movement.get("description"), movement.get("counterparty"),
+                       movement.get("is_credit"), movement.get("amount"))
+        votes = self._votes.get(key) if key else None
+        if not votes:
+            return None
+        total = sum(votes.values())
+        account_id, count = votes.most_common(1)[0]
+        agreement = count / total
+        if total < self.min_support or agreement < self.min_agreement:
+            return None
+        account = self._accounts[account_id]
+        return {
+            "account_code": account["code"],
+            "account_name": account["name"],
+            "transaction_type": self._types.get((key, account_id)),
+            "confidence": round(min(0.95, agreement), 2),
+            "reasoning": (f"Memoria: {count}/{total} movimientos confirmados de "
+                          f"'{key[0]}' se clasificaron como {account['code']}"),
+            "needs_subcategory": False,
+            "source": "memo",
+        }
+
+    def split(self, movements: list, stats: Optional[MemoStats] = None) -> tuple[list, list]:
+        """→ ([(movement, suggestion)] answered by the memo, [movement] for the model)."""
+        hits, misses = [], []
+        for mv in movements:
+            suggestion = self.lookup(mv)
+            if suggestion is None:
+                misses.append(mv)
+            else:
+                hits.append((mv, suggestion))
+        if stats is not None:
+            stats.hits += len(hits)
+            stats.misses += len(misses)
+        return hits, misses
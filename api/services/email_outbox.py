@@ -0,0 +1,341 @@
+"""
+Outbound email outbox (migration 116).
+
+Every email the app sends is first a scheduled_emails row. queue_email()
+inserts it: one database write in the request path instead of a Resend
+call. The drain, process_scheduled_emails on the scheduler every 20 s,
+delivers the due rows:
+
+  - claim: claim_outbox_emails hands up to CLAIM_LIMIT due rows to this
+    drain (status 'sending', locked_until). Concurrent drains in other
+    processes get other rows.
+  - send: rows go out in chunks of up to 100 through Resend's batch
+    endpoint. Chunks are sent in parallel by WORKERS threads under one
+    RateLimiter (RESEND_RATE_LIMIT requests/s, Resend's per-team limit).
+    Each chunk carries an idempotency key, so a resend of the same chunk
+    is not delivered twice.
+  - settle: each row is updated by id, only while this drain still holds
+    its claim (locked_by), so a drain whose lock expired can't overwrite
+    the drain that took the row over. A delivered row becomes 'sent' with
+    Resend's message_id.
+    A failed row is retried with exponential backoff (RETRY_BASE * 2^n,
+    capped at RETRY_MAX). After MAX_ATTEMPTS, or on a permanent rejection
+    (400/422: bad address, missing field), it is dead-lettered: status
+    'failed' with last_error. A 429 that outlasts RATE_LIMIT_RETRIES puts
+    the row back without spending an attempt.
+
+Delivery is at-least-once. A drain that dies between the Resend call and
+the settle leaves its rows 'sending', and they are claimed again once
+locked_until passes.
+
+If migration 116 is not applied, queue_email() sends directly, as before,
+rather than lose the email. Without claim_outbox_emails the drain does
+nothing: every process runs it, and unclaimed rows would go out twice.
+Any other database error raises (queue_email) or skips the tick (drain);
+it is not taken as a missing schema.
+metrics() reports the per-type counts and throughput of this process's
+drains (GET /emails/stats).
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.services.job_executor import check_cancelled
+from api.services.job_leases import HOLDER
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_TABLE = "scheduled_emails"
+CLAIM_RPC = "claim_outbox_emails"
+DEAD_STATUS = "failed"  # the dead letter
+
+WORKERS = int(os.getenv("OUTBOX_WORKERS", "4"))
+RATE_LIMIT = float(os.getenv("RESEND_RATE_LIMIT", "2"))  # requests per second
+CHUNK_SIZE = 100           # Resend's batch limit
+CLAIM_LIMIT = 500
+MAX_ROUNDS = 10            # claims per drain; the next tick picks up the rest
+LOCK_SECONDS = 300
+MAX_ATTEMPTS = 5
+RETRY_BASE = 60            # seconds; doubles per attempt
+RETRY_MAX = 6 * 3600
+RATE_LIMIT_RETRIES = 3
+PERMANENT_CODES = {400, 422}
+
+# PostgREST / Postgres codes for an object that does not exist
+MISSING_FUNCTION_CODES = ("PGRST202", "42883")
+MISSING_TABLE_CODES = ("PGRST204", "PGRST205", "42P01", "42703")
+
+
+def _db():
+    # The background client the scheduler jobs use; not the request path's `sb`
+    from tools.supabase_client import get_background_client
+    return get_background_client()
+
+
+def _is_missing(error: Exception, codes: Tuple[str, ...]) -> bool:
+    """Whether `error` says the schema object is absent (migration 116 not applied)."""
+    code = str(getattr(error, "code", "") or "")
+    return code in codes or any(c in str(error) for c in codes)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class RateLimiter:
+    """At most `rate` calls per second across threads, evenly spaced."""
+
+    def __init__(self, rate: float = RATE_LIMIT):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next)
+            self._next = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller back for `seconds` (the API answered 429)."""
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+
+_limiter = RateLimiter()
+
+
+# ---------------------------------------------------------------------------
+# Enqueue
+# ---------------------------------------------------------------------------
+
+def outbox_row(to: List[str], subject: str, html: str, email_type: str, *,
+               to_name: str = "", send_at: Optional[datetime] = None,
+               dedupe_key: Optional[str] = None, metadata: Optional[dict] = None,
+               client_id: Optional[str] = None, sale_id: Optional[str] = None) -> dict:
+    """A scheduled_emails row for a rendered email (due now unless `send_at`)."""
+    row = {
+        "email_type": email_type,
+        "to_email": to[0] if to else "",
+        "to_name": to_name or "",
+        "subject": subject,
+        "payload": {"to": list(to), "html": html},
+        "metadata": metadata or {},
+        "scheduled_for": (send_at or _now()).isoformat(),
+        "status": "pending",
+    }
+    if dedupe_key:
+        row["dedupe_key"] = dedupe_key
+    if client_id:
+        row["client_id"] = client_id
+    if sale_id:
+        row["sale_id"] = sale_id
+    return row
+
+
+def queue_email(to: List[str], subject: str, html: str, email_type: str = "transactional",
+                db=None, **kwargs: Any) -> dict:
+    """Put an email in the outbox; the drain delivers it.
+
+    Same arguments as tools.email_tool.send_email, plus `email_type` and the
+    outbox_row() options. Falls back to sending directly if the outbox
+    table does not exist. Any other insert error raises ValueError, as
+    send_email did when Resend failed, so callers don't record an email
+    that was never queued as sent.
+    """
+    row = outbox_row(to, subject, html, email_type, **kwargs)
+    try:
+        res = (db or _db()).table(OUTBOX_TABLE).insert(row).execute()
+    except Exception as e:
+        if not _is_missing(e, MISSING_TABLE_CODES):
+            logger.error(f"[email_outbox] Could not queue {email_type} to {to}: {e}")
+            raise ValueError(f"Could not queue {email_type} email: {e}") from e
+        logger.warning(f"[email_outbox] Outbox missing, sending {email_type} to {to} directly: {e}")
+        from tools.email_tool import send_email
+        return {"ok": True, **send_email(to=to, subject=subject, html=html), "queued": False}
+    outbox_id = res.data[0]["id"] if res.data else None
+    logger.info(f"[email_outbox] Queued {email_type} to {to} ({outbox_id})")
+    return {"ok": True, "queued": True, "outbox_id": outbox_id, "to": to, "subject": subject}
+
+
+# ---------------------------------------------------------------------------
+# Drain
+# ---------------------------------------------------------------------------
+
+_metrics_lock = threading.Lock()
+_totals: Dict[str, Counter] = defaultdict(Counter)
+_last_drain: dict = {}
+
+
+def metrics() -> dict:
+    """Per-type totals of this process's drains, and the last drain's throughput."""
+    with _metrics_lock:
+        return {"by_type": {t: dict(c) for t, c in _totals.items()}, "last_drain": dict(_last_drain)}
+
+
+def _claim(db, holder: str, limit: int) -> List[dict]:
+    try:
+        return db.rpc(CLAIM_RPC, {"p_holder": holder, "p_limit": limit,
+                                  "p_lock_seconds": LOCK_SECONDS}).execute().data or []
+    except Exception as e:
+        if not _is_missing(e, MISSING_FUNCTION_CODES):
+            # A real failure: claiming nothing skips this tick, the next one retries
+            logger.error(f"[email_outbox] {CLAIM_RPC} failed, skipping this drain: {e}")
+            return []
+        # Every process drains (LOCAL_JOB_IDS), so unclaimed rows would be sent
+        # more than once. They wait, pending, until the function exists.
+        logger.error(f"[email_outbox] {CLAIM_RPC} missing (apply migration 116), not draining: {e}")
+        return []
+
+
+def _message(row: dict) -> Optional[dict]:
+    """The Resend payload for a row (rendering it from email_type if needed)."""
+    payload = row.get("payload") or {}
+    if payload.get("html"):
+        return {"to": payload.get("to") or [row["to_email"]], "subject": row["subject"],
+                "html": payload["html"]}
+    from api.services.email_service import render_scheduled_email
+    rendered = render_scheduled_email(row)
+    if rendered is None:
+        return None
+    subject, html = rendered
+    return {"to": [row["to_email"]], "subject": subject, "html": html}
+
+
+def _send_chunk(chunk: List[Tuple[dict, dict]], limiter: RateLimiter) -> List[dict]:
+    from tools.email_tool import send_email_batch
+
+    messages = [m for _, m in chunk]
+    key = "outbox:" + hashlib.sha256(",".join(r["id"] for r, _ in chunk).encode()).hexdigest()[:32]
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        limiter.acquire()
+        results = send_email_batch(messages, idempotency_key=key)
+        throttled = [r for r in results if r.get("code") == 429]
+        if not throttled or attempt == RATE_LIMIT_RETRIES:
+            return results
+        limiter.pause(throttled[0].get("retry_after") or 1.0)
+    return results
+
+
+def _backoff(attempts: int) -> float:
+    return min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX)
+
+
+def _outcome(row: dict, result: dict, now: datetime) -> Tuple[Dict[str, Any], str]:
+    changes: Dict[str, Any] = {"locked_by": None, "locked_until": None}
+    if result.get("ok"):
+        changes.update(status="sent", sent_at=now.isoformat(), message_id=result.get("message_id"),
+                       last_error=None)
+        return changes, "sent"
+    changes["last_error"] = str(result.get("error"))[:1000]
+    if result.get("code") == 429:
+        retry_at = now + timedelta(seconds=result.get("retry_after") or RETRY_BASE)
+        changes.update(status="pending", scheduled_for=retry_at.isoformat())
+        return changes, "rate_limited"
+    attempts = (row.get("attempts") or 0) + 1
+    changes["attempts"] = attempts
+    if result.get("code") in PERMANENT_CODES or attempts >= MAX_ATTEMPTS:
+        changes["status"] = DEAD_STATUS
+        return changes, "dead"
+    changes.update(status="pending",
+                   scheduled_for=(now + timedelta(seconds=_backoff(attempts))).isoformat())
+    return changes, "retried"
+
+
+def _settle(db, holder: str, row_id: str, changes: Dict[str, Any]) -> bool:
+    """Write a row's settle columns, only while this drain still holds its
+    claim. False if the claim expired and another drain took the row."""
+    res = db.table(OUTBOX_TABLE).update(changes) \
+        .eq("id", row_id) \
+        .eq("locked_by", holder) \
+        .execute()
+    return bool(res.data)
+
+
+def drain(db=None, *, holder: str = HOLDER, workers: int = WORKERS,
+          limiter: Optional[RateLimiter] = None, claim_limit: int = CLAIM_LIMIT,
+          max_rounds: int = MAX_ROUNDS) -> dict:
+    """Deliver the due outbox rows (see module docstring)."""
+    db = db or _db()
+    limiter = limiter or _limiter
+    outcomes: Dict[str, Counter] = defaultdict(Counter)
+    t0 = time.monotonic()
+
+    for _ in range(max_rounds):
+        check_cancelled()
+        rows = _claim(db, holder, claim_limit)
+        if not rows:
+            break
+
+        ready, updates = [], []
+        now = _now()
+        for row in rows:
+            message = _message(row)
+            if message is None:
+                changes, outcome = _outcome(row, {"ok": False, "code": 422,
+                                                  "error": f"Unknown email type: {row['email_type']}"}, now)
+                updates.append((row, changes))
+                outcomes[row["email_type"]][outcome] += 1
+            else:
+                ready.append((row, message))
+
+        chunks = [ready[i:i + CHUNK_SIZE] for i in range(0, len(ready), CHUNK_SIZE)]
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="email-outbox") as pool:
+            chunk_results = list(pool.map(lambda c: _send_chunk(c, limiter), chunks))
+
+            now = _now()
+            for chunk, results in zip(chunks, chunk_results):
+                for (row, _), result in zip(chunk, results):
+                    changes, outcome = _outcome(row, result, now)
+                    updates.append((row, changes))
+                    outcomes[row["email_type"]][outcome] += 1
+                    if outcome == "dead":
+                        logger.error(f"[email_outbox] Dead-lettered {row['email_type']} {row['id']} "
+                                     f"to {row['to_email']}: {result.get('error')}")
+            # One update per row, guarded by the claim: a full-row upsert could
+            # overwrite a row another drain took over after our lock expired.
+            owned = list(pool.map(lambda u: _settle(db, holder, u[0]["id"], u[1]), updates))
+        for (row, _), still_ours in zip(updates, owned):
+            if not still_ours:
+                logger.warning(f"[email_outbox] Claim on {row['email_type']} {row['id']} expired "
+                               f"before it was settled; left to the drain that holds it")
+        if len(rows) < claim_limit:
+            break
+
+    elapsed = time.monotonic() - t0
+    totals = Counter()
+    for counts in outcomes.values():
+        totals.update(counts)
+    processed = sum(totals.values())
+    result = {
+        "ok": True,
+        "processed": processed,
+        "sent": totals["sent"],
+        "failed": processed - totals["sent"],
+        "retried": totals["retried"],
+        "dead": totals["dead"],
+        "rate_limited": totals["rate_limited"],
+        "seconds": round(elapsed, 2),
+        "emails_per_sec": round(totals["sent"] / elapsed, 1) if elapsed > 0 and totals["sent"] else 0.0,
+        "by_type": {t: dict(c) for t, c in outcomes.items()},
+    }
+    if processed:
+        with _metrics_lock:
+            for email_type, counts in outcomes.items():
+                _totals[email_type].update(counts)
+            _last_drain.clear()
+            _last_drain.update(at=_now().isoformat(), **{k: result[k] for k in
+                               ("processed", "sent", "failed", "seconds", "emails_per_sec")})
+        logger.info(f"[email_outbox] Drained {processed}: {totals['sent']} sent, {totals['retried']} retried, "
+                    f"{totals['dead']} dead-lettered in {elapsed:.1f}s")
+    return result
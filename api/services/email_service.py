@@ -8,15 +8,22 @@ Email types:
 3. Review Request - 7 days after sale
 4. Referral Request - 30 days after sale
 
-Uses Resend API via tools/email_tool.py
+Emails are queued in the outbox (scheduled_emails) and delivered through
+the Resend API by api/services/email_outbox.py. Templates are compiled once,
+at import (api/services/email_templates.py); tests/test_email_templates.py
+holds them to their HTML snapshots.
 """
 
 import os
 import logging
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 
-from tools.email_tool import send_email
+# Every email goes through the outbox: the send_* functions below queue a
+# scheduled_emails row and return; the drain delivers it (email_outbox.py).
+from api.services.email_outbox import queue_email as send_email
+from api.services.email_templates import EmailTemplate
 from tools.supabase_client import sb
 
 logger = logging.getLogger(__name__)
@@ -35,9 +42,10 @@ COMPANY_PHONE = "832-745-9600"
 # EMAIL TEMPLATES
 # =============================================================================
 
-def _base_template(content: str) -> str:
-    """Wrap content in the Maninos brand email template."""
-    return f"""
+# Brand shell: every email is its content in here. The templates below are
+# str.format sources compiled once, at import, by _page() (shell + content +
+# these constants folded in); see api/services/email_templates.py.
+_SHELL = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -71,11 +79,22 @@ def _base_template(content: str) -> str:
     </body>
     </html>
     """
+_CONSTANTS = {"APP_URL": APP_URL, "COMPANY_NAME": COMPANY_NAME, "COMPANY_PHONE": COMPANY_PHONE}
+_SHELL_HEAD, _SHELL_TAIL = _SHELL.split("{content}")
+_BASE = EmailTemplate(_SHELL, **_CONSTANTS)
 
 
-def _welcome_html(client_name: str) -> str:
-    """Welcome email when a new client is created."""
-    content = f"""
+def _page(content: str) -> EmailTemplate:
+    """Compile an email's content source together with the brand shell."""
+    return EmailTemplate(_SHELL_HEAD + content + _SHELL_TAIL, **_CONSTANTS)
+
+
+def _base_template(content: str) -> str:
+    """Wrap content in the Maninos brand email template."""
+    return _BASE.render(content=content)
+
+
+_WELCOME = _page("""
     <div class="header">
         <h1>🏠 ¡Bienvenido a {COMPANY_NAME}!</h1>
         <p>Estamos encantados de tenerte con nosotros</p>
@@ -100,20 +119,15 @@ def _welcome_html(client_name: str) -> str:
         <hr class="divider">
         <p style="font-size: 13px; color: #718096;">Si tienes preguntas, responde a este email o llámanos al {COMPANY_PHONE}.</p>
     </div>
-    """
-    return _base_template(content)
+    """)
 
 
-def _payment_confirmation_html(
-    client_name: str,
-    property_address: str,
-    property_city: str,
-    sale_price: float,
-    payment_date: str,
-    payment_method: str = "Transferencia bancaria",
-) -> str:
-    """Payment confirmation email after successful payment."""
-    content = f"""
+def _welcome_html(client_name: str) -> str:
+    """Welcome email when a new client is created."""
+    return _WELCOME.render(client_name=client_name)
+
+
+_PAYMENT_CONFIRMATION = _page("""
     <div class="header">
         <h1>✅ ¡Pago Confirmado!</h1>
         <p>Tu compra ha sido procesada exitosamente</p>
@@ -145,16 +159,29 @@ def _payment_confirmation_html(
         <hr class="divider">
         <p style="font-size: 13px; color: #718096;">Guarda este email como comprobante de tu compra.</p>
     </div>
-    """
-    return _base_template(content)
+    """)
 
 
-def _review_request_html(
+def _payment_confirmation_html(
     client_name: str,
     property_address: str,
+    property_city: str,
+    sale_price: float,
+    payment_date: str,
+    payment_method: str = "Transferencia bancaria",
 ) -> str:
-    """Review request email - sent 7 days after sale."""
-    content = f"""
+    """Payment confirmation email after successful payment."""
+    return _PAYMENT_CONFIRMATION.render(
+        client_name=client_name,
+        property_address=property_address,
+        property_city=property_city,
+        sale_price=sale_price,
+        payment_date=payment_date,
+        payment_method=payment_method,
+    )
+
+
+_REVIEW_REQUEST = _page("""
     <div class="header">
         <h1>⭐ ¿Cómo fue tu experiencia?</h1>
         <p>Tu opinión nos ayuda a mejorar</p>
@@ -174,15 +201,18 @@ def _review_request_html(
         <hr class="divider">
         <p style="font-size: 13px; color: #718096;">Si has tenido algún problema, no dudes en contactarnos directamente al {COMPANY_PHONE}. Siempre estamos aquí para ayudarte.</p>
     </div>
-    """
-    return _base_template(content)
+    """)
 
 
-def _referral_request_html(
+def _review_request_html(
     client_name: str,
+    property_address: str,
 ) -> str:
-    """Referral request email - sent 30 days after sale."""
-    content = f"""
+    """Review request email - sent 7 days after sale."""
+    return _REVIEW_REQUEST.render(client_name=client_name, property_address=property_address)
+
+
+_REFERRAL_REQUEST = _page("""
     <div class="header">
         <h1>💛 ¿Conoces a alguien buscando casa?</h1>
         <p>Comparte la experiencia con tus amigos y familia</p>
@@ -207,8 +237,14 @@ def _referral_request_html(
         <hr class="divider">
         <p style="font-size: 13px; color: #718096;">Si necesitas cualquier cosa, estamos aquí: {COMPANY_PHONE}</p>
     </div>
-    """
-    return _base_template(content)
+    """)
+
+
+def _referral_request_html(
+    client_name: str,
+) -> str:
+    """Referral request email - sent 30 days after sale."""
+    return _REFERRAL_REQUEST.render(client_name=client_name)
 
 
 # =============================================================================
@@ -223,6 +259,7 @@ def send_welcome_email(client_email: str, client_name: str) -> dict:
             to=[client_email],
             subject=f"🏠 ¡Bienvenido a {COMPANY_NAME}!",
             html=html,
+            email_type="welcome",
         )
         logger.info(f"[email_service] Welcome email sent to {client_email}")
         return {"ok": True, "type": "welcome", **result}
@@ -249,6 +286,7 @@ def send_payment_confirmation_email(
             to=[client_email],
             subject="✅ ¡Pago Confirmado! - Tu compra en Maninos Homes",
             html=html,
+            email_type="payment_confirmation",
         )
         logger.info(f"[email_service] Payment confirmation sent to {client_email}")
         return {"ok": True, "type": "payment_confirmation", **result}
@@ -269,6 +307,7 @@ def send_review_request_email(
             to=[client_email],
             subject="⭐ ¿Cómo fue tu experiencia? - Maninos Homes",
             html=html,
+            email_type="review_request",
         )
         logger.info(f"[email_service] Review request sent to {client_email}")
         return {"ok": True, "type": "review_request", **result}
@@ -288,6 +327,7 @@ def send_referral_request_email(
             to=[client_email],
             subject="💛 ¿Conoces a alguien buscando casa? - Maninos Homes",
             html=html,
+            email_type="referral_request",
         )
         logger.info(f"[email_service] Referral request sent to {client_email}")
         return {"ok": True, "type": "referral_request", **result}
@@ -296,9 +336,7 @@ def send_referral_request_email(
         return {"ok": False, "error": str(e)}
 
 
-def _title_transferred_html(client_name: str, property_address: str) -> str:
-    """Congratulations email when a title is transferred to the client."""
-    content = f"""
+_TITLE_TRANSFERRED = _page("""
     <div class="header">
         <h1>🏠 ¡Tu título ha sido transferido!</h1>
         <p>¡Felicidades, la casa es oficialmente tuya!</p>
@@ -325,8 +363,12 @@ def _title_transferred_html(client_name: str, property_address: str) -> str:
         <hr class="divider">
         <p style="font-size: 13px; color: #718096;">Si tienes preguntas sobre tus documentos, llámanos al {COMPANY_PHONE}.</p>
     </div>
-    """
-    return _base_template(content)
+    """)
+
+
+def _title_transferred_html(client_name: str, property_address: str) -> str:
+    """Congratulations email when a title is transferred to the client."""
+    return _TITLE_TRANSFERRED.render(client_name=client_name, property_address=property_address)
 
 
 def send_title_transferred_email(
@@ -341,6 +383,7 @@ def send_title_transferred_email(
             to=[client_email],
             subject="🏠 ¡Tu título ha sido transferido! - Maninos Homes",
             html=html,
+            email_type="title_transferred",
         )
         logger.info(f"[email_service] Title transferred email sent to {client_email}")
         return {"ok": True, "type": "title_transferred", **result}
@@ -349,16 +392,7 @@ def send_title_transferred_email(
         return {"ok": False, "error": str(e)}
 
 
-def send_rto_application_email(
-    client_email: str,
-    client_name: str,
-    property_address: str,
-    property_city: str,
-    sale_price: float,
-) -> dict:
-    """Send RTO application confirmation email to client."""
-    try:
-        content = f"""
+_RTO_APPLICATION = _page("""
     <div class="header">
         <h1>Solicitud Rent-to-Own Recibida</h1>
         <p>Tu solicitud ha sido registrada exitosamente</p>
@@ -396,12 +430,39 @@ def send_rto_application_email(
         <hr class="divider">
         <p>Si tienes preguntas, no dudes en contactarnos al <strong>{COMPANY_PHONE}</strong>.</p>
     </div>
-        """
-        html = _base_template(content)
+        """)
+
+
+def _rto_application_html(
+    client_name: str,
+    property_address: str,
+    property_city: str,
+    sale_price: float,
+) -> str:
+    """RTO application confirmation email."""
+    return _RTO_APPLICATION.render(
+        client_name=client_name,
+        property_address=property_address,
+        property_city=property_city,
+        sale_price=sale_price,
+    )
+
+
+def send_rto_application_email(
+    client_email: str,
+    client_name: str,
+    property_address: str,
+    property_city: str,
+    sale_price: float,
+) -> dict:
+    """Send RTO application confirmation email to client."""
+    try:
+        html = _rto_application_html(client_name, property_address, property_city, sale_price)
         result = send_email(
             to=[client_email],
             subject="Solicitud Rent-to-Own Recibida - Maninos Homes",
             html=html,
+            email_type="rto_application",
         )
         logger.info(f"[email_service] RTO application email sent to {client_email}")
         return {"ok": True, "type": "rto_application", **result}
@@ -410,14 +471,7 @@ def send_rto_application_email(
         return {"ok": False, "error": str(e)}
 
 
-def _transfer_reported_html(
-    client_name: str,
-    property_address: str,
-    property_city: str,
-    sale_price: float,
-) -> str:
-    """Acknowledgment email when client reports a bank transfer."""
-    content = f"""
+_TRANSFER_REPORTED = _page("""
     <div class="header">
         <h1>Hemos registrado tu transferencia</h1>
         <p>Tu reporte ha sido recibido</p>
@@ -450,8 +504,22 @@ def _transfer_reported_html(
         <hr class="divider">
         <p style="font-size: 13px; color: #718096;">Si tienes preguntas, contactanos al {COMPANY_PHONE}.</p>
     </div>
-    """
-    return _base_template(content)
+    """)
+
+
+def _transfer_reported_html(
+    client_name: str,
+    property_address: str,
+    property_city: str,
+    sale_price: float,
+) -> str:
+    """Acknowledgment email when client reports a bank transfer."""
+    return _TRANSFER_REPORTED.render(
+        client_name=client_name,
+        property_address=property_address,
+        property_city=property_city,
+        sale_price=sale_price,
+    )
 
 
 def send_transfer_reported_email(
@@ -470,6 +538,7 @@ def send_transfer_reported_email(
             to=[client_email],
             subject=f"Transferencia Registrada - {COMPANY_NAME}",
             html=html,
+            email_type="transfer_reported",
         )
         logger.info(f"[email_service] Transfer reported email sent to {client_email}")
         return {"ok": True, "type": "transfer_reported", **result}
@@ -478,16 +547,7 @@ def send_transfer_reported_email(
         return {"ok": False, "error": str(e)}
 
 
-def _sale_completed_html(
-    client_name: str,
-    property_address: str,
-    property_city: str,
-    sale_price: float,
-    documents_url: str = None,
-) -> str:
-    """Sale completed email after transfer is confirmed."""
-    docs_url = documents_url or f"{APP_URL}/clientes/mi-cuenta/documentos"
-    content = f"""
+_SALE_COMPLETED = _page("""
     <div class="header">
         <h1>Venta Completada!</h1>
         <p>Felicidades por tu nueva casa</p>
@@ -520,8 +580,25 @@ def _sale_completed_html(
         <hr class="divider">
         <p style="font-size: 13px; color: #718096;">Si tienes preguntas, contactanos al {COMPANY_PHONE}.</p>
     </div>
-    """
-    return _base_template(content)
+    """)
+
+
+def _sale_completed_html(
+    client_name: str,
+    property_address: str,
+    property_city: str,
+    sale_price: float,
+    documents_url: str = None,
+) -> str:
+    """Sale completed email after transfer is confirmed."""
+    docs_url = documents_url or f"{APP_URL}/clientes/mi-cuenta/documentos"
+    return _SALE_COMPLETED.render(
+        client_name=client_name,
+        property_address=property_address,
+        property_city=property_city,
+        sale_price=sale_price,
+        docs_url=docs_url,
+    )
 
 
 def send_sale_completed_email(
@@ -541,6 +618,7 @@ def send_sale_completed_email(
             to=[client_email],
             subject=f"Venta Completada! - {COMPANY_NAME}",
             html=html,
+            email_type="sale_completed",
         )
         logger.info(f"[email_service] Sale completed email sent to {client_email}")
         return {"ok": True, "type": "sale_completed", **result}
@@ -553,34 +631,7 @@ def send_sale_completed_email(
 # RTO EMAIL TEMPLATES
 # =============================================================================
 
-def _rto_payment_reminder_html(
-    client_name: str,
-    property_address: str,
-    monthly_rent: float,
-    due_date: str,
-    payment_number: int,
-    total_payments: int,
-    days_until_due: int,
-) -> str:
-    """Payment reminder email for RTO clients."""
-    if days_until_due > 0:
-        urgency_color = "#f59e0b"  # amber
-        urgency_text = f"Tu pago vence en <strong>{days_until_due} día{'s' if days_until_due > 1 else ''}</strong>"
-        urgency_icon = "📅"
-        subject_prefix = "Recordatorio"
-    elif days_until_due == 0:
-        urgency_color = "#ef4444"  # red
-        urgency_text = "Tu pago vence <strong>HOY</strong>"
-        urgency_icon = "⚠️"
-        subject_prefix = "HOY vence"
-    else:
-        urgency_color = "#dc2626"  # dark red
-        days_late = abs(days_until_due)
-        urgency_text = f"Tu pago está <strong>atrasado {days_late} día{'s' if days_late > 1 else ''}</strong>"
-        urgency_icon = "🚨"
-        subject_prefix = "ATRASADO"
-
-    content = f"""
+_RTO_PAYMENT_REMINDER = _page("""
     <div class="header" style="background: linear-gradient(135deg, #1e3a5f 0%, #2d5a8e 100%);">
         <h1>{urgency_icon} {subject_prefix} - Pago RTO</h1>
         <p>Maninos Capital — Rent-to-Own</p>
@@ -643,32 +694,72 @@ def _rto_payment_reminder_html(
             ¿Preguntas? Llámanos al {COMPANY_PHONE}
         </p>
     </div>
-    """
-    return _base_template(content)
+    """)
 
 
-def _rto_overdue_alert_html(
-    employee_name: str,
-    overdue_payments: list,
-    total_overdue_amount: float,
+def _rto_reminder_urgency(days_until_due: int) -> dict:
+    """The parts of a reminder that depend only on its window."""
+    if days_until_due > 0:
+        urgency_color = "#f59e0b"  # amber
+        urgency_text = f"Tu pago vence en <strong>{days_until_due} día{'s' if days_until_due > 1 else ''}</strong>"
+        urgency_icon = "📅"
+        subject_prefix = "Recordatorio"
+    elif days_until_due == 0:
+        urgency_color = "#ef4444"  # red
+        urgency_text = "Tu pago vence <strong>HOY</strong>"
+        urgency_icon = "⚠️"
+        subject_prefix = "HOY vence"
+    else:
+        urgency_color = "#dc2626"  # dark red
+        days_late = abs(days_until_due)
+        urgency_text = f"Tu pago está <strong>atrasado {days_late} día{'s' if days_late > 1 else ''}</strong>"
+        urgency_icon = "🚨"
+        subject_prefix = "ATRASADO"
+    return {"urgency_color": urgency_color, "urgency_text": urgency_text,
+            "urgency_icon": urgency_icon, "subject_prefix": subject_prefix}
+
+
+@lru_cache(maxsize=32)
+def _rto_reminder_template(days_until_due: int) -> EmailTemplate:
+    """The reminder template with its window's urgency folded in: a reminder
+    run renders only the per-payment values."""
+    return _RTO_PAYMENT_REMINDER.bind(**_rto_reminder_urgency(days_until_due))
+
+
+def _rto_payment_reminder_html(
+    client_name: str,
+    property_address: str,
+    monthly_rent: float,
+    due_date: str,
+    payment_number: int,
+    total_payments: int,
+    days_until_due: int,
 ) -> str:
-    """Alert email for employees about overdue RTO payments."""
-    rows = ""
-    for p in overdue_payments:
-        rows += f"""
+    """Payment reminder email for RTO clients."""
+    return _rto_reminder_template(days_until_due).render(
+        client_name=client_name,
+        property_address=property_address,
+        monthly_rent=monthly_rent,
+        due_date=due_date,
+        payment_number=payment_number,
+        total_payments=total_payments,
+    )
+
+
+_RTO_OVERDUE_ROW = EmailTemplate("""
         <tr>
-            <td style="padding: 8px; border-bottom: 1px solid #eee;">{p.get('client_name', 'N/A')}</td>
-            <td style="padding: 8px; border-bottom: 1px solid #eee;">{p.get('property_address', 'N/A')}</td>
-            <td style="padding: 8px; border-bottom: 1px solid #eee; text-align: right;">${p.get('amount', 0):,.2f}</td>
-            <td style="padding: 8px; border-bottom: 1px solid #eee; color: #dc2626; font-weight: bold;">{p.get('days_late', 0)} días</td>
-            <td style="padding: 8px; border-bottom: 1px solid #eee; color: #ef4444;">${p.get('late_fee', 0):,.2f}</td>
+            <td style="padding: 8px; border-bottom: 1px solid #eee;">{client_name}</td>
+            <td style="padding: 8px; border-bottom: 1px solid #eee;">{property_address}</td>
+            <td style="padding: 8px; border-bottom: 1px solid #eee; text-align: right;">${amount:,.2f}</td>
+            <td style="padding: 8px; border-bottom: 1px solid #eee; color: #dc2626; font-weight: bold;">{days_late} días</td>
+            <td style="padding: 8px; border-bottom: 1px solid #eee; color: #ef4444;">${late_fee:,.2f}</td>
         </tr>
-        """
+        """)
 
-    content = f"""
+_RTO_OVERDUE_ALERT = _page("""
     <div class="header" style="background: linear-gradient(135deg, #dc2626 0%, #991b1b 100%);">
         <h1>🚨 Alerta de Morosidad RTO</h1>
-        <p>{len(overdue_payments)} pago{'s' if len(overdue_payments) > 1 else ''} vencido{'s' if len(overdue_payments) > 1 else ''}</p>
+        <p>{count} pago{plural} vencido{plural}</p>
     </div>
     <div class="body">
         <p>Hola <strong>{employee_name}</strong>,</p>
@@ -701,8 +792,36 @@ def _rto_overdue_alert_html(
             </a>
         </center>
     </div>
-    """
-    return _base_template(content)
+    """)
+
+
+def _rto_overdue_alert_html(
+    employee_name: str,
+    overdue_payments: list,
+    total_overdue_amount: float,
+) -> str:
+    """Alert email for employees about overdue RTO payments."""
+    rows = "".join(_RTO_OVERDUE_ROW.render_many(
+        {"client_name": p.get("client_name", "N/A"), "property_address": p.get("property_address", "N/A"),
+         "amount": p.get("amount", 0), "days_late": p.get("days_late", 0), "late_fee": p.get("late_fee", 0)}
+        for p in overdue_payments
+    ))
+    count = len(overdue_payments)
+    return _RTO_OVERDUE_ALERT.render(
+        count=count,
+        plural="s" if count > 1 else "",
+        employee_name=employee_name,
+        total_overdue_amount=total_overdue_amount,
+        rows=rows,
+    )
+
+
+def _rto_reminder_subject(days_until_due: int) -> str:
+    if days_until_due > 0:
+        return f"📅 Recordatorio: Tu pago RTO vence en {days_until_due} días"
+    if days_until_due == 0:
+        return "⚠️ HOY vence tu pago RTO - Maninos Homes"
+    return f"🚨 Pago RTO atrasado ({abs(days_until_due)} días) - Maninos Homes"
 
 
 def send_rto_payment_reminder(
@@ -727,14 +846,8 @@ def send_rto_payment_reminder(
             days_until_due=days_until_due,
         )
         
-        if days_until_due > 0:
-            subject = f"📅 Recordatorio: Tu pago RTO vence en {days_until_due} días"
-        elif days_until_due == 0:
-            subject = "⚠️ HOY vence tu pago RTO - Maninos Homes"
-        else:
-            subject = f"🚨 Pago RTO atrasado ({abs(days_until_due)} días) - Maninos Homes"
-        
-        result = send_email(to=[client_email], subject=subject, html=html)
+        subject = _rto_reminder_subject(days_until_due)
+        result = send_email(to=[client_email], subject=subject, html=html, email_type="rto_reminder")
         logger.info(f"[email_service] RTO reminder sent to {client_email} (days: {days_until_due})")
         return {"ok": True, "type": "rto_reminder", **result}
     except Exception as e:
@@ -758,7 +871,7 @@ def send_rto_overdue_alert(
         count = len(overdue_payments)
         subject = f"🚨 {count} pago{'s' if count > 1 else ''} RTO vencido{'s' if count > 1 else ''} - Acción requerida"
         
-        result = send_email(to=[employee_email], subject=subject, html=html)
+        result = send_email(to=[employee_email], subject=subject, html=html, email_type="rto_overdue_alert")
         logger.info(f"[email_service] Overdue alert sent to {employee_email} ({count} payments)")
         return {"ok": True, "type": "rto_overdue_alert", **result}
     except Exception as e:
@@ -825,101 +938,37 @@ def schedule_post_sale_emails(
         return {"ok": False, "error": str(e)}
 
 
+def render_scheduled_email(row: dict) -> Optional[tuple]:
+    """(subject, html) for an outbox row queued without a rendered payload.
+
+    Those are the post-sale emails of schedule_post_sale_emails, rendered
+    at send time. None for a type this cannot render.
+    """
+    metadata = row.get("metadata") or {}
+    if row["email_type"] == "review_request":
+        return row["subject"], _review_request_html(row["to_name"], metadata.get("property_address", ""))
+    if row["email_type"] == "referral_request":
+        return row["subject"], _referral_request_html(row["to_name"])
+    return None
+
+
 def process_scheduled_emails() -> dict:
     """
-    Process all scheduled emails that are due.
-    Called by cron job or manual trigger.
+    Deliver the due emails in the outbox (api/services/email_outbox.py).
+    Called by the scheduler every 20 s, or by manual trigger.
     
-    Returns count of sent/failed emails.
+    Returns counts of sent / retried / dead-lettered emails, overall and per type.
     """
+    from api.services.email_outbox import drain
+    
     try:
-        now = datetime.utcnow().isoformat()
-        
-        # Get pending emails that are due
-        result = sb.table("scheduled_emails") \
-            .select("*") \
-            .eq("status", "pending") \
-            .lte("scheduled_for", now) \
-            .order("scheduled_for") \
-            .limit(50) \
-            .execute()
-        
-        if not result.data:
-            return {"ok": True, "processed": 0, "message": "No emails pending"}
-        
-        sent = 0
-        failed = 0
-        
-        for email_row in result.data:
-            email_type = email_row["email_type"]
-            to_email = email_row["to_email"]
-            to_name = email_row["to_name"]
-            metadata = email_row.get("metadata") or {}
-            
-            try:
-                if email_type == "review_request":
-                    send_review_request_email(
-                        client_email=to_email,
-                        client_name=to_name,
-                        property_address=metadata.get("property_address", ""),
-                    )
-                elif email_type == "referral_request":
-                    send_referral_request_email(
-                        client_email=to_email,
-                        client_name=to_name,
-                    )
-                else:
-                    logger.warning(f"[email_service] Unknown email type: {email_type}")
-                    continue
-                
-                # Mark as sent
-                sb.table("scheduled_emails").update({
-                    "status": "sent",
-                    "sent_at": datetime.utcnow().isoformat(),
-                }).eq("id", email_row["id"]).execute()
-                
-                sent += 1
-                
-            except Exception as send_error:
-                logger.error(f"[email_service] Failed to send {email_type} to {to_email}: {send_error}")
-                
-                # Mark as failed with retry
-                attempts = email_row.get("attempts", 0) + 1
-                update_data = {
-                    "attempts": attempts,
-                    "last_error": str(send_error),
-                }
-                
-                if attempts >= 3:
-                    update_data["status"] = "failed"
-                else:
-                    # Retry in 1 hour
-                    update_data["scheduled_for"] = (datetime.utcnow() + timedelta(hours=1)).isoformat()
-                
-                sb.table("scheduled_emails").update(update_data).eq("id", email_row["id"]).execute()
-                failed += 1
-        
-        logger.info(f"[email_service] Processed {sent + failed} emails: {sent} sent, {failed} failed")
-        return {
-            "ok": True,
-            "processed": sent + failed,
-            "sent": sent,
-            "failed": failed,
-        }
-        
+        return drain()
     except Exception as e:
         logger.error(f"[email_service] Error processing scheduled emails: {e}")
         return {"ok": False, "error": str(e)}
 
 
-def _rto_completed_html(
-    client_name: str,
-    property_address: str,
-    documents_url: str = None,
-) -> str:
-    """Congratulations email when all RTO payments are complete."""
-    docs_url = documents_url or f"{APP_URL}/clientes/mi-cuenta/documentos"
-    content = f"""
+_RTO_COMPLETED = _page("""
     <div class="header" style="background: linear-gradient(135deg, #059669 0%, #047857 100%);">
         <h1>Contrato RTO Completado!</h1>
         <p>Felicidades, has completado todos tus pagos</p>
@@ -958,8 +1007,21 @@ def _rto_completed_html(
         <hr class="divider">
         <p style="font-size: 13px; color: #718096;">Gracias por confiar en {COMPANY_NAME}. Si tienes preguntas, contactanos al {COMPANY_PHONE}.</p>
     </div>
-    """
-    return _base_template(content)
+    """)
+
+
+def _rto_completed_html(
+    client_name: str,
+    property_address: str,
+    documents_url: str = None,
+) -> str:
+    """Congratulations email when all RTO payments are complete."""
+    docs_url = documents_url or f"{APP_URL}/clientes/mi-cuenta/documentos"
+    return _RTO_COMPLETED.render(
+        client_name=client_name,
+        property_address=property_address,
+        docs_url=docs_url,
+    )
 
 
 def send_rto_completed_email(
@@ -977,6 +1039,7 @@ def send_rto_completed_email(
             to=[client_email],
             subject=f"Contrato RTO Completado! - {COMPANY_NAME}",
             html=html,
+            email_type="rto_completed",
         )
         logger.info(f"[email_service] RTO completed email sent to {client_email}")
         return {"ok": True, "type": "rto_completed", **result}
@@ -985,99 +1048,113 @@ def send_rto_completed_email(
         return {"ok": False, "error": str(e)}
 
 
+# Reminder windows: (days until due, label). The label is part of the email
+# type and of its dedupe key, so each window is sent once per payment.
+RTO_REMINDER_WINDOWS = [(3, "3_days_before"), (0, "day_of"), (-1, "1_day_after")]
+# Keys per `dedupe_key IN (...)` query, to keep the request URL short
+_DEDUPE_CHUNK = 200
+
+
+def _rto_reminder_key(label: str, payment_id: str) -> str:
+    return f"rto_reminder_{label}:{payment_id}"
+
+
+def _job_db():
+    """The background client (as for the scheduler jobs and the outbox), not
+    the request handlers' `sb`."""
+    from tools.supabase_client import get_background_client
+    return get_background_client()
+
+
+def _already_queued(db, keys: list) -> set:
+    """The dedupe keys of `keys` already present in scheduled_emails."""
+    queued = set()
+    for i in range(0, len(keys), _DEDUPE_CHUNK):
+        rows = db.table("scheduled_emails") \
+            .select("dedupe_key") \
+            .in_("dedupe_key", keys[i:i + _DEDUPE_CHUNK]) \
+            .execute().data or []
+        queued.update(r["dedupe_key"] for r in rows)
+    return queued
+
+
 def process_rto_reminders() -> dict:
     """
     Process RTO payment reminders.
     Sends reminders at: 3 days before, day of, and 1 day after due date.
     Called by cron job or manual trigger.
+
+    Set-based: one query for the payments due on the three dates, one for
+    the reminders already queued (scheduled_emails.dedupe_key, migration
+    115), and the difference goes into the outbox with one bulk upsert that
+    skips keys already present. The outbox drain delivers them.
     """
     from datetime import date as date_type
+    from api.services.email_outbox import outbox_row
     
     try:
+        db = _job_db()
         today = date_type.today()
+        windows = {(today + timedelta(days=days)).isoformat(): (days, label)
+                   for days, label in RTO_REMINDER_WINDOWS}
         
-        # Find payments due in 3 days, today, or 1 day overdue
-        target_dates = [
-            (today + timedelta(days=3), 3, "3_days_before"),
-            (today, 0, "day_of"),
-            (today - timedelta(days=1), -1, "1_day_after"),
-        ]
+        payments = db.table("rto_payments") \
+            .select("id, amount, due_date, payment_number, "
+                    "rto_contracts(id, term_months, clients(name, email), properties(address))") \
+            .in_("due_date", list(windows)) \
+            .in_("status", ["scheduled", "pending", "late"]) \
+            .execute().data or []
+        
+        candidates = []
+        for p in payments:
+            contract = p.get("rto_contracts") or {}
+            client = contract.get("clients") or {}
+            if not client.get("email") or p.get("due_date") not in windows:
+                continue
+            days_until, label = windows[p["due_date"]]
+            candidates.append((_rto_reminder_key(label, p["id"]), label, days_until, p, contract, client))
         
-        total_sent = 0
-        total_failed = 0
-        details = []
+        queued_keys = _already_queued(db, [c[0] for c in candidates])
         
-        for target_date, days_until, label in target_dates:
-            # Get pending/scheduled payments for this date
-            payments = sb.table("rto_payments") \
-                .select("*, rto_contracts(*, clients(name, email), properties(address))") \
-                .eq("due_date", target_date.isoformat()) \
-                .in_("status", ["scheduled", "pending", "late"]) \
-                .execute()
-            
-            if not payments.data:
-                details.append({"label": label, "sent": 0, "reason": "no payments"})
+        # Rendered per window: the window's template is compiled once with its
+        # urgency block, and each reminder fills in only its own values.
+        rows = []
+        per_label = {label: {"label": label, "queued": 0} for _, label in RTO_REMINDER_WINDOWS}
+        for days_until, label in RTO_REMINDER_WINDOWS:
+            batch = [c for c in candidates if c[1] == label and c[0] not in queued_keys]
+            if not batch:
                 continue
-            
-            sent = 0
-            for p in payments.data:
-                contract = p.get("rto_contracts") or {}
-                client = contract.get("clients") or {}
-                prop = contract.get("properties") or {}
-                
-                if not client.get("email"):
-                    continue
-                
-                # Check if we already sent this reminder (prevent duplicates)
-                # Use scheduled_emails table to track
-                existing = sb.table("scheduled_emails") \
-                    .select("id") \
-                    .eq("email_type", f"rto_reminder_{label}") \
-                    .eq("metadata->>payment_id", p["id"]) \
-                    .execute()
-                
-                if existing.data:
-                    continue  # Already sent
-                
-                result = send_rto_payment_reminder(
-                    client_email=client["email"],
-                    client_name=client.get("name", "Cliente"),
-                    property_address=prop.get("address", "N/A"),
-                    monthly_rent=float(p.get("amount", 0)),
-                    due_date=target_date.strftime("%d de %B, %Y"),
-                    payment_number=p.get("payment_number", 0),
-                    total_payments=contract.get("term_months", 0),
-                    days_until_due=days_until,
-                )
-                
-                if result.get("ok"):
-                    sent += 1
-                    # Log in scheduled_emails to prevent duplicates
-                    try:
-                        sb.table("scheduled_emails").insert({
-                            "email_type": f"rto_reminder_{label}",
-                            "to_email": client["email"],
-                            "to_name": client.get("name"),
-                            "subject": f"RTO Reminder ({label})",
-                            "metadata": {"payment_id": p["id"], "contract_id": contract.get("id")},
-                            "scheduled_for": datetime.utcnow().isoformat(),
-                            "status": "sent",
-                            "sent_at": datetime.utcnow().isoformat(),
-                        }).execute()
-                    except Exception:
-                        pass
-                else:
-                    total_failed += 1
-            
-            total_sent += sent
-            details.append({"label": label, "sent": sent})
+            htmls = _rto_reminder_template(days_until).render_many(
+                {
+                    "client_name": client.get("name", "Cliente"),
+                    "property_address": (contract.get("properties") or {}).get("address", "N/A"),
+                    "monthly_rent": float(p.get("amount", 0)),
+                    "due_date": datetime.strptime(p["due_date"], "%Y-%m-%d").strftime("%d de %B, %Y"),
+                    "payment_number": p.get("payment_number", 0),
+                    "total_payments": contract.get("term_months", 0),
+                }
+                for _, _, _, p, contract, client in batch
+            )
+            subject = _rto_reminder_subject(days_until)
+            for (key, _, _, p, contract, client), html in zip(batch, htmls):
+                rows.append(outbox_row(
+                    [client["email"]], subject, html, f"rto_reminder_{label}",
+                    to_name=client.get("name") or "Cliente", dedupe_key=key,
+                    metadata={"payment_id": p["id"], "contract_id": contract.get("id")},
+                ))
+            per_label[label]["queued"] = len(batch)
+        
+        if rows:
+            db.table("scheduled_emails") \
+                .upsert(rows, on_conflict="dedupe_key", ignore_duplicates=True) \
+                .execute()
         
-        logger.info(f"[email_service] RTO reminders: {total_sent} sent, {total_failed} failed")
+        logger.info(f"[email_service] RTO reminders: {len(rows)} queued, {len(queued_keys)} already queued")
         return {
             "ok": True,
-            "total_sent": total_sent,
-            "total_failed": total_failed,
-            "details": details,
+            "total_queued": len(rows),
+            "already_queued": len(queued_keys),
+            "details": list(per_label.values()),
         }
     except Exception as e:
         logger.error(f"[email_service] Error processing RTO reminders: {e}")
@@ -1095,8 +1172,9 @@ def process_rto_overdue_alerts(admin_email: str = "info@maninoscapital.com") ->
         today = date_type.today()
         
         # Get all overdue payments (past grace period = 5 days after due)
-        overdue = sb.table("rto_payments") \
-            .select("*, rto_contracts(*, clients(name, phone), properties(address))") \
+        overdue = _job_db().table("rto_payments") \
+            .select("amount, due_date, payment_number, "
+                    "rto_contracts(late_fee_per_day, clients(name), properties(address))") \
             .in_("status", ["pending", "late"]) \
             .lt("due_date", (today - timedelta(days=5)).isoformat()) \
             .order("due_date") \
@@ -1152,38 +1230,20 @@ def process_rto_overdue_alerts(admin_email: str = "info@maninoscapital.com") ->
 # PROMISSORY NOTE MATURITY ALERTS
 # =============================================================================
 
-def _promissory_maturity_alert_html(notes_summary: list, total_amount: float) -> str:
-    """HTML template for promissory note maturity alert."""
-    rows = ""
-    for n in notes_summary:
-        days = n["days_remaining"]
-        if days < 0:
-            urgency_color = "#991b1b"
-            urgency_label = f"{abs(days)}d OVERDUE"
-        elif days <= 30:
-            urgency_color = "#dc2626"
-            urgency_label = f"{days}d remaining"
-        elif days <= 60:
-            urgency_color = "#ea580c"
-            urgency_label = f"{days}d remaining"
-        else:
-            urgency_color = "#ca8a04"
-            urgency_label = f"{days}d remaining"
-
-        rows += f"""
+_PROMISSORY_MATURITY_ROW = EmailTemplate("""
         <tr>
-            <td style="padding: 12px; border-bottom: 1px solid #e2e8f0;">{n['investor_name']}</td>
-            <td style="padding: 12px; border-bottom: 1px solid #e2e8f0; text-align: right;">${n['loan_amount']:,.2f}</td>
-            <td style="padding: 12px; border-bottom: 1px solid #e2e8f0; text-align: right;">${n['total_due']:,.2f}</td>
-            <td style="padding: 12px; border-bottom: 1px solid #e2e8f0;">{n['maturity_date']}</td>
+            <td style="padding: 12px; border-bottom: 1px solid #e2e8f0;">{investor_name}</td>
+            <td style="padding: 12px; border-bottom: 1px solid #e2e8f0; text-align: right;">${loan_amount:,.2f}</td>
+            <td style="padding: 12px; border-bottom: 1px solid #e2e8f0; text-align: right;">${total_due:,.2f}</td>
+            <td style="padding: 12px; border-bottom: 1px solid #e2e8f0;">{maturity_date}</td>
             <td style="padding: 12px; border-bottom: 1px solid #e2e8f0; color: {urgency_color}; font-weight: 600;">{urgency_label}</td>
         </tr>
-        """
+        """)
 
-    content = f"""
+_PROMISSORY_MATURITY_ALERT = _page("""
     <div class="header">
         <h1>Promissory Note Maturity Alert</h1>
-        <p>{len(notes_summary)} note{'s' if len(notes_summary) != 1 else ''} approaching maturity</p>
+        <p>{count} note{plural} approaching maturity</p>
     </div>
     <div class="body">
         <p>The following promissory notes are maturing within the next 90 days and require attention:</p>
@@ -1213,8 +1273,43 @@ def _promissory_maturity_alert_html(notes_summary: list, total_amount: float) ->
             <a href="{APP_URL}/capital/promissory-notes" class="btn">View Promissory Notes</a>
         </center>
     </div>
-    """
-    return _base_template(content)
+    """)
+
+
+def _promissory_maturity_alert_html(notes_summary: list, total_amount: float) -> str:
+    """HTML template for promissory note maturity alert."""
+    rows = []
+    for n in notes_summary:
+        days = n["days_remaining"]
+        if days < 0:
+            urgency_color = "#991b1b"
+            urgency_label = f"{abs(days)}d OVERDUE"
+        elif days <= 30:
+            urgency_color = "#dc2626"
+            urgency_label = f"{days}d remaining"
+        elif days <= 60:
+            urgency_color = "#ea580c"
+            urgency_label = f"{days}d remaining"
+        else:
+            urgency_color = "#ca8a04"
+            urgency_label = f"{days}d remaining"
+
+        rows.append(_PROMISSORY_MATURITY_ROW.render(
+            investor_name=n["investor_name"],
+            loan_amount=n["loan_amount"],
+            total_due=n["total_due"],
+            maturity_date=n["maturity_date"],
+            urgency_color=urgency_color,
+            urgency_label=urgency_label,
+        ))
+
+    count = len(notes_summary)
+    return _PROMISSORY_MATURITY_ALERT.render(
+        count=count,
+        plural="s" if count != 1 else "",
+        rows="".join(rows),
+        total_amount=total_amount,
+    )
 
 
 def send_promissory_maturity_alert(
@@ -1246,7 +1341,7 @@ def send_promissory_maturity_alert(
 
         subject = f"[{urgency}] Promissory note maturing — {investor_name} (${note_amount:,.0f})"
 
-        result = send_email(to=[admin_email], subject=subject, html=html)
+        result = send_email(to=[admin_email], subject=subject, html=html, email_type="promissory_maturity_alert")
         logger.info(f"[email_service] Maturity alert sent for {investor_name} ({days_remaining}d remaining)")
         return {"ok": True, "type": "promissory_maturity_alert", **result}
     except Exception as e:
@@ -1323,7 +1418,7 @@ def process_promissory_maturity_alerts(admin_email: str = "info@maninoscapital.c
             urgency = "NOTICE"
 
         subject = f"[{urgency}] {count} promissory note{'s' if count != 1 else ''} maturing soon — ${total_amount:,.0f} total"
-        email_result = send_email(to=[admin_email], subject=subject, html=html)
+        email_result = send_email(to=[admin_email], subject=subject, html=html, email_type="promissory_maturity_alert")
 
         # Update last_maturity_alert_at on each note
         now_iso = datetime.utcnow().isoformat()
@@ -1351,30 +1446,19 @@ def process_promissory_maturity_alerts(admin_email: str = "info@maninoscapital.c
         return {"ok": False, "error": str(e)}
 
 
-def _investor_payment_reminder_html(summary: dict) -> str:
-    """HTML for the monthly 'pagos a inversionistas del 15' reminder to treasury."""
-    from datetime import date as _date
-    try:
-        pd = _date.fromisoformat(summary["pay_date"])
-        pay_label = pd.strftime("%d/%m/%Y")
-    except Exception:
-        pay_label = summary.get("pay_date", "")
-    t = summary.get("totals", {})
-    rows = ""
-    for i in summary.get("investors", []):
-        rows += (
-            f'<tr>'
-            f'<td style="padding:8px 10px;border-bottom:1px solid #eee;">{i["name"]}</td>'
-            f'<td style="padding:8px 10px;border-bottom:1px solid #eee;text-align:right;font-weight:600;">${i["total"]:,.2f}</td>'
-            f'<td style="padding:8px 10px;border-bottom:1px solid #eee;text-align:right;color:#555;">${i["principal"]:,.2f}</td>'
-            f'<td style="padding:8px 10px;border-bottom:1px solid #eee;text-align:right;color:#b8860b;">${i["interest"]:,.2f}</td>'
-            f'</tr>'
-        )
-    return f"""
+_INVESTOR_PAYMENT_ROW = EmailTemplate(
+    '<tr>'
+    '<td style="padding:8px 10px;border-bottom:1px solid #eee;">{name}</td>'
+    '<td style="padding:8px 10px;border-bottom:1px solid #eee;text-align:right;font-weight:600;">${total:,.2f}</td>'
+    '<td style="padding:8px 10px;border-bottom:1px solid #eee;text-align:right;color:#555;">${principal:,.2f}</td>'
+    '<td style="padding:8px 10px;border-bottom:1px solid #eee;text-align:right;color:#b8860b;">${interest:,.2f}</td>'
+    '</tr>'
+)
+_INVESTOR_PAYMENT_REMINDER = EmailTemplate("""
     <div style="font-family:Arial,sans-serif;max-width:640px;margin:0 auto;color:#1a1a2e;">
       <h2 style="color:#1a1a2e;">Pagos a inversionistas — {pay_label}</h2>
       <p style="color:#444;">Recordatorio automático (día 12) para preparar los pagos que vencen el <strong>15</strong>.
-      Son <strong>{t.get('count', 0)}</strong> inversionistas, total <strong>${t.get('total', 0):,.2f}</strong>.</p>
+      Son <strong>{count}</strong> inversionistas, total <strong>${total:,.2f}</strong>.</p>
       <table style="width:100%;border-collapse:collapse;font-size:14px;margin-top:12px;">
         <thead>
           <tr style="background:#f5f2e8;">
@@ -1388,9 +1472,9 @@ def _investor_payment_reminder_html(summary: dict) -> str:
         <tfoot>
           <tr style="background:#fafafa;font-weight:700;">
             <td style="padding:10px;">TOTAL</td>
-            <td style="padding:10px;text-align:right;">${t.get('total', 0):,.2f}</td>
-            <td style="padding:10px;text-align:right;">${t.get('principal', 0):,.2f}</td>
-            <td style="padding:10px;text-align:right;">${t.get('interest', 0):,.2f}</td>
+            <td style="padding:10px;text-align:right;">${total:,.2f}</td>
+            <td style="padding:10px;text-align:right;">${principal:,.2f}</td>
+            <td style="padding:10px;text-align:right;">${interest:,.2f}</td>
           </tr>
         </tfoot>
       </table>
@@ -1398,7 +1482,29 @@ def _investor_payment_reminder_html(summary: dict) -> str:
         Calculado del cronograma de cada pagaré (regla de pago el día 15). Cifras a la fecha; verifica en Capital → Pagos del Mes.
       </p>
     </div>
-    """
+    """)
+
+
+def _investor_payment_reminder_html(summary: dict) -> str:
+    """HTML for the monthly 'pagos a inversionistas del 15' reminder to treasury."""
+    from datetime import date as _date
+    try:
+        pd = _date.fromisoformat(summary["pay_date"])
+        pay_label = pd.strftime("%d/%m/%Y")
+    except Exception:
+        pay_label = summary.get("pay_date", "")
+    t = summary.get("totals", {})
+    rows = "".join(_INVESTOR_PAYMENT_ROW.render(
+        name=i["name"], total=i["total"], principal=i["principal"], interest=i["interest"],
+    ) for i in summary.get("investors", []))
+    return _INVESTOR_PAYMENT_REMINDER.render(
+        pay_label=pay_label,
+        count=t.get("count", 0),
+        total=t.get("total", 0),
+        principal=t.get("principal", 0),
+        interest=t.get("interest", 0),
+        rows=rows,
+    )
 
 
 def process_investor_payment_reminder(admin_email: str = "aruiz@maninoscapital.com") -> dict:
@@ -1423,7 +1529,7 @@ def process_investor_payment_reminder(admin_email: str = "aruiz@maninoscapital.c
             pay_label = summary.get("pay_date", "")
         subject = f"Pagos a inversionistas del {pay_label} — {len(investors)} inversionistas, ${total:,.0f}"
         html = _investor_payment_reminder_html(summary)
-        email_result = send_email(to=[admin_email], subject=subject, html=html)
+        email_result = send_email(to=[admin_email], subject=subject, html=html, email_type="investor_payment_reminder")
         logger.info(f"[email_service] investor payment reminder sent to {admin_email}: "
                     f"{len(investors)} investors, ${total:,.2f}, ok={email_result.get('ok', False)}")
         return {
@@ -1443,40 +1549,20 @@ def process_investor_payment_reminder(admin_email: str = "aruiz@maninoscapital.c
 # INVESTOR EMAILS
 # =============================================================================
 
-def _investor_welcome_html(
-    investor_name: str,
-    note_data: dict,
-) -> str:
-    """HTML template for investor welcome email with promissory note details."""
-    loan_amount = float(note_data.get("loan_amount", 0))
-    annual_rate = float(note_data.get("annual_rate", 12))
-    term_months = int(note_data.get("term_months", 12))
-    total_due = float(note_data.get("total_due", 0))
-    total_interest = float(note_data.get("total_interest", 0))
-    start_date = note_data.get("start_date", "")
-    maturity_date = note_data.get("maturity_date", "")
-    monthly_interest = round(total_interest / term_months, 2) if term_months > 0 else 0
-    subscriber = note_data.get("subscriber_name", "Maninos Capital LLC")
-    lender = note_data.get("lender_name", investor_name)
-
-    # Build monthly schedule rows
-    schedule_rows = ""
-    for month in range(1, term_months + 1):
-        schedule_rows += f"""
+_INVESTOR_SCHEDULE_ROW = EmailTemplate("""
         <tr>
             <td style="padding: 6px 10px; border-bottom: 1px solid #e2e8f0; text-align: center;">{month}</td>
             <td style="padding: 6px 10px; border-bottom: 1px solid #e2e8f0; text-align: right;">${monthly_interest:,.2f}</td>
         </tr>
-        """
-    # Final row for principal return at maturity
-    schedule_rows += f"""
+        """)
+_INVESTOR_SCHEDULE_MATURITY_ROW = EmailTemplate("""
     <tr style="background: #fef9e7;">
         <td style="padding: 8px 10px; font-weight: 700; border-top: 2px solid #c9a227;">Vencimiento</td>
         <td style="padding: 8px 10px; text-align: right; font-weight: 700; border-top: 2px solid #c9a227;">${loan_amount:,.2f} (principal)</td>
     </tr>
-    """
+    """)
 
-    content = f"""
+_INVESTOR_WELCOME = _page("""
     <div class="header">
         <h1>Bienvenido a Maninos Capital</h1>
         <p>Gracias por su confianza como inversionista</p>
@@ -1558,8 +1644,45 @@ def _investor_welcome_html(
             o responda directamente a este correo.
         </p>
     </div>
-    """
-    return _base_template(content)
+    """)
+
+
+def _investor_welcome_html(
+    investor_name: str,
+    note_data: dict,
+) -> str:
+    """HTML template for investor welcome email with promissory note details."""
+    loan_amount = float(note_data.get("loan_amount", 0))
+    annual_rate = float(note_data.get("annual_rate", 12))
+    term_months = int(note_data.get("term_months", 12))
+    total_due = float(note_data.get("total_due", 0))
+    total_interest = float(note_data.get("total_interest", 0))
+    start_date = note_data.get("start_date", "")
+    maturity_date = note_data.get("maturity_date", "")
+    monthly_interest = round(total_interest / term_months, 2) if term_months > 0 else 0
+    subscriber = note_data.get("subscriber_name", "Maninos Capital LLC")
+    lender = note_data.get("lender_name", investor_name)
+
+    # Build monthly schedule rows
+    month_row = _INVESTOR_SCHEDULE_ROW.bind(monthly_interest=monthly_interest)
+    schedule_rows = "".join(month_row.render(month=month) for month in range(1, term_months + 1))
+    # Final row for principal return at maturity
+    schedule_rows += _INVESTOR_SCHEDULE_MATURITY_ROW.render(loan_amount=loan_amount)
+
+    return _INVESTOR_WELCOME.render(
+        investor_name=investor_name,
+        lender=lender,
+        subscriber=subscriber,
+        loan_amount=loan_amount,
+        annual_rate=annual_rate,
+        term_months=term_months,
+        monthly_interest=monthly_interest,
+        total_interest=total_interest,
+        total_due=total_due,
+        start_date=start_date,
+        maturity_date=maturity_date,
+        schedule_rows=schedule_rows,
+    )
 
 
 def send_investor_welcome_email(
@@ -1577,7 +1700,7 @@ def send_investor_welcome_email(
         loan_amount = float(note_data.get("loan_amount", 0))
         subject = f"Bienvenido a Maninos Capital — Nota Promisoria ${loan_amount:,.0f}"
 
-        result = send_email(to=[investor_email], subject=subject, html=html)
+        result = send_email(to=[investor_email], subject=subject, html=html, email_type="investor_welcome")
         logger.info(f"[email_service] Investor welcome email sent to {investor_email}")
         return {"ok": True, "type": "investor_welcome", **result}
     except Exception as e:
@@ -1585,39 +1708,19 @@ def send_investor_welcome_email(
         return {"ok": False, "error": str(e)}
 
 
-def _investor_followup_html(
-    investor_name: str,
-    summary: dict,
-) -> str:
-    """HTML template for periodic investor follow-up email."""
-    total_invested = float(summary.get("total_invested", 0))
-    total_returned = float(summary.get("total_returned", 0))
-    outstanding = float(summary.get("outstanding", 0))
-    active_notes = int(summary.get("active_notes", 0))
-    notes_detail = summary.get("notes", [])
-    report_date = datetime.utcnow().strftime("%d/%m/%Y")
-
-    rows = ""
-    for n in notes_detail:
-        status_color = "#16a34a" if n["status"] == "paid" else "#c9a227" if n["status"] == "active" else "#dc2626"
-        status_label = "Pagada" if n["status"] == "paid" else "Activa" if n["status"] == "active" else n["status"].capitalize()
-        loan = float(n.get("loan_amount", 0))
-        total_due = float(n.get("total_due", 0))
-        paid = float(n.get("paid_amount", 0) or 0)
-        remaining = max(0, total_due - paid)
-        rows += f"""
+_INVESTOR_FOLLOWUP_ROW = EmailTemplate("""
         <tr>
             <td style="padding: 10px; border-bottom: 1px solid #e2e8f0;">${loan:,.2f}</td>
-            <td style="padding: 10px; border-bottom: 1px solid #e2e8f0; text-align: center;">{n.get('annual_rate', 12)}%</td>
+            <td style="padding: 10px; border-bottom: 1px solid #e2e8f0; text-align: center;">{annual_rate}%</td>
             <td style="padding: 10px; border-bottom: 1px solid #e2e8f0; text-align: right;">${total_due:,.2f}</td>
             <td style="padding: 10px; border-bottom: 1px solid #e2e8f0; text-align: right; color: #16a34a;">${paid:,.2f}</td>
             <td style="padding: 10px; border-bottom: 1px solid #e2e8f0; text-align: right;">${remaining:,.2f}</td>
-            <td style="padding: 10px; border-bottom: 1px solid #e2e8f0;">{n.get('maturity_date', 'N/A')}</td>
+            <td style="padding: 10px; border-bottom: 1px solid #e2e8f0;">{maturity_date}</td>
             <td style="padding: 10px; border-bottom: 1px solid #e2e8f0; color: {status_color}; font-weight: 600;">{status_label}</td>
         </tr>
-        """
+        """)
 
-    content = f"""
+_INVESTOR_FOLLOWUP = _page("""
     <div class="header">
         <h1>Reporte Mensual de Inversion</h1>
         <p>Maninos Capital — {report_date}</p>
@@ -1645,7 +1748,7 @@ def _investor_followup_html(
             </tr>
         </table>
 
-        <h3 style="color: #1e3a5f; margin-top: 24px;">Detalle de Notas Promisorias ({active_notes} activa{'s' if active_notes != 1 else ''})</h3>
+        <h3 style="color: #1e3a5f; margin-top: 24px;">Detalle de Notas Promisorias ({active_notes} activa{plural})</h3>
 
         <table style="width: 100%; border-collapse: collapse; margin: 12px 0; font-size: 13px;">
             <thead>
@@ -1671,8 +1774,50 @@ def _investor_followup_html(
             contactenos al <strong>{COMPANY_PHONE}</strong> o responda directamente a este correo.
         </p>
     </div>
-    """
-    return _base_template(content)
+    """)
+
+
+def _investor_followup_html(
+    investor_name: str,
+    summary: dict,
+) -> str:
+    """HTML template for periodic investor follow-up email."""
+    total_invested = float(summary.get("total_invested", 0))
+    total_returned = float(summary.get("total_returned", 0))
+    outstanding = float(summary.get("outstanding", 0))
+    active_notes = int(summary.get("active_notes", 0))
+    notes_detail = summary.get("notes", [])
+    report_date = datetime.utcnow().strftime("%d/%m/%Y")
+
+    rows = []
+    for n in notes_detail:
+        status_color = "#16a34a" if n["status"] == "paid" else "#c9a227" if n["status"] == "active" else "#dc2626"
+        status_label = "Pagada" if n["status"] == "paid" else "Activa" if n["status"] == "active" else n["status"].capitalize()
+        loan = float(n.get("loan_amount", 0))
+        total_due = float(n.get("total_due", 0))
+        paid = float(n.get("paid_amount", 0) or 0)
+        remaining = max(0, total_due - paid)
+        rows.append(_INVESTOR_FOLLOWUP_ROW.render(
+            loan=loan,
+            annual_rate=n.get("annual_rate", 12),
+            total_due=total_due,
+            paid=paid,
+            remaining=remaining,
+            maturity_date=n.get("maturity_date", "N/A"),
+            status_color=status_color,
+            status_label=status_label,
+        ))
+
+    return _INVESTOR_FOLLOWUP.render(
+        report_date=report_date,
+        investor_name=investor_name,
+        total_invested=total_invested,
+        total_returned=total_returned,
+        outstanding=outstanding,
+        active_notes=active_notes,
+        plural="s" if active_notes != 1 else "",
+        rows="".join(rows),
+    )
 
 
 def send_investor_followup_email(
@@ -1689,7 +1834,7 @@ def send_investor_followup_email(
         html = _investor_followup_html(investor_name, summary)
         subject = f"Maninos Capital — Reporte de Inversion ({investor_name})"
 
-        result = send_email(to=[investor_email], subject=subject, html=html)
+        result = send_email(to=[investor_email], subject=subject, html=html, email_type="investor_followup")
         logger.info(f"[email_service] Investor followup email sent to {investor_email}")
         return {"ok": True, "type": "investor_followup", **result}
     except Exception as e:
@@ -1697,20 +1842,7 @@ def send_investor_followup_email(
         return {"ok": False, "error": str(e)}
 
 
-def _investor_completion_html(
-    investor_name: str,
-    note_data: dict,
-) -> str:
-    """HTML template for promissory note completion email."""
-    loan_amount = float(note_data.get("loan_amount", 0))
-    total_due = float(note_data.get("total_due", 0))
-    paid_amount = float(note_data.get("paid_amount", 0))
-    annual_rate = float(note_data.get("annual_rate", 12))
-    total_interest = float(note_data.get("total_interest", 0))
-    start_date = note_data.get("start_date", "")
-    maturity_date = note_data.get("maturity_date", "")
-
-    content = f"""
+_INVESTOR_COMPLETION = _page("""
     <div class="header" style="background: linear-gradient(135deg, #166534 0%, #15803d 100%);">
         <h1>Nota Promisoria Completada</h1>
         <p>Su inversion ha sido pagada en su totalidad</p>
@@ -1757,8 +1889,31 @@ def _investor_completion_html(
             al <strong>{COMPANY_PHONE}</strong> o responda directamente a este correo.
         </p>
     </div>
-    """
-    return _base_template(content)
+    """)
+
+
+def _investor_completion_html(
+    investor_name: str,
+    note_data: dict,
+) -> str:
+    """HTML template for promissory note completion email."""
+    loan_amount = float(note_data.get("loan_amount", 0))
+    total_due = float(note_data.get("total_due", 0))
+    paid_amount = float(note_data.get("paid_amount", 0))
+    annual_rate = float(note_data.get("annual_rate", 12))
+    total_interest = float(note_data.get("total_interest", 0))
+    start_date = note_data.get("start_date", "")
+    maturity_date = note_data.get("maturity_date", "")
+
+    return _INVESTOR_COMPLETION.render(
+        investor_name=investor_name,
+        loan_amount=loan_amount,
+        annual_rate=annual_rate,
+        total_interest=total_interest,
+        paid_amount=paid_amount,
+        start_date=start_date,
+        maturity_date=maturity_date,
+    )
 
 
 def send_investor_completion_email(
@@ -1776,7 +1931,7 @@ def send_investor_completion_email(
         loan_amount = float(note_data.get("loan_amount", 0))
         subject = f"Nota Promisoria Completada — ${loan_amount:,.0f} pagada en su totalidad"
 
-        result = send_email(to=[investor_email], subject=subject, html=html)
+        result = send_email(to=[investor_email], subject=subject, html=html, email_type="investor_completion")
         logger.info(f"[email_service] Investor completion email sent to {investor_email}")
         return {"ok": True, "type": "investor_completion", **result}
     except Exception as e:
@@ -1853,59 +2008,30 @@ def process_investor_followup_emails() -> dict:
 # CLIENT POST-PURCHASE OPTIONS EMAIL (RTO completed)
 # =============================================================================
 
-def _client_post_purchase_html(
-    client_name: str,
-    property_address: str,
-    options_data: dict,
-) -> str:
-    """HTML template for client post-purchase options after RTO completion."""
-    financial = options_data.get("financial_summary", {})
-    purchase_price = float(financial.get("purchase_price", 0))
-    total_paid = float(financial.get("total_paid", 0))
-    options = options_data.get("options", [])
-    loyalty = options_data.get("loyalty_programs", {})
-
-    # Build options sections
-    options_html = ""
-    for opt in options:
-        icon = "🏠" if opt["key"] == "repurchase" else "⬆️"
-        details_html = ""
-        for detail in opt.get("details", []):
-            details_html += f'<li style="margin: 6px 0; color: #4a5568;">{detail}</li>'
-
-        highlight_html = ""
-        if opt.get("estimated_discount"):
-            highlight_html = f"""
+_POST_PURCHASE_DETAIL = EmailTemplate('<li style="margin: 6px 0; color: #4a5568;">{detail}</li>')
+_POST_PURCHASE_DISCOUNT = EmailTemplate("""
             <div style="background: #eff6ff; border-radius: 6px; padding: 12px; margin-top: 12px; text-align: center;">
-                <span style="color: #1e40af; font-weight: 600;">Ahorro estimado: ${opt['estimated_discount']:,.2f}</span>
-            </div>"""
-        elif opt.get("credit_amount"):
-            highlight_html = f"""
+                <span style="color: #1e40af; font-weight: 600;">Ahorro estimado: ${amount:,.2f}</span>
+            </div>""")
+_POST_PURCHASE_CREDIT = EmailTemplate("""
             <div style="background: #f0fdf4; border-radius: 6px; padding: 12px; margin-top: 12px; text-align: center;">
-                <span style="color: #166534; font-weight: 600;">Credito estimado: ${opt['credit_amount']:,.2f}</span>
-            </div>"""
-
-        options_html += f"""
+                <span style="color: #166534; font-weight: 600;">Credito estimado: ${amount:,.2f}</span>
+            </div>""")
+_POST_PURCHASE_OPTION = EmailTemplate("""
         <div style="background: #ffffff; border: 1px solid #e2e8f0; border-radius: 10px; padding: 20px; margin: 12px 0;">
-            <h3 style="margin: 0 0 8px; color: #1e3a5f; font-size: 16px;">{icon} {opt['title']}</h3>
-            <p style="margin: 0 0 12px; color: #718096; font-size: 14px;">{opt['description']}</p>
+            <h3 style="margin: 0 0 8px; color: #1e3a5f; font-size: 16px;">{icon} {title}</h3>
+            <p style="margin: 0 0 12px; color: #718096; font-size: 14px;">{description}</p>
             <ul style="padding-left: 20px; margin: 0;">{details_html}</ul>
             {highlight_html}
         </div>
-        """
-
-    # Loyalty programs
-    loyalty_html = ""
-    for prog in loyalty.get("programs", []):
-        bonus_text = ""
-        if prog.get("min_bonus"):
-            bonus_text = f' <strong style="color: #c9a227;">(${prog["min_bonus"]:,} - ${prog["max_bonus"]:,})</strong>'
-        loyalty_html += f"""
+        """)
+_POST_PURCHASE_BONUS = EmailTemplate(' <strong style="color: #c9a227;">(${min_bonus:,} - ${max_bonus:,})</strong>')
+_POST_PURCHASE_LOYALTY = EmailTemplate("""
         <li style="margin: 8px 0; color: #4a5568;">
-            <strong>{prog['title']}</strong>: {prog['description']}{bonus_text}
-        </li>"""
+            <strong>{title}</strong>: {description}{bonus_text}
+        </li>""")
 
-    content = f"""
+_CLIENT_POST_PURCHASE = _page("""
     <div class="header">
         <h1>Opciones Post-Compra</h1>
         <p>Tu casa, tus opciones — Maninos Homes</p>
@@ -1937,7 +2063,7 @@ def _client_post_purchase_html(
 
         {options_html}
 
-        <h2 style="color: #1e3a5f; font-size: 18px; margin-top: 28px;">🎁 {loyalty.get('title', 'Programas de Lealtad')}</h2>
+        <h2 style="color: #1e3a5f; font-size: 18px; margin-top: 28px;">🎁 {loyalty_title}</h2>
 
         <ul style="padding-left: 20px;">
             {loyalty_html}
@@ -1954,8 +2080,57 @@ def _client_post_purchase_html(
             Gracias por ser parte de la familia Maninos Homes.
         </p>
     </div>
-    """
-    return _base_template(content)
+    """)
+
+
+def _client_post_purchase_html(
+    client_name: str,
+    property_address: str,
+    options_data: dict,
+) -> str:
+    """HTML template for client post-purchase options after RTO completion."""
+    financial = options_data.get("financial_summary", {})
+    purchase_price = float(financial.get("purchase_price", 0))
+    total_paid = float(financial.get("total_paid", 0))
+    options = options_data.get("options", [])
+    loyalty = options_data.get("loyalty_programs", {})
+
+    # Build options sections
+    options_html = ""
+    for opt in options:
+        icon = "🏠" if opt["key"] == "repurchase" else "⬆️"
+        details_html = "".join(_POST_PURCHASE_DETAIL.render(detail=d) for d in opt.get("details", []))
+
+        highlight_html = ""
+        if opt.get("estimated_discount"):
+            highlight_html = _POST_PURCHASE_DISCOUNT.render(amount=opt["estimated_discount"])
+        elif opt.get("credit_amount"):
+            highlight_html = _POST_PURCHASE_CREDIT.render(amount=opt["credit_amount"])
+
+        options_html += _POST_PURCHASE_OPTION.render(
+            icon=icon, title=opt["title"], description=opt["description"],
+            details_html=details_html, highlight_html=highlight_html,
+        )
+
+    # Loyalty programs
+    loyalty_html = ""
+    for prog in loyalty.get("programs", []):
+        bonus_text = ""
+        if prog.get("min_bonus"):
+            bonus_text = _POST_PURCHASE_BONUS.render(min_bonus=prog["min_bonus"], max_bonus=prog["max_bonus"])
+        loyalty_html += _POST_PURCHASE_LOYALTY.render(
+            title=prog["title"], description=prog["description"], bonus_text=bonus_text,
+        )
+
+    return _CLIENT_POST_PURCHASE.render(
+        client_name=client_name,
+        property_address=property_address,
+        purchase_price=purchase_price,
+        total_paid=total_paid,
+        options_html=options_html,
+        loyalty_title=loyalty.get("title", "Programas de Lealtad"),
+        loyalty_html=loyalty_html,
+    )
 
 
 def send_client_post_purchase_email(
@@ -1973,7 +2148,7 @@ def send_client_post_purchase_email(
         html = _client_post_purchase_html(client_name, property_address, options_data)
         subject = f"Tus opciones como propietario — {property_address}"
 
-        result = send_email(to=[client_email], subject=subject, html=html)
+        result = send_email(to=[client_email], subject=subject, html=html, email_type="client_post_purchase")
         logger.info(f"[email_service] Post-purchase options email sent to {client_email}")
         return {"ok": True, "type": "client_post_purchase", **result}
     except Exception as e:
@@ -0,0 +1,96 @@
+"""
+Precompiled email templates.
+
+An EmailTemplate is compiled once, at import. Its source uses str.format
+syntax, so the placeholders the f-string templates had carry over unchanged.
+Compiling splits the source into static text and slots, and folds the
+constants it is given (APP_URL, COMPANY_PHONE, ...) into the static text.
+It then compiles the result into a Python function: one f-string
+expression, so a render is the bytecode of a single f-string whose
+literal parts are already built.
+
+email_service compiles each email as one template together with the brand
+shell. The ~2 KB of shell and CSS is never rebuilt; a render formats only
+the per-recipient values.
+
+For a run of many emails of one kind (the RTO reminders), bind() folds the
+values every email shares into a new compiled template, and render_many()
+renders the rest per recipient.
+
+Placeholders are plain names with an optional format spec ({amount:,.2f}).
+The caller computes anything else (p.get(...), plurals) and passes it in.
+Row lists are rendered with their own template.
+"""
+from __future__ import annotations
+
+import keyword
+import string
+from typing import Any, Callable, Iterable, List, Mapping, Tuple
+
+_FORMATTER = string.Formatter()
+
+
+def _compile(statics: Tuple[str, ...], slots: Tuple[Tuple[str, str], ...]) -> Callable[..., str]:
+    """`lambda *, a, b, **_: f"...{a}...{b:,.2f}..."` for the template."""
+    body = [statics[0].replace("{", "{{").replace("}", "}}")]
+    for (name, spec), text in zip(slots, statics[1:]):
+        body.append("{" + name + (":" + spec if spec else "") + "}")
+        body.append(text.replace("{", "{{").replace("}", "}}"))
+    params = "".join(f"{name}, " for name in dict.fromkeys(name for name, _ in slots))
+    source = f"lambda *, {params}**_: f{''.join(body)!r}" if slots else f"lambda **_: {statics[0]!r}"
+    return eval(compile(source, "<email template>", "eval"), {"__builtins__": {}})
+
+
+class EmailTemplate:
+    """Static text with {name} / {name:spec} slots, compiled once."""
+
+    __slots__ = ("source", "_statics", "_slots", "_render")
+
+    def __init__(self, source: str, **constants: Any):
+        self.source = source
+        statics, slots = [""], []
+        for literal, field, spec, conversion in _FORMATTER.parse(source):
+            statics[-1] += literal
+            if field is None:
+                continue
+            if (conversion or not field.isidentifier() or keyword.iskeyword(field)
+                    or any(c in (spec or "") for c in "{}'\"\\")):
+                raise ValueError(f"Unsupported placeholder in email template: {{{field}}}")
+            if field in constants:
+                statics[-1] += format(constants[field], spec)
+            else:
+                slots.append((field, spec))
+                statics.append("")
+        self._set(tuple(statics), tuple(slots))
+
+    def _set(self, statics: Tuple[str, ...], slots: Tuple[Tuple[str, str], ...]) -> None:
+        self._statics, self._slots = statics, slots
+        self._render = _compile(statics, slots)
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        """The names render() needs, in order of first use."""
+        return tuple(dict.fromkeys(name for name, _ in self._slots))
+
+    def bind(self, **values: Any) -> "EmailTemplate":
+        """A template with `values` folded into the static text."""
+        statics, slots = [self._statics[0]], []
+        for (name, spec), text in zip(self._slots, self._statics[1:]):
+            if name in values:
+                statics[-1] += format(values[name], spec) + text
+            else:
+                slots.append((name, spec))
+                statics.append(text)
+        bound = EmailTemplate.__new__(EmailTemplate)
+        bound.source = self.source
+        bound._set(tuple(statics), tuple(slots))
+        return bound
+
+    def render(self, **values: Any) -> str:
+        """The email for `values` (TypeError if one is missing; extras are ignored)."""
+        return self._render(**values)
+
+    def render_many(self, rows: Iterable[Mapping[str, Any]]) -> List[str]:
+        """render(**row) for each row."""
+        render = self._render
+        return [render(**row) for row in rows]
@@ -111,7 +111,7 @@ def send_signing_emails(envelope_id: str, base_url: str = "") -> Dict[str, Any]:
             signing_url = f"{base_url}/firmar/{sig['token']}"
 
             # Send email via Resend
-            from tools.email_tool import send_email as _send_email
+            from api.services.email_outbox import queue_email as _send_email
             _send_email(
                 to=[sig["signer_email"]],
                 subject=f"Firma requerida: {envelope.data['name']}",
@@ -139,6 +139,7 @@ def send_signing_emails(envelope_id: str, base_url: str = "") -> Dict[str, Any]:
                     </div>
                 </div>
                 """,
+                email_type="esign_request",
             )
 
             # Update status and audit log
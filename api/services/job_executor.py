@@ -0,0 +1,324 @@
+"""
+Dedicated executor for the scheduler's jobs.
+
+AsyncIOScheduler hands synchronous jobs to the event loop's default
+executor, and nothing bounded how long one could run. The 320 s Apify call
+in the Facebook scrape, or a title-monitor run stuck on TDHCA, held its
+thread with no timeout and no way to stop it. The manual triggers
+(/transfers/title-monitor/trigger, /emails/scheduler/run-all) went further
+and called the same job functions inline in the request handler, which
+froze the API's event loop for the whole run. The async jobs (partner
+refresh, title monitor) also called asyncio.get_event_loop() from a worker
+thread, which raises on Python 3.11, so they never ran at all.
+
+JobExecutor is an APScheduler executor (and a plain `submit(job_id, fn)`
+for the manual triggers) that:
+
+  - runs every job on its own bounded pool of "scheduler-job" threads
+    (SCHEDULER_JOB_WORKERS, default 4), so jobs never touch the loop and
+    never compete with the API's I/O pool (tools/supabase_async.py);
+  - gives each job a timeout (`timeouts` by job id, else `default_timeout`;
+    SCHEDULER_JOB_TIMEOUTS="title_monitor=7200,..." overrides). When it
+    expires, a watchdog reports the job as timed out and sets its cancel
+    flag;
+  - supports cancellation through `cancel(job_id)`, which sets the same
+    flag.
+
+Python cannot kill a thread, so cancellation is cooperative. Inside a job:
+
+  - check_cancelled() raises JobCancelled between units of work;
+  - run_coroutine(coro) runs an async body on a private event loop on the
+    worker thread and cancels it as soon as the flag is set;
+  - remaining(cap) bounds a blocking HTTP timeout by the time left.
+
+A job that ignores all three still finishes on its own. Its thread stays
+busy until then, and max_instances keeps a second copy from starting.
+
+With `leases` (api/services/job_leases.py), every scheduled run of a job
+outside `local_jobs` is first claimed cluster-wide, on the job thread. A
+run another process claimed is skipped. While a claimed run executes, a
+heartbeat thread renews its lease, and the job is cancelled if the lease
+is lost. The outcome is recorded on the run's row. reclaim_abandoned()
+re-runs what a crashed process left unfinished.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from apscheduler.events import EVENT_JOB_MISSED
+from apscheduler.executors.base import BaseExecutor, run_job
+
+from api.services.job_leases import Lease, LeaseStore, run_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_TIMEOUT = 1800
+_POLL = 0.25
+
+
+class JobCancelled(Exception):
+    """The running job was cancelled or ran past its timeout."""
+
+
+@dataclass
+class JobContext:
+    job_id: str
+    timeout: Optional[float]
+    started: float = field(default_factory=time.monotonic)
+    cancelled: threading.Event = field(default_factory=threading.Event)
+    timed_out: bool = False
+    lease: Optional[Lease] = None
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> Optional[float]:
+        if self.timeout is None:
+            return None
+        return max(0.0, self.timeout - self.elapsed)
+
+
+_local = threading.local()
+
+
+def current_job() -> Optional[JobContext]:
+    """The context of the job running on this thread (None outside the executor)."""
+    return getattr(_local, "job", None)
+
+
+def check_cancelled() -> None:
+    """Raise JobCancelled if the current job was cancelled or timed out."""
+    ctx = current_job()
+    if ctx is not None and ctx.cancelled.is_set():
+        raise JobCancelled(f"{ctx.job_id} {'timed out' if ctx.timed_out else 'cancelled'} "
+                           f"after {ctx.elapsed:.0f}s")
+
+
+def remaining(cap: float) -> float:
+    """`cap` seconds, or less if the current job's timeout is closer (for HTTP timeouts)."""
+    ctx = current_job()
+    left = ctx.remaining() if ctx else None
+    return cap if left is None else max(1.0, min(cap, left))
+
+
+def run_coroutine(coro) -> Any:
+    """Run an async job body to completion on this worker thread.
+
+    It gets a private event loop and is cancelled as soon as the job is.
+    """
+    ctx = current_job()
+
+    async def _guarded():
+        task = asyncio.ensure_future(coro)
+        while not task.done():
+            if ctx is not None and ctx.cancelled.is_set():
+                task.cancel()
+            await asyncio.wait({task}, timeout=_POLL)
+        return task.result()
+
+    try:
+        return asyncio.run(_guarded())
+    except asyncio.CancelledError:
+        check_cancelled()
+        raise JobCancelled("coroutine cancelled")
+
+
+def env_timeouts() -> Dict[str, float]:
+    timeouts = {}
+    for item in os.getenv("SCHEDULER_JOB_TIMEOUTS", "").split(","):
+        job_id, _, seconds = item.partition("=")
+        try:
+            timeouts[job_id.strip()] = float(seconds)
+        except ValueError:
+            continue
+    return timeouts
+
+
+class JobExecutor(BaseExecutor):
+    """Runs jobs on a dedicated thread pool with per-job timeouts (see module docstring)."""
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS,
+                 timeouts: Optional[Dict[str, float]] = None,
+                 default_timeout: Optional[float] = DEFAULT_TIMEOUT,
+                 on_timeout: Optional[Callable[[str, float], None]] = None,
+                 leases: Optional[LeaseStore] = None,
+                 local_jobs: Iterable[str] = ()):
+        super().__init__()
+        self.max_workers = max_workers
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = default_timeout
+        self.on_timeout = on_timeout
+        self.leases = leases
+        self.local_jobs = set(local_jobs)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._running: Dict[int, JobContext] = {}
+        self._stopping = threading.Event()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+
+    # --------------------------------------------------------------- pool
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="scheduler-job")
+        return self._pool
+
+    def timeout_for(self, job_id: str) -> Optional[float]:
+        return self.timeouts.get(job_id, self.default_timeout)
+
+    def submit(self, job_id: str, fn: Callable, *args: Any, **kwargs: Any) -> Future:
+        """Run `fn(*args, **kwargs)` as job `job_id` on the pool, under its timeout."""
+        ctx = JobContext(job_id, self.timeout_for(job_id))
+
+        def _call():
+            _local.job = ctx
+            self._running[id(ctx)] = ctx
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._running.pop(id(ctx), None)
+                _local.job = None
+
+        future = self._get_pool().submit(_call)
+        if ctx.timeout:
+            watchdog = threading.Timer(ctx.timeout, self._expire, (ctx, future))
+            watchdog.daemon = True
+            watchdog.start()
+            future.add_done_callback(lambda _f: watchdog.cancel())
+        return future
+
+    def _expire(self, ctx: JobContext, future: Future) -> None:
+        if future.done():
+            return
+        ctx.timed_out = True
+        ctx.cancelled.set()
+        logger.error(f"[scheduler] Job {ctx.job_id} timed out after {ctx.timeout:.0f}s — cancelling")
+        if self.on_timeout:
+            try:
+                self.on_timeout(ctx.job_id, ctx.timeout)
+            except Exception as e:
+                logger.warning(f"[scheduler] on_timeout hook failed for {ctx.job_id}: {e}")
+
+    def cancel(self, job_id: str) -> bool:
+        """Ask every running instance of `job_id` to stop. False if none is running."""
+        found = False
+        for ctx in list(self._running.values()):
+            if ctx.job_id == job_id:
+                ctx.cancelled.set()
+                found = True
+        return found
+
+    def running(self) -> Dict[str, float]:
+        """{job_id: seconds running} for the jobs on the pool right now."""
+        return {ctx.job_id: round(ctx.elapsed, 1) for ctx in list(self._running.values())}
+
+    # ---------------------------------------------------------- APScheduler
+
+    def _do_submit_job(self, job, run_times):
+        def callback(f):
+            try:
+                events = f.result()
+            except BaseException:
+                self._run_job_error(job.id, *sys.exc_info()[1:])
+            else:
+                self._run_job_success(job.id, events)
+
+        if self.leases is not None and job.id not in self.local_jobs:
+            future = self.submit(job.id, self._run_leased, job, run_times, run_key(run_times[-1]))
+        else:
+            future = self.submit(job.id, run_job, job, job._jobstore_alias, run_times, self._logger.name)
+        future.add_done_callback(callback)
+
+    # ---------------------------------------------------------------- leases
+
+    def _run_leased(self, job, run_times, key: str) -> List[Any]:
+        """On the job thread: claim the run, execute it, record the outcome."""
+        lease = self.leases.claim(job.id, key)
+        if lease is None:
+            logger.info(f"[scheduler] {job.id} {key} is claimed by another process — skipping")
+            return []
+        current_job().lease = lease
+        self._ensure_heartbeat()
+        t0 = time.monotonic()
+        events = run_job(job, job._jobstore_alias, run_times, self._logger.name)
+        duration_ms = int((time.monotonic() - t0) * 1000)
+
+        event = events[-1] if events else None
+        if event is None or event.code == EVENT_JOB_MISSED:
+            self.leases.finish(lease, False, duration_ms, {"missed": True})
+        elif event.exception is not None:
+            if self._stopping.is_set() and isinstance(event.exception, JobCancelled):
+                self.leases.abandon(lease)  # stopped by shutdown: let another process finish it
+            else:
+                self.leases.finish(lease, False, duration_ms, error=f"{type(event.exception).__name__}: "
+                                                                  f"{event.exception}")
+        else:
+            result = event.retval if isinstance(event.retval, dict) else {}
+            self.leases.finish(lease, bool(result.get("ok", True)), duration_ms,
+                               {k: v for k, v in result.items() if k != "ok"},
+                               result.get("error"))
+        return events
+
+    def _ensure_heartbeat(self) -> None:
+        if self._heartbeat_thread is None or not self._heartbeat_thread.is_alive():
+            with self._pool_lock:
+                if self._heartbeat_thread is None or not self._heartbeat_thread.is_alive():
+                    self._heartbeat_thread = threading.Thread(
+                        target=self._heartbeat_loop, name="scheduler-heartbeat", daemon=True)
+                    self._heartbeat_thread.start()
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stopping.wait(self.leases.heartbeat_seconds):
+            for ctx in list(self._running.values()):
+                if ctx.lease is None or ctx.cancelled.is_set():
+                    continue
+                if self.leases.heartbeat(ctx.lease) is False:
+                    logger.error(f"[scheduler] Lost the lease on {ctx.job_id} {ctx.lease.run_key} — cancelling")
+                    ctx.cancelled.set()
+
+    def reclaim_abandoned(self) -> dict:
+        """Take over the runs crashed processes left unfinished (jobs this scheduler has)."""
+        if self.leases is None or self._scheduler is None:
+            return {"ok": True, "reclaimed": 0}
+        jobs = {job.id: job for job in self._scheduler.get_jobs() if job.id not in self.local_jobs}
+        reclaimed = []
+        for row in self.leases.abandoned_runs(jobs):
+            job = jobs[row["job_name"]]
+            now = [datetime.now(timezone.utc)]  # a takeover runs now, not at the missed fire time
+            future = self.submit(job.id, self._run_leased, job, now, row["run_key"])
+            future.add_done_callback(self._dispatch_events)
+            reclaimed.append(f"{job.id}@{row['run_key']}")
+        if reclaimed:
+            logger.warning(f"[scheduler] Taking over abandoned runs: {', '.join(reclaimed)}")
+        return {"ok": True, "reclaimed": len(reclaimed), "runs": reclaimed}
+
+    def _dispatch_events(self, future: Future) -> None:
+        try:
+            events = future.result()
+        except BaseException as e:
+            logger.error(f"[scheduler] Takeover run failed: {e}")
+            return
+        for event in events:
+            self._scheduler._dispatch_event(event)
+
+    def shutdown(self, wait: bool = True):
+        self._stopping.set()
+        for ctx in list(self._running.values()):
+            ctx.cancelled.set()
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
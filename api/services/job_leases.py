@@ -0,0 +1,143 @@
+"""
+Cluster-wide leases for scheduled runs (migration 114).
+
+Every process that runs the scheduler fires the same runs: cron triggers
+are deterministic, and interval triggers are anchored to one start date
+(scheduler_service._every). Before a run executes, JobExecutor claims it
+in scheduler_runs under (job_name, run_key = scheduled fire time in UTC):
+
+  - claim() wins for exactly one process. The others skip that run.
+  - While the job runs, the holder renews the lease every
+    lease_seconds / 4 (heartbeat()). If a renewal finds the run owned by
+    someone else, the local job is cancelled.
+  - finish() records the outcome on the same row, so a leased run is one
+    scheduler_runs row.
+  - If the holder crashes, its lease expires with the run unfinished.
+    abandoned_runs() lists such runs and claim() takes them over
+    (attempts + 1, at most MAX_ATTEMPTS). That makes them at-least-once
+    after a crash, which the jobs tolerate: they are idempotent per
+    note / payment / email.
+
+If the store is unreachable (migration 114 not applied, PostgREST down),
+claim() fails open and returns an unleased Lease, so a single replica
+keeps working. The warning in the log is the signal to fix it before
+adding replicas.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RUNS_TABLE = "scheduler_runs"
+CLAIM_RPC = "claim_scheduler_run"
+HEARTBEAT_RPC = "heartbeat_scheduler_run"
+
+LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", "120"))
+MAX_ATTEMPTS = 3
+# Runs older than this are not taken over: the next scheduled run will do.
+TAKEOVER_WINDOW = timedelta(hours=6)
+
+HOLDER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def run_key(run_time: datetime) -> str:
+    """The scheduled fire time as the run's cluster-wide key."""
+    return run_time.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+@dataclass
+class Lease:
+    job_name: str
+    run_key: str
+    run_id: Optional[str]      # None: store unavailable, running unleased
+    attempts: int = 1
+
+
+class LeaseStore:
+    def __init__(self, db_factory: Callable[[], Any], holder: str = HOLDER,
+                 lease_seconds: int = LEASE_SECONDS):
+        self._db = db_factory
+        self.holder = holder
+        self.lease_seconds = lease_seconds
+
+    @property
+    def heartbeat_seconds(self) -> float:
+        return self.lease_seconds / 4
+
+    def claim(self, job_name: str, key: str) -> Optional[Lease]:
+        """Own this run (a Lease) or None if another process has it / it already ran."""
+        try:
+            rows = self._db().rpc(CLAIM_RPC, {
+                "p_job_name": job_name, "p_run_key": key,
+                "p_holder": self.holder, "p_lease_seconds": self.lease_seconds,
+            }).execute().data or []
+        except Exception as e:
+            logger.warning(f"[scheduler] Lease store unavailable, running {job_name} {key} unleased: {e}")
+            return Lease(job_name, key, None)
+        if not rows:
+            return None
+        return Lease(job_name, key, rows[0]["id"], rows[0].get("attempts") or 1)
+
+    def heartbeat(self, lease: Lease, lease_seconds: Optional[int] = None) -> Optional[bool]:
+        """Renew the lease. False: we lost the run; None: couldn't tell (store error)."""
+        if not lease.run_id:
+            return True
+        try:
+            owned = self._db().rpc(HEARTBEAT_RPC, {
+                "p_run_id": lease.run_id, "p_holder": self.holder,
+                "p_lease_seconds": self.lease_seconds if lease_seconds is None else lease_seconds,
+            }).execute().data
+        except Exception as e:
+            logger.warning(f"[scheduler] Heartbeat failed for {lease.job_name} {lease.run_key}: {e}")
+            return None
+        return bool(owned)
+
+    def abandon(self, lease: Lease) -> None:
+        """Hand the run back for immediate takeover (this process is shutting down)."""
+        self.heartbeat(lease, lease_seconds=0)
+
+    def finish(self, lease: Lease, ok: bool, duration_ms: int,
+               summary: Optional[dict] = None, error: Optional[str] = None) -> None:
+        if not lease.run_id:
+            return
+        try:
+            self._db().table(RUNS_TABLE).update({
+                "finished_at": _now_iso(),
+                "ok": ok,
+                "duration_ms": duration_ms,
+                "summary": summary or {},
+                "error": error,
+            }).eq("id", lease.run_id).eq("holder", self.holder).execute()
+        except Exception as e:
+            logger.warning(f"[scheduler] Could not record end of {lease.job_name} {lease.run_key}: {e}")
+
+    def abandoned_runs(self, job_names: Iterable[str]) -> List[dict]:
+        """Unfinished runs of these jobs whose lease expired (candidates for takeover)."""
+        names = list(job_names)
+        if not names:
+            return []
+        now = datetime.now(timezone.utc)
+        try:
+            return self._db().table(RUNS_TABLE) \
+                .select("id, job_name, run_key, holder, attempts, lease_expires_at") \
+                .in_("job_name", names) \
+                .is_("finished_at", "null") \
+                .not_.is_("run_key", "null") \
+                .lt("lease_expires_at", now.isoformat()) \
+                .gte("started_at", (now - TAKEOVER_WINDOW).isoformat()) \
+                .lt("attempts", MAX_ATTEMPTS) \
+                .execute().data or []
+        except Exception as e:
+            logger.warning(f"[scheduler] Could not list abandoned runs: {e}")
+            return []
@@ -1,8 +1,8 @@
 """
 Unified accounting ledger writer for Maninos (Homes + Capital).
 
-The ONLY function any other code should call to create accounting rows is
-`post_to_ledger`. This guarantees:
+The ONLY functions any other code should call to create accounting rows are
+`post_to_ledger` and, for batches, `post_many_to_ledger`. This guarantees:
 
   - Every money-movement event lands as a balanced double-entry pair in
     the entity's transactions table (linked via `linked_transaction_id`).
@@ -46,6 +46,8 @@ from __future__ import annotations
 import logging
 import re
 import threading
+import time
+import uuid
 from dataclasses import dataclass, field
 from datetime import date, datetime
 from typing import Any, Optional
@@ -261,6 +263,9 @@ class LedgerConfig:
     supports_yard: bool = True
     # Statuses excluded from derived bank balances.
     balance_excluded_statuses: tuple = ("voided",)
+    # Identifies this ledger in the server-side helpers ('homes' | 'capital';
+    # migrations 109 and 110). None = always use the client-side fallbacks.
+    ledger_key: Optional[str] = None
 
 
 HOMES_CONFIG = LedgerConfig(
@@ -273,6 +278,7 @@ HOMES_CONFIG = LedgerConfig(
     property_subaccount_routing=True,
     supports_yard=True,
     balance_excluded_statuses=("voided",),
+    ledger_key="homes",
 )
 
 
@@ -398,28 +404,99 @@ def _get_bank_chart_account_id(db, bank_account_id: str, banks_table: str) -> st
     return chart_id
 
 
-def _generate_transaction_number(db, transactions_table: str) -> str:
-    """Match the convention in api/routes/accounting.py:217."""
-    today = date.today().strftime("%y%m%d")
-    prefix = f"TXN-{today}-"
+# ---------------------------------------------------------------------------
+# Server-side helpers (RPCs) — each has a client-side fallback
+# ---------------------------------------------------------------------------
+# After a failed RPC (migration not applied yet) skip it for a while instead
+# of paying a failed round-trip on every call.
+_RPC_RETRY_AFTER_S = 300
+_rpc_unavailable_until: dict[str, float] = {}   # rpc name -> monotonic deadline
+
+
+def _rpc_ready(name: str) -> bool:
+    return time.monotonic() >= _rpc_unavailable_until.get(name, 0.0)
+
+
+def _rpc_failed(name: str, err: Exception) -> None:
+    with _lock:
+        _rpc_unavailable_until[name] = time.monotonic() + _RPC_RETRY_AFTER_S
+    logger.warning("%s unavailable, using client-side fallback for %ss: %s", name, _RPC_RETRY_AFTER_S, err)
+
+
+# ---------------------------------------------------------------------------
+# Transaction numbers: TXN-YYMMDD-NNN
+# ---------------------------------------------------------------------------
+# allocate_txn_numbers (migration 110) bumps a per-(ledger, day) counter row
+# atomically, so concurrent posters never get the same serial and the cost
+# doesn't grow with the day's volume. Fallback: highest serial in use today.
+TXN_NUMBERS_RPC = "allocate_txn_numbers"
+
+
+def _max_txn_seq(db, transactions_table: str, prefix: str) -> int:
+    """Highest sequence number in use for `prefix`, parsing the numeric part
+    and IGNORING the -D/-C suffix ledger pairs add. Max-based (not
+    count-based) so it never reissues a number when pairs leave the count
+    desynced from the real max — which would violate the UNIQUE index."""
     try:
         existing = (
             db.table(transactions_table)
             .select("transaction_number")
             .like("transaction_number", f"{prefix}%")
             .execute()
+            .data or []
         )
-        count = len(existing.data) if existing.data else 0
     except Exception:
-        count = 0
-    return f"{prefix}{count + 1:03d}"
+        return 0
+    hi = 0
+    for row in existing:
+        num = row.get("transaction_number") or ""
+        mid = num[len(prefix):].split("-")[0]
+        if mid.isdigit():
+            hi = max(hi, int(mid))
+    return hi
+
+
+def allocate_transaction_numbers(
+    count: int = 1,
+    *,
+    db: Any = None,
+    config: Optional[LedgerConfig] = None,
+) -> list[str]:
+    """Reserve `count` consecutive transaction numbers for today in one call.
+
+    Batch writers (bank-statement posting, splits) take a block up front
+    instead of one round-trip per row. Numbers of an abandoned block are
+    simply skipped — serials are unique, not gapless.
+    """
+    if count < 1:
+        return []
+    if db is None:
+        from tools.supabase_client import sb
+        db = sb
+    cfg = config or HOMES_CONFIG
+    day = date.today()
+    prefix = f"TXN-{day.strftime('%y%m%d')}-"
+
+    first = None
+    if cfg.ledger_key and _rpc_ready(TXN_NUMBERS_RPC):
+        try:
+            first = db.rpc(TXN_NUMBERS_RPC, {
+                "p_ledger": cfg.ledger_key, "p_day": day.isoformat(), "p_count": count,
+            }).execute().data
+        except Exception as e:
+            _rpc_failed(TXN_NUMBERS_RPC, e)
+        if not isinstance(first, int):
+            first = None
+    if first is None:
+        first = _max_txn_seq(db, cfg.transactions_table, prefix) + 1
+    return [f"{prefix}{n:03d}" for n in range(first, first + count)]
 
 
 # ---------------------------------------------------------------------------
-# Public API
+# Pair construction
 # ---------------------------------------------------------------------------
 
-def post_to_ledger(
+def _build_ledger_pair(
     event_type: str,
     amount: float,
     *,
@@ -445,20 +522,12 @@ def post_to_ledger(
     status: str = "confirmed",
     created_by: Optional[str] = None,
     extra_fields: Optional[dict[str, Any]] = None,  # entity-specific columns (e.g. Capital's investor_id)
-    db: Any = None,
-    config: Optional[LedgerConfig] = None,
-) -> tuple[str, str]:
-    """
-    Post a balanced double-entry pair to the ledger.
-
-    Returns: (debit_txn_id, credit_txn_id)
-
-    Raises ValueError on misuse (unknown event, missing required bank, etc.).
-    """
-    if db is None:
-        from tools.supabase_client import sb
-        db = sb
-    cfg = config or HOMES_CONFIG
+    db: Any,
+    cfg: LedgerConfig,
+) -> tuple[dict, dict]:
+    """Resolve accounts, description and is_income for one event and return
+    the (debit_row, credit_row) to insert — no transaction_number, no ids.
+    Only reads (cached lookups); raises ValueError on misuse."""
 
     spec = cfg.registry.get(event_type)
     if spec is None:
@@ -605,66 +674,255 @@ def post_to_ledger(
     if extra_fields:
         base.update(extra_fields)
 
-    # One serial per *pair*, with -D / -C suffix so the two legs are unique
-    # within the pair AND visibly linked when an operator scans the ledger.
-    # Calling _generate_transaction_number twice in a row would race on the
-    # COUNT query and produce duplicates that hit the UNIQUE constraint.
-    base_serial = _generate_transaction_number(db, cfg.transactions_table)
     debit_row = {
         **base,
-        "transaction_number": f"{base_serial}-D",
         "account_id": debit_account_id,
         "bank_account_id": debit_bank_id,
         "is_income": debit_is_income,
     }
     credit_row = {
         **base,
-        "transaction_number": f"{base_serial}-C",
         "account_id": credit_account_id,
         "bank_account_id": credit_bank_id,
         "is_income": credit_is_income,
     }
     debit_row = {k: v for k, v in debit_row.items() if v is not None}
     credit_row = {k: v for k, v in credit_row.items() if v is not None}
+    return debit_row, credit_row
 
-    # ---- Insert + link, rolling back on any failure of the second leg ----
-    debit_res = db.table(cfg.transactions_table).insert(debit_row).execute()
-    if not debit_res.data:
-        raise RuntimeError("Failed to insert debit leg of ledger entry.")
-    debit_id = debit_res.data[0]["id"]
 
-    credit_row["linked_transaction_id"] = debit_id
-    try:
-        credit_res = db.table(cfg.transactions_table).insert(credit_row).execute()
-        if not credit_res.data:
-            raise RuntimeError("credit leg insert returned no data")
-        credit_id = credit_res.data[0]["id"]
-    except Exception as e:
-        # Roll back the orphan debit so half-pair rows never live in the
-        # ledger. Swallow rollback failures (best-effort cleanup).
-        try:
-            db.table(cfg.transactions_table).delete().eq("id", debit_id).execute()
-        except Exception as cleanup_err:
-            logger.error(f"post_to_ledger rollback failed for debit {debit_id}: {cleanup_err}")
-        raise RuntimeError(f"Failed to insert credit leg of ledger entry; debit rolled back. cause={e}") from e
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def post_to_ledger(
+    event_type: str,
+    amount: float,
+    *,
+    date: str,
+    bank_account_id: Optional[str] = None,
+    bank_account_id_from: Optional[str] = None,   # bank_transfer only
+    bank_account_id_to: Optional[str] = None,     # bank_transfer only
+    counterparty_name: Optional[str] = None,
+    counterparty_type: Optional[str] = None,
+    entity_type: Optional[str] = None,
+    entity_id: Optional[str] = None,
+    property_id: Optional[str] = None,
+    yard_id: Optional[str] = None,
+    description_data: Optional[dict[str, Any]] = None,
+    description_override: Optional[str] = None,
+    expense_account_code: Optional[str] = None,   # for manual_expense / invoice_received_ap
+    income_account_code: Optional[str] = None,    # for manual_income
+    debit_account_id_override: Optional[str] = None,   # bypass spec.debit lookup
+    credit_account_id_override: Optional[str] = None,  # bypass spec.credit lookup
+    payment_method: Optional[str] = None,
+    payment_reference: Optional[str] = None,
+    notes: Optional[str] = None,
+    status: str = "confirmed",
+    created_by: Optional[str] = None,
+    extra_fields: Optional[dict[str, Any]] = None,  # entity-specific columns (e.g. Capital's investor_id)
+    db: Any = None,
+    config: Optional[LedgerConfig] = None,
+) -> tuple[str, str]:
+    """
+    Post a balanced double-entry pair to the ledger.
 
-    db.table(cfg.transactions_table).update({"linked_transaction_id": credit_id}).eq("id", debit_id).execute()
+    Returns: (debit_txn_id, credit_txn_id)
 
+    Raises ValueError on misuse (unknown event, missing required bank, etc.).
+    """
+    if db is None:
+        from tools.supabase_client import sb
+        db = sb
+    cfg = config or HOMES_CONFIG
+    debit_row, credit_row = _build_ledger_pair(
+        event_type,
+        amount,
+        date=date,
+        bank_account_id=bank_account_id,
+        bank_account_id_from=bank_account_id_from,
+        bank_account_id_to=bank_account_id_to,
+        counterparty_name=counterparty_name,
+        counterparty_type=counterparty_type,
+        entity_type=entity_type,
+        entity_id=entity_id,
+        property_id=property_id,
+        yard_id=yard_id,
+        description_data=description_data,
+        description_override=description_override,
+        expense_account_code=expense_account_code,
+        income_account_code=income_account_code,
+        debit_account_id_override=debit_account_id_override,
+        credit_account_id_override=credit_account_id_override,
+        payment_method=payment_method,
+        payment_reference=payment_reference,
+        notes=notes,
+        status=status,
+        created_by=created_by,
+        extra_fields=extra_fields,
+        db=db,
+        cfg=cfg,
+    )
+    [(debit_id, credit_id)] = insert_ledger_pairs([(debit_row, credit_row)], db=db, config=cfg)
     logger.info(
         "post_to_ledger table=%s event=%s amount=%s pair=(%s, %s) bank=%s entity=%s/%s",
-        cfg.transactions_table, event_type, amt, debit_id, credit_id, bank_account_id, entity_type, entity_id,
+        cfg.transactions_table, event_type, debit_row["amount"], debit_id, credit_id,
+        bank_account_id, entity_type, entity_id,
     )
     return debit_id, credit_id
 
 
+def post_many_to_ledger(
+    entries: list[dict[str, Any]],
+    *,
+    db: Any = None,
+    config: Optional[LedgerConfig] = None,
+) -> list[tuple[str, str]]:
+    """
+    Post many balanced pairs at once — all or nothing.
+
+    Each entry is the keyword arguments of one `post_to_ledger` call
+    (event_type, amount, date, bank_account_id, ...; no db/config). Every
+    entry is resolved and validated before anything is written, so a bad
+    entry raises ValueError with the ledger untouched; the rows then go in
+    through `insert_ledger_pairs` (one serial block + one INSERT).
+
+    Returns [(debit_txn_id, credit_txn_id), ...] in entry order.
+    """
+    if db is None:
+        from tools.supabase_client import sb
+        db = sb
+    cfg = config or HOMES_CONFIG
+    pairs = []
+    for i, entry in enumerate(entries):
+        kwargs = dict(entry)
+        try:
+            event_type = kwargs.pop("event_type")
+            amount = kwargs.pop("amount")
+        except KeyError as e:
+            raise ValueError(f"entry {i}: missing {e!s}") from e
+        try:
+            pairs.append(_build_ledger_pair(event_type, amount, db=db, cfg=cfg, **kwargs))
+        except ValueError as e:
+            raise ValueError(f"entry {i}: {e}") from e
+    ids = insert_ledger_pairs(pairs, db=db, config=cfg)
+    logger.info("post_many_to_ledger table=%s pairs=%s", cfg.transactions_table, len(ids))
+    return ids
+
+
+def insert_ledger_pairs(
+    pairs: list[tuple[dict[str, Any], dict[str, Any]]],
+    *,
+    db: Any = None,
+    config: Optional[LedgerConfig] = None,
+) -> list[tuple[str, str]]:
+    """
+    Write already-resolved (debit_row, credit_row) pairs in ONE insert.
+
+    Ids are generated client-side so both legs carry linked_transaction_id
+    at insert time (no back-link UPDATE), and one block of serials is
+    reserved for the whole batch: pair k gets `<serial k>-D` / `-C`. A
+    multi-row INSERT is a single statement, so either every row lands or
+    none does — no half-pairs to roll back.
+
+    Returns [(debit_txn_id, credit_txn_id), ...] in input order.
+    """
+    if not pairs:
+        return []
+    if db is None:
+        from tools.supabase_client import sb
+        db = sb
+    cfg = config or HOMES_CONFIG
+    serials = allocate_transaction_numbers(len(pairs), db=db, config=cfg)
+    rows: list[dict[str, Any]] = []
+    ids: list[tuple[str, str]] = []
+    for (debit, credit), serial in zip(pairs, serials):
+        debit_id, credit_id = str(uuid.uuid4()), str(uuid.uuid4())
+        rows.append({**debit, "id": debit_id, "transaction_number": f"{serial}-D",
+                     "linked_transaction_id": credit_id})
+        rows.append({**credit, "id": credit_id, "transaction_number": f"{serial}-C",
+                     "linked_transaction_id": debit_id})
+        ids.append((debit_id, credit_id))
+    res = db.table(cfg.transactions_table).insert(rows).execute()
+    if not res.data:
+        raise RuntimeError(f"Failed to insert {len(pairs)} ledger pair(s) into {cfg.transactions_table}.")
+    return ids
+
+
 def reset_caches() -> None:
     """Test hook — clear the in-process account/bank lookup caches."""
     with _lock:
+        _rpc_unavailable_until.clear()
         _account_by_code_cache.clear()
         _bank_chart_cache.clear()
         _account_type_cache.clear()
 
 
+# ---------------------------------------------------------------------------
+# Derived bank balances
+# ---------------------------------------------------------------------------
+# Fast path: the get_derived_bank_balances RPC (migration 109) sums a
+# trigger-maintained per-bank/day table server-side — cost independent of
+# ledger size. Fallback: page through the bank legs and sum in Python.
+BANK_BALANCES_RPC = "get_derived_bank_balances"
+_BALANCE_PAGE_SIZE = 1000
+
+
+def _rpc_bank_balances(
+    db: Any, cfg: LedgerConfig, bank_account_id: Optional[str], as_of: Optional[str],
+) -> Optional[dict[str, float]]:
+    """{bank_account_id → balance} from the RPC, or None if it can't be used."""
+    if not cfg.ledger_key or not _rpc_ready(BANK_BALANCES_RPC):
+        return None
+    params = {
+        "p_ledger": cfg.ledger_key,
+        "p_excluded_statuses": list(cfg.balance_excluded_statuses),
+        "p_bank_account_id": bank_account_id,
+        "p_as_of": as_of,
+    }
+    try:
+        rows = db.rpc(BANK_BALANCES_RPC, params).execute().data
+    except Exception as e:
+        _rpc_failed(BANK_BALANCES_RPC, e)
+        return None
+    if not isinstance(rows, list):
+        return None
+    return {
+        r["bank_account_id"]: round(float(r.get("balance") or 0), 2)
+        for r in rows if r.get("bank_account_id")
+    }
+
+
+def _scan_bank_balances(
+    db: Any, cfg: LedgerConfig, bank_account_id: Optional[str], as_of: Optional[str],
+) -> dict[str, float]:
+    """{bank_account_id → balance} summed in Python over every bank leg."""
+    out: dict[str, float] = {}
+    offset = 0
+    while True:
+        q = db.table(cfg.transactions_table).select("id,bank_account_id,amount,is_income,status")
+        if bank_account_id:
+            q = q.eq("bank_account_id", bank_account_id)
+        else:
+            q = q.not_.is_("bank_account_id", "null")
+        if as_of:
+            q = q.lte("transaction_date", as_of)
+        # Stable order so pagination never skips or repeats a row.
+        rows = q.order("id").range(offset, offset + _BALANCE_PAGE_SIZE - 1).execute().data or []
+        for r in rows:
+            if (r.get("status") or "") in cfg.balance_excluded_statuses:
+                continue
+            bid = r.get("bank_account_id")
+            if not bid:
+                continue
+            amt = float(r.get("amount") or 0)
+            out[bid] = out.get(bid, 0.0) + (amt if r.get("is_income") else -amt)
+        if len(rows) < _BALANCE_PAGE_SIZE:
+            break
+        offset += _BALANCE_PAGE_SIZE
+    return {k: round(v, 2) for k, v in out.items()}
+
+
 def get_bank_balance(
     bank_account_id: str,
     *,
@@ -684,6 +942,9 @@ def get_bank_balance(
     Excludes rows whose status is in config.balance_excluded_statuses
     (Homes: voided; Capital also excludes pending_confirmation/draft).
 
+    Computed server-side by get_derived_bank_balances (migration 109) when
+    available, otherwise by scanning the bank's rows.
+
     This function is intentionally pure: it does NOT write to
     <banks_table>.current_balance. The stored column is decoupled
     from the ledger — callers compute on read.
@@ -692,44 +953,26 @@ def get_bank_balance(
         from tools.supabase_client import sb
         db = sb
     cfg = config or HOMES_CONFIG
-    q = (
-        db.table(cfg.transactions_table)
-        .select("amount,is_income,status")
-        .eq("bank_account_id", bank_account_id)
-    )
-    if as_of:
-        q = q.lte("transaction_date", as_of)
-    rows = (q.execute().data or [])
-    bal = 0.0
-    for r in rows:
-        if (r.get("status") or "") in cfg.balance_excluded_statuses:
-            continue
-        amt = float(r.get("amount") or 0)
-        bal += amt if r.get("is_income") else -amt
-    return round(bal, 2)
-
-
-def get_all_bank_balances(*, db: Any = None, config: Optional[LedgerConfig] = None) -> dict[str, float]:
-    """Return {bank_account_id → derived balance} for every active bank.
-    One query instead of one per bank — used by the dashboard."""
+    balances = _rpc_bank_balances(db, cfg, bank_account_id, as_of)
+    if balances is None:
+        balances = _scan_bank_balances(db, cfg, bank_account_id, as_of)
+    return balances.get(bank_account_id, 0.0)
+
+
+def get_all_bank_balances(
+    *,
+    as_of: Optional[str] = None,
+    db: Any = None,
+    config: Optional[LedgerConfig] = None,
+) -> dict[str, float]:
+    """Return {bank_account_id → derived balance} for every bank with ledger
+    rows. One RPC (or one paginated scan) instead of one query per bank —
+    used by the dashboard."""
     if db is None:
         from tools.supabase_client import sb
         db = sb
     cfg = config or HOMES_CONFIG
-    rows = (
-        db.table(cfg.transactions_table)
-        .select("bank_account_id,amount,is_income,status")
-        .not_.is_("bank_account_id", "null")
-        .execute()
-        .data or []
-    )
-    out: dict[str, float] = {}
-    for r in rows:
-        if (r.get("status") or "") in cfg.balance_excluded_statuses:
-            continue
-        bid = r.get("bank_account_id")
-        if not bid:
-            continue
-        amt = float(r.get("amount") or 0)
-        out[bid] = out.get(bid, 0.0) + (amt if r.get("is_income") else -amt)
-    return {k: round(v, 2) for k, v in out.items()}
+    balances = _rpc_bank_balances(db, cfg, None, as_of)
+    if balances is None:
+        balances = _scan_bank_balances(db, cfg, None, as_of)
+    return balances
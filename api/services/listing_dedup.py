@@ -0,0 +1,226 @@
+"""
+Dedup index for market-listing ingestion.
+
+Every scraped listing is checked against what the team has already handled
+before it is saved: listings dismissed / purchased / rejected (by exact
+source_url or by address, since URLs drift between scrapes) and houses
+already in the Maninos properties inventory. Done per listing, that was up
+to three Supabase queries each — one of them fetching every handled listing
+and re-normalizing all of their addresses — so a bulk ingest cost
+O(listings × history).
+
+`ListingDedupIndex.load(db)` reads the history and inventory once per
+ingest run (paginated past the 1000-row PostgREST cap) and answers every
+lookup in memory:
+
+  - exact source_url → status map (all non-available listings),
+  - normalized addresses in an `AddressIndex`: "one contains the other" is
+    answered with a set of addresses (history address inside the query:
+    probe the query's substrings of each indexed length) plus a trigram
+    index (query inside a history address: intersect posting lists, verify
+    the few candidates).
+
+    index = ListingDedupIndex.load(supabase)
+    for listing in scraped:
+        if index.check(listing.source_url, listing.address):
+            continue
+    index.reasons  # Counter of skip reasons for the run summary
+
+The index is a snapshot: a listing dismissed while the run is in flight is
+caught by the next run.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from collections import Counter, defaultdict
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Listings in these statuses never come back through a scrape.
+SKIP_STATUSES = ("purchased", "rejected", "dismissed")
+
+# Addresses shorter than this (after normalization) are too vague to match on.
+MIN_ADDRESS_LEN = 10
+
+# Skip reasons (keys of ListingDedupIndex.reasons).
+REASON_URL = "handled_url"            # same source_url dismissed/purchased/rejected
+REASON_ADDRESS = "handled_address"    # same address dismissed/purchased/rejected
+REASON_INVENTORY = "inventory_address"  # already a Maninos property
+REASON_STATUS = "existing_status"     # source_url exists in another non-available status
+
+_PAGE_SIZE = 1000
+
+# Listing title noise (applied globally, not just prefix)
+_NOISE = [re.compile(p, re.IGNORECASE) for p in (
+    r'for\s+sale\.?',
+    r'\bfeatured\b',
+    r'\bmobile\s+home\b',
+    r'\bsingle\s+section\b',
+    r'\bdouble\s+wide\b',
+    r'\bmanufactured\s+home\b',
+    r'^(19|20)\d{2}\s+[a-z]+\s+',  # "2022 BLISS " year prefix at start (only 1900-2099)
+)]
+_COMMA = re.compile(r'\s*,\s*')
+_UNIT = re.compile(r'\s*#\s*')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_address(address: str) -> str:
+    """
+    Extract and normalize the street part from an address for dedup matching.
+    Removes listing title noise like '2022 BLISS single section for sale.'
+    and normalizes all whitespace/punctuation.
+    """
+    if not address:
+        return ""
+    addr = address.strip().lower()
+    for pattern in _NOISE:
+        addr = pattern.sub(' ', addr)
+    # Normalize punctuation: remove dots, normalize comma-space
+    addr = addr.replace('.', ' ')
+    addr = _COMMA.sub(', ', addr)  # uniform ", " after commas
+    addr = _UNIT.sub(' #', addr)   # uniform " #" before unit numbers
+    # Collapse all whitespace, drop leading/trailing commas
+    return _SPACES.sub(' ', addr).strip().strip(', ')
+
+
+def _trigrams(s: str) -> set:
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+class AddressIndex:
+    """Normalized addresses, answering "is there one that contains the query
+    or is contained in it?" without scanning them all."""
+
+    def __init__(self, addresses: Iterable[str] = ()):
+        self._addresses: set[str] = set()
+        self._lengths: set[int] = set()
+        self._by_trigram: dict[str, set[str]] = defaultdict(set)
+        for a in addresses:
+            self.add(a)
+
+    def __len__(self) -> int:
+        return len(self._addresses)
+
+    def add(self, normalized: str) -> None:
+        if not normalized or normalized in self._addresses:
+            return
+        self._addresses.add(normalized)
+        self._lengths.add(len(normalized))
+        for g in _trigrams(normalized):
+            self._by_trigram[g].add(normalized)
+
+    def find(self, normalized: str) -> Optional[str]:
+        """An indexed address that contains `normalized` or is contained in
+        it (the first found), or None."""
+        if not normalized:
+            return None
+        if normalized in self._addresses:
+            return normalized
+        # Indexed address inside the query: probe its substrings per length.
+        n = len(normalized)
+        for length in self._lengths:
+            if length < n:
+                for i in range(n - length + 1):
+                    sub = normalized[i:i + length]
+                    if sub in self._addresses:
+                        return sub
+        # Query inside an indexed address: every trigram of the query must be
+        # in it — intersect the posting lists, rarest first.
+        grams = _trigrams(normalized)
+        if not grams:
+            return next((a for a in self._addresses if normalized in a), None)
+        postings = sorted((self._by_trigram.get(g, ()) for g in grams), key=len)
+        if not postings[0]:
+            return None
+        candidates = set(postings[0])
+        for p in postings[1:]:
+            candidates &= p
+            if not candidates:
+                return None
+        return next((a for a in candidates if normalized in a), None)
+
+
+def _fetch_all(db, table: str, columns: str, build=lambda q: q) -> list:
+    rows: list = []
+    offset = 0
+    while True:
+        q = build(db.table(table).select(columns))
+        batch = q.range(offset, offset + _PAGE_SIZE - 1).execute().data or []
+        rows.extend(batch)
+        if len(batch) < _PAGE_SIZE:
+            return rows
+        offset += _PAGE_SIZE
+
+
+class ListingDedupIndex:
+    """What an ingest run must not (re)create, loaded once, queried in memory."""
+
+    def __init__(self, listings: Iterable[dict] = (), properties: Iterable[dict] = ()):
+        self.url_status: dict[str, str] = {}
+        self.handled = AddressIndex()
+        self.inventory = AddressIndex()
+        self.reasons: Counter = Counter()
+        for row in listings:
+            status = row.get("status")
+            if not status or status == "available":
+                continue
+            if row.get("source_url"):
+                self.url_status[row["source_url"]] = status
+            if status in SKIP_STATUSES:
+                self.handled.add(normalize_address(row.get("address") or ""))
+        for prop in properties:
+            self.inventory.add(normalize_address(prop.get("address") or ""))
+
+    @classmethod
+    def load(cls, db) -> "ListingDedupIndex":
+        """Two paginated reads: non-available market_listings and properties.
+        On a read error the index is empty — ingest goes on without dedup,
+        as the per-listing check did."""
+        try:
+            listings = _fetch_all(db, "market_listings", "source_url, status, address",
+                                  lambda q: q.neq("status", "available").order("id"))
+            properties = _fetch_all(db, "properties", "id, address", lambda q: q.order("id"))
+        except Exception as e:
+            logger.warning(f"[Dedup] Could not load dedup index: {e}")
+            return cls()
+        index = cls(listings, properties)
+        logger.info(f"[Dedup] Index: {len(index.url_status)} non-available urls, "
+                    f"{len(index.handled)} handled addresses, {len(index.inventory)} properties")
+        return index
+
+    def skip_reason(self, source_url: str, address: str) -> Optional[str]:
+        """Why this listing is already purchased / rejected / dismissed / in
+        inventory, or None if it may be saved:
+          1. source_url of a dismissed/purchased/rejected listing (exact),
+          2. same normalized address as one (catches URL variations),
+          3. normalized address of a Maninos property.
+        Addresses match when one contains the other; addresses shorter than
+        MIN_ADDRESS_LEN are never matched."""
+        if source_url and self.url_status.get(source_url) in SKIP_STATUSES:
+            return REASON_URL
+        normalized = normalize_address(address) if address else ""
+        if len(normalized) < MIN_ADDRESS_LEN:
+            return None
+        match = self.handled.find(normalized)
+        if match:
+            logger.info(f"[Dedup] Address match (dismissed/skipped): '{normalized}' ↔ '{match}'")
+            return REASON_ADDRESS
+        match = self.inventory.find(normalized)
+        if match:
+            logger.info(f"[Dedup] Address match (property): '{normalized}' ↔ '{match}'")
+            return REASON_INVENTORY
+        return None
+
+    def check(self, source_url: str, address: str) -> Optional[str]:
+        """skip_reason(), counted in `reasons`."""
+        reason = self.skip_reason(source_url, address)
+        if reason:
+            self.reasons[reason] += 1
+        return reason
+
+    def existing_status(self, source_url: str) -> Optional[str]:
+        """Status of an existing non-available listing with this source_url."""
+        return self.url_status.get(source_url) if source_url else None
@@ -0,0 +1,193 @@
+"""
+Batched save stage for partner-listing refreshes (VMF Homes, 21st Mortgage).
+
+The scheduler job and POST /public/properties/partners/refresh both saved
+~300 scraped listings one at a time: a SELECT for the existing status, then
+an UPSERT — two round-trips per listing. `ingest_partner_listings` does the
+same work in a handful:
+
+  1. one `in_("source_url", …)` lookup per LOOKUP_CHUNK urls for the rows
+     that already exist,
+  2. in memory: listings whose row is in any status but 'available' are
+     left alone (never resurrect purchased / rejected / dismissed), the
+     rest are split into inserted / updated / unchanged by comparing the
+     stored content_hash with the scraped listing's (migration 111,
+     api/utils/listing_fingerprint.py) and, when the caller sets them, the
+     qualification flags (not part of the fingerprint),
+  3. inserted + updated rows go out as multi-row upserts of UPSERT_CHUNK,
+  4. unchanged rows are not written — except that `scraped_at` is bumped
+     once it is older than TOUCH_AFTER, so the 14-day expiry job still sees
+     listings that are live on the partner site,
+  5. a changed price is recorded in market_listing_events (one insert).
+
+A chunk the database rejects is retried row by row so one bad listing
+doesn't drop the others. Counts come back per source.
+"""
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from api.utils.listing_fingerprint import listing_fingerprint
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_CHUNK = 150   # source_urls per in_() filter (keeps the GET URL short)
+UPSERT_CHUNK = 100
+# Unchanged listings get scraped_at refreshed when it is older than this
+# (well inside the 14-day expiry, far less often than every 6-hour refresh).
+TOUCH_AFTER = timedelta(days=3)
+
+_COUNTS = ("inserted", "updated", "unchanged", "preserved", "failed", "price_drops")
+# Extra columns the public refresh sets (partner_listing_row(**extra)) and
+# the scheduler job doesn't; compared only when the row carries them.
+_QUALIFICATION = ("passes_70_rule", "passes_age_rule", "passes_location_rule", "is_qualified")
+
+
+def partner_listing_row(listing, **extra) -> dict:
+    """A ScrapedListing → market_listings row (status 'available')."""
+    row = {
+        "source": listing.source,
+        "source_url": listing.source_url,
+        "source_id": listing.source_id,
+        "address": listing.address,
+        "city": listing.city,
+        "state": listing.state,
+        "zip_code": listing.zip_code,
+        "listing_price": listing.listing_price,
+        "year_built": listing.year_built or 2000,
+        "sqft": listing.sqft,
+        "bedrooms": listing.bedrooms,
+        "bathrooms": listing.bathrooms,
+        "photos": listing.photos,
+        "thumbnail_url": listing.thumbnail_url,
+        "scraped_at": listing.scraped_at or datetime.now().isoformat(),
+        "status": "available",
+        "content_hash": listing.content_hash,
+    }
+    row.update(extra)
+    return row
+
+
+def _chunks(items: list, size: int) -> Iterable[list]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def fetch_existing(db, urls: list, columns: str) -> tuple:
+    """market_listings rows for `urls`, keyed by source_url — one in_()
+    lookup per LOOKUP_CHUNK urls. Returns (rows, round_trips)."""
+    existing = {}
+    round_trips = 0
+    for chunk in _chunks(urls, LOOKUP_CHUNK):
+        res = db.table("market_listings").select(columns).in_("source_url", chunk).execute()
+        round_trips += 1
+        for r in res.data or []:
+            existing[r["source_url"]] = r
+    return existing, round_trips
+
+
+def _older_than(stamp: Optional[str], age: timedelta, now: datetime) -> bool:
+    if not stamp:
+        return True
+    try:
+        seen = datetime.fromisoformat(stamp.replace("Z", "+00:00"))
+    except ValueError:
+        return True
+    if seen.tzinfo is None:
+        seen = seen.replace(tzinfo=timezone.utc)
+    return now - seen > age
+
+
+def _upsert(db, rows: list) -> set:
+    """Upsert rows; returns the source_urls that failed."""
+    try:
+        db.table("market_listings").upsert(rows, on_conflict="source_url").execute()
+        return set()
+    except Exception as e:
+        if len(rows) == 1:
+            logger.warning(f"[PartnerIngest] Error saving {rows[0]['source_url']}: {e}")
+            return {rows[0]["source_url"]}
+        logger.warning(f"[PartnerIngest] Upsert of {len(rows)} listings failed ({e}); retrying one by one")
+    failed = set()
+    for row in rows:
+        failed |= _upsert(db, [row])
+    return failed
+
+
+def ingest_partner_listings(db, rows: list) -> dict:
+    """Save market_listings rows (see partner_listing_row) in bulk.
+
+    Returns {"by_source": {source: {inserted, updated, unchanged, preserved,
+    failed, price_drops}}, "saved": inserted + updated + unchanged,
+    "price_events": [market_listing_events rows], "round_trips": n}."""
+    # Last one wins if a source lists the same url twice — a multi-row upsert
+    # can't touch the same conflict key twice.
+    by_url = {r["source_url"]: r for r in rows if r.get("source_url")}
+    existing, round_trips = fetch_existing(
+        db, list(by_url),
+        ", ".join(("id", "status", "source_url", "content_hash", "listing_price", "scraped_at")
+                  + _QUALIFICATION))
+
+    now = datetime.now(timezone.utc)
+    outcome = {}
+    to_upsert, to_touch, events = [], [], []
+    for url, row in by_url.items():
+        current = existing.get(url)
+        row.setdefault("content_hash", listing_fingerprint(row))
+        if current is None:
+            outcome[url] = "inserted"
+            to_upsert.append(row)
+        elif current.get("status") not in ("available", None):
+            outcome[url] = "preserved"
+        elif current.get("content_hash") != row["content_hash"] or any(
+                k in row and row[k] != current.get(k) for k in _QUALIFICATION):
+            outcome[url] = "updated"
+            to_upsert.append(row)
+            old, new = current.get("listing_price"), row.get("listing_price")
+            if old is not None and new is not None and round(float(old), 2) != round(float(new), 2):
+                events.append({
+                    "listing_id": current.get("id"),
+                    "source": row.get("source"),
+                    "source_url": url,
+                    "event_type": "price_drop" if float(new) < float(old) else "price_increase",
+                    "old_price": float(old),
+                    "new_price": float(new),
+                })
+        else:
+            outcome[url] = "unchanged"
+            if _older_than(current.get("scraped_at"), TOUCH_AFTER, now):
+                to_touch.append(url)
+
+    for chunk in _chunks(to_upsert, UPSERT_CHUNK):
+        for url in _upsert(db, chunk):
+            outcome[url] = "failed"
+        round_trips += 1
+
+    for chunk in _chunks(to_touch, UPSERT_CHUNK):
+        try:
+            db.table("market_listings").update({"scraped_at": datetime.now().isoformat()}) \
+                .in_("source_url", chunk).execute()
+        except Exception as e:
+            logger.warning(f"[PartnerIngest] Could not refresh scraped_at for {len(chunk)} listings: {e}")
+        round_trips += 1
+
+    events = [e for e in events if outcome[e["source_url"]] == "updated"]
+    if events:
+        try:
+            db.table("market_listing_events").insert(events).execute()
+        except Exception as e:
+            logger.warning(f"[PartnerIngest] Could not record {len(events)} price events: {e}")
+        round_trips += 1
+
+    by_source = defaultdict(lambda: dict.fromkeys(_COUNTS, 0))
+    for url, result in outcome.items():
+        by_source[by_url[url].get("source") or "unknown"][result] += 1
+    for e in events:
+        if e["event_type"] == "price_drop":
+            by_source[e["source"] or "unknown"]["price_drops"] += 1
+    saved = sum(c["inserted"] + c["updated"] + c["unchanged"] for c in by_source.values())
+    return {"by_source": dict(by_source), "saved": saved, "price_events": events,
+            "round_trips": round_trips}
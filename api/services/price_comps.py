@@ -0,0 +1,243 @@
+"""
+Versioned comps for the price predictor (migration 113).
+
+api/utils/price_predictor.py used to know only the 93 houses in
+data/historico_2025.json. Houses sold since then became comps only after
+someone edited the file and redeployed. The comps now live in
+`price_comp_snapshots`:
+
+  - build_comps(db) puts together the 2025 seed and every house sold from
+    SEED_CUTOFF on (sales 'paid' / 'completed' joined to properties; the
+    renovation cost is properties.renovation_cost, or else the latest
+    renovations.total_cost), in the seed's record format;
+  - publish_snapshot(db, records) stores that set under its content hash
+    (price_predictor.dataset_version) and makes it the active version.
+    The active version is the row with the latest published_at, so
+    publishing an already-stored version is a rollback;
+  - refresh_active_dataset(db) runs in every API process (scheduler, every
+    few minutes). It reads just the active version, and only when that
+    differs from the in-memory one does it download the records, build the
+    feature arrays and swap them in with price_predictor.install_dataset.
+
+Every prediction carries `dataset_version`, so a number shown to an
+employee can be traced back to the exact set of houses it was computed
+from. If the table is unreachable, the process keeps the dataset it has
+(the seed file at worst).
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from api.utils import price_predictor
+from api.utils.price_predictor import ComparablesDataset, classify_home_type, dataset_version
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_TABLE = "price_comp_snapshots"
+CLOSED_STATUSES = ("paid", "completed")
+# Sales that closed before this are already in data/historico_2025.json.
+SEED_CUTOFF = "2026-01-01"
+_PAGE_SIZE = 1000
+_IN_CHUNK = 200
+
+
+# ---------------------------------------------------------------- building
+
+def _closed_sales(db: Any) -> List[dict]:
+    """The latest paid/completed sale per property that closed from SEED_CUTOFF on."""
+    rows: List[dict] = []
+    offset = 0
+    while True:
+        batch = (
+            db.table("sales")
+            .select("id, property_id, sale_price, status, completed_at, created_at")
+            .in_("status", list(CLOSED_STATUSES))
+            .order("id")
+            .range(offset, offset + _PAGE_SIZE - 1)
+            .execute().data or []
+        )
+        rows.extend(batch)
+        if len(batch) < _PAGE_SIZE:
+            break
+        offset += _PAGE_SIZE
+
+    latest: Dict[str, dict] = {}
+    for s in rows:
+        closed = str(s.get("completed_at") or s.get("created_at") or "")
+        if not s.get("property_id") or closed < SEED_CUTOFF:
+            continue
+        s["closed_at"] = closed
+        prev = latest.get(s["property_id"])
+        if prev is None or closed > prev["closed_at"]:
+            latest[s["property_id"]] = s
+    return sorted(latest.values(), key=lambda s: (s["closed_at"], s["id"]))
+
+
+def _fetch_by_property(db: Any, table: str, columns: str, key: str, ids: List[str]) -> List[dict]:
+    rows: List[dict] = []
+    for i in range(0, len(ids), _IN_CHUNK):
+        q = db.table(table).select(columns).in_(key, ids[i:i + _IN_CHUNK])
+        if table == "renovations":
+            q = q.order("created_at", desc=True)
+        rows.extend(q.execute().data or [])
+    return rows
+
+
+def _num(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def sale_to_comp(sale: dict, prop: dict, renovation_cost: Optional[float]) -> Optional[Dict[str, Any]]:
+    """One closed sale as a price_predictor record (None without both prices)."""
+    compra = _num(prop.get("purchase_price"))
+    venta = _num(sale.get("sale_price")) or _num(prop.get("sale_price"))
+    if not compra or compra <= 0 or not venta or venta <= 0:
+        return None
+
+    remo = _num(prop.get("renovation_cost"))
+    if remo is None:
+        remo = renovation_cost or 0.0
+    width = _num(prop.get("width_ft"))
+    length = _num(prop.get("length_ft"))
+    sqft = _num(prop.get("square_feet")) or (width * length if width and length else None)
+    bedrooms = prop.get("bedrooms")
+    if width:
+        tipo = "DOUBLE" if width >= 24 else "SINGLE"
+    else:
+        tipo = classify_home_type(sqft, bedrooms)
+
+    inversion = compra + remo
+    ganancia = venta - inversion
+    return {
+        "id": prop.get("property_code") or f"P-{str(prop['id'])[:8]}",
+        "tipo": tipo,
+        "cuartos": bedrooms,
+        "banos": _num(prop.get("bathrooms")),
+        "ancho_ft": width,
+        "largo_ft": length,
+        "sqft": sqft,
+        "precio_compra": compra,
+        "remodelacion": round(remo, 2),
+        "precio_venta": venta,
+        "inversion_con_remo": round(inversion, 2),
+        "ganancia_con_remo": round(ganancia, 2),
+        "margen_con_remo_pct": round(ganancia / inversion * 100, 1) if inversion > 0 else None,
+        "property_id": str(prop["id"]),
+        "sale_id": str(sale["id"]),
+        "fecha_venta": sale["closed_at"][:10],
+    }
+
+
+def closed_sale_comps(db: Any) -> List[Dict[str, Any]]:
+    """Comps for every house sold from SEED_CUTOFF on, oldest sale first."""
+    sales = _closed_sales(db)
+    if not sales:
+        return []
+    ids = [s["property_id"] for s in sales]
+    props = {
+        p["id"]: p for p in _fetch_by_property(
+            db, "properties",
+            "id, property_code, purchase_price, sale_price, bedrooms, bathrooms, "
+            "square_feet, width_ft, length_ft, renovation_cost",
+            "id", ids)
+    }
+    reno_costs: Dict[str, float] = {}
+    for r in _fetch_by_property(db, "renovations", "property_id, total_cost, created_at", "property_id", ids):
+        reno_costs.setdefault(r["property_id"], _num(r.get("total_cost")) or 0.0)
+
+    comps = []
+    for s in sales:
+        prop = props.get(s["property_id"])
+        comp = sale_to_comp(s, prop, reno_costs.get(s["property_id"])) if prop else None
+        if comp:
+            comps.append(comp)
+    return comps
+
+
+def build_comps(db: Any) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """(records, counts by source): the 2025 seed followed by the houses sold since."""
+    seed = price_predictor.usable_records(price_predictor.load_seed_records())
+    sold = closed_sale_comps(db)
+    return seed + sold, {"seed_2025": len(seed), "sales": len(sold)}
+
+
+# --------------------------------------------------------------- the store
+
+def active_snapshot(db: Any) -> Optional[dict]:
+    """{version, record_count, published_at} of the active snapshot, or None."""
+    rows = (
+        db.table(SNAPSHOT_TABLE)
+        .select("version, record_count, published_at")
+        .order("published_at", desc=True)
+        .limit(1)
+        .execute().data or []
+    )
+    return rows[0] if rows else None
+
+
+def publish_snapshot(db: Any, records: List[Dict[str, Any]],
+                     sources: Optional[Dict[str, int]] = None) -> dict:
+    """Store `records` (if new) and make them the active version."""
+    version = dataset_version(records)
+    active = active_snapshot(db)
+    if active and active["version"] == version:
+        return {"version": version, "published": False, "record_count": len(records)}
+
+    now = datetime.now(timezone.utc).isoformat()
+    stored = db.table(SNAPSHOT_TABLE).select("version").eq("version", version).execute().data
+    if stored:
+        db.table(SNAPSHOT_TABLE).update({"published_at": now}).eq("version", version).execute()
+    else:
+        db.table(SNAPSHOT_TABLE).insert({
+            "version": version,
+            "records": records,
+            "record_count": len(records),
+            "sources": sources or {},
+            "built_at": now,
+            "published_at": now,
+        }).execute()
+    logger.info(f"[price_comps] Published comps version {version} ({len(records)} houses, "
+                f"sources={sources}), was {active['version'] if active else None}")
+    return {"version": version, "published": True, "record_count": len(records),
+            "previous_version": active["version"] if active else None}
+
+
+def refresh_active_dataset(db: Any) -> dict:
+    """Swap the published comps into this process when their version changed."""
+    current = price_predictor.get_dataset()
+    current_version = current.version if current else None
+    try:
+        active = active_snapshot(db)
+        if not active:
+            return {"version": current_version, "changed": False, "reason": "no published snapshot"}
+        if active["version"] == current_version:
+            return {"version": current_version, "changed": False}
+
+        rows = db.table(SNAPSHOT_TABLE).select("records").eq("version", active["version"]).execute().data
+        if not rows:
+            return {"version": current_version, "changed": False, "reason": "snapshot vanished"}
+        dataset = ComparablesDataset.from_records(rows[0]["records"], source="store",
+                                                  version=active["version"])
+    except Exception as e:
+        logger.warning(f"[price_comps] Could not refresh comps, keeping {current_version}: {e}")
+        return {"version": current_version, "changed": False, "error": str(e)}
+
+    price_predictor.install_dataset(dataset)
+    return {"version": dataset.version, "changed": True, "previous_version": current_version,
+            "record_count": len(dataset.records)}
+
+
+def rebuild_and_publish(db: Any) -> dict:
+    """Build the comps from the seed + closed sales, publish, and load them here."""
+    records, sources = build_comps(db)
+    if not records:
+        return {"published": False, "reason": "no comps"}
+    result = publish_snapshot(db, records, sources)
+    result["sources"] = sources
+    result["refresh"] = refresh_active_dataset(db)
+    return result
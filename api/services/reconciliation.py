@@ -0,0 +1,641 @@
+"""
+Bank-statement reconciliation matcher (Homes).
+
+Pairs statement movements with unreconciled ledger bank legs
+(`match_movements_to_transactions`) and with open invoices
+(`match_movements_to_invoices`). Used by
+POST /api/accounting/bank-statements/{id}/reconcile.
+
+The scoring rules are unchanged from the original in-route matcher; what
+changed is how candidates are found:
+
+  - Every candidate is prepared ONCE: date parsed, counterparty/description
+    normalized and tokenized (`PreparedName`). The inner loop never calls
+    strptime or the regex again.
+  - Transactions are bucketed by direction (is_income) and kept sorted by
+    amount. A movement only scores the rows inside its ±1% / ±$0.01 amount
+    window (`amount_window`, a bisect) — rows outside it were always
+    discarded by the scorer, so results are identical to the full scan.
+    A candidate whose amount+date score can't beat the current best even
+    with a perfect name skips the name comparison.
+  - Invoices are bucketed by direction. Amount can't prune them (partial
+    payments match any larger remaining balance), but preparation still
+    removes the per-pair parsing.
+
+Ties keep the original behaviour: the first candidate in input order wins.
+"""
+from __future__ import annotations
+
+import re
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from heapq import heappop, heappush
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Optional
+
+# Two amounts are the same payment when they differ by < $0.01 or < 1%.
+AMOUNT_ABS_TOLERANCE = 0.01
+AMOUNT_PCT_TOLERANCE = 0.01
+
+_NAME_NOISE = (
+    "zelle payment from ", "wire transfer in - ", "wire transfer - ",
+    "check #", "ach debit - ", "ach credit - ", "transfer from ",
+    "transfer to ", "payment from ", "payment to ",
+    "venta contado - ", "compra propiedad: ", "compra: ",
+)
+_NON_NAME_RE = re.compile(r'[^a-záéíóúñü\s]')
+
+
+# ---------------------------------------------------------------------------
+# Names
+# ---------------------------------------------------------------------------
+
+def normalize_name(name: str) -> str:
+    """Normalize a counterparty name for comparison."""
+    name = name.lower().strip()
+    # Remove common prefixes/suffixes
+    for noise in _NAME_NOISE:
+        name = name.replace(noise, "")
+    # Remove non-alphanumeric except spaces
+    return _NON_NAME_RE.sub('', name).strip()
+
+
+@dataclass(frozen=True, eq=False)   # identity hash: cheap cache key
+class PreparedName:
+    raw: str
+    norm: str
+    tokens: frozenset
+
+
+@lru_cache(maxsize=8192)
+def prepare_name(raw: Optional[str]) -> Optional[PreparedName]:
+    """Normalize + tokenize once. None for empty input (never compared).
+    Cached: statements and ledgers repeat the same counterparties."""
+    if not raw:
+        return None
+    norm = normalize_name(raw)
+    return PreparedName(raw=raw, norm=norm, tokens=frozenset(norm.split()))
+
+
+@lru_cache(maxsize=65536)
+def prepared_similarity(a: PreparedName, b: PreparedName) -> float:
+    """`name_similarity` on already-prepared names (0.0 to 1.0)."""
+    n1, n2 = a.norm, b.norm
+    if not n1 or not n2:
+        return 0.0
+
+    # Exact match after normalization
+    if n1 == n2:
+        return 1.0
+
+    # One contains the other
+    if n1 in n2 or n2 in n1:
+        return 0.9
+
+    # Token overlap
+    if not a.tokens or not b.tokens:
+        return 0.0
+    total = max(len(a.tokens), len(b.tokens))
+    return len(a.tokens & b.tokens) / total if total > 0 else 0.0
+
+
+def name_similarity(name1: str, name2: str) -> float:
+    """Calculate similarity between two names (0.0 to 1.0)."""
+    a, b = prepare_name(name1 or ""), prepare_name(name2 or "")
+    if a is None or b is None:
+        return 0.0
+    return prepared_similarity(a, b)
+
+
+def _best_similarity(left: tuple, right: tuple) -> float:
+    best = 0.0
+    for a in left:
+        if a is None:
+            continue
+        for b in right:
+            if b is not None:
+                best = max(best, prepared_similarity(a, b))
+    return best
+
+
+# ---------------------------------------------------------------------------
+# Dates / amounts
+# ---------------------------------------------------------------------------
+
+def parse_iso_date(value) -> Optional[date]:
+    """YYYY-MM-DD → date; None for empty or anything else (as the matcher
+    always treated unparseable dates)."""
+    if not value:
+        return None
+    try:
+        if len(value) == 10 and value[4] == "-" and value[7] == "-":
+            return date.fromisoformat(value)   # same result, ~20x cheaper
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def amount_window(amount: float) -> tuple[float, float]:
+    """Closed [lo, hi] that contains every amount the matcher could accept
+    for `amount` (slightly padded — the exact test is `_amount_points`)."""
+    lo = min(amount * (1 - AMOUNT_PCT_TOLERANCE), amount - AMOUNT_ABS_TOLERANCE)
+    hi = max(amount / (1 - AMOUNT_PCT_TOLERANCE), amount + AMOUNT_ABS_TOLERANCE)
+    pad = 1e-9 * max(1.0, amount)
+    return lo - pad, hi + pad
+
+
+def _amount_points(mv_amount: float, txn_amount: float) -> int:
+    """50 exact, 35 within 1%, 0 = not a candidate."""
+    if mv_amount <= 0 or txn_amount <= 0:
+        return 0
+    diff = abs(mv_amount - txn_amount)
+    if diff < AMOUNT_ABS_TOLERANCE:
+        return 50
+    if diff / max(mv_amount, txn_amount) < AMOUNT_PCT_TOLERANCE:
+        return 35
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Match explanation
+# ---------------------------------------------------------------------------
+
+def match_signals(name_sim: float, diff_days, partial: bool) -> tuple:
+    """Build the transparency payload for a match: which signals corroborate it
+    (amount / name / date), the name-similarity %, and a short human 'reason' so
+    the reconciliation UI can show WHY it's a match and HOW sure it is — instead
+    of the app matching silently."""
+    name_ok = name_sim >= 0.4
+    date_ok = diff_days is not None and diff_days <= 3
+    signals = {
+        "amount": True,   # amount is a precondition for every match
+        "name": name_ok,
+        "date": date_ok,
+        "name_similarity": round(name_sim * 100),
+        "days_apart": diff_days,
+    }
+    parts = ["monto coincide"]
+    parts.append(f"nombre {round(name_sim*100)}%" if name_ok else "nombre no coincide")
+    if diff_days is not None:
+        parts.append("misma fecha" if diff_days == 0 else f"±{diff_days} días")
+    reason = " · ".join(parts)
+    if partial:
+        reason = "pago parcial · " + reason
+    # A caveat line the UI can surface when it's not a sure thing.
+    caveat = None
+    if not name_ok:
+        caveat = "La app NO está segura: coincide el monto pero el nombre no. Revísalo."
+    elif not date_ok and diff_days is not None:
+        caveat = "Revisa: el nombre coincide pero las fechas están algo separadas."
+    return signals, reason, caveat
+
+
+# ---------------------------------------------------------------------------
+# Movements ↔ ledger transactions
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class _Movement:
+    row: dict
+    amount: float
+    is_credit: bool
+    day: Optional[date]
+    names: tuple
+
+
+def _prepare_movement(mv: dict) -> _Movement:
+    return _Movement(
+        row=mv,
+        amount=abs(float(mv.get("amount", 0))),
+        is_credit=bool(mv.get("is_credit", False)),
+        day=parse_iso_date(mv.get("movement_date", "")),
+        # Also check description for counterparty clues
+        names=(prepare_name(mv.get("counterparty") or ""), prepare_name(mv.get("description") or "")),
+    )
+
+
+@dataclass(frozen=True)
+class _Candidate:
+    pos: int           # input order — tie-break
+    row: dict
+    amount: float
+    day: Optional[date]
+    names: tuple
+
+
+class TransactionIndex:
+    """Ledger rows bucketed by direction and sorted by amount."""
+
+    def __init__(self, transactions: list):
+        buckets: dict[bool, list[_Candidate]] = {True: [], False: []}
+        for pos, txn in enumerate(transactions):
+            amount = abs(float(txn.get("amount", 0)))
+            if amount <= 0:
+                continue  # never a candidate
+            buckets[bool(txn.get("is_income", False))].append(_Candidate(
+                pos=pos,
+                row=txn,
+                amount=amount,
+                day=parse_iso_date(txn.get("transaction_date", "")),
+                names=(prepare_name(txn.get("counterparty_name") or ""),
+                       prepare_name(txn.get("description") or "")),
+            ))
+        self._sorted: dict[bool, tuple[list[float], list[_Candidate]]] = {}
+        for direction, cands in buckets.items():
+            cands.sort(key=lambda c: (c.amount, c.pos))
+            self._sorted[direction] = ([c.amount for c in cands], cands)
+
+    def candidates(self, is_income: bool, amount: float) -> list[_Candidate]:
+        """Rows of this direction inside the amount window, in input order."""
+        if amount <= 0:
+            return []
+        amounts, cands = self._sorted[is_income]
+        lo, hi = amount_window(amount)
+        window = cands[bisect_left(amounts, lo):bisect_right(amounts, hi)]
+        window.sort(key=lambda c: c.pos)
+        return window
+
+
+def _date_points(diff_days: Optional[int]) -> int:
+    if diff_days is None:
+        return 0
+    if diff_days == 0:
+        return 30
+    if diff_days <= 1:
+        return 25
+    if diff_days <= 3:
+        return 15
+    if diff_days <= 7:
+        return 8
+    if diff_days <= 14:
+        return 3
+    return 0
+
+
+def _corroborated(name_sim: float, diff_days: Optional[int]) -> bool:
+    """RELIABILITY RULE: a matching AMOUNT is necessary but NEVER sufficient on
+    its own (two different payments can share an amount). Require at least one
+    CORROBORATING signal — the counterparty name is similar, or the dates are
+    very close — so the wizard never proposes a coincidence."""
+    return name_sim >= 0.4 or (diff_days is not None and diff_days <= 3)
+
+
+def _transaction_match(mv: _Movement, txn: dict, score: int, name_sim: float, diff_days) -> dict:
+    # High confidence (auto-selectable) only with a STRONG signal: a clear
+    # name match, or a same-day exact-amount hit. Otherwise it's a
+    # suggestion the operator must confirm.
+    strong = name_sim >= 0.7 or (name_sim >= 0.4 and diff_days == 0)
+    signals, reason, caveat = match_signals(name_sim, diff_days, False)
+    return {
+        "movement_id": mv.row["id"],
+        "transaction_id": txn["id"],
+        "target_type": "transaction",
+        "score": score,
+        "confidence": "high" if strong else "medium",
+        "signals": signals,
+        "reason": reason,
+        "caveat": caveat,
+        "movement": mv.row,
+        "transaction": txn,
+    }
+
+
+def match_movements_to_transactions(movements: list, transactions: list) -> list:
+    """Match bank statement movements against existing accounting transactions.
+    Returns list of match dicts with scores.
+
+    Greedy: movements are taken in order and each claims its best unused
+    transaction. See `assign_movements_to_transactions` for the global mode."""
+    index = TransactionIndex(transactions)
+    matches = []
+    used_txn_ids = set()
+
+    for mv in map(_prepare_movement, movements):
+        best_match = None
+        best_score = 0
+        best_name_sim = 0.0
+        best_diff_days = None
+
+        # Direction must agree (credit=income, debit=expense) and the amount
+        # must match within 1% — the index only yields rows that satisfy both.
+        for cand in index.candidates(mv.is_credit, mv.amount):
+            if cand.row["id"] in used_txn_ids:
+                continue
+            score = _amount_points(mv.amount, cand.amount)
+            if not score:
+                continue  # amount too different → not a candidate
+
+            # Date proximity
+            diff_days = abs((mv.day - cand.day).days) if mv.day and cand.day else None
+            score += _date_points(diff_days)
+
+            # The name adds at most 20 and only a strictly higher score
+            # replaces the best, so skip the similarity when it can't win.
+            if score + 20 <= best_score:
+                continue
+
+            # Counterparty similarity (name in either field of either side)
+            name_sim = _best_similarity(mv.names, cand.names)
+            score += int(20 * name_sim)
+
+            if score > best_score:
+                best_score = score
+                best_match = cand.row
+                best_name_sim = name_sim
+                best_diff_days = diff_days
+
+        # Amount-only "matches" are dropped (see _corroborated).
+        if not best_match or not _corroborated(best_name_sim, best_diff_days):
+            continue
+
+        used_txn_ids.add(best_match["id"])
+        matches.append(_transaction_match(mv, best_match, best_score, best_name_sim, best_diff_days))
+
+    return matches
+
+
+def assign_movements_to_transactions(movements: list, transactions: list) -> list:
+    """Global variant of `match_movements_to_transactions`.
+
+    The greedy pass lets an early, weakly corroborated movement claim a
+    transaction that a later movement matches perfectly; the later one is
+    then left for manual work. Here every corroborated (movement,
+    transaction) pair is an edge weighted by its score, and the matches are
+    the maximum-total-score assignment over that graph — each movement and
+    each transaction used at most once. Scores, confidence and the
+    `match_signals` payload are computed exactly as in the greedy pass.
+
+    Candidates come from the same amount index, so the graph is sparse and
+    each augmenting search stays local (see `max_weight_matching`).
+
+    Returns match dicts in movement order.
+    """
+    index = TransactionIndex(transactions)
+    prepared = [_prepare_movement(mv) for mv in movements]
+    edges = []          # (movement idx, transaction id, score)
+    details = {}        # (movement idx, transaction id) → (txn row, name_sim, diff_days, score)
+
+    for i, mv in enumerate(prepared):
+        for cand in index.candidates(mv.is_credit, mv.amount):
+            score = _amount_points(mv.amount, cand.amount)
+            if not score:
+                continue
+            diff_days = abs((mv.day - cand.day).days) if mv.day and cand.day else None
+            name_sim = _best_similarity(mv.names, cand.names)
+            if not _corroborated(name_sim, diff_days):
+                continue
+            score += _date_points(diff_days) + int(20 * name_sim)
+            key = (i, cand.row["id"])
+            if key in details and details[key][3] >= score:
+                continue  # duplicate transaction id: keep the first best row
+            details[key] = (cand.row, name_sim, diff_days, score)
+            edges.append((i, cand.row["id"], score))
+
+    matches = []
+    for i, txn_id in sorted(max_weight_matching(edges), key=lambda pair: pair[0]):
+        txn, name_sim, diff_days, score = details[(i, txn_id)]
+        matches.append(_transaction_match(prepared[i], txn, score, name_sim, diff_days))
+    return matches
+
+
+def max_weight_matching(edges: list) -> list:
+    """Maximum-weight bipartite matching (not necessarily perfect).
+
+    `edges` is a list of (left, right, weight) with hashable node keys and
+    positive integer weights. Returns the matched (left, right) pairs.
+
+    Solved as an assignment problem: every left node also gets a private
+    "stay unmatched" node, edge costs are `top - weight` (dummy: `top`), and
+    left nodes are added one at a time with a Dijkstra shortest augmenting
+    path over reduced costs (Jonker–Volgenant style). Each search stops at
+    the first free right node it reaches, so on the sparse, pruned
+    reconciliation graph it only touches the neighbourhood of the new node.
+    """
+    adj: dict = {}
+    for left, right, weight in edges:
+        rights = adj.setdefault(left, {})
+        if weight > rights.get(right, 0):
+            rights[right] = weight
+    if not adj:
+        return []
+
+    lefts = list(adj)
+    rights = list(dict.fromkeys(r for left in lefts for r in adj[left]))
+    r_index = {r: j for j, r in enumerate(rights)}
+    top = max(w for left in lefts for w in adj[left].values())
+    n, m = len(lefts), len(rights)
+    # Right node m + i is left i's "unmatched" option.
+    graph = [[(r_index[r], top - w) for r, w in adj[left].items()] + [(m + i, top)]
+             for i, left in enumerate(lefts)]
+    cost_of = [dict(row) for row in graph]
+    match_l, match_r = [-1] * n, [-1] * (m + n)
+    pot_l, pot_r = [0] * n, [0] * (m + n)
+
+    for source in range(n):
+        dist_l, dist_r, via = {source: 0}, {}, {}
+        done_l, done_r = [], []
+        heap = [(0, 0, source)]
+        target = -1
+        while heap:
+            d, side, x = heappop(heap)
+            if side == 0:
+                if d > dist_l[x]:
+                    continue
+                done_l.append(x)
+                for j, cost in graph[x]:
+                    nd = d + cost + pot_l[x] - pot_r[j]
+                    if nd < dist_r.get(j, nd + 1):
+                        dist_r[j], via[j] = nd, x
+                        heappush(heap, (nd, 1, j))
+            else:
+                if d > dist_r[x]:
+                    continue
+                done_r.append(x)
+                i = match_r[x]
+                if i == -1:
+                    target = x
+                    break
+                nd = d - cost_of[i][x] + pot_r[x] - pot_l[i]
+                if nd < dist_l.get(i, nd + 1):
+                    dist_l[i] = nd
+                    heappush(heap, (nd, 0, i))
+
+        # Keep reduced costs non-negative: shift every settled node by its
+        # distance minus the augmenting path length.
+        bound = dist_r[target]
+        for i in done_l:
+            pot_l[i] += dist_l[i] - bound
+        for j in done_r:
+            pot_r[j] += dist_r[j] - bound
+
+        j = target
+        while True:
+            i = via[j]
+            j_prev = match_l[i]
+            match_l[i], match_r[j] = j, i
+            if i == source:
+                break
+            j = j_prev
+
+    return [(lefts[i], rights[j]) for i, j in enumerate(match_l) if j < m]
+
+
+# ---------------------------------------------------------------------------
+# Movements ↔ open invoices
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class _Invoice:
+    row: dict
+    counterparty: Optional[PreparedName]
+    number: str
+    days: tuple        # parsed (due_date, issue_date), None where missing
+
+
+def match_movements_to_invoices(movements: list, invoices: list) -> list:
+    """Match bank statement movements against open invoices (AR or AP), including
+    SPLIT / PARTIAL payments.
+
+    Why invoices (and not the transaction matcher) unlock split payments: the
+    exact-amount transaction matcher can't reconcile "$500 + $500 = a $1000
+    factura" because each $500 is 50% off the target. An invoice, however,
+    carries a `balance_due` and natively accumulates `amount_paid`, so it can
+    absorb several movements until it's settled. Each invoice therefore keeps a
+    running `remaining` balance that is decremented as movements are allocated,
+    letting one invoice take multiple movements in a single pass without
+    over-allocating.
+
+    Partial matches (a movement smaller than the remaining balance) are only
+    offered when something corroborates them — the counterparty name matches, or
+    the invoice number appears in the movement text — so a random small deposit
+    is never glued onto a large unrelated invoice. Matches carry a `partial`
+    flag so the UI can label them and skip auto-selecting them.
+
+    Returns match dicts with `target_type='invoice'` and `invoice_id` so
+    reconcile-confirm can branch on it (that endpoint already re-reads the
+    invoice per pair and accumulates amount_paid, so N partials settle correctly).
+    """
+    matches: list = []
+    # Running unallocated balance per invoice, decremented as we allocate.
+    remaining = {inv["id"]: float(inv.get("balance_due") or 0) for inv in invoices}
+
+    # Direction must agree:
+    #   deposit (is_credit=True)  → receivable (we get paid)
+    #   withdrawal (is_credit=False) → payable (we pay a bill)
+    by_direction: dict[bool, list[_Invoice]] = {True: [], False: []}
+    for inv in invoices:
+        direction = (inv.get("direction") or "").lower()
+        if direction not in ("receivable", "payable"):
+            continue
+        by_direction[direction == "receivable"].append(_Invoice(
+            row=inv,
+            counterparty=prepare_name(inv.get("counterparty_name") or ""),
+            number=(inv.get("invoice_number") or "").lower(),
+            days=(parse_iso_date(inv.get("due_date")), parse_iso_date(inv.get("issue_date"))),
+        ))
+
+    for mv in map(_prepare_movement, movements):
+        if mv.amount <= 0:
+            continue
+        mv_texts = tuple(n.raw.lower() for n in mv.names if n is not None)
+
+        best_match = None
+        best_score = 0
+        best_is_partial = False
+        best_name_sim_win = 0.0
+        best_diff_days_win = None
+
+        for inv in by_direction[mv.is_credit]:
+            rem = remaining.get(inv.row["id"], 0.0)
+            if rem <= 0.01:
+                continue  # already fully allocated by earlier movements
+
+            # Corroboration signals (name similarity / invoice number in text).
+            best_name_sim = _best_similarity(mv.names, (inv.counterparty,))
+            if inv.number and any(inv.number in t for t in mv_texts):
+                best_name_sim = 1.0
+
+            # ---- Amount scoring against the REMAINING balance ----
+            score = 0
+            is_partial = False
+            diff = abs(mv.amount - rem)
+            diff_pct = diff / max(mv.amount, rem)
+            if diff < 0.01:
+                score += 50            # settles the remaining balance exactly
+            elif diff_pct < 0.01:
+                score += 35
+            elif diff_pct < 0.05:
+                score += 15
+            elif mv.amount < rem:
+                # PARTIAL payment: only a candidate when corroborated, so we
+                # never glue an unrelated small deposit onto a large invoice.
+                if best_name_sim >= 0.5:
+                    score += 25
+                    is_partial = True
+                else:
+                    continue
+            else:
+                continue  # movement bigger than the remaining balance → not this invoice
+
+            # ---- Date proximity vs due_date or issue_date (best of the two) ----
+            this_diff_days = None
+            if mv.day:
+                for cmp_date in inv.days:
+                    if cmp_date is None:
+                        continue
+                    dd = abs((mv.day - cmp_date).days)
+                    this_diff_days = dd if this_diff_days is None else min(this_diff_days, dd)
+            if this_diff_days is not None:
+                if this_diff_days == 0:
+                    score += 30
+                elif this_diff_days <= 3:
+                    score += 20
+                elif this_diff_days <= 14:
+                    score += 10
+                elif this_diff_days <= 30:
+                    score += 5
+
+            score += int(20 * best_name_sim)
+
+            if score > best_score:
+                best_score = score
+                best_match = inv.row
+                best_is_partial = is_partial
+                best_name_sim_win = best_name_sim
+                best_diff_days_win = this_diff_days
+
+        # RELIABILITY RULE: never match a movement to an invoice on AMOUNT alone.
+        # Partials already require a name match above; for full/near-full matches
+        # require corroboration too — similar counterparty name, the invoice
+        # number in the movement text, or a date within a few days of the
+        # invoice. Otherwise two unrelated payments of the same amount would be
+        # matched by coincidence.
+        if best_match:
+            name_ok = best_name_sim_win >= 0.4
+            date_ok = best_diff_days_win is not None and best_diff_days_win <= 3
+            if not best_is_partial and not (name_ok or date_ok):
+                best_match = None  # amount-only → not a real match
+
+        if best_match and best_score >= 50:
+            rem_before = remaining.get(best_match["id"], 0.0)
+            remaining[best_match["id"]] = rem_before - mv.amount  # allocate this movement
+            # High (auto-selectable) only with a strong signal; else a suggestion.
+            strong = best_name_sim_win >= 0.7 or (best_name_sim_win >= 0.4 and best_diff_days_win == 0)
+            confidence = "high" if (strong and not best_is_partial) else "medium"
+            signals, reason, caveat = match_signals(best_name_sim_win, best_diff_days_win, best_is_partial)
+            matches.append({
+                "movement_id": mv.row["id"],
+                "invoice_id": best_match["id"],
+                "target_type": "invoice",
+                "score": best_score,
+                "confidence": confidence,
+                "partial": best_is_partial,
+                "signals": signals,
+                "reason": reason,
+                "caveat": caveat,
+                "movement": mv.row,
+                "invoice": best_match,
+            })
+
+    return matches
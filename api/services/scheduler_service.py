@@ -4,31 +4,129 @@ Background job scheduling for automated emails, reminders, alerts,
 and partner listing refresh.
 
 Uses APScheduler to run:
-1. Process pending scheduled emails (every 30 min)
+1. Drain the email outbox (every 20 s)
 2. RTO payment reminders (daily at 8am CT)
 3. RTO overdue alerts (daily at 9am CT)
 4. Portal sync (every 2 hours)
 5. Partner listings refresh — VMF Homes + 21st Mortgage (every 6 hours)
+6. Price comps: rebuild + publish from closed sales (daily 5am CT) and
+   hot-reload of the published version into this process (every 5 min)
+
+Jobs run on a JobExecutor (api/services/job_executor.py): a dedicated
+"scheduler-job" thread pool, separate from the event loop and from the
+API's I/O pool, with a per-job timeout (JOB_TIMEOUTS) and cooperative
+cancellation. Jobs that query Supabase directly use their own client
+(_job_db). Manual triggers go through run_job_now(), so an endpoint that
+fires a job awaits it off the loop instead of running it inline.
+
+Several processes can run the scheduler at once (replicas, or the web tier
+next to `python -m api.worker`). Each scheduled run is claimed in
+scheduler_runs first, so exactly one process executes it, and a run whose
+holder crashed is taken over (api/services/job_leases.py). SCHEDULER_ROLE
+picks which jobs a process schedules:
+  - all (default): every job;
+  - web: only LOCAL_JOB_IDS (the price-comps reload, the outbox drain, ...);
+  - worker: every job (what api/worker.py runs).
+SCHEDULER_LEASES=0 turns leasing off for a single-process deployment.
 """
 
+import asyncio
 import logging
 import os
 import time
 from contextlib import contextmanager
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 
+from api.services.job_executor import (
+    JobExecutor, check_cancelled, current_job, env_timeouts, remaining, run_coroutine,
+)
+from api.services.job_leases import HOLDER, LeaseStore
+
 logger = logging.getLogger(__name__)
 
 # Singleton scheduler instance
 _scheduler: Optional[AsyncIOScheduler] = None
+_executor: Optional[JobExecutor] = None
 _job_history: list = []
 MAX_HISTORY = 100
 
+# Seconds a run may take before it is reported as timed out and cancelled
+# (SCHEDULER_JOB_TIMEOUTS="title_monitor=7200,..." overrides). Jobs not
+# listed get JobExecutor's default (30 min).
+JOB_TIMEOUTS = {
+    "process_scheduled_emails": 900,
+    "portal_sync": 1800,
+    "refresh_partner_listings": 1800,
+    "title_monitor": 3600,
+    "facebook_auto_scrape": 600,   # Apify waitForFinish=300 + dataset fetch + upserts
+    "expire_old_listings": 300,
+    "promissory_maturity_alerts": 900,
+    "investor_payment_reminder": 900,
+    "publish_price_comps": 900,
+    "refresh_price_comps": 120,
+    "reclaim_abandoned_runs": 60,
+}
+
+# Jobs every process runs for itself, unleased: they act on in-process state
+# (or, for the takeover sweep, on this process's own jobs), or are safe to run
+# concurrently (the outbox drain claims its rows).
+LOCAL_JOB_IDS = {"refresh_price_comps", "reclaim_abandoned_runs", "process_scheduled_emails"}
+SCHEDULER_ROLES = ("all", "web", "worker")
+
+# Interval triggers start here rather than at process start, so every process
+# computes the same fire times (and therefore the same lease run keys).
+_INTERVAL_ANCHOR = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _every(**interval) -> IntervalTrigger:
+    return IntervalTrigger(start_date=_INTERVAL_ANCHOR, **interval)
+
+
+def scheduler_role() -> str:
+    role = os.getenv("SCHEDULER_ROLE", "all").strip().lower()
+    if role not in SCHEDULER_ROLES:
+        logger.warning(f"[scheduler] Unknown SCHEDULER_ROLE={role!r}, using 'all'")
+        return "all"
+    return role
+
+
+def _runs_here(job_id: str, role: str) -> bool:
+    return role != "web" or job_id in LOCAL_JOB_IDS
+
+
+def _get_executor() -> JobExecutor:
+    """The job pool, shared by the scheduler and run_job_now (created lazily)."""
+    global _executor
+    if _executor is None:
+        _executor = JobExecutor(
+            max_workers=int(os.getenv("SCHEDULER_JOB_WORKERS", "4")),
+            timeouts={**JOB_TIMEOUTS, **env_timeouts()},
+            on_timeout=lambda job_id, timeout: _log_job(
+                job_id, {"ok": False, "error": f"timed out after {timeout:.0f}s"}),
+            leases=LeaseStore(_job_db) if os.getenv("SCHEDULER_LEASES", "1") != "0" else None,
+            local_jobs=LOCAL_JOB_IDS,
+        )
+    return _executor
+
+
+def _job_db():
+    """Supabase client for the jobs — the background client
+    (tools/supabase_client.get_background_client), separate from the API's
+    `sb`, so a job paging through a table never holds the request
+    handlers' connections."""
+    from tools.supabase_client import get_background_client
+    return get_background_client()
+
+
+async def run_job_now(job_id: str, fn, *args, **kwargs):
+    """Run a job function on the job pool (under its timeout) and await the result."""
+    return await asyncio.wrap_future(_get_executor().submit(job_id, fn, *args, **kwargs))
+
 
 def _log_job(job_name: str, result: dict):
     """Log job execution to in-memory history."""
@@ -45,9 +143,13 @@ def _log_job(job_name: str, result: dict):
 
 def _persist_run_start(job_name: str) -> Optional[str]:
     """Insert a scheduler_runs row at job start. Returns row id or None if
-    the table doesn't exist yet (migration 085 not applied)."""
+    the table doesn't exist yet (migration 085 not applied), or if this is a
+    leased run — its lease row already records it."""
+    ctx = current_job()
+    if ctx is not None and ctx.lease is not None and ctx.lease.run_id:
+        return None
     try:
-        from tools.supabase_client import sb
+        sb = _job_db()
         res = sb.table("scheduler_runs").insert({
             "job_name": job_name,
             "started_at": datetime.utcnow().isoformat() + "Z",
@@ -64,7 +166,7 @@ def _persist_run_end(run_id: Optional[str], ok: bool, duration_ms: int,
     if not run_id:
         return
     try:
-        from tools.supabase_client import sb
+        sb = _job_db()
         sb.table("scheduler_runs").update({
             "finished_at": datetime.utcnow().isoformat() + "Z",
             "ok": ok,
@@ -116,12 +218,13 @@ def _track_run(job_name: str):
 # =========================================================================
 
 def _job_process_scheduled_emails():
-    """Job: Process all pending scheduled emails that are due."""
+    """Job: Deliver the due emails in the outbox."""
     from api.services.email_service import process_scheduled_emails
     try:
         result = process_scheduled_emails()
-        _log_job("process_scheduled_emails", result)
         processed = result.get("processed", 0)
+        if processed > 0 or not result.get("ok"):
+            _log_job("process_scheduled_emails", result)  # every 20 s: only runs that did something
         if processed > 0:
             logger.info(f"[scheduler] Processed {processed} scheduled emails (sent={result.get('sent',0)}, failed={result.get('failed',0)})")
         return result
@@ -137,9 +240,9 @@ def _job_rto_reminders():
     try:
         result = process_rto_reminders()
         _log_job("rto_reminders", result)
-        total_sent = result.get("total_sent", 0)
-        if total_sent > 0:
-            logger.info(f"[scheduler] Sent {total_sent} RTO payment reminders")
+        total_queued = result.get("total_queued", 0)
+        if total_queued > 0:
+            logger.info(f"[scheduler] Queued {total_queued} RTO payment reminders")
         return result
     except Exception as e:
         logger.error(f"[scheduler] Error in rto_reminders: {e}")
@@ -182,7 +285,7 @@ def _job_capital_rto_invoices():
 def _job_portal_sync():
     """Job: Sync data between portals (Homes ↔ Capital ↔ Clientes)."""
     try:
-        from tools.supabase_client import sb
+        sb = _job_db()
         synced = 0
 
         # Find RTO sales missing Capital applications
@@ -194,6 +297,7 @@ def _job_portal_sync():
             .execute()
 
         for sale in (rto_sales.data or []):
+            check_cancelled()
             existing = sb.table("rto_applications") \
                 .select("id") \
                 .eq("sale_id", sale["id"]) \
@@ -222,85 +326,40 @@ def _job_refresh_partner_listings():
     """
     Job: Refresh partner listings from VMF Homes + 21st Mortgage.
     Both use direct JSON APIs — no browser needed, fast and reliable.
-    Saves new/updated listings to market_listings table.
+    Saves new/updated listings to market_listings table in bulk
+    (api/services/partner_ingest.py).
     """
-    import asyncio
-    from datetime import datetime as dt
-
     try:
-        from api.services.scrapers.partner_scrapers import VMFHomesScraper, TwentyFirstMortgageScraper
-        from tools.supabase_client import sb
-
-        async def _scrape_and_save():
-            # Scrape both in parallel
-            vmf_task = VMFHomesScraper.scrape(min_price=5000, max_price=80000, max_listings=150)
-            m21_task = TwentyFirstMortgageScraper.scrape(min_price=5000, max_price=80000, max_listings=150)
+        from api.services.partner_ingest import ingest_partner_listings, partner_listing_row
+        from api.services.scrapers.orchestrator import record_scrape_run, run_sources
+        from api.services.scrapers.partner_scrapers import partner_sources
 
-            results = await asyncio.gather(vmf_task, m21_task, return_exceptions=True)
-            vmf_listings = results[0] if not isinstance(results[0], Exception) else []
-            m21_listings = results[1] if not isinstance(results[1], Exception) else []
+        sb = _job_db()
 
-            if isinstance(results[0], Exception):
-                logger.error(f"[scheduler] VMF scrape error: {results[0]}")
-            if isinstance(results[1], Exception):
-                logger.error(f"[scheduler] 21st scrape error: {results[1]}")
+        async def _scrape_and_save():
+            # Scrape both concurrently, each with its own timeout
+            run = await run_sources(partner_sources(min_price=5000, max_price=80000, max_listings=150))
+            record_scrape_run(sb, run, "scheduler.refresh_partner_listings")
+            for name, r in run.results.items():
+                if not r.ok:
+                    logger.error(f"[scheduler] {name} scrape {r.status}: {r.error}")
+            vmf_listings = run.data("vmf_homes", [])
+            m21_listings = run.data("21st_mortgage", [])
 
             all_listings = list(vmf_listings) + list(m21_listings)
-            saved = 0
-
-            for listing in all_listings:
-                try:
-                    data = {
-                        "source": listing.source,
-                        "source_url": listing.source_url,
-                        "source_id": listing.source_id,
-                        "address": listing.address,
-                        "city": listing.city,
-                        "state": listing.state,
-                        "zip_code": listing.zip_code,
-                        "listing_price": listing.listing_price,
-                        "year_built": listing.year_built or 2000,
-                        "sqft": listing.sqft,
-                        "bedrooms": listing.bedrooms,
-                        "bathrooms": listing.bathrooms,
-                        "photos": listing.photos,
-                        "thumbnail_url": listing.thumbnail_url,
-                        "scraped_at": listing.scraped_at or dt.now().isoformat(),
-                        "status": "available",
-                    }
-
-                    existing = sb.table("market_listings") \
-                        .select("id, status") \
-                        .eq("source_url", listing.source_url) \
-                        .limit(1).execute()
-
-                    if existing.data and existing.data[0].get("status") not in ("available", None):
-                        continue
-
-                    sb.table("market_listings") \
-                        .upsert(data, on_conflict="source_url") \
-                        .execute()
-                    saved += 1
-                except Exception as e:
-                    logger.warning(f"[scheduler] Error saving partner listing: {e}")
-                    continue
+            ingest = ingest_partner_listings(sb, [partner_listing_row(l) for l in all_listings])
 
             return {
                 "ok": True,
                 "vmf": len(vmf_listings),
                 "mortgage21": len(m21_listings),
-                "saved": saved,
+                "saved": ingest["saved"],
+                "by_source": ingest["by_source"],
+                "scrape_metrics": run.metrics(),
             }
 
-        # Run the async scrape in the current event loop
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            # APScheduler runs in the asyncio loop — create a task
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as pool:
-                result = pool.submit(asyncio.run, _scrape_and_save()).result()
-        else:
-            result = asyncio.run(_scrape_and_save())
+        # On the job thread's own event loop, cancelled if the job times out
+        result = run_coroutine(_scrape_and_save())
 
         _log_job("refresh_partner_listings", result)
         total = result.get("vmf", 0) + result.get("mortgage21", 0)
@@ -419,7 +478,7 @@ def _job_facebook_auto_scrape():
             return {"ok": True, "skipped": True}
 
         from api.utils.qualification import qualify_listing
-        from tools.supabase_client import sb
+        sb = _job_db()
 
         city = random.choice(["houston", "dallas", "sanantonio"])
         logger.info(f"[scheduler] FB auto-scrape via Apify: {city}")
@@ -431,7 +490,7 @@ def _job_facebook_auto_scrape():
                 "startUrls": [{"url": f"https://www.facebook.com/marketplace/{city}/search?query=mobile%20home&minPrice=5000&maxPrice=80000&exact=false"}],
                 "maxItems": 50,
             },
-            timeout=320,
+            timeout=remaining(320),
         )
 
         if run_resp.status_code != 201:
@@ -444,11 +503,12 @@ def _job_facebook_auto_scrape():
 
         items = req.get(
             f"https://api.apify.com/v2/datasets/{dataset_id}/items?limit=100",
-            headers={"Authorization": f"Bearer {apify_token}"}, timeout=30,
+            headers={"Authorization": f"Bearer {apify_token}"}, timeout=remaining(30),
         ).json()
 
         saved = 0
         for item in items:
+            check_cancelled()
             try:
                 price_data = item.get("listing_price", {})
                 price = float(price_data.get("amount", 0)) if isinstance(price_data, dict) else float(price_data or 0)
@@ -505,7 +565,7 @@ def _job_expire_old_listings():
     """
     from datetime import datetime as dt, timedelta
     try:
-        from tools.supabase_client import sb
+        sb = _job_db()
 
         cutoff = (dt.now() - timedelta(days=14)).isoformat()
 
@@ -529,6 +589,52 @@ def _job_expire_old_listings():
         return {"ok": False, "error": str(e)}
 
 
+def _job_refresh_price_comps():
+    """
+    Job: Load the published price-comps version if it changed (cheap when it
+    hasn't — one single-row read). Only changes and errors go to the history.
+    """
+    try:
+        from api.services.price_comps import refresh_active_dataset
+
+        result = refresh_active_dataset(_job_db())
+        result["ok"] = "error" not in result
+        if result.get("changed") or not result["ok"]:
+            _log_job("refresh_price_comps", result)
+        return result
+    except Exception as e:
+        logger.error(f"[scheduler] Price comps refresh error: {e}")
+        _log_job("refresh_price_comps", {"ok": False, "error": str(e)})
+        return {"ok": False, "error": str(e)}
+
+
+def _job_publish_price_comps():
+    """Job: Rebuild the price comps (2025 seed + houses sold since) and publish a new version."""
+    with _track_run("publish_price_comps") as tracker:
+        try:
+            from api.services.price_comps import rebuild_and_publish
+
+            result = rebuild_and_publish(_job_db())
+            result["ok"] = True
+            tracker.set_result(result)
+            if result.get("published"):
+                logger.info(f"[scheduler] Published price comps {result['version']} "
+                            f"({result['record_count']} houses)")
+            return result
+        except Exception as e:
+            logger.error(f"[scheduler] Error in publish_price_comps: {e}")
+            tracker.set_result({"ok": False, "error": str(e)})
+            return {"ok": False, "error": str(e)}
+
+
+def _job_reclaim_abandoned_runs():
+    """Take over the leased runs whose holder died before finishing."""
+    result = _get_executor().reclaim_abandoned()
+    if result.get("reclaimed"):
+        _log_job("reclaim_abandoned_runs", result)
+    return result
+
+
 def init_scheduler() -> AsyncIOScheduler:
     """
     Initialize and start the APScheduler with all email jobs.
@@ -542,6 +648,7 @@ def init_scheduler() -> AsyncIOScheduler:
 
     _scheduler = AsyncIOScheduler(
         timezone="US/Central",  # Texas timezone
+        executors={"default": _get_executor()},  # off-loop job pool with timeouts
         job_defaults={
             "coalesce": True,       # Combine missed runs into one
             "max_instances": 1,     # Prevent overlapping runs
@@ -549,12 +656,12 @@ def init_scheduler() -> AsyncIOScheduler:
         },
     )
 
-    # Job 1: Process scheduled emails - every 30 minutes
+    # Job 1: Drain the email outbox - every 20 seconds (every send is queued)
     _scheduler.add_job(
         _job_process_scheduled_emails,
-        trigger=IntervalTrigger(minutes=30),
+        trigger=_every(seconds=20),
         id="process_scheduled_emails",
-        name="Process Pending Scheduled Emails",
+        name="Deliver Queued Emails (outbox)",
         replace_existing=True,
     )
 
@@ -579,7 +686,7 @@ def init_scheduler() -> AsyncIOScheduler:
     # Job 4: Portal sync - every 2 hours, ensures Homes ↔ Capital consistency
     _scheduler.add_job(
         _job_portal_sync,
-        trigger=IntervalTrigger(hours=2),
+        trigger=_every(hours=2),
         id="portal_sync",
         name="Cross-Portal Data Sync (Homes ↔ Capital)",
         replace_existing=True,
@@ -589,7 +696,7 @@ def init_scheduler() -> AsyncIOScheduler:
     # Scrapes VMF Homes + 21st Mortgage (both pure HTTP JSON APIs, fast)
     _scheduler.add_job(
         _job_refresh_partner_listings,
-        trigger=IntervalTrigger(hours=6),
+        trigger=_every(hours=6),
         id="refresh_partner_listings",
         name="Refresh Partner Listings (VMF + 21st Mortgage)",
         replace_existing=True,
@@ -676,17 +783,51 @@ def init_scheduler() -> AsyncIOScheduler:
         replace_existing=True,
     )
 
+    # Job: Price comps — rebuild from closed sales daily at 5:00 AM CT,
+    # and pick up the published version every 5 min (first check at startup)
+    _scheduler.add_job(
+        _job_publish_price_comps,
+        trigger=CronTrigger(hour=5, minute=0),
+        id="publish_price_comps",
+        name="Price Comps: Rebuild + Publish (daily)",
+        replace_existing=True,
+    )
+    _scheduler.add_job(
+        _job_refresh_price_comps,
+        trigger=IntervalTrigger(minutes=5),
+        next_run_time=datetime.now(timezone.utc),
+        id="refresh_price_comps",
+        name="Price Comps: Load Published Version",
+        replace_existing=True,
+    )
+
+    # Takeover sweep: re-run what a crashed process left unfinished
+    _scheduler.add_job(
+        _job_reclaim_abandoned_runs,
+        trigger=IntervalTrigger(minutes=1),
+        id="reclaim_abandoned_runs",
+        name="Scheduler: Take Over Abandoned Runs",
+        replace_existing=True,
+    )
+
+    role = scheduler_role()
+    for job in _scheduler.get_jobs():
+        if not _runs_here(job.id, role):
+            _scheduler.remove_job(job.id)
+
     _scheduler.start()
-    logger.info("[scheduler] ✅ Scheduler started with 10 jobs")
+    logger.info(f"[scheduler] ✅ Scheduler started with {len(_scheduler.get_jobs())} jobs "
+                f"(role={role}, holder={HOLDER})")
     return _scheduler
 
 
 def shutdown_scheduler():
     """Shutdown scheduler gracefully."""
-    global _scheduler
+    global _scheduler, _executor
     if _scheduler:
         _scheduler.shutdown(wait=False)
         _scheduler = None
+        _executor = None  # shut down with the scheduler; the next one gets a fresh pool
         logger.info("[scheduler] Scheduler stopped")
 
 
@@ -709,8 +850,12 @@ def get_scheduler_status() -> dict:
         "ok": True,
         "running": _scheduler.running,
         "timezone": "US/Central",
+        "role": scheduler_role(),
+        "holder": HOLDER,
+        "leases": _get_executor().leases is not None,
         "jobs": jobs,
         "job_count": len(jobs),
+        "running_jobs": _get_executor().running(),
         "recent_history": _job_history[:20],
     }
 
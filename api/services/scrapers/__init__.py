@@ -4,16 +4,34 @@ Scrapers module — partner listing scrapers extracted from the former BuscadorA
 Only VMFHomesScraper and TwentyFirstMortgageScraper are kept here;
 the other scrapers (MHVillage, MobileHome.net, MHBay, Facebook) were
 removed along with BuscadorAgent.
+
+orchestrator runs several scrapers concurrently with per-source budgets.
 """
 
 from api.services.scrapers.partner_scrapers import (
     ScrapedListing,
     VMFHomesScraper,
     TwentyFirstMortgageScraper,
+    partner_sources,
+)
+from api.services.scrapers.orchestrator import (
+    SourceSpec,
+    SourceResult,
+    ScrapeRun,
+    iter_sources,
+    run_sources,
+    record_scrape_run,
 )
 
 __all__ = [
     "ScrapedListing",
     "VMFHomesScraper",
     "TwentyFirstMortgageScraper",
+    "partner_sources",
+    "SourceSpec",
+    "SourceResult",
+    "ScrapeRun",
+    "iter_sources",
+    "run_sources",
+    "record_scrape_run",
 ]
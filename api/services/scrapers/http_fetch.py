@@ -0,0 +1,142 @@
+"""
+Pooled HTTP client for the partner scrapers, with conditional requests.
+
+VMF Homes and 21st Mortgage publish their inventory as JSON, yet a refresh
+drove headless Chromium (VMF) or a fresh `requests` session per call
+(21st). `fetch_json` goes over one shared `httpx.AsyncClient` per event
+loop — kept-alive connections, gzip — through the on-disk response cache
+(api/utils/response_cache.py): within the host's TTL the stored body is
+served without a request; after it, the stored ETag / Last-Modified are
+sent as If-None-Match / If-Modified-Since and a 304 is answered from the
+cache, so an unchanged 21st Mortgage feed (several MB) isn't downloaded
+again every 6 hours — nor after a restart.
+
+Anything that isn't a 2xx/304 with a JSON body — including a WAF
+challenge page — raises FetchError, so callers can fall back to the
+browser. A cached body that no longer decodes is dropped and the feed
+fetched again in full.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import httpx
+
+from api.utils import response_cache
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+LIMITS = httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=60.0)
+DEFAULT_HEADERS = {
+    "Accept": "application/json",
+    "Accept-Encoding": "gzip, deflate",
+}
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = \
+    weakref.WeakKeyDictionary()
+
+
+class FetchError(Exception):
+    """The endpoint didn't return usable JSON (HTTP error, non-JSON body, network)."""
+
+
+@dataclass
+class FetchResult:
+    data: Any
+    status: int
+    not_modified: bool
+    bytes_downloaded: int
+    elapsed_ms: int
+    from_cache: bool = False
+
+
+def get_client() -> httpx.AsyncClient:
+    """The shared client for the running event loop (created on first use)."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(timeout=TIMEOUT, limits=LIMITS, headers=DEFAULT_HEADERS,
+                                   follow_redirects=True)
+        _clients[loop] = client
+    return client
+
+
+async def aclose() -> None:
+    """Close the running loop's client (tests, shutdown)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def fetch_json(
+    url: str,
+    *,
+    method: str = "GET",
+    params: Optional[dict] = None,
+    json_body: Any = None,
+    headers: Optional[dict] = None,
+    use_cache: bool = True,
+    bypass_cache: bool = False,
+) -> FetchResult:
+    """Fetch and decode a JSON endpoint. See module docstring.
+
+    bypass_cache (or RESPONSE_CACHE_BYPASS) skips a fresh cached copy; the
+    request is still conditional, so an unchanged feed costs a 304.
+    """
+    cache = response_cache.get_cache() if use_cache else None
+    cache_key = dict(params=params, method=method, json_body=json_body)
+    cached = cache.get(url, allow_stale=True, **cache_key) if cache else None
+    if cached is not None and cached.fresh and not response_cache.bypassed(bypass_cache):
+        try:
+            return FetchResult(cached.json(), cached.status, False, 0, 0, from_cache=True)
+        except ValueError:
+            cached = None
+
+    send = dict(headers or {})
+    if cached is not None:
+        if cached.etag:
+            send["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            send["If-Modified-Since"] = cached.last_modified
+
+    resp, elapsed_ms = await _request(method, url, params, json_body, send)
+
+    if resp.status_code == 304 and cached is not None:
+        try:
+            data = cached.json()
+        except ValueError:
+            # The stored body no longer decodes: drop it and fetch unconditionally
+            logger.warning(f"[http_fetch] Cached body for {url} is not valid JSON; refetching")
+            cache.invalidate(url, **cache_key)
+            resp, elapsed_ms = await _request(method, url, params, json_body, dict(headers or {}))
+        else:
+            cache.refresh(url, headers=resp.headers, **cache_key)
+            return FetchResult(data, 304, True, resp.num_bytes_downloaded, elapsed_ms)
+    if not resp.is_success:
+        raise FetchError(f"HTTP {resp.status_code} from {url}")
+    try:
+        data = resp.json()
+    except ValueError as e:
+        ctype = resp.headers.get("content-type", "?")
+        raise FetchError(f"non-JSON response ({ctype}) from {url}") from e
+
+    if cache is not None:
+        cache.put(url, resp.content, status=resp.status_code, headers=resp.headers, **cache_key)
+    return FetchResult(data, resp.status_code, False, resp.num_bytes_downloaded, elapsed_ms)
+
+
+async def _request(method: str, url: str, params: Optional[dict], json_body: Any,
+                   headers: dict) -> tuple:
+    """(response, elapsed ms); network errors as FetchError."""
+    t0 = time.monotonic()
+    try:
+        resp = await get_client().request(method, url, params=params, json=json_body, headers=headers)
+    except httpx.HTTPError as e:
+        raise FetchError(f"{type(e).__name__}: {e}") from e
+    return resp, int((time.monotonic() - t0) * 1000)
@@ -0,0 +1,228 @@
+"""
+Concurrent multi-source scrape runner.
+
+`MobileHomeScraper.search_all_sources` awaited MHVillage, MobileHome.net and
+the Zillow ARV lookup one after another, and POST /market-listings/scrape did
+the same for VMF and 21st Mortgage — a run took the sum of every source's
+latency, and one hung site held up all the others.
+
+`iter_sources` starts every enabled source at once and yields a
+`SourceResult` as each one finishes (partial results are usable before the
+slowest site answers). Per source:
+
+  - `timeout` — the scrape is cancelled after this many seconds and
+    reported as status 'timeout' (its page is closed by the scraper's own
+    `finally`);
+  - `concurrency` — at most this many scrapes of the same source run at
+    once in the process, so an overlapping scheduler run and manual
+    refresh don't hit a site twice in parallel;
+  - `browser` — sources that open Playwright pages share the one browser
+    from `BrowserManager` and take a slot from `BROWSER_SLOTS`, which
+    bounds open pages across all sources.
+
+`run_sources` collects everything into a `ScrapeRun`, and
+`record_scrape_run` writes one scrape_source_runs row per source
+(migration 112) with latency, yield and outcome.
+
+Sources can be switched off without a deploy via SCRAPER_DISABLED_SOURCES
+(comma-separated source names).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+import weakref
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 90.0
+BROWSER_SLOTS = int(os.getenv("SCRAPER_BROWSER_SLOTS", "3"))
+
+STATUS_OK = "ok"
+STATUS_TIMEOUT = "timeout"
+STATUS_ERROR = "error"
+STATUS_DISABLED = "disabled"
+
+# Semaphores belong to an event loop, and the scheduler runs scrapes under
+# asyncio.run() in a worker thread — keep one set per loop.
+_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = \
+    weakref.WeakKeyDictionary()
+
+
+def _limit(key: str, size: int) -> asyncio.Semaphore:
+    per_loop = _limits.setdefault(asyncio.get_running_loop(), {})
+    if key not in per_loop:
+        per_loop[key] = asyncio.Semaphore(max(1, size))
+    return per_loop[key]
+
+
+def disabled_sources() -> set:
+    raw = os.getenv("SCRAPER_DISABLED_SOURCES", "")
+    return {s.strip() for s in raw.split(",") if s.strip()}
+
+
+def _default_count(data: Any) -> int:
+    if data is None:
+        return 0
+    try:
+        return len(data)
+    except TypeError:
+        return 1
+
+
+@dataclass
+class SourceSpec:
+    """One scraper to run: `scrape` is called with no arguments and awaited."""
+    name: str
+    scrape: Callable[[], Awaitable[Any]]
+    timeout: float = DEFAULT_TIMEOUT
+    concurrency: int = 1
+    browser: bool = False
+    enabled: bool = True
+    # How many results `scrape` produced (len() of the listing list by default)
+    count: Callable[[Any], int] = _default_count
+
+
+@dataclass
+class SourceResult:
+    source: str
+    status: str
+    data: Any = None
+    error: Optional[str] = None
+    latency_ms: int = 0
+    listings: int = 0
+    started_at: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == STATUS_OK
+
+    def metrics(self) -> dict:
+        return {
+            "status": self.status,
+            "latency_ms": self.latency_ms,
+            "listings": self.listings,
+            "error": self.error,
+        }
+
+
+@dataclass
+class ScrapeRun:
+    run_id: str
+    started_at: str
+    results: Dict[str, SourceResult] = field(default_factory=dict)
+    latency_ms: int = 0
+
+    def data(self, source: str, default: Any = None) -> Any:
+        """The source's scrape result, or `default` if it failed, timed out or was disabled."""
+        r = self.results.get(source)
+        return r.data if r is not None and r.ok else default
+
+    def metrics(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "latency_ms": self.latency_ms,
+            "sources": {name: r.metrics() for name, r in self.results.items()},
+        }
+
+
+async def _run_one(spec: SourceSpec, browser_slots: int) -> SourceResult:
+    started_at = datetime.now().isoformat()
+    t0 = time.monotonic()
+    status, data, error = STATUS_OK, None, None
+    try:
+        async with _limit(f"source:{spec.name}", spec.concurrency):
+            if spec.browser:
+                async with _limit("browser", browser_slots):
+                    data = await asyncio.wait_for(spec.scrape(), timeout=spec.timeout)
+            else:
+                data = await asyncio.wait_for(spec.scrape(), timeout=spec.timeout)
+    except asyncio.TimeoutError:
+        status, error = STATUS_TIMEOUT, f"no result after {spec.timeout:.0f}s"
+        logger.warning(f"[ScrapeRun] {spec.name} timed out after {spec.timeout:.0f}s")
+    except Exception as e:
+        status, error = STATUS_ERROR, f"{type(e).__name__}: {e}"
+        logger.error(f"[ScrapeRun] {spec.name} failed: {error}")
+    latency_ms = int((time.monotonic() - t0) * 1000)
+    listings = spec.count(data) if status == STATUS_OK else 0
+    if status == STATUS_OK:
+        logger.info(f"[ScrapeRun] {spec.name}: {listings} results in {latency_ms} ms")
+    return SourceResult(spec.name, status, data, error, latency_ms, listings, started_at)
+
+
+async def iter_sources(
+    specs: List[SourceSpec],
+    *,
+    browser_slots: int = BROWSER_SLOTS,
+) -> AsyncIterator[SourceResult]:
+    """Run the enabled sources concurrently; yield each result as it finishes.
+
+    Disabled sources are yielded first (status 'disabled'). Closing the
+    generator early cancels the sources still running."""
+    off = disabled_sources()
+    pending = set()
+    try:
+        for spec in specs:
+            if not spec.enabled or spec.name in off:
+                yield SourceResult(spec.name, STATUS_DISABLED)
+                continue
+            pending.add(asyncio.ensure_future(_run_one(spec, browser_slots)))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def run_sources(
+    specs: List[SourceSpec],
+    *,
+    browser_slots: int = BROWSER_SLOTS,
+    on_result: Optional[Callable[[SourceResult], Any]] = None,
+) -> ScrapeRun:
+    """Run all sources (see iter_sources) and collect the results.
+
+    `on_result` is called with each SourceResult as soon as that source is
+    done, e.g. to start processing one source's listings early."""
+    run = ScrapeRun(run_id=str(uuid.uuid4()), started_at=datetime.now().isoformat())
+    t0 = time.monotonic()
+    async for result in iter_sources(specs, browser_slots=browser_slots):
+        run.results[result.source] = result
+        if on_result is not None:
+            on_result(result)
+    run.latency_ms = int((time.monotonic() - t0) * 1000)
+    return run
+
+
+def record_scrape_run(db, run: ScrapeRun, trigger: str) -> None:
+    """Insert one scrape_source_runs row per source. Best-effort: a missing
+    table (migration 112 not applied) or a DB error only logs."""
+    rows = [
+        {
+            "run_id": run.run_id,
+            "trigger": trigger,
+            "source": r.source,
+            "status": r.status,
+            "latency_ms": r.latency_ms,
+            "listings": r.listings,
+            "error": r.error,
+            "started_at": r.started_at or run.started_at,
+        }
+        for r in run.results.values()
+    ]
+    if not rows:
+        return
+    try:
+        db.table("scrape_source_runs").insert(rows).execute()
+    except Exception as e:
+        logger.debug(f"[ScrapeRun] Could not record metrics for run {run.run_id}: {e}")
@@ -1,7 +1,8 @@
 """
 Partner scrapers for VMF Homes (Vanderbilt) and 21st Mortgage.
 
-Both use direct JSON APIs — no browser/Playwright needed.
+Both use direct JSON APIs over a pooled HTTP client (http_fetch.py);
+VMF falls back to Playwright only when its WAF refuses the API call.
 Extracted from the former api/agents/buscador/scraper.py so that
 scheduler_service, market_listings, and public/properties can
 continue refreshing partner inventory after BuscadorAgent was removed.
@@ -12,9 +13,13 @@ import logging
 import re
 from typing import List, Dict, Optional
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from urllib.parse import quote
 
+from api.services.scrapers.http_fetch import FetchError, fetch_json
+from api.services.scrapers.orchestrator import SourceSpec
+from api.utils.listing_fingerprint import listing_fingerprint
+
 logger = logging.getLogger(__name__)
 
 
@@ -44,6 +49,11 @@ class ScrapedListing:
     price_type: str = "full"
     estimated_full_price: Optional[float] = None
 
+    @property
+    def content_hash(self) -> str:
+        """Stable fingerprint of price/photos/details (see api/utils/listing_fingerprint.py)."""
+        return listing_fingerprint(asdict(self))
+
 
 # ============================================
 # VMF HOMES (VANDERBILT) SCRAPER
@@ -59,7 +69,8 @@ class VMFHomesScraper:
         POST /api/searchByState?state=TX  -> all Texas listings
         POST /api/searchByDistance         -> listings near a GPS coordinate
 
-    NO browser/Playwright needed — pure HTTP + JSON. Fast and reliable.
+    Fetched over plain HTTP + JSON; Playwright only runs when the
+    CloudFront WAF refuses the API call.
     """
 
     BASE_URL = "https://www.vmfhomes.com"
@@ -98,86 +109,15 @@ class VMFHomesScraper:
         """
         Fetch mobile homes for sale in Texas from VMF Homes.
 
-        VMF sits behind CloudFront WAF which blocks direct HTTP POSTs (403).
-        We use Playwright: load the home-search page (which passes the WAF
-        challenge and sets cookies), then run the internal /api/searchByState
-        from within that authenticated browser context.
+        Inventory comes from the JSON API over plain HTTP (_fetch_inventory);
+        the Playwright WAF bypass only runs when the API refuses us.
         """
-        logger.info(f"[VMF] Fetching VMF Homes inventory via Playwright (WAF bypass), ${min_price}-${max_price}")
+        logger.info(f"[VMF] Fetching VMF Homes inventory, ${min_price}-${max_price}")
 
         listings = []
-        data = None
 
         try:
-            from playwright.async_api import async_playwright
-            async with async_playwright() as pw:
-                browser = await pw.chromium.launch(headless=True)
-                try:
-                    context = await browser.new_context(
-                        user_agent=VMFHomesScraper.HEADERS["User-Agent"],
-                        viewport={"width": 1400, "height": 900},
-                    )
-                    page = await context.new_page()
-                    # 1) Visit the home-search page so CloudFront issues the session cookies
-                    await page.goto(
-                        f"{VMFHomesScraper.BASE_URL}/homesearch",
-                        wait_until="domcontentloaded",
-                        timeout=45000,
-                    )
-                    await asyncio.sleep(3)  # WAF challenge JS settle
-
-                    # 2) Capture the data Next.js has already loaded. Two strategies:
-                    #    a) Read __NEXT_DATA__ JSON (Next.js dumps initial props there)
-                    #    b) Listen for the internal /api/searchByState fetch & intercept response
-                    #
-                    # We try (b) by triggering a search and capturing the response.
-                    listings_response = {"data": None}
-
-                    async def on_response(resp):
-                        if "searchByState" in resp.url or "searchByDistance" in resp.url:
-                            try:
-                                if resp.ok:
-                                    listings_response["data"] = await resp.json()
-                            except Exception:
-                                pass
-
-                    page.on("response", on_response)
-
-                    # Apply state=TX filter via URL navigation (triggers the API call from within the SPA)
-                    await page.goto(
-                        f"{VMFHomesScraper.BASE_URL}/homesearch?state=TX",
-                        wait_until="networkidle",
-                        timeout=60000,
-                    )
-                    await asyncio.sleep(5)  # let any deferred fetches complete
-
-                    if not listings_response["data"]:
-                        # Fallback: pull from __NEXT_DATA__
-                        next_data = await page.evaluate(
-                            """() => {
-                                const el = document.getElementById('__NEXT_DATA__')
-                                if (!el) return null
-                                try { return JSON.parse(el.textContent) } catch { return null }
-                            }"""
-                        )
-                        if next_data:
-                            # Walk the tree looking for an array of home objects
-                            def _find_homes(node):
-                                if isinstance(node, list) and node and isinstance(node[0], dict) and (
-                                    "listingId" in node[0] or "price" in node[0] and "bedrooms" in node[0]
-                                ):
-                                    return node
-                                if isinstance(node, dict):
-                                    for v in node.values():
-                                        found = _find_homes(v)
-                                        if found is not None:
-                                            return found
-                                return None
-                            listings_response["data"] = _find_homes(next_data)
-
-                    data = listings_response["data"]
-                finally:
-                    await browser.close()
+            data = await VMFHomesScraper._fetch_inventory()
 
             if not isinstance(data, list):
                 logger.warning(f"[VMF] No usable listing data returned (type={type(data).__name__})")
@@ -219,6 +159,110 @@ class VMFHomesScraper:
 
         return listings
 
+    @staticmethod
+    async def _fetch_inventory():
+        """All TX listings: POST /api/searchByState over the shared HTTP
+        client (http_fetch.py — keep-alive, gzip, response cache). VMF
+        sits behind CloudFront WAF, which answers some direct POSTs with a
+        403 or a challenge page; only then drive the browser."""
+        try:
+            res = await fetch_json(
+                VMFHomesScraper.SEARCH_API,
+                method="POST",
+                params={"state": "TX"},
+                headers=VMFHomesScraper.HEADERS,
+            )
+            if isinstance(res.data, list):
+                logger.info(f"[VMF] Inventory via JSON API: HTTP {res.status}"
+                            f"{' (cached)' if res.from_cache else ''}, "
+                            f"{res.bytes_downloaded / 1024:.0f} KB in {res.elapsed_ms} ms")
+                return res.data
+            logger.warning(f"[VMF] JSON API returned {type(res.data).__name__}, not a list")
+        except FetchError as e:
+            logger.info(f"[VMF] JSON API refused ({e}) — falling back to Playwright")
+        return await VMFHomesScraper._fetch_inventory_browser()
+
+    @staticmethod
+    async def _fetch_inventory_browser():
+        """
+        Playwright fallback: load the home-search page (which passes the WAF
+        challenge and sets cookies), then capture the internal
+        /api/searchByState response from within that browser context.
+        """
+        from playwright.async_api import async_playwright
+
+        logger.info("[VMF] Fetching inventory via Playwright (WAF bypass)")
+        data = None
+        async with async_playwright() as pw:
+            browser = await pw.chromium.launch(headless=True)
+            try:
+                context = await browser.new_context(
+                    user_agent=VMFHomesScraper.HEADERS["User-Agent"],
+                    viewport={"width": 1400, "height": 900},
+                )
+                page = await context.new_page()
+                # 1) Visit the home-search page so CloudFront issues the session cookies
+                await page.goto(
+                    f"{VMFHomesScraper.BASE_URL}/homesearch",
+                    wait_until="domcontentloaded",
+                    timeout=45000,
+                )
+                await asyncio.sleep(3)  # WAF challenge JS settle
+
+                # 2) Capture the data Next.js has already loaded. Two strategies:
+                #    a) Read __NEXT_DATA__ JSON (Next.js dumps initial props there)
+                #    b) Listen for the internal /api/searchByState fetch & intercept response
+                #
+                # We try (b) by triggering a search and capturing the response.
+                listings_response = {"data": None}
+
+                async def on_response(resp):
+                    if "searchByState" in resp.url or "searchByDistance" in resp.url:
+                        try:
+                            if resp.ok:
+                                listings_response["data"] = await resp.json()
+                        except Exception:
+                            pass
+
+                page.on("response", on_response)
+
+                # Apply state=TX filter via URL navigation (triggers the API call from within the SPA)
+                await page.goto(
+                    f"{VMFHomesScraper.BASE_URL}/homesearch?state=TX",
+                    wait_until="networkidle",
+                    timeout=60000,
+                )
+                await asyncio.sleep(5)  # let any deferred fetches complete
+
+                if not listings_response["data"]:
+                    # Fallback: pull from __NEXT_DATA__
+                    next_data = await page.evaluate(
+                        """() => {
+                            const el = document.getElementById('__NEXT_DATA__')
+                            if (!el) return null
+                            try { return JSON.parse(el.textContent) } catch { return null }
+                        }"""
+                    )
+                    if next_data:
+                        # Walk the tree looking for an array of home objects
+                        def _find_homes(node):
+                            if isinstance(node, list) and node and isinstance(node[0], dict) and (
+                                "listingId" in node[0] or "price" in node[0] and "bedrooms" in node[0]
+                            ):
+                                return node
+                            if isinstance(node, dict):
+                                for v in node.values():
+                                    found = _find_homes(v)
+                                    if found is not None:
+                                        return found
+                            return None
+                        listings_response["data"] = _find_homes(next_data)
+
+                data = listings_response["data"]
+            finally:
+                await browser.close()
+        return data
+
     @staticmethod
     def _parse_item(item: Dict, price: float) -> Optional[ScrapedListing]:
         """Parse a single JSON item from the VMF API into a ScrapedListing."""
@@ -302,24 +346,21 @@ class TwentyFirstMortgageScraper:
         """
         Fetch and filter mobile homes for sale in Texas from 21st Mortgage.
         """
-        import requests as sync_requests
-
         logger.info(f"[21stMortgage] Fetching inventory JSON, ${min_price}-${max_price}")
 
         listings = []
 
         try:
-            loop = asyncio.get_event_loop()
-            resp = await loop.run_in_executor(
-                None,
-                lambda: sync_requests.get(
-                    TwentyFirstMortgageScraper.JSON_URL,
-                    headers={"User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"},
-                    timeout=30,
-                )
+            # Shared HTTP client + response cache; an unchanged feed is a 304
+            res = await fetch_json(
+                TwentyFirstMortgageScraper.JSON_URL,
+                headers={"User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"},
             )
-            resp.raise_for_status()
-            data = resp.json()
+            data = res.data
+            logger.info(f"[21stMortgage] HTTP {res.status}"
+                        f"{' (not modified)' if res.not_modified else ''}"
+                        f"{' (cached)' if res.from_cache else ''}, "
+                        f"{res.bytes_downloaded / 1024:.0f} KB in {res.elapsed_ms} ms")
 
             logger.info(f"[21stMortgage] Total inventory: {len(data)} homes")
 
@@ -437,3 +478,30 @@ class TwentyFirstMortgageScraper:
         listing._model = model
 
         return listing
+
+
+# ============================================
+# ORCHESTRATOR SOURCES
+# ============================================
+
+def partner_sources(
+    min_price: float = 5000,
+    max_price: float = 80000,
+    max_listings: int = 150,
+) -> List[SourceSpec]:
+    """VMF + 21st Mortgage as orchestrator sources (run concurrently by
+    api/services/scrapers/orchestrator.py). VMF drives its own Chromium to
+    get past the WAF, so it gets the longer budget."""
+    return [
+        SourceSpec(
+            "vmf_homes",
+            lambda: VMFHomesScraper.scrape(min_price=min_price, max_price=max_price, max_listings=max_listings),
+            timeout=120,
+        ),
+        SourceSpec(
+            "21st_mortgage",
+            lambda: TwentyFirstMortgageScraper.scrape(min_price=min_price, max_price=max_price,
+                                                      max_listings=max_listings),
+            timeout=60,
+        ),
+    ]
@@ -0,0 +1,109 @@
+"""
+Streaming text extraction for bank-statement uploads.
+
+A year-long statement is 100-200 PDF pages. Extracting the whole text, then
+splitting it for the model, holds the full text (and every parsed movement)
+in memory and shows nothing until the last chunk is back. These helpers
+produce the text lazily instead:
+
+  - `iter_pdf_pages`  — one page's text at a time (pypdf / PyPDF2),
+  - `iter_excel_rows` — one " | "-joined row at a time (openpyxl read-only),
+  - `iter_text_chunks` — packs pages/rows into ≤ chunk_size model prompts,
+    cutting at a blank line / newline like the old whole-text splitter,
+  - `TextPreview` — keeps the first N chars (bank_statements.raw_extracted_text)
+    while the rest streams through.
+
+    preview = TextPreview()
+    for chunk in iter_text_chunks(preview.tap(iter_pdf_pages(data)), sep="\\n\\n"):
+        ...
+
+CSV movements are streamed row by row in accounting._iter_csv_movements.
+"""
+from __future__ import annotations
+
+import io
+from typing import Iterable, Iterator
+
+CHUNK_SIZE = 6000
+PREVIEW_CHARS = 50000
+
+
+def iter_pdf_pages(file_content: bytes) -> Iterator[str]:
+    """Text of each PDF page that has any, in order."""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        from PyPDF2 import PdfReader
+    reader = PdfReader(io.BytesIO(file_content))
+    for page in reader.pages:
+        text = page.extract_text()
+        if text:
+            yield text
+
+
+def iter_excel_rows(file_content: bytes) -> Iterator[str]:
+    """Rows of the active sheet as "a | b | c" lines (read-only mode: rows are
+    read from the zip as they're iterated, not loaded up front)."""
+    import openpyxl
+
+    wb = openpyxl.load_workbook(io.BytesIO(file_content), read_only=True)
+    try:
+        for row in wb.active.iter_rows(values_only=True):
+            yield " | ".join(str(c) if c is not None else "" for c in row)
+    finally:
+        wb.close()
+
+
+def _break_point(text: str, chunk_size: int) -> int:
+    """Where to cut an over-long buffer: the last blank line, else the last
+    newline, in the second half of the chunk — else a hard cut."""
+    at = text.rfind("\n\n", 0, chunk_size)
+    if at < chunk_size // 2:
+        at = text.rfind("\n", 0, chunk_size)
+    if at < chunk_size // 2:
+        at = chunk_size
+    return at
+
+
+def iter_text_chunks(pieces: Iterable[str], sep: str = "\n\n", chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Join `pieces` with `sep` and yield it in chunks of at most `chunk_size`
+    chars. Only about one chunk of text is buffered at a time."""
+    buf = ""
+    for piece in pieces:
+        buf = f"{buf}{sep}{piece}" if buf else piece
+        while len(buf) > chunk_size:
+            at = _break_point(buf, chunk_size)
+            yield buf[:at]
+            buf = buf[at:].lstrip()
+    if buf.strip():
+        yield buf
+
+
+class TextPreview:
+    """First `limit` chars of a text that streams past, plus its total length."""
+
+    def __init__(self, limit: int = PREVIEW_CHARS, sep: str = "\n\n"):
+        self.limit = limit
+        self.sep = sep
+        self.length = 0
+        self._parts: list[str] = []
+        self._kept = 0
+
+    def add(self, piece: str) -> None:
+        if self.length:
+            piece = self.sep + piece
+        self.length += len(piece)
+        if self._kept < self.limit:
+            part = piece[:self.limit - self._kept]
+            self._parts.append(part)
+            self._kept += len(part)
+
+    def tap(self, pieces: Iterable[str]) -> Iterator[str]:
+        """Pass `pieces` through unchanged, recording them."""
+        for piece in pieces:
+            self.add(piece)
+            yield piece
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
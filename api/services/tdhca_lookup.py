@@ -0,0 +1,187 @@
+"""
+TDHCA title search: serial / label number → the title detail page HTML.
+
+Shared by the /market-listings/tdhca-lookup endpoint and the title monitor
+(title_monitor.check_single_transfer), which used to drive the same form in
+two copies of the Playwright flow:
+
+  1. open https://mhweb.tdhca.state.tx.us/mhweb/title_view.jsp,
+  2. fill the serial or label field and submit,
+  3. stop if TDHCA reports no records,
+  4. from a results page, click through to the detail page (detail links
+     in table cells first, then any title_detail link, a "Detail" cell
+     link, and finally the first link of a result row).
+
+Every finished lookup — a detail page or "no records" — goes into the
+on-disk response cache (api/utils/response_cache.py) keyed by search type
++ value, so looking the same title up again within the TDHCA TTL (1 hour)
+doesn't launch Chromium. `bypass_cache=True` (or RESPONSE_CACHE_BYPASS)
+forces a live lookup; a results page we couldn't click through is never
+cached.
+
+Parsing stays with the callers (api/utils/tdhca_parser.py).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from bs4 import BeautifulSoup
+
+from api.utils import response_cache
+
+logger = logging.getLogger(__name__)
+
+TDHCA_BASE_URL = "https://mhweb.tdhca.state.tx.us/mhweb"
+TDHCA_SEARCH_URL = f"{TDHCA_BASE_URL}/title_view.jsp"
+
+NO_RECORDS_INDICATORS = (
+    'No records', 'no records', 'total_rec" value="0"',
+    'No matching', 'no matching', '0 records',
+)
+
+# Detail pages have these as table cell TEXT (not column headers)
+_DETAIL_INDICATORS = ('certificate #', 'manufacturer', 'wind zone', 'square ftg')
+
+# Strategies A–D, in order (see module docstring)
+_DETAIL_LINK_SELECTORS = (
+    ("A", 'table td a[href*="title_detail"], table td a[href*="titleDetail"], table td a[href*="certnum"]'),
+    ("B", 'a[href*="title_detail"], a[href*="titleDetail"]'),
+    ("C", 'table td a:has-text("Detail")'),
+    ("D", 'table tr:not(:first-child) td a'),
+)
+
+
+@dataclass
+class TdhcaPage:
+    search_type: str
+    search_value: str
+    content: str
+    url: str
+    found: bool
+    from_cache: bool = False
+    debug_log: List[str] = field(default_factory=list)
+
+    @property
+    def print_url(self) -> Optional[str]:
+        """Absolute href of the page's Print link, if any."""
+        soup = BeautifulSoup(self.content, 'html.parser')
+        for a in soup.find_all('a', href=True):
+            if 'Print' in a.get_text() or 'print' in a['href']:
+                href = a['href']
+                return href if href.startswith('http') else f"{TDHCA_BASE_URL}/{href}"
+        return None
+
+
+def _has_no_records(content: str) -> bool:
+    return any(ind in content for ind in NO_RECORDS_INDICATORS)
+
+
+def _looks_like_detail_page(url: str, content: str) -> Optional[str]:
+    """Why this is a detail page ('url' / 'content'), or None for a results page."""
+    url_lower = url.lower()
+    if 'title_detail' in url_lower or 'titledetail' in url_lower:
+        return "url"
+    cells = {td.get_text(strip=True).lower() for td in BeautifulSoup(content, 'html.parser').find_all('td')}
+    if sum(1 for ind in _DETAIL_INDICATORS if ind in cells) >= 2:
+        return "content"
+    return None
+
+
+def _cache_params(search_type: str, search_value: str) -> dict:
+    return {"search_type": search_type, "search_value": search_value.strip().upper()}
+
+
+async def fetch_title_page(search_type: str, search_value: str, *,
+                           bypass_cache: bool = False) -> TdhcaPage:
+    """Run a TDHCA title search (search_type 'serial' or 'label'). See module docstring."""
+    cache = response_cache.get_cache()
+    params = _cache_params(search_type, search_value)
+    if not response_cache.bypassed(bypass_cache):
+        cached = cache.get(TDHCA_SEARCH_URL, params, method="POST")
+        if cached is not None:
+            content = cached.text()
+            url = cached.headers.get("location", TDHCA_SEARCH_URL)
+            logger.info(f"[TDHCA] {search_type} {search_value}: cached ({cached.age:.0f}s old)")
+            return TdhcaPage(search_type, search_value, content, url,
+                             found=not _has_no_records(content), from_cache=True,
+                             debug_log=[f"Cache: served from response cache ({cached.age:.0f}s old)"])
+
+    page_result, cacheable = await _search(search_type, search_value)
+    if cacheable:
+        cache.put(TDHCA_SEARCH_URL, page_result.content.encode("utf-8"), params, method="POST",
+                  headers={"location": page_result.url})
+    return page_result
+
+
+async def _search(search_type: str, search_value: str):
+    """The live Playwright flow → (TdhcaPage, cacheable)."""
+    from playwright.async_api import async_playwright
+
+    debug_log: List[str] = []
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=True)
+        try:
+            page = await browser.new_page()
+
+            # ═══ Step 1: Navigate to TDHCA search page ═══
+            await page.goto(TDHCA_SEARCH_URL, wait_until='domcontentloaded', timeout=30000)
+            debug_log.append(f"Step1: Loaded search page: {page.url}")
+
+            # ═══ Step 2: Fill in the search field and submit ═══
+            field_name = "serial" if search_type == 'serial' else "label"
+            await page.fill(f'input[name="{field_name}"]', search_value)
+            await page.click('input[type="submit"], button[type="submit"]')
+            await page.wait_for_load_state('domcontentloaded', timeout=15000)
+            await asyncio.sleep(2)
+
+            content = await page.content()
+            debug_log.append(f"Step2: After submit URL: {page.url}")
+            debug_log.append(f"Step2: Content length: {len(content)}")
+
+            # ═══ Step 3: Check if we got results ═══
+            if _has_no_records(content):
+                return TdhcaPage(search_type, search_value, content, page.url, found=False,
+                                 debug_log=debug_log), True
+
+            # ═══ Step 4: Results page or detail page? ═══
+            reason = _looks_like_detail_page(page.url, content)
+            if reason:
+                debug_log.append(f"Step4: Already on detail page ({reason}), no click needed")
+                return TdhcaPage(search_type, search_value, content, page.url, found=True,
+                                 debug_log=debug_log), True
+
+            # ═══ Step 5: On a results page, navigate to detail ═══
+            debug_log.append("Step5: On results page, trying to navigate to detail...")
+            all_links = page.locator('a')
+            link_count = await all_links.count()
+            link_info = []
+            for i in range(min(link_count, 30)):
+                href = await all_links.nth(i).get_attribute('href') or ''
+                text = (await all_links.nth(i).text_content() or '').strip()
+                link_info.append(f"  [{i}] text='{text[:40]}' href='{href[:80]}'")
+            debug_log.append(f"Step5: Found {link_count} links:\n" + "\n".join(link_info))
+            logger.info(f"[TDHCA] All links on page:\n" + "\n".join(link_info))
+
+            for strategy, selector in _DETAIL_LINK_SELECTORS:
+                links = page.locator(selector)
+                count = await links.count()
+                if count > 0:
+                    debug_log.append(f"Step5{strategy}: Found {count} links for {selector!r}")
+                    await links.first.click()
+                    await page.wait_for_load_state('domcontentloaded', timeout=15000)
+                    await asyncio.sleep(2)
+                    content = await page.content()
+                    debug_log.append(f"Step5: After click URL: {page.url}")
+                    logger.info(f"[TDHCA] After click — page URL: {page.url}")
+                    return TdhcaPage(search_type, search_value, content, page.url, found=True,
+                                     debug_log=debug_log), True
+
+            debug_log.append("Step5: ⚠️ Could not find any detail link to click! Parsing current page as-is.")
+            logger.warning("[TDHCA] Could not find detail link! Parsing results page as fallback.")
+            return TdhcaPage(search_type, search_value, content, page.url, found=True,
+                             debug_log=debug_log), False
+        finally:
+            await browser.close()
@@ -125,10 +125,12 @@ def populate_tdhca_fields_from_document_data(transfer_id: str) -> dict:
     return {"ok": True, "serial": serial, "label": label}
 
 
-async def check_single_transfer(transfer_id: str) -> dict:
+async def check_single_transfer(transfer_id: str, bypass_cache: bool = False) -> dict:
     """
     Check TDHCA for a single transfer. Returns result dict.
-    Uses the existing TDHCA scraper from market_listings.
+    Uses the shared TDHCA search (api/services/tdhca_lookup.py); a title
+    looked up within the last hour is answered from the response cache
+    unless bypass_cache is set.
     """
     from tools.supabase_client import sb
 
@@ -149,103 +151,67 @@ async def check_single_transfer(transfer_id: str) -> dict:
     if t.get("title_name_updated"):
         return {"ok": True, "already_updated": True, "tdhca_owner": t.get("tdhca_owner_name")}
 
-    # Do the TDHCA lookup using Playwright
+    # Do the TDHCA lookup (Playwright, or the response cache)
     try:
-        from playwright.async_api import async_playwright
         from bs4 import BeautifulSoup
-        import asyncio
+        from api.services.tdhca_lookup import fetch_title_page
 
         search_type = "serial" if serial else "label"
         search_value = serial or label
 
-        async with async_playwright() as pw:
-            browser = await pw.chromium.launch(headless=True)
-            page = await browser.new_page()
+        result = await fetch_title_page(search_type, search_value, bypass_cache=bypass_cache)
+        content = result.content
 
-            await page.goto(
-                "https://mhweb.tdhca.state.tx.us/mhweb/title_view.jsp",
-                wait_until='domcontentloaded',
-                timeout=30000
-            )
-
-            if search_type == 'serial':
-                await page.fill('input[name="serial"]', search_value)
-            else:
-                await page.fill('input[name="label"]', search_value)
-
-            await page.click('input[type="submit"], button[type="submit"]')
-            await page.wait_for_load_state('domcontentloaded', timeout=15000)
-            await asyncio.sleep(2)
-
-            content = await page.content()
-
-            # Check for no results
-            no_records = ['No records', 'no records', 'total_rec" value="0"', '0 records']
-            if any(ind in content for ind in no_records):
-                await browser.close()
-                # Update check timestamp
-                sb.table("title_transfers").update({
-                    "last_tdhca_check": datetime.utcnow().isoformat(),
-                    "next_tdhca_check": (datetime.utcnow() + timedelta(days=30)).isoformat(),
-                    "tdhca_check_count": (t.get("tdhca_check_count") or 0) + 1,
-                }).eq("id", transfer_id).execute()
-                return {"ok": True, "found": False, "message": "No TDHCA records found"}
-
-            # Try to navigate to detail page if on results page
-            url_lower = page.url.lower()
-            if 'title_detail' not in url_lower and 'titledetail' not in url_lower:
-                detail_link = page.locator(
-                    'table td a[href*="title_detail"], table td a[href*="titleDetail"], '
-                    'table td a[href*="certnum"], a[href*="title_detail"]'
-                )
-                if await detail_link.count() > 0:
-                    await detail_link.first.click()
-                    await page.wait_for_load_state('domcontentloaded', timeout=15000)
-                    await asyncio.sleep(2)
-                    content = await page.content()
-
-            await browser.close()
-
-            # Parse the page to extract buyer name
-            from api.utils.tdhca_parser import parse_tdhca_detail_page
-            soup = BeautifulSoup(content, 'html.parser')
-            page_text = soup.get_text('\n', strip=True)
-            title_data = parse_tdhca_detail_page(soup, page_text)
-
-            tdhca_owner = (
-                title_data.get("buyer_transferee") or
-                title_data.get("buyer") or
-                title_data.get("transferee") or
-                ""
-            )
+        # Check for no results
+        if not result.found:
+            # Update check timestamp
+            sb.table("title_transfers").update({
+                "last_tdhca_check": datetime.utcnow().isoformat(),
+                "next_tdhca_check": (datetime.utcnow() + timedelta(days=30)).isoformat(),
+                "tdhca_check_count": (t.get("tdhca_check_count") or 0) + 1,
+            }).eq("id", transfer_id).execute()
+            return {"ok": True, "found": False, "message": "No TDHCA records found"}
+
+        # Parse the page to extract buyer name
+        from api.utils.tdhca_parser import parse_tdhca_detail_page
+        soup = BeautifulSoup(content, 'html.parser')
+        page_text = soup.get_text('\n', strip=True)
+        title_data = parse_tdhca_detail_page(soup, page_text)
+
+        tdhca_owner = (
+            title_data.get("buyer_transferee") or
+            title_data.get("buyer") or
+            title_data.get("transferee") or
+            ""
+        )
+
+        # Compare names
+        expected_name = t.get("to_name", "")
+        matched = _names_match(tdhca_owner, expected_name)
+
+        # Update transfer
+        now = datetime.utcnow()
+        update = {
+            "tdhca_owner_name": tdhca_owner,
+            "last_tdhca_check": now.isoformat(),
+            "tdhca_check_count": (t.get("tdhca_check_count") or 0) + 1,
+            "title_name_updated": matched,
+        }
+        if not matched:
+            update["next_tdhca_check"] = (now + timedelta(days=30)).isoformat()
+        else:
+            update["next_tdhca_check"] = None
 
-            # Compare names
-            expected_name = t.get("to_name", "")
-            matched = _names_match(tdhca_owner, expected_name)
+        sb.table("title_transfers").update(update).eq("id", transfer_id).execute()
 
-            # Update transfer
-            now = datetime.utcnow()
-            update = {
-                "tdhca_owner_name": tdhca_owner,
-                "last_tdhca_check": now.isoformat(),
-                "tdhca_check_count": (t.get("tdhca_check_count") or 0) + 1,
-                "title_name_updated": matched,
-            }
-            if not matched:
-                update["next_tdhca_check"] = (now + timedelta(days=30)).isoformat()
-            else:
-                update["next_tdhca_check"] = None
-
-            sb.table("title_transfers").update(update).eq("id", transfer_id).execute()
-
-            return {
-                "ok": True,
-                "found": True,
-                "tdhca_owner": tdhca_owner,
-                "expected_owner": expected_name,
-                "matched": matched,
-                "check_count": update["tdhca_check_count"],
-            }
+        return {
+            "ok": True,
+            "found": True,
+            "tdhca_owner": tdhca_owner,
+            "expected_owner": expected_name,
+            "matched": matched,
+            "check_count": update["tdhca_check_count"],
+        }
 
     except Exception as e:
         logger.error(f"[title_monitor] Error checking transfer {transfer_id}: {e}")
@@ -261,9 +227,11 @@ async def check_single_transfer(transfer_id: str) -> dict:
 def run_title_monitor_job() -> dict:
     """
     Cron job entry point: find all transfers due for a TDHCA check and process them.
-    Runs synchronously (APScheduler wrapper handles async).
+    Runs synchronously on a scheduler job thread (api/services/job_executor.py);
+    the TDHCA checks run on that thread's own event loop and stop if the job
+    times out or is cancelled.
     """
-    import asyncio
+    from api.services.job_executor import check_cancelled, run_coroutine
 
     try:
         from tools.supabase_client import sb
@@ -275,6 +243,7 @@ def run_title_monitor_job() -> dict:
 
         populated = 0
         for row in (missing.data or []):
+            check_cancelled()
             result = populate_tdhca_fields_from_document_data(row["id"])
             if result.get("ok") and result.get("serial"):
                 populated += 1
@@ -297,14 +266,7 @@ def run_title_monitor_job() -> dict:
                 results.append(r)
             return results
 
-        # Run async checks
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as pool:
-                results = pool.submit(asyncio.run, _check_all()).result()
-        else:
-            results = asyncio.run(_check_all())
+        results = run_coroutine(_check_all())
 
         matched = sum(1 for r in results if r.get("matched"))
         checked = len(results)
@@ -0,0 +1,46 @@
+"""
+Content fingerprint for scraped market listings.
+
+A partner refresh re-scrapes the same ~300 homes every 6 hours; almost all of
+them are unchanged. The fingerprint is a stable hash of what a buyer sees —
+price, photos and details — stored on the row as market_listings.content_hash
+(migration 111), so ingest can tell "same listing, nothing new" from a real
+change without comparing column by column.
+
+Not part of the fingerprint: scraped_at (changes every run), source_id and
+source_url (identity, not content), and anything computed after scraping
+(qualification, market value).
+"""
+
+import hashlib
+import json
+from typing import Any, Mapping
+
+FINGERPRINT_FIELDS = (
+    "address", "city", "state", "zip_code",
+    "listing_price", "price_type", "estimated_full_price",
+    "year_built", "sqft", "bedrooms", "bathrooms",
+    "photos", "thumbnail_url",
+)
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        # 30000 and 30000.0 (and DECIMAL round-trips) hash the same
+        return round(float(value), 2)
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return str(value)
+
+
+def listing_fingerprint(listing: Mapping[str, Any]) -> str:
+    """sha1 hex of the listing's content fields (missing fields count as None)."""
+    payload = {k: _canonical(listing.get(k)) for k in FINGERPRINT_FIELDS}
+    if payload["price_type"] is None:
+        payload["price_type"] = "full"
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
@@ -21,55 +21,132 @@ We use ONLY remodelación because:
   3. It gives a clearer picture of "how much will I spend fixing this house"
 
 Data source: data/historico_2025.json (93 casas from MANINOS HOMES 2025.xlsx)
+plus the houses sold since, as versioned snapshots in price_comp_snapshots
+(api/services/price_comps.py). Every prediction reports the
+`dataset_version` it was computed from.
+
+Matching: `compute_similarity` is the reference definition of how alike a
+listing and a historical house are. For scoring, the historical set is
+loaded once into NumPy arrays (`HistoricalFeatures`) and
+`similarity_matrix` scores N listings × H houses in one pass — the same
+arithmetic in the same order, so the scores are bit-identical — with
+`top_k_matches` picking the k best per listing via argpartition (ties in
+historical order, as the stable sort did). `predict_batch` scores all
+listings together; scripts/benchmark_price_predictor.py compares it to the
+per-pair loop.
 """
 
+import hashlib
 import json
 import math
 import logging
-from typing import Optional, Dict, Any, List
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Sequence, Tuple
 from pathlib import Path
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 # ============================================
 # LOAD HISTORICAL DATA
 # ============================================
+#
+# The comps live in one immutable ComparablesDataset: built from
+# data/historico_2025.json on first use, replaced as a whole by
+# install_dataset() when api/services/price_comps.py finds a newer
+# published snapshot. The swap is a single assignment, so a prediction
+# that captured the dataset scores against one consistent version.
 
-_historical_data: List[Dict[str, Any]] = []
-_summary_stats: Dict[str, Any] = {}
+SEED_PATH = Path(__file__).parent.parent.parent / "data" / "historico_2025.json"
 
 
-def _load_data():
-    """Load historical data from JSON file (lazy, cached)."""
-    global _historical_data, _summary_stats
-    if _historical_data:
-        return _historical_data
-    
-    data_path = Path(__file__).parent.parent.parent / "data" / "historico_2025.json"
-    if not data_path.exists():
-        logger.error(f"[PricePredictor] Historical data not found at {data_path}")
-        return []
-    
-    with open(data_path, 'r', encoding='utf-8') as f:
-        all_records = json.load(f)
-    
-    # All records already have both prices (filtered during extraction)
-    _historical_data = [
-        r for r in all_records
+def usable_records(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Records with both a purchase and a sale price."""
+    return [
+        r for r in records
         if r.get('precio_compra') and r['precio_compra'] > 0
         and r.get('precio_venta') and r['precio_venta'] > 0
     ]
-    
-    _compute_summary_stats(_historical_data)
-    
-    logger.info(f"[PricePredictor] Loaded {len(_historical_data)} historical houses")
-    return _historical_data
 
 
-def _compute_summary_stats(records: List[Dict[str, Any]]):
+def dataset_version(records: List[Dict[str, Any]]) -> str:
+    """Content hash of a comps set — the same houses always give the same version."""
+    material = json.dumps(records, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()[:12]
+
+
+@dataclass(frozen=True)
+class ComparablesDataset:
+    version: str
+    source: str  # 'seed' (the JSON file) or 'store' (price_comp_snapshots)
+    records: List[Dict[str, Any]]
+    features: "HistoricalFeatures"
+    summary_stats: Dict[str, Any]
+    loaded_at: float
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]], *, source: str,
+                     version: Optional[str] = None) -> "ComparablesDataset":
+        usable = usable_records(records)
+        return cls(
+            version=version or dataset_version(usable),
+            source=source,
+            records=usable,
+            features=HistoricalFeatures.from_records(usable),
+            summary_stats=_compute_summary_stats(usable),
+            loaded_at=time.time(),
+        )
+
+
+_dataset: Optional[ComparablesDataset] = None
+_dataset_lock = threading.Lock()
+
+
+def load_seed_records() -> List[Dict[str, Any]]:
+    """The 2025 houses from data/historico_2025.json ([] if the file is missing)."""
+    if not SEED_PATH.exists():
+        logger.error(f"[PricePredictor] Historical data not found at {SEED_PATH}")
+        return []
+    with open(SEED_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def get_dataset() -> Optional[ComparablesDataset]:
+    """The active comps — the seed file until a stored snapshot is installed; None without data."""
+    global _dataset
+    if _dataset is None:
+        with _dataset_lock:
+            if _dataset is None:
+                records = load_seed_records()
+                if records:
+                    _dataset = ComparablesDataset.from_records(records, source='seed')
+                    logger.info(f"[PricePredictor] Loaded {len(_dataset.records)} historical houses "
+                                f"(seed, version {_dataset.version})")
+    return _dataset
+
+
+def install_dataset(dataset: ComparablesDataset) -> Optional[ComparablesDataset]:
+    """Make `dataset` the active comps; returns the one it replaced."""
+    global _dataset
+    with _dataset_lock:
+        previous, _dataset = _dataset, dataset
+    logger.info(f"[PricePredictor] Active comps: version {dataset.version} ({dataset.source}, "
+                f"{len(dataset.records)} houses)"
+                + (f", replacing {previous.version}" if previous else ""))
+    return previous
+
+
+def _load_data():
+    """Records of the active dataset (lazy, cached)."""
+    dataset = get_dataset()
+    return dataset.records if dataset else []
+
+
+def _compute_summary_stats(records: List[Dict[str, Any]]) -> Dict[str, Any]:
     """Compute summary statistics."""
-    global _summary_stats
-    
     single = [r for r in records if r['tipo'] == 'SINGLE']
     double = [r for r in records if r['tipo'] == 'DOUBLE']
     
@@ -104,7 +181,7 @@ def _compute_summary_stats(records: List[Dict[str, Any]]):
             'ganancia_pct_venta': round(avg_g / avg_v * 100) if avg_v > 0 else 0,
         }
     
-    _summary_stats = {
+    return {
         'total_casas': len(records),
         'single_wide': type_stats(single),
         'double_wide': type_stats(double),
@@ -113,16 +190,24 @@ def _compute_summary_stats(records: List[Dict[str, Any]]):
 
 
 def get_summary_stats() -> Dict[str, Any]:
-    """Get pre-computed summary statistics."""
-    _load_data()
-    return _summary_stats
+    """Get pre-computed summary statistics (with the dataset version they describe)."""
+    dataset = get_dataset()
+    if not dataset:
+        return {}
+    return {**dataset.summary_stats, 'dataset_version': dataset.version}
+
+
+def get_historical_features() -> Optional["HistoricalFeatures"]:
+    """Feature arrays of the active dataset (None when there is no data)."""
+    dataset = get_dataset()
+    return dataset.features if dataset else None
 
 
 def reload_data():
-    """Force reload of historical data."""
-    global _historical_data, _summary_stats
-    _historical_data = []
-    _summary_stats = {}
+    """Force reload of historical data from the seed file."""
+    global _dataset
+    with _dataset_lock:
+        _dataset = None
     return _load_data()
 
 
@@ -255,10 +340,213 @@ def compute_similarity(listing_features: Dict, historical: Dict) -> float:
     return score / 100.0
 
 
+# ============================================
+# VECTORIZED SIMILARITY (N listings × H houses)
+# ============================================
+
+# Denominator of the sqft Gaussian in compute_similarity
+_SQFT_VAR2 = 2 * 400 ** 2
+# Integral sqft differences beyond this score exp(-x) == 0.0 anyway
+_SQFT_TABLE_MAX = 20000
+_SQFT_TABLE = np.array([math.exp(-(d ** 2) / _SQFT_VAR2) for d in range(_SQFT_TABLE_MAX + 1)])
+
+# Listings scored per block, so N × H float64 temporaries stay ~10-20 MB
+_BLOCK_CELLS = 1_000_000
+
+
+def _present(values: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """(float array, mask) — mask is False where compute_similarity's `if x` fails (None / 0)."""
+    arr = np.array([float(v) if v else 0.0 for v in values], dtype=np.float64)
+    return arr, arr != 0
+
+
+@dataclass(frozen=True)
+class HistoricalFeatures:
+    """The historical set as column arrays, in record order."""
+    tipo: np.ndarray              # int code per house, see tipo_codes
+    tipo_codes: Dict[Any, int]    # tipo value → code ('SINGLE', 'DOUBLE', ...)
+    precio_compra: np.ndarray
+    sqft: np.ndarray
+    has_sqft: np.ndarray
+    cuartos: np.ndarray
+    has_cuartos: np.ndarray
+    banos: np.ndarray
+    has_banos: np.ndarray
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]]) -> "HistoricalFeatures":
+        tipo_codes: Dict[Any, int] = {}
+        tipo = np.array([tipo_codes.setdefault(r.get('tipo'), len(tipo_codes)) for r in records],
+                        dtype=np.int64)
+        precio = np.array([float(r.get('precio_compra') or 0) for r in records], dtype=np.float64)
+        sqft = np.array([float(r['sqft']) if r.get('sqft') and r['sqft'] > 0 else 0.0 for r in records],
+                        dtype=np.float64)
+        cuartos, has_cuartos = _present([r.get('cuartos') for r in records])
+        banos, has_banos = _present([r.get('banos') for r in records])
+        return cls(tipo, tipo_codes, precio, sqft, sqft > 0,
+                   cuartos, has_cuartos, banos, has_banos)
+
+    def __len__(self) -> int:
+        return len(self.precio_compra)
+
+
+def _sqft_gaussian(diff: np.ndarray) -> np.ndarray:
+    """exp(-(diff²) / (2·400²)), bit-identical to math.exp in compute_similarity."""
+    clipped = np.minimum(diff, _SQFT_TABLE_MAX)  # the table's last entry is 0.0
+    as_int = clipped.astype(np.int64)
+    if (as_int == clipped).all():
+        return _SQFT_TABLE[as_int]
+    out = np.zeros_like(diff)
+    integral = (diff == np.floor(diff)) & (diff <= _SQFT_TABLE_MAX)
+    out[integral] = _SQFT_TABLE[diff[integral].astype(np.int64)]
+    rest = ~integral & (diff <= _SQFT_TABLE_MAX)
+    if rest.any():
+        out[rest] = [math.exp(-(d ** 2) / _SQFT_VAR2) for d in diff[rest].tolist()]
+    return out
+
+
+def _categorical_term(l_vals, l_has, h_vals, h_has, *, rule, missing: float) -> np.ndarray:
+    """
+    A term that depends only on |listing value − house value| (bedrooms,
+    bathrooms): `rule` is applied to the few distinct value pairs and the
+    (N, H) result gathered from that table. `missing` when either side
+    has no value.
+    """
+    l_unique, l_inv = np.unique(np.where(l_has, l_vals, np.nan), return_inverse=True)
+    h_unique, h_inv = np.unique(np.where(h_has, h_vals, np.nan), return_inverse=True)
+    diff = np.abs(l_unique[:, None] - h_unique[None, :])
+    table = np.where(np.isnan(diff), missing, rule(diff))
+    return table[l_inv.reshape(-1)[:, None], h_inv.reshape(-1)[None, :]]
+
+
+def similarity_matrix(listings: Sequence[Dict[str, Any]], hist: HistoricalFeatures) -> np.ndarray:
+    """
+    compute_similarity for every (listing, historical house) pair → (N, H).
+
+    `listings` are feature dicts as built for compute_similarity (tipo,
+    sqft, cuartos, banos, precio_lista). Each term is added in the same
+    order as compute_similarity, so every score equals its scalar result.
+    """
+    l_tipo = np.array([hist.tipo_codes.get(f.get('tipo'), -1) for f in listings], dtype=np.int64)[:, None]
+    l_price = np.array([float(f.get('precio_lista') or 0) for f in listings], dtype=np.float64)[:, None]
+    l_sqft = np.array([float(f.get('sqft', 1200)) for f in listings], dtype=np.float64)[:, None]
+    l_beds, l_has_beds = _present([f.get('cuartos') for f in listings])
+    l_baths, l_has_baths = _present([f.get('banos') for f in listings])
+
+    same_type = l_tipo == hist.tipo[None, :]
+
+    # Type match (20 points)
+    score = np.where(same_type, 20.0, 3.0)
+
+    # Price closeness (35 points)
+    h_price = hist.precio_compra[None, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        term = np.minimum(l_price, h_price)
+        term /= np.maximum(l_price, h_price)
+    term *= 35
+    unpriced = ~((l_price > 0) & (h_price > 0))
+    if unpriced.any():
+        np.copyto(term, 10.0, where=unpriced)
+    score += term
+
+    # Sqft closeness (20 points)
+    term = _sqft_gaussian(np.abs(l_sqft - hist.sqft[None, :]))
+    term *= 20
+    no_sqft = ~hist.has_sqft
+    if no_sqft.any():
+        term[:, no_sqft] = np.where(same_type[:, no_sqft], 8.0, 3.0)
+    score += term
+
+    # Bedrooms match (15 points)
+    score += _categorical_term(
+        l_beds, l_has_beds, hist.cuartos, hist.has_cuartos, missing=7.0,
+        rule=lambda d: np.where(d == 0, 15.0, np.where(d == 1, 10.0, 3.0)))
+
+    # Bathrooms match (10 points)
+    score += _categorical_term(
+        l_baths, l_has_baths, hist.banos, hist.has_banos, missing=5.0,
+        rule=lambda d: np.where(d == 0, 10.0, np.where(d <= 0.5, 7.0, 2.0)))
+
+    score /= 100.0
+    return score
+
+
+def _top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k best columns per row, best first, ties by column order."""
+    h = scores.shape[1]
+    if k >= h:
+        return np.argsort(-scores, axis=1, kind='stable')
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    kth = np.take_along_axis(scores, part, axis=1).min(axis=1)
+    # argpartition picks arbitrarily among ties at the k-th score; rows
+    # with more candidates than slots get the stable-sort answer instead.
+    ambiguous = np.flatnonzero((scores >= kth[:, None]).sum(axis=1) > k)
+    for row in ambiguous:
+        part[row] = np.argsort(-scores[row], kind='stable')[:k]
+    part.sort(axis=1)
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1)
+
+
+def top_k_matches(
+    listings: Sequence[Dict[str, Any]],
+    hist: HistoricalFeatures,
+    k: int = 8,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The k most similar historical houses per listing → (indices, scores),
+    both (N, min(k, H)), best first — the same picks, in the same order,
+    as sorting compute_similarity scores with a stable sort.
+    """
+    k = min(k, len(hist))
+    idx = np.empty((len(listings), k), dtype=np.int64)
+    sims = np.empty((len(listings), k), dtype=np.float64)
+    block = max(1, _BLOCK_CELLS // max(1, len(hist)))
+    for start in range(0, len(listings), block):
+        scores = similarity_matrix(listings[start:start + block], hist)
+        top = _top_k_rows(scores, k)
+        idx[start:start + block] = top
+        sims[start:start + block] = np.take_along_axis(scores, top, axis=1)
+    return idx, sims
+
+
 # ============================================
 # PREDICTION ENGINE
 # ============================================
 
+def _no_data_prediction() -> Dict[str, Any]:
+    return {
+        "recommended_max_price": None,
+        "expected_sale_price": None,
+        "expected_remodelacion": None,
+        "expected_ganancia": None,
+        "margin_at_listing_price_pct": None,
+        "confidence": "sin_datos",
+        "similar_houses": [],
+        "home_type": None,
+        "analysis": "No hay datos históricos disponibles para hacer predicciones.",
+    }
+
+
+def _listing_features(
+    listing_price: float,
+    sqft: Optional[int] = None,
+    bedrooms: Optional[int] = None,
+    bathrooms: Optional[float] = None,
+    description: str = "",
+) -> Dict[str, Any]:
+    """Classify a listing and build its compute_similarity feature dict."""
+    home_type = classify_home_type(sqft, bedrooms, description)
+    est_sqft = estimate_sqft_from_listing(sqft, bedrooms, home_type)
+    return {
+        'tipo': home_type,
+        'sqft': est_sqft,
+        'cuartos': bedrooms,
+        'banos': bathrooms,
+        'precio_lista': listing_price,  # KEY: used to find historically similar-priced purchases
+    }
+
+
 def predict_price(
     listing_price: float,
     sqft: Optional[int] = None,
@@ -279,41 +567,30 @@ def predict_price(
         expected_remodelacion: How much renovation will cost
         expected_ganancia: Profit (venta - compra - remodelación)
         margin_pct: Margin as percentage
+        dataset_version: Version of the comps the prediction was made from
     """
-    data = _load_data()
-    if not data:
-        return {
-            "recommended_max_price": None,
-            "expected_sale_price": None,
-            "expected_remodelacion": None,
-            "expected_ganancia": None,
-            "margin_at_listing_price_pct": None,
-            "confidence": "sin_datos",
-            "similar_houses": [],
-            "home_type": None,
-            "analysis": "No hay datos históricos disponibles para hacer predicciones.",
-        }
-    
-    # Classify listing
-    home_type = classify_home_type(sqft, bedrooms, description)
-    est_sqft = estimate_sqft_from_listing(sqft, bedrooms, home_type)
-    
-    listing_features = {
-        'tipo': home_type,
-        'sqft': est_sqft,
-        'cuartos': bedrooms,
-        'banos': bathrooms,
-        'precio_lista': listing_price,  # KEY: used to find historically similar-priced purchases
-    }
-    
+    dataset = get_dataset()
+    if not dataset or not dataset.records:
+        return _no_data_prediction()
+
+    listing_features = _listing_features(listing_price, sqft, bedrooms, bathrooms, description)
+
     # Find most similar historical houses
-    scored = []
-    for hist in data:
-        sim = compute_similarity(listing_features, hist)
-        scored.append((sim, hist))
-    
-    scored.sort(key=lambda x: -x[0])
-    top_k = scored[:k]
+    idx, sims = top_k_matches([listing_features], dataset.features, k)
+    top_k = [(float(sim), dataset.records[i]) for sim, i in zip(sims[0], idx[0])]
+    pred = _predict_from_matches(listing_features, top_k)
+    pred['dataset_version'] = dataset.version
+    return pred
+
+
+def _predict_from_matches(
+    listing_features: Dict[str, Any],
+    top_k: List[Tuple[float, Dict[str, Any]]],
+) -> Dict[str, Any]:
+    """The prediction for one listing from its k best (similarity, house) matches."""
+    listing_price = listing_features['precio_lista']
+    home_type = listing_features['tipo']
+    est_sqft = listing_features['sqft']
     
     relevant = [(sim, h) for sim, h in top_k if sim >= 0.3]
     if not relevant:
@@ -547,17 +824,30 @@ def predict_price(
     }
 
 
-def predict_batch(listings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Run predictions for multiple listings at once."""
-    results = []
-    for listing in listings:
-        pred = predict_price(
+def predict_batch(listings: List[Dict[str, Any]], k: int = 8) -> List[Dict[str, Any]]:
+    """Run predictions for multiple listings at once (one similarity pass for all)."""
+    dataset = get_dataset()
+    data = dataset.records if dataset else []
+    features = [
+        _listing_features(
             listing_price=listing.get('listing_price', 0),
             sqft=listing.get('sqft'),
             bedrooms=listing.get('bedrooms'),
             bathrooms=listing.get('bathrooms'),
             description=listing.get('address', '') + ' ' + (listing.get('description') or ''),
         )
+        for listing in listings
+    ]
+    if data and features:
+        idx, sims = top_k_matches(features, dataset.features, k)
+    results = []
+    for row, (listing, listing_features) in enumerate(zip(listings, features)):
+        if data:
+            top_k = [(float(sim), data[i]) for sim, i in zip(sims[row], idx[row])]
+            pred = _predict_from_matches(listing_features, top_k)
+            pred['dataset_version'] = dataset.version
+        else:
+            pred = _no_data_prediction()
         pred['listing_id'] = listing.get('id')
         results.append(pred)
     return results
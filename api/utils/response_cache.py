@@ -0,0 +1,298 @@
+"""
+On-disk response cache for the scrapers and the TDHCA title lookup.
+
+Re-running a scrape, or `title_monitor.check_single_transfer`, a few
+minutes after the last one fetched the same pages again from MHVillage,
+Zillow and the TDHCA site — each one a Chromium page load. Responses are
+now kept in a SQLite file shared by every process on the host (API
+workers, scheduler):
+
+  - keyed by method + URL + the parameters that shape the response
+    (query params, JSON body, form values);
+  - fresh for a per-host TTL (`HOST_TTLS`, overridable with
+    RESPONSE_CACHE_TTLS="www.zillow.com=3600,mhweb.tdhca.state.tx.us=0");
+    a stale entry is kept so its ETag / Last-Modified can revalidate it;
+  - bodies zlib-compressed and the file bounded to RESPONSE_CACHE_MAX_MB,
+    evicting least-recently-used entries first.
+
+`bypassed(flag)` is the bypass switch — the caller's flag or
+RESPONSE_CACHE_BYPASS=1: reads are skipped (fresh data from the origin)
+but what comes back is still stored for the next run.
+
+The cache never breaks a scrape: any SQLite error is logged and treated
+as a miss.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "maninos_response_cache.sqlite3")
+DEFAULT_MAX_MB = 256
+DEFAULT_TTL = 600
+
+# Seconds a response stays fresh, by host (subdomains included).
+HOST_TTLS: Dict[str, int] = {
+    "mhvillage.com": 900,
+    "mobilehome.net": 900,
+    "mhbay.com": 900,
+    "craigslist.org": 900,
+    "zillow.com": 1800,
+    "vmfhomes.com": 900,
+    "21stmortgage.com": 1800,
+    # A title transfer shows up on TDHCA days after filing; an hour-old
+    # answer is as good as a new one.
+    "mhweb.tdhca.state.tx.us": 3600,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key         TEXT PRIMARY KEY,
+    url         TEXT NOT NULL,
+    status      INTEGER NOT NULL,
+    headers     TEXT NOT NULL,
+    body        BLOB NOT NULL,
+    size        INTEGER NOT NULL,
+    stored_at   REAL NOT NULL,
+    expires_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+def _env_ttls() -> Dict[str, int]:
+    ttls = {}
+    for item in os.getenv("RESPONSE_CACHE_TTLS", "").split(","):
+        host, _, seconds = item.partition("=")
+        try:
+            ttls[host.strip().lower()] = int(seconds)
+        except ValueError:
+            continue
+    return ttls
+
+
+def bypassed(flag: bool = False) -> bool:
+    """True when cached responses must not be served (caller flag or RESPONSE_CACHE_BYPASS)."""
+    return flag or os.getenv("RESPONSE_CACHE_BYPASS", "0").lower() in ("1", "true", "yes")
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    status: int
+    body: bytes
+    headers: Dict[str, str]
+    stored_at: float
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("etag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get("last-modified")
+
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+@dataclass
+class ResponseCache:
+    path: str = DEFAULT_PATH
+    max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024
+    ttls: Dict[str, int] = field(default_factory=dict)
+    default_ttl: int = DEFAULT_TTL
+    stats: Counter = field(default_factory=Counter)
+
+    def __post_init__(self):
+        self.ttls = {**HOST_TTLS, **self.ttls}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    # ------------------------------------------------------------------ keys
+
+    @staticmethod
+    def key(url: str, params: Optional[Mapping] = None, *, method: str = "GET",
+            json_body: Any = None) -> str:
+        material = json.dumps([method.upper(), url, sorted((params or {}).items()), json_body],
+                              sort_keys=True, default=str)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def ttl_for(self, url: str) -> int:
+        host = (urlsplit(url).hostname or "").lower()
+        best = None
+        for domain, ttl in self.ttls.items():
+            if (host == domain or host.endswith("." + domain)) and (best is None or len(domain) > len(best[0])):
+                best = (domain, ttl)
+        return best[1] if best else self.default_ttl
+
+    # --------------------------------------------------------------- storage
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get(self, url: str, params: Optional[Mapping] = None, *, method: str = "GET",
+            json_body: Any = None, allow_stale: bool = False) -> Optional[CachedResponse]:
+        """The stored response, or None. Stale entries only with allow_stale."""
+        key = self.key(url, params, method=method, json_body=json_body)
+        try:
+            with self._lock:
+                row = self._db().execute(
+                    "SELECT status, headers, body, stored_at, expires_at FROM responses WHERE key = ?",
+                    (key,)).fetchone()
+                if row is None:
+                    self.stats["miss"] += 1
+                    return None
+                self._db().execute("UPDATE responses SET accessed_at = ? WHERE key = ?",
+                                   (time.time(), key))
+            entry = CachedResponse(url, row[0], zlib.decompress(row[2]), json.loads(row[1]),
+                                   row[3], row[4])
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            logger.warning(f"[ResponseCache] read failed for {url[:80]}: {e}")
+            self.stats["error"] += 1
+            return None
+        if not entry.fresh and not allow_stale:
+            self.stats["stale"] += 1
+            return None
+        self.stats["hit" if entry.fresh else "stale"] += 1
+        return entry
+
+    def put(self, url: str, body: bytes, params: Optional[Mapping] = None, *, method: str = "GET",
+            json_body: Any = None, status: int = 200, headers: Optional[Mapping[str, str]] = None,
+            ttl: Optional[int] = None) -> None:
+        """Store a response; `ttl` overrides the host's."""
+        key = self.key(url, params, method=method, json_body=json_body)
+        kept = {k.lower(): v for k, v in (headers or {}).items()
+                if v and k.lower() in ("etag", "last-modified", "content-type", "location")}
+        blob = zlib.compress(body, 6)
+        if len(blob) > self.max_bytes // 4:
+            return
+        now = time.time()
+        expires = now + (self.ttl_for(url) if ttl is None else ttl)
+        try:
+            with self._lock:
+                db = self._db()
+                db.execute(
+                    "INSERT OR REPLACE INTO responses "
+                    "(key, url, status, headers, body, size, stored_at, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, url, status, json.dumps(kept), blob, len(blob), now, expires, now))
+                self.stats["store"] += 1
+                self._evict(db)
+        except sqlite3.Error as e:
+            logger.warning(f"[ResponseCache] write failed for {url[:80]}: {e}")
+            self.stats["error"] += 1
+
+    def refresh(self, url: str, params: Optional[Mapping] = None, *, method: str = "GET",
+                json_body: Any = None, headers: Optional[Mapping[str, str]] = None) -> None:
+        """A 304 revalidated the stored entry: start a new TTL (and take new validators)."""
+        key = self.key(url, params, method=method, json_body=json_body)
+        now = time.time()
+        try:
+            with self._lock:
+                db = self._db()
+                row = db.execute("SELECT headers FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return
+                kept = json.loads(row[0])
+                kept.update({k.lower(): v for k, v in (headers or {}).items()
+                             if v and k.lower() in ("etag", "last-modified")})
+                db.execute("UPDATE responses SET headers = ?, stored_at = ?, expires_at = ?, "
+                           "accessed_at = ? WHERE key = ?",
+                           (json.dumps(kept), now, now + self.ttl_for(url), now, key))
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"[ResponseCache] refresh failed for {url[:80]}: {e}")
+
+    def invalidate(self, url: str, params: Optional[Mapping] = None, *, method: str = "GET",
+                   json_body: Any = None) -> None:
+        key = self.key(url, params, method=method, json_body=json_body)
+        try:
+            with self._lock:
+                self._db().execute("DELETE FROM responses WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"[ResponseCache] invalidate failed for {url[:80]}: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db().execute("DELETE FROM responses")
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._db().execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        """Drop least-recently-used entries until the file is back under 90% of max_bytes."""
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = total - int(self.max_bytes * 0.9)
+        doomed, freed = [], 0
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            doomed.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.stats["evicted"] += len(doomed)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def get_cache() -> ResponseCache:
+    """The process-wide cache, configured from RESPONSE_CACHE_* on first use."""
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache(
+            path=os.getenv("RESPONSE_CACHE_PATH", DEFAULT_PATH),
+            max_bytes=int(float(os.getenv("RESPONSE_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024),
+            ttls=_env_ttls(),
+        )
+    return _cache
+
+
+def set_cache(cache: Optional[ResponseCache]) -> Optional[ResponseCache]:
+    """Install `cache` as the process-wide one (tests); returns the previous one."""
+    global _cache
+    previous, _cache = _cache, cache
+    return previous
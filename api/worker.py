@@ -0,0 +1,45 @@
+"""
+Maninos AI — standalone scheduler worker.
+
+Runs the scheduled jobs outside the web tier:
+
+    python -m api.worker
+
+It defaults to SCHEDULER_ROLE=worker (every job). Pair it with
+SCHEDULER_ROLE=web on the API so the web processes keep only their
+per-process jobs. Any number of workers can run: each scheduled run is
+leased in scheduler_runs, so it executes once, and if a worker dies
+mid-run another one takes the run over (api/services/job_leases.py).
+"""
+import asyncio
+import logging
+import os
+import signal
+
+import env_loader  # noqa: F401  (loads .env before the services read it)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger("api.worker")
+
+
+async def main() -> None:
+    os.environ.setdefault("SCHEDULER_ROLE", "worker")
+    from api.services.scheduler_service import init_scheduler, shutdown_scheduler
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    init_scheduler()
+    logger.info("Scheduler worker running — waiting for SIGTERM")
+    await stop.wait()
+
+    # Stops the running jobs: the leased ones are handed back for takeover
+    shutdown_scheduler()
+    await asyncio.sleep(0)  # AsyncIOScheduler.shutdown runs on the next loop turn
+    logger.info("Scheduler worker stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
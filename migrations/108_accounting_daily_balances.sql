@@ -0,0 +1,151 @@
+-- ============================================================================
+-- Migration 108: Daily balance snapshots for the Homes ledger
+-- ============================================================================
+-- Problem: the Income Statement, Balance Sheet, Cash Flow and the accounts
+-- tree re-page through EVERY row of accounting_transactions on each request
+-- (_fetch_all_transactions) and re-sum them in Python. Cost grows with the
+-- ledger, not with the report.
+--
+-- Solution: one row per (account, day, property, yard) holding the two sums
+-- the reports need:
+--     in_amount  = Σ amount WHERE is_income = TRUE
+--     out_amount = Σ amount WHERE is_income = FALSE
+-- over non-voided transactions (status <> 'voided', i.e. the same rows the
+-- reports' `.neq("status", "voided")` returns). _signed_balance / _net_income_sign are linear
+-- in amount per is_income, so summing snapshot rows gives the SAME totals as
+-- summing the raw transactions. A period report becomes "sum of daily
+-- snapshots between two dates".
+--
+-- Maintenance is incremental and lives in the database: an AFTER trigger on
+-- accounting_transactions applies the delta of every INSERT / UPDATE / DELETE
+-- in the same transaction as the write. That covers post_to_ledger,
+-- void_ledger_entry (status → 'voided' subtracts the row) and the ~40 other
+-- direct writers in api/routes — a Python-side hook would miss those.
+--
+-- Safety net: rebuild_accounting_daily_balances() recomputes everything from
+-- scratch (used by POST /api/accounting/reports/snapshots/rebuild), and
+-- GET /api/accounting/reports/snapshots/check compares both paths.
+-- Reports fall back to the full scan if this table is missing.
+--
+-- Requires Postgres 15+ (UNIQUE NULLS NOT DISTINCT) — Supabase default.
+-- Idempotent.
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS accounting_daily_balances (
+    account_id    UUID NOT NULL,
+    balance_date  DATE NOT NULL,
+    property_id   UUID,                 -- NULL = transaction without property
+    yard_id       UUID,                 -- NULL = transaction without yard
+    in_amount     NUMERIC(14,2) NOT NULL DEFAULT 0,   -- Σ amount, is_income = TRUE
+    out_amount    NUMERIC(14,2) NOT NULL DEFAULT 0,   -- Σ amount, is_income = FALSE
+    txn_count     INTEGER NOT NULL DEFAULT 0,
+    updated_at    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    CONSTRAINT accounting_daily_balances_key
+        UNIQUE NULLS NOT DISTINCT (account_id, balance_date, property_id, yard_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_acct_daily_balances_date
+    ON accounting_daily_balances (balance_date);
+CREATE INDEX IF NOT EXISTS idx_acct_daily_balances_yard_date
+    ON accounting_daily_balances (yard_id, balance_date);
+
+ALTER TABLE accounting_daily_balances ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE accounting_daily_balances IS
+    'Per account/day/property/yard sums of non-voided accounting_transactions, maintained by trigger trg_accounting_daily_balances. Read by the Homes financial reports instead of scanning the ledger.';
+
+
+-- ── Delta helper ────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION _accounting_daily_balances_add(
+    p_account_id UUID, p_date DATE, p_property_id UUID, p_yard_id UUID,
+    p_amount NUMERIC, p_is_income BOOLEAN, p_sign INTEGER
+) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO accounting_daily_balances AS b
+        (account_id, balance_date, property_id, yard_id, in_amount, out_amount, txn_count)
+    VALUES (
+        p_account_id, p_date, p_property_id, p_yard_id,
+        CASE WHEN p_is_income THEN p_sign * COALESCE(p_amount, 0) ELSE 0 END,
+        CASE WHEN p_is_income THEN 0 ELSE p_sign * COALESCE(p_amount, 0) END,
+        p_sign
+    )
+    ON CONFLICT ON CONSTRAINT accounting_daily_balances_key DO UPDATE
+    SET in_amount  = b.in_amount  + EXCLUDED.in_amount,
+        out_amount = b.out_amount + EXCLUDED.out_amount,
+        txn_count  = b.txn_count  + EXCLUDED.txn_count,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- ── Trigger: apply the delta of every ledger write ──────────────────────────
+CREATE OR REPLACE FUNCTION accounting_daily_balances_apply()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.account_id       IS NOT DISTINCT FROM OLD.account_id
+       AND NEW.transaction_date IS NOT DISTINCT FROM OLD.transaction_date
+       AND NEW.property_id      IS NOT DISTINCT FROM OLD.property_id
+       AND NEW.yard_id          IS NOT DISTINCT FROM OLD.yard_id
+       AND NEW.amount           IS NOT DISTINCT FROM OLD.amount
+       AND NEW.is_income        IS NOT DISTINCT FROM OLD.is_income
+       AND NEW.status           IS NOT DISTINCT FROM OLD.status THEN
+        -- e.g. linking the pair, reconciling, editing the description
+        RETURN NEW;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE')
+       AND OLD.account_id IS NOT NULL
+       AND OLD.status <> 'voided' THEN
+        PERFORM _accounting_daily_balances_add(
+            OLD.account_id, OLD.transaction_date, OLD.property_id, OLD.yard_id,
+            OLD.amount, COALESCE(OLD.is_income, FALSE), -1);
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE')
+       AND NEW.account_id IS NOT NULL
+       AND NEW.status <> 'voided' THEN
+        PERFORM _accounting_daily_balances_add(
+            NEW.account_id, NEW.transaction_date, NEW.property_id, NEW.yard_id,
+            NEW.amount, COALESCE(NEW.is_income, FALSE), 1);
+    END IF;
+
+    RETURN COALESCE(NEW, OLD);
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_accounting_daily_balances ON accounting_transactions;
+CREATE TRIGGER trg_accounting_daily_balances
+    AFTER INSERT OR UPDATE OR DELETE ON accounting_transactions
+    FOR EACH ROW EXECUTE FUNCTION accounting_daily_balances_apply();
+
+
+-- ── Full recompute (backfill + repair) ──────────────────────────────────────
+CREATE OR REPLACE FUNCTION rebuild_accounting_daily_balances()
+RETURNS INTEGER AS $$
+DECLARE
+    n INTEGER;
+BEGIN
+    -- Block concurrent ledger writes while we rebuild so no delta is lost.
+    LOCK TABLE accounting_transactions IN SHARE ROW EXCLUSIVE MODE;
+    DELETE FROM accounting_daily_balances;
+    INSERT INTO accounting_daily_balances
+        (account_id, balance_date, property_id, yard_id, in_amount, out_amount, txn_count)
+    SELECT account_id, transaction_date, property_id, yard_id,
+           COALESCE(SUM(amount) FILTER (WHERE is_income), 0),
+           COALESCE(SUM(amount) FILTER (WHERE NOT COALESCE(is_income, FALSE)), 0),
+           COUNT(*)
+    FROM accounting_transactions
+    WHERE account_id IS NOT NULL
+      AND status <> 'voided'
+    GROUP BY account_id, transaction_date, property_id, yard_id;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_accounting_daily_balances();
+
+COMMIT;
@@ -0,0 +1,161 @@
+-- ============================================================================
+-- Migration 109: Server-side derived bank balances (Homes + Capital)
+-- ============================================================================
+-- Problem: ledger.get_bank_balance / get_all_bank_balances download every
+-- transaction row that touches a bank and sum amount / is_income in Python.
+-- Cost grows with the ledger, and the unpaginated get_all_bank_balances
+-- query silently stops at PostgREST's 1000-row cap — the dashboard shows
+-- wrong balances once a ledger passes 1000 bank legs.
+--
+-- Solution: ledger_bank_daily_balances keeps, per (ledger, bank, day,
+-- status), the signed net of the bank legs:
+--     net_amount = Σ (CASE WHEN is_income THEN amount ELSE -amount END)
+-- maintained by an AFTER trigger on accounting_transactions (ledger='homes')
+-- and capital_transactions (ledger='capital'). Status is part of the key so
+-- each LedgerConfig keeps its own exclusion list (Homes: voided; Capital:
+-- voided, pending_confirmation, draft) without a second table.
+--
+-- get_derived_bank_balances(ledger, excluded_statuses, bank_id?, as_of?)
+-- sums those rows and returns one row per bank. Its cost depends on
+-- banks × days, not on how many transactions were posted, so it stays flat
+-- as the ledger grows (see scripts/benchmark_bank_balances.py).
+--
+-- rebuild_ledger_bank_daily_balances() recomputes the table from scratch
+-- (backfill below; repair if ever needed). ledger.py falls back to a
+-- paginated row scan if the RPC is missing.
+--
+-- Idempotent.
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS ledger_bank_daily_balances (
+    ledger          TEXT NOT NULL CHECK (ledger IN ('homes', 'capital')),
+    bank_account_id UUID NOT NULL,
+    balance_date    DATE NOT NULL,
+    status          TEXT NOT NULL DEFAULT '',     -- '' = NULL status on the ledger row
+    net_amount      NUMERIC(14,2) NOT NULL DEFAULT 0,
+    txn_count       INTEGER NOT NULL DEFAULT 0,
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (ledger, bank_account_id, balance_date, status)
+);
+
+ALTER TABLE ledger_bank_daily_balances ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE ledger_bank_daily_balances IS
+    'Per ledger/bank/day/status signed net of bank legs, maintained by trg_ledger_bank_daily_balances on accounting_transactions and capital_transactions. Read by get_derived_bank_balances().';
+
+
+-- ── Delta helper ────────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION _ledger_bank_daily_balances_add(
+    p_ledger TEXT, p_bank_account_id UUID, p_date DATE, p_status TEXT,
+    p_amount NUMERIC, p_is_income BOOLEAN, p_sign INTEGER
+) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO ledger_bank_daily_balances AS b
+        (ledger, bank_account_id, balance_date, status, net_amount, txn_count)
+    VALUES (
+        p_ledger, p_bank_account_id, p_date, COALESCE(p_status, ''),
+        p_sign * CASE WHEN p_is_income THEN COALESCE(p_amount, 0) ELSE -COALESCE(p_amount, 0) END,
+        p_sign
+    )
+    ON CONFLICT (ledger, bank_account_id, balance_date, status) DO UPDATE
+    SET net_amount = b.net_amount + EXCLUDED.net_amount,
+        txn_count  = b.txn_count  + EXCLUDED.txn_count,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- ── Trigger: apply the delta of every bank-leg write ────────────────────────
+CREATE OR REPLACE FUNCTION ledger_bank_daily_balances_apply()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_ledger TEXT := CASE TG_TABLE_NAME WHEN 'capital_transactions' THEN 'capital' ELSE 'homes' END;
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.bank_account_id  IS NOT DISTINCT FROM OLD.bank_account_id
+       AND NEW.transaction_date IS NOT DISTINCT FROM OLD.transaction_date
+       AND NEW.status           IS NOT DISTINCT FROM OLD.status
+       AND NEW.amount           IS NOT DISTINCT FROM OLD.amount
+       AND NEW.is_income        IS NOT DISTINCT FROM OLD.is_income THEN
+        RETURN NEW;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.bank_account_id IS NOT NULL THEN
+        PERFORM _ledger_bank_daily_balances_add(
+            v_ledger, OLD.bank_account_id, OLD.transaction_date, OLD.status,
+            OLD.amount, COALESCE(OLD.is_income, FALSE), -1);
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.bank_account_id IS NOT NULL THEN
+        PERFORM _ledger_bank_daily_balances_add(
+            v_ledger, NEW.bank_account_id, NEW.transaction_date, NEW.status,
+            NEW.amount, COALESCE(NEW.is_income, FALSE), 1);
+    END IF;
+
+    RETURN COALESCE(NEW, OLD);
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_ledger_bank_daily_balances ON accounting_transactions;
+CREATE TRIGGER trg_ledger_bank_daily_balances
+    AFTER INSERT OR UPDATE OR DELETE ON accounting_transactions
+    FOR EACH ROW EXECUTE FUNCTION ledger_bank_daily_balances_apply();
+
+DROP TRIGGER IF EXISTS trg_ledger_bank_daily_balances ON capital_transactions;
+CREATE TRIGGER trg_ledger_bank_daily_balances
+    AFTER INSERT OR UPDATE OR DELETE ON capital_transactions
+    FOR EACH ROW EXECUTE FUNCTION ledger_bank_daily_balances_apply();
+
+
+-- ── RPC: derived balance per bank ───────────────────────────────────────────
+-- Same rule as ledger.get_bank_balance:
+--   Σ amount (is_income) − Σ amount (NOT is_income), status NOT IN excluded,
+--   transaction_date <= as_of when given.
+CREATE OR REPLACE FUNCTION get_derived_bank_balances(
+    p_ledger            TEXT,
+    p_excluded_statuses TEXT[] DEFAULT ARRAY['voided'],
+    p_bank_account_id   UUID DEFAULT NULL,
+    p_as_of             DATE DEFAULT NULL
+) RETURNS TABLE (bank_account_id UUID, balance NUMERIC) AS $$
+    SELECT b.bank_account_id, ROUND(SUM(b.net_amount), 2)
+    FROM ledger_bank_daily_balances b
+    WHERE b.ledger = p_ledger
+      AND (p_bank_account_id IS NULL OR b.bank_account_id = p_bank_account_id)
+      AND (p_as_of IS NULL OR b.balance_date <= p_as_of)
+      AND NOT (b.status = ANY (COALESCE(p_excluded_statuses, ARRAY[]::TEXT[])))
+    GROUP BY b.bank_account_id;
+$$ LANGUAGE sql STABLE;
+
+
+-- ── Full recompute (backfill + repair) ──────────────────────────────────────
+CREATE OR REPLACE FUNCTION rebuild_ledger_bank_daily_balances()
+RETURNS INTEGER AS $$
+DECLARE
+    n INTEGER;
+BEGIN
+    LOCK TABLE accounting_transactions IN SHARE ROW EXCLUSIVE MODE;
+    LOCK TABLE capital_transactions IN SHARE ROW EXCLUSIVE MODE;
+    DELETE FROM ledger_bank_daily_balances;
+    INSERT INTO ledger_bank_daily_balances
+        (ledger, bank_account_id, balance_date, status, net_amount, txn_count)
+    SELECT ledger, bank_account_id, transaction_date, COALESCE(status, ''),
+           SUM(CASE WHEN COALESCE(is_income, FALSE) THEN amount ELSE -amount END),
+           COUNT(*)
+    FROM (
+        SELECT 'homes' AS ledger, bank_account_id, transaction_date, status, amount, is_income
+        FROM accounting_transactions WHERE bank_account_id IS NOT NULL
+        UNION ALL
+        SELECT 'capital', bank_account_id, transaction_date, status, amount, is_income
+        FROM capital_transactions WHERE bank_account_id IS NOT NULL
+    ) t
+    GROUP BY ledger, bank_account_id, transaction_date, COALESCE(status, '');
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_ledger_bank_daily_balances();
+
+COMMIT;
@@ -0,0 +1,87 @@
+-- ============================================================================
+-- Migration 110: Atomic transaction-number allocator (Homes + Capital)
+-- ============================================================================
+-- Problem: every TXN-YYMMDD-NNN was picked by reading all of today's
+-- numbers (LIKE 'TXN-yymmdd-%') and taking count/max + 1. The read grows
+-- with the day's volume, and two concurrent posters (bank-statement bulk
+-- posting, splits) read the same max and collide on the UNIQUE index.
+--
+-- Solution: one counter row per (ledger, day). allocate_txn_numbers()
+-- bumps it with a single UPDATE ... RETURNING, which row-locks the counter
+-- until commit, so every caller gets a distinct block [first, first+count).
+-- The first call of a day seeds the counter from the highest serial
+-- already in use (numbers written before this migration, or by a client
+-- still on the fallback path) — one scan per ledger per day.
+--
+-- Called from api/services/ledger.allocate_transaction_numbers.
+-- Idempotent.
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS ledger_txn_counters (
+    ledger      TEXT NOT NULL CHECK (ledger IN ('homes', 'capital')),
+    counter_day DATE NOT NULL,
+    last_seq    INTEGER NOT NULL DEFAULT 0,
+    updated_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (ledger, counter_day)
+);
+
+ALTER TABLE ledger_txn_counters ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE ledger_txn_counters IS
+    'Last TXN-YYMMDD-NNN serial handed out per ledger and day. Only written by allocate_txn_numbers().';
+
+
+-- Returns the FIRST serial of a block of p_count consecutive serials.
+CREATE OR REPLACE FUNCTION allocate_txn_numbers(
+    p_ledger TEXT,
+    p_day    DATE DEFAULT CURRENT_DATE,
+    p_count  INTEGER DEFAULT 1
+) RETURNS INTEGER AS $$
+DECLARE
+    v_last   INTEGER;
+    v_seed   INTEGER;
+    v_prefix TEXT := 'TXN-' || to_char(p_day, 'YYMMDD') || '-';
+BEGIN
+    IF p_count IS NULL OR p_count < 1 THEN
+        RAISE EXCEPTION 'allocate_txn_numbers: p_count must be >= 1 (got %)', p_count;
+    END IF;
+
+    -- Hot path: the day's counter exists.
+    UPDATE ledger_txn_counters
+       SET last_seq = last_seq + p_count, updated_at = NOW()
+     WHERE ledger = p_ledger AND counter_day = p_day
+    RETURNING last_seq INTO v_last;
+
+    IF v_last IS NULL THEN
+        -- First allocation of the day: start after the highest serial in use.
+        -- The numeric part sits between the prefix and an optional -D / -C.
+        IF p_ledger = 'capital' THEN
+            SELECT COALESCE(MAX(split_part(substr(transaction_number, length(v_prefix) + 1), '-', 1)::INTEGER), 0)
+              INTO v_seed
+              FROM capital_transactions
+             WHERE transaction_number LIKE v_prefix || '%'
+               AND split_part(substr(transaction_number, length(v_prefix) + 1), '-', 1) ~ '^[0-9]+$';
+        ELSE
+            SELECT COALESCE(MAX(split_part(substr(transaction_number, length(v_prefix) + 1), '-', 1)::INTEGER), 0)
+              INTO v_seed
+              FROM accounting_transactions
+             WHERE transaction_number LIKE v_prefix || '%'
+               AND split_part(substr(transaction_number, length(v_prefix) + 1), '-', 1) ~ '^[0-9]+$';
+        END IF;
+
+        -- A concurrent first caller may have inserted meanwhile: ON CONFLICT
+        -- turns our insert into an increment of its row.
+        INSERT INTO ledger_txn_counters AS c (ledger, counter_day, last_seq)
+        VALUES (p_ledger, p_day, v_seed + p_count)
+        ON CONFLICT (ledger, counter_day) DO UPDATE
+        SET last_seq = c.last_seq + p_count, updated_at = NOW()
+        RETURNING last_seq INTO v_last;
+    END IF;
+
+    RETURN v_last - p_count + 1;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
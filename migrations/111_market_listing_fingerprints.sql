@@ -0,0 +1,50 @@
+-- ============================================================================
+-- Migration 111: Content fingerprints + price events for scraped listings
+-- ============================================================================
+-- Problem: every partner refresh (VMF, 21st Mortgage — every 6 hours)
+-- rewrote all ~300 market_listings rows even when nothing changed: table
+-- churn, a fresh scraped_at on every row, and no record of what actually
+-- changed between two scrapes (e.g. a price drop).
+--
+-- Solution:
+--   market_listings.content_hash — sha1 of the listing's price, photos and
+--     details as scraped (api/utils/listing_fingerprint.py). Ingest compares
+--     it with the freshly scraped listing and only writes real changes
+--     (api/services/partner_ingest.py).
+--   market_listing_events — one row per price change seen by ingest
+--     ('price_drop' / 'price_increase'), old and new price.
+--
+-- Rows written before this migration have content_hash NULL; the first
+-- refresh treats them as changed and fills it in.
+-- Idempotent.
+-- ============================================================================
+
+BEGIN;
+
+ALTER TABLE market_listings ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+COMMENT ON COLUMN market_listings.content_hash IS
+    'Fingerprint of price/photos/details at the last write (api/utils/listing_fingerprint.py).';
+
+CREATE TABLE IF NOT EXISTS market_listing_events (
+    id          UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    listing_id  UUID REFERENCES market_listings(id) ON DELETE CASCADE,
+    source      TEXT,
+    source_url  TEXT NOT NULL,
+    event_type  TEXT NOT NULL CHECK (event_type IN ('price_drop', 'price_increase')),
+    old_price   DECIMAL(12, 2),
+    new_price   DECIMAL(12, 2),
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_market_listing_events_created
+    ON market_listing_events (created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_market_listing_events_listing
+    ON market_listing_events (listing_id, created_at DESC);
+
+ALTER TABLE market_listing_events ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE market_listing_events IS
+    'Price changes detected when a scraped listing is re-ingested. Written by api/services/partner_ingest.py.';
+
+COMMIT;
@@ -0,0 +1,41 @@
+-- ============================================================================
+-- Migration 112: Per-source scrape metrics
+-- ============================================================================
+-- Problem: scrapes now run all sources concurrently with a timeout each
+-- (api/services/scrapers/orchestrator.py), but nothing recorded how long a
+-- source took, how many listings it returned, or how often it timed out —
+-- a partner site going slow or empty was only visible in the logs.
+--
+-- Solution: one row per source per scrape run — status ('ok', 'timeout',
+-- 'error', 'disabled'), latency, listings returned, error message. run_id
+-- groups the sources of one run; trigger names the caller
+-- ('market_listings.scrape', 'scheduler.refresh_partner_listings', ...).
+-- Idempotent.
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS scrape_source_runs (
+    id          UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    run_id      UUID NOT NULL,
+    trigger     TEXT NOT NULL,
+    source      TEXT NOT NULL,
+    status      TEXT NOT NULL CHECK (status IN ('ok', 'timeout', 'error', 'disabled')),
+    latency_ms  INTEGER NOT NULL DEFAULT 0,
+    listings    INTEGER NOT NULL DEFAULT 0,
+    error       TEXT,
+    started_at  TIMESTAMPTZ,
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_scrape_source_runs_source_time
+    ON scrape_source_runs (source, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_scrape_source_runs_run
+    ON scrape_source_runs (run_id);
+
+ALTER TABLE scrape_source_runs ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE scrape_source_runs IS
+    'Latency / yield / outcome of each scraper source per run. Written by api/services/scrapers/orchestrator.py (record_scrape_run).';
+
+COMMIT;
@@ -0,0 +1,40 @@
+-- ============================================================================
+-- Migration 113: Versioned comps for the price predictor
+-- ============================================================================
+-- Problem: api/utils/price_predictor.py read its comparable sales from
+-- data/historico_2025.json and kept them in memory for the life of the
+-- process. Houses sold in 2026 never became comps without editing the file
+-- and redeploying, and nothing recorded which data a prediction came from.
+--
+-- Solution: immutable snapshots of the comps set. Each one holds the 2025
+-- seed plus the houses Maninos has sold since (sales paid/completed, joined
+-- to properties and renovations), and its version is a content hash.
+-- Publishing a snapshot stamps published_at, and the active version is the
+-- row with the latest published_at, so a single-row write switches every
+-- worker over. Re-publishing an older version rolls back. Running API
+-- processes poll the active version and swap the new set in
+-- (api/services/price_comps.py). Idempotent.
+-- ============================================================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS price_comp_snapshots (
+    version       TEXT PRIMARY KEY,
+    records       JSONB NOT NULL,
+    record_count  INTEGER NOT NULL,
+    sources       JSONB NOT NULL DEFAULT '{}'::jsonb,
+    built_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    published_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_price_comp_snapshots_published
+    ON price_comp_snapshots (published_at DESC);
+
+ALTER TABLE price_comp_snapshots ENABLE ROW LEVEL SECURITY;
+
+COMMENT ON TABLE price_comp_snapshots IS
+    'Comparable-sales sets for api/utils/price_predictor.py; the active one is the latest published_at. Written by api/services/price_comps.py (publish_snapshot).';
+COMMENT ON COLUMN price_comp_snapshots.sources IS
+    'Record counts by origin, e.g. {"seed_2025": 93, "sales": 14}.';
+
+COMMIT;
@@ -0,0 +1,80 @@
+-- ============================================================================
+-- Migration 114: Leases on scheduler runs
+-- ============================================================================
+-- Problem: every API process starts the scheduler (api/main.py lifespan), and
+-- the only overlap guard was APScheduler's in-process max_instances=1. Two
+-- Railway replicas or two uvicorn workers would each send the RTO reminders
+-- and each accrue investor interest.
+--
+-- Solution: a scheduled run is claimed in scheduler_runs before it executes.
+--   - run_key identifies the run: its scheduled fire time. Cron triggers and
+--     anchored interval triggers give every process the same fire times, and
+--     (job_name, run_key) is unique, so only one process can claim a run.
+--   - holder / lease_expires_at: the claiming process renews the lease with
+--     a heartbeat while the job runs. A run that is unfinished with an expired
+--     lease belongs to a crashed process, and claim_scheduler_run lets another
+--     process take it over (attempts + 1).
+--   - claim_scheduler_run / heartbeat_scheduler_run do the compare-and-set in
+--     one statement on the database clock.
+-- Rows without run_key (manual triggers, runs before this migration) are
+-- unaffected. Idempotent.
+-- ============================================================================
+
+BEGIN;
+
+ALTER TABLE scheduler_runs ADD COLUMN IF NOT EXISTS run_key TEXT;
+ALTER TABLE scheduler_runs ADD COLUMN IF NOT EXISTS holder TEXT;
+ALTER TABLE scheduler_runs ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ;
+ALTER TABLE scheduler_runs ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+ALTER TABLE scheduler_runs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_scheduler_runs_job_run_key
+    ON scheduler_runs (job_name, run_key) WHERE run_key IS NOT NULL;
+
+-- The takeover sweep: unfinished leased runs by lease expiry
+CREATE INDEX IF NOT EXISTS idx_scheduler_runs_open_leases
+    ON scheduler_runs (lease_expires_at) WHERE finished_at IS NULL AND run_key IS NOT NULL;
+
+-- Claim a run: insert it, or take over an unfinished run whose lease expired.
+-- Returns the row (id, attempts) when this holder now owns the run, nothing
+-- when another process holds it or it already finished.
+CREATE OR REPLACE FUNCTION claim_scheduler_run(
+    p_job_name TEXT, p_run_key TEXT, p_holder TEXT, p_lease_seconds INTEGER
+) RETURNS TABLE (id UUID, attempts INTEGER)
+LANGUAGE sql AS $$
+    INSERT INTO scheduler_runs AS r
+        (job_name, run_key, holder, started_at, heartbeat_at, lease_expires_at)
+    VALUES
+        (p_job_name, p_run_key, p_holder, NOW(), NOW(), NOW() + make_interval(secs => p_lease_seconds))
+    ON CONFLICT (job_name, run_key) WHERE run_key IS NOT NULL DO UPDATE
+        SET holder = EXCLUDED.holder,
+            started_at = NOW(),
+            heartbeat_at = NOW(),
+            lease_expires_at = EXCLUDED.lease_expires_at,
+            attempts = r.attempts + 1
+        WHERE r.finished_at IS NULL AND r.lease_expires_at < NOW()
+    RETURNING r.id, r.attempts;
+$$;
+
+-- Renew a lease (p_lease_seconds = 0 hands it back for immediate takeover).
+-- FALSE when the holder no longer owns the run.
+CREATE OR REPLACE FUNCTION heartbeat_scheduler_run(
+    p_run_id UUID, p_holder TEXT, p_lease_seconds INTEGER
+) RETURNS BOOLEAN
+LANGUAGE sql AS $$
+    WITH renewed AS (
+        UPDATE scheduler_runs
+           SET heartbeat_at = NOW(),
+               lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+         WHERE id = p_run_id AND holder = p_holder AND finished_at IS NULL
+        RETURNING 1
+    )
+    SELECT EXISTS (SELECT 1 FROM renewed);
+$$;
+
+COMMENT ON COLUMN scheduler_runs.run_key IS
+    'Scheduled fire time (UTC) of a leased run; unique per job_name. NULL for manual triggers.';
+COMMENT ON COLUMN scheduler_runs.lease_expires_at IS
+    'Renewed by the holder''s heartbeat; an unfinished run past this is taken over by another process (api/services/job_leases.py).';
+
+COMMIT;
@@ -0,0 +1,50 @@
+-- ============================================================================
+-- Migration 115: Idempotency key on scheduled_emails
+-- ============================================================================
+-- Problem: process_rto_reminders checked for an already-sent reminder with one
+-- query per payment on metadata->>'payment_id' — an unindexed JSON-path scan
+-- of scheduled_emails — and nothing in the table stopped two runs from logging
+-- (and sending) the same reminder twice.
+--
+-- Solution: dedupe_key names the logical email ('rto_reminder_day_of:<payment
+-- id>'). It is unique, so the reminder run reads all sent keys for its
+-- candidates in one indexed query, and writes its send log with one bulk
+-- upsert that ignores keys already present. NULL for emails without a key
+-- (post-sale review/referral rows), which the unique index allows.
+--
+-- Existing reminder rows are backfilled from their metadata (the oldest row
+-- keeps the key if a reminder was logged twice). Idempotent.
+-- ============================================================================
+
+BEGIN;
+
+ALTER TABLE scheduled_emails ADD COLUMN IF NOT EXISTS dedupe_key TEXT;
+
+WITH keyed AS (
+    SELECT id,
+           email_type || ':' || (metadata->>'payment_id') AS key,
+           ROW_NUMBER() OVER (
+               PARTITION BY email_type, metadata->>'payment_id'
+               ORDER BY created_at, id
+           ) AS rn
+      FROM scheduled_emails
+     WHERE email_type LIKE 'rto_reminder_%'
+       AND metadata ? 'payment_id'
+       AND dedupe_key IS NULL
+)
+UPDATE scheduled_emails e
+   SET dedupe_key = keyed.key
+  FROM keyed
+ WHERE e.id = keyed.id
+   AND keyed.rn = 1
+   AND NOT EXISTS (SELECT 1 FROM scheduled_emails d WHERE d.dedupe_key = keyed.key);
+
+-- Not partial: PostgREST's on_conflict=dedupe_key needs a plain unique index
+-- (NULLs stay distinct, so unkeyed rows are unaffected).
+CREATE UNIQUE INDEX IF NOT EXISTS uq_scheduled_emails_dedupe_key
+    ON scheduled_emails (dedupe_key);
+
+COMMENT ON COLUMN scheduled_emails.dedupe_key IS
+    'Logical identity of the email (e.g. rto_reminder_day_of:<payment_id>); unique — see api/services/email_service.py';
+
+COMMIT;
@@ -0,0 +1,61 @@
+-- ============================================================================
+-- Migration 116: scheduled_emails as the outbound email outbox
+-- ============================================================================
+-- Problem: transactional emails (sale completed, payment confirmation,
+-- investor welcome, ...) called Resend inline in the request handlers, so a
+-- slow Resend call added seconds to user-facing endpoints and a failed call
+-- lost the email. The only queued emails (post-sale review/referral) were
+-- drained 50 at a time, serially, every 30 minutes.
+--
+-- Solution: every email is a scheduled_emails row, drained by
+-- api/services/email_outbox.py:
+--   - payload: the rendered email ({"to": [...], "html": "..."}). NULL for
+--     rows rendered at send time from email_type + metadata (review/referral).
+--   - status 'sending' + locked_by / locked_until: claimed by a drain. A
+--     claim that outlives locked_until (crashed drain) is claimed again.
+--   - status 'failed' is the dead letter: permanent rejection or out of
+--     attempts. last_error says why.
+--   - message_id: Resend's id for the delivered email.
+--   - claim_outbox_emails hands due rows to one drain at a time
+--     (FOR UPDATE SKIP LOCKED), so any number of processes can drain.
+-- Idempotent.
+-- ============================================================================
+
+BEGIN;
+
+ALTER TABLE scheduled_emails ADD COLUMN IF NOT EXISTS payload JSONB;
+ALTER TABLE scheduled_emails ADD COLUMN IF NOT EXISTS message_id TEXT;
+ALTER TABLE scheduled_emails ADD COLUMN IF NOT EXISTS locked_by TEXT;
+ALTER TABLE scheduled_emails ADD COLUMN IF NOT EXISTS locked_until TIMESTAMPTZ;
+
+-- Claims abandoned by a crashed drain
+CREATE INDEX IF NOT EXISTS idx_scheduled_emails_sending
+    ON scheduled_emails (locked_until) WHERE status = 'sending';
+
+CREATE OR REPLACE FUNCTION claim_outbox_emails(
+    p_holder TEXT, p_limit INTEGER, p_lock_seconds INTEGER
+) RETURNS SETOF scheduled_emails
+LANGUAGE sql AS $$
+    UPDATE scheduled_emails e
+       SET status = 'sending',
+           locked_by = p_holder,
+           locked_until = NOW() + make_interval(secs => p_lock_seconds)
+      FROM (
+            SELECT id
+              FROM scheduled_emails
+             WHERE (status = 'pending' AND scheduled_for <= NOW())
+                OR (status = 'sending' AND locked_until < NOW())
+             ORDER BY scheduled_for
+             LIMIT p_limit
+               FOR UPDATE SKIP LOCKED
+           ) due
+     WHERE e.id = due.id
+    RETURNING e.*;
+$$;
+
+COMMENT ON COLUMN scheduled_emails.payload IS
+    'Rendered email {"to": [...], "html": "..."}; NULL = rendered at send time from email_type + metadata';
+COMMENT ON COLUMN scheduled_emails.locked_until IS
+    'End of the current drain''s claim (status sending); past it the row is claimed again';
+
+COMMIT;
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark: derived bank balances — Python row scan vs get_derived_bank_balances RPC.
+
+Builds a throwaway schema on a SCRATCH Postgres (never point this at the
+production database), applies migrations/109_bank_balance_aggregates.sql to
+it, then grows a synthetic Homes ledger step by step and times, at each size:
+
+  scan  — what ledger._scan_bank_balances does: read every bank leg and sum
+          amount / is_income in Python (before migration 109, minus the
+          PostgREST paging round-trips, so the real gap is larger).
+  rpc   — SELECT * FROM get_derived_bank_balances('homes', '{voided}').
+
+Both results are compared bank by bank. The schema is dropped at the end.
+
+    python scripts/benchmark_bank_balances.py --dsn postgresql://postgres@localhost:5432/scratch
+    python scripts/benchmark_bank_balances.py --dsn ... --sizes 1000,10000,100000,250000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import psycopg
+
+ROOT = Path(__file__).resolve().parent.parent
+MIGRATION = ROOT / "migrations" / "109_bank_balance_aggregates.sql"
+SCHEMA = "bench_bank_balances"
+N_BANKS = 8
+N_DAYS = 3 * 365
+
+# Only the columns migration 109 reads.
+_TABLES = """
+CREATE TABLE accounting_transactions (
+    id BIGSERIAL PRIMARY KEY,
+    transaction_date DATE NOT NULL,
+    bank_account_id UUID,
+    amount NUMERIC(14,2) NOT NULL,
+    is_income BOOLEAN NOT NULL,
+    status TEXT
+);
+CREATE INDEX ON accounting_transactions (bank_account_id);
+CREATE TABLE capital_transactions (LIKE accounting_transactions INCLUDING ALL);
+"""
+
+# Half the rows are bank legs (the other leg of each pair has no bank), ~2% voided.
+_SEED = """
+INSERT INTO accounting_transactions (transaction_date, bank_account_id, amount, is_income, status)
+SELECT DATE '2024-01-01' + (g %% %(days)s),
+       CASE WHEN g %% 2 = 0
+            THEN ('00000000-0000-0000-0000-' || lpad(((g / 2) %% %(banks)s)::text, 12, '0'))::uuid END,
+       round((random() * 5000)::numeric + 1, 2),
+       random() < 0.45,
+       CASE WHEN g %% 50 = 0 THEN 'voided' ELSE 'confirmed' END
+FROM generate_series(%(lo)s, %(hi)s - 1) g
+"""
+
+
+def _timed(fn, repeat):
+    samples = []
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return out, statistics.median(samples)
+
+
+def _scan(cur):
+    cur.execute(
+        "SELECT bank_account_id, amount, is_income, status FROM accounting_transactions "
+        "WHERE bank_account_id IS NOT NULL"
+    )
+    out = {}
+    for bid, amount, is_income, status in cur.fetchall():
+        if (status or "") in ("voided",):
+            continue
+        amt = float(amount)
+        out[str(bid)] = out.get(str(bid), 0.0) + (amt if is_income else -amt)
+    return {k: round(v, 2) for k, v in out.items()}
+
+
+def _rpc(cur):
+    cur.execute("SELECT bank_account_id, balance FROM get_derived_bank_balances('homes', ARRAY['voided'])")
+    return {str(bid): round(float(bal), 2) for bid, bal in cur.fetchall()}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--dsn", default=os.getenv("BENCH_DATABASE_URL"), help="scratch Postgres DSN")
+    ap.add_argument("--sizes", default="1000,10000,50000,100000,200000",
+                    help="cumulative ledger sizes (rows) to measure at")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    if not args.dsn:
+        sys.exit("--dsn (or BENCH_DATABASE_URL) is required")
+    sizes = sorted(int(s) for s in args.sizes.split(","))
+
+    with psycopg.connect(args.dsn, autocommit=True) as conn, conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.execute(f"CREATE SCHEMA {SCHEMA}")
+        cur.execute(f"SET search_path TO {SCHEMA}")
+        try:
+            cur.execute(_TABLES)
+            cur.execute(MIGRATION.read_text())
+
+            print(f"{'ledger rows':>12}{'agg rows':>10}{'insert ms':>11}{'scan ms':>10}{'rpc ms':>9}{'match':>7}")
+            have = 0
+            for size in sizes:
+                t0 = time.perf_counter()
+                cur.execute(_SEED, {"lo": have, "hi": size, "days": N_DAYS, "banks": N_BANKS})
+                insert_ms = (time.perf_counter() - t0) * 1000
+                have = size
+                cur.execute("ANALYZE accounting_transactions; ANALYZE ledger_bank_daily_balances")
+                cur.execute("SELECT count(*) FROM ledger_bank_daily_balances")
+                agg_rows = cur.fetchone()[0]
+
+                scan, scan_ms = _timed(lambda: _scan(cur), args.repeat)
+                rpc, rpc_ms = _timed(lambda: _rpc(cur), args.repeat)
+                match = scan.keys() == rpc.keys() and all(abs(scan[k] - rpc[k]) < 0.005 for k in scan)
+                print(f"{size:>12,}{agg_rows:>10,}{insert_ms:>11.0f}{scan_ms:>10.1f}{rpc_ms:>9.1f}{'yes' if match else 'NO':>7}")
+                if not match:
+                    sys.exit("RPC result differs from the row scan")
+        finally:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: rendering a run of RTO payment reminders — f-string vs. compiled.
+
+  f-string — what _rto_payment_reminder_html did per email: compute the
+             window's urgency block, evaluate the page as an f-string (the
+             same source, compiled as one f-string expression);
+  compiled — _rto_payment_reminder_html now: the window's template
+             (shell + content, constants and urgency folded in) renders the
+             per-payment values;
+  batch    — process_rto_reminders: render_many over each window's rows.
+
+The three must produce identical HTML for every reminder.
+
+    python scripts/benchmark_email_templates.py
+    python scripts/benchmark_email_templates.py --emails 20000 --repeat 5
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# email_service imports the Supabase client; no query is made
+os.environ.setdefault("SUPABASE_URL", "https://dummy.supabase.co")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", (
+    "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9."
+    "eyJpc3MiOiJzdXBhYmFzZSIsInJlZiI6InRlc3QiLCJyb2xlIjoic2VydmljZV9yb2xlIiw"
+    "iaWF0IjoxNjE2MTU5MjIyLCJleHAiOjE5MzE3MzUyMjJ9.dummykey"
+))
+
+from api.services import email_service as es  # noqa: E402
+
+
+def _rows(n, rnd):
+    return [
+        {
+            "client_name": rnd.choice(["Ana López", "Luis Pérez", "María García", "José Hernández"]),
+            "property_address": f"{rnd.randrange(100, 9999)} {rnd.choice(['Oak St', 'Elm Rd', 'FM 1960'])}",
+            "monthly_rent": round(rnd.uniform(550, 1400), 2),
+            "due_date": "15 de marzo, 2026",
+            "payment_number": rnd.randrange(1, 37),
+            "total_payments": 36,
+            "days_until_due": rnd.choice([days for days, _ in es.RTO_REMINDER_WINDOWS]),
+        }
+        for _ in range(n)
+    ]
+
+
+def _fstring_render(code, constants):
+    def render(days_until_due, **values):
+        return eval(code, {}, {**constants, **es._rto_reminder_urgency(days_until_due), **values})
+    return render
+
+
+def _best(fn, repeat):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--emails", type=int, default=5000)
+    ap.add_argument("--repeat", type=int, default=3, help="runs per method; the fastest is reported")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    rows = _rows(args.emails, random.Random(args.seed))
+    code = compile("f" + repr(es._RTO_PAYMENT_REMINDER.source), "<reminder>", "eval")
+    fstring = _fstring_render(code, es._CONSTANTS)
+
+    by_window = {}
+    for i, r in enumerate(rows):
+        by_window.setdefault(r["days_until_due"], ([], []))
+        by_window[r["days_until_due"]][0].append(i)
+        by_window[r["days_until_due"]][1].append({k: v for k, v in r.items() if k != "days_until_due"})
+
+    def batch():
+        out = [None] * len(rows)
+        for days, (idx, values) in by_window.items():
+            for i, html in zip(idx, es._rto_reminder_template(days).render_many(values)):
+                out[i] = html
+        return out
+
+    t_f, out_f = _best(lambda: [fstring(**r) for r in rows], args.repeat)
+    t_c, out_c = _best(lambda: [es._rto_payment_reminder_html(**r) for r in rows], args.repeat)
+    t_b, out_b = _best(batch, args.repeat)
+
+    identical = sum(1 for a, b, c in zip(out_f, out_c, out_b) if a == b == c)
+    size = sum(map(len, out_c)) / len(rows)
+    print(f"{args.emails} RTO reminders, ~{size / 1024:.1f} KB each, best of {args.repeat}")
+    for name, t in (("f-string", t_f), ("compiled", t_c), ("batch", t_b)):
+        print(f"  {name:9}: {t * 1000:8.1f} ms  ({t / len(rows) * 1e6:6.1f} µs/email, "
+              f"{len(rows) / t:9,.0f} emails/s, {t_f / t:4.1f}x)")
+    print(f"  identical: {identical}/{len(rows)}")
+    if identical != len(rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark: market-listing dedup — in-memory index vs per-listing scan.
+
+Generates a synthetic listing history and properties inventory (no database
+needed) and checks a batch of scraped listings two ways:
+
+  index — as shipped: ListingDedupIndex built once, one in-memory lookup
+          per listing.
+  scan  — the old per-listing check: for every listing, walk all handled
+          listings and all properties, re-normalizing each address. Run on
+          --scan-sample listings and extrapolated. (The old path also paid
+          up to three Supabase round-trips per listing, not counted here.)
+
+Both must give the same skip decision on the sample.
+
+    python scripts/benchmark_listing_dedup.py
+    python scripts/benchmark_listing_dedup.py --history 20000 --listings 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.services.listing_dedup import SKIP_STATUSES, ListingDedupIndex, normalize_address  # noqa: E402
+
+STREETS = ["Main St", "Oak Ave", "FM 1960 Rd", "Bliss Ln", "Cypress Creek Pkwy", "Hwy 59",
+           "Old Spanish Trl", "Aldine Bender Rd", "W Little York Rd", "Telge Rd"]
+CITIES = ["Houston", "Conroe", "Dallas", "Katy", "Spring", "Humble", "Tomball"]
+STATUSES = ["purchased", "rejected", "dismissed", "expired", "contacted", "negotiating"]
+
+
+def _address(rng):
+    base = f"{rng.randint(1, 29999)} {rng.choice(STREETS)}"
+    if rng.random() < 0.2:
+        return f"{rng.randint(1995, 2024)} CLAYTON single section for sale. {base}, {rng.choice(CITIES)}"
+    if rng.random() < 0.3:
+        return f"{base} #{rng.randint(1, 80)}, {rng.choice(CITIES)}, TX"
+    return f"{base}, {rng.choice(CITIES)}, TX"
+
+
+def _synthetic(n_history, n_properties, n_listings, seed):
+    rng = random.Random(seed)
+    history = [{"source_url": f"https://mhvillage.com/l/{i}", "status": rng.choice(STATUSES),
+                "address": _address(rng)} for i in range(n_history)]
+    properties = [{"id": f"p{i}", "address": _address(rng)} for i in range(n_properties)]
+    listings = []
+    for i in range(n_listings):
+        r = rng.random()
+        if r < 0.1:
+            h = rng.choice(history)
+            listings.append((h["source_url"], h["address"]))
+        elif r < 0.2:
+            listings.append((f"https://vmf.com/{i}", rng.choice(history)["address"]))
+        elif r < 0.25:
+            listings.append((f"https://21st.com/{i}", rng.choice(properties)["address"]))
+        else:
+            listings.append((f"https://new.com/{i}", _address(rng)))
+    return history, properties, listings
+
+
+def _scan_skip(url, address, history, properties):
+    if url and any(r["source_url"] == url and r["status"] in SKIP_STATUSES for r in history):
+        return True
+    n = normalize_address(address)
+    if len(n) < 10:
+        return False
+    for r in history:
+        if r["status"] in SKIP_STATUSES:
+            d = normalize_address(r["address"])
+            if d and (n in d or d in n):
+                return True
+    for p in properties:
+        d = normalize_address(p["address"])
+        if d and (n in d or d in n):
+            return True
+    return False
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--history", type=int, default=5000)
+    ap.add_argument("--properties", type=int, default=500)
+    ap.add_argument("--listings", type=int, default=1000)
+    ap.add_argument("--scan-sample", type=int, default=50,
+                    help="listings to run through the full scan (time is extrapolated)")
+    ap.add_argument("--seed", type=int, default=11)
+    args = ap.parse_args()
+
+    history, properties, listings = _synthetic(args.history, args.properties, args.listings, args.seed)
+
+    def run_index():
+        index = ListingDedupIndex(history, properties)
+        return [index.check(url, addr) is not None for url, addr in listings], index
+
+    (decisions, index), index_s = _timed(run_index)
+
+    sample = listings[:args.scan_sample]
+    scanned, scan_s = _timed(lambda: [_scan_skip(u, a, history, properties) for u, a in sample])
+    scan_full_s = scan_s * len(listings) / max(1, len(sample))
+
+    print(f"history={len(history):,} properties={len(properties):,} listings={len(listings):,} "
+          f"skipped={sum(decisions):,} {dict(index.reasons)}")
+    print(f"  index   : {index_s * 1000:10.1f} ms  (build + lookups)")
+    print(f"  scan    : {scan_full_s * 1000:10.1f} ms  (extrapolated from {len(sample)} listings)")
+    print(f"  speedup : {scan_full_s / index_s:10.1f}x")
+    if scanned != decisions[:len(sample)]:
+        sys.exit("index decisions differ from the full scan")
+    print("  match   :        yes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: k-NN matching in price_predictor — per-pair loop vs. vectorized.
+
+  loop       — what predict_price / predict_batch did per listing:
+               compute_similarity against every historical house, full
+               sort, take k;
+  vectorized — top_k_matches: similarity_matrix over the precomputed
+               HistoricalFeatures arrays, argpartition top-k.
+
+The historical set is data/historico_2025.json resampled (with sqft /
+price jitter) to `--history` houses; listings are random. The loop is
+timed on `--loop-sample` listings and extrapolated; on those the two
+methods must pick the same houses with the same scores.
+
+    python scripts/benchmark_price_predictor.py
+    python scripts/benchmark_price_predictor.py --listings 10000 --history 5000 --k 8
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.utils.price_predictor import (  # noqa: E402
+    HistoricalFeatures,
+    _listing_features,
+    _load_data,
+    compute_similarity,
+    top_k_matches,
+)
+
+
+def _history(n, rnd):
+    base = _load_data()
+    if not base:
+        sys.exit("data/historico_2025.json not found")
+    out = []
+    for i in range(n):
+        h = dict(rnd.choice(base))
+        h['id'] = f"S{i}"
+        if h.get('sqft'):
+            h['sqft'] = float(max(400, h['sqft'] + rnd.choice([-64, -32, 0, 0, 32, 64])))
+        h['precio_compra'] = round(h['precio_compra'] * rnd.uniform(0.8, 1.2), -2)
+        out.append(h)
+    return out
+
+
+def _listings(n, rnd):
+    return [
+        _listing_features(
+            listing_price=rnd.choice([rnd.uniform(3000, 90000), rnd.randrange(5000, 60000, 500)]),
+            sqft=rnd.choice([None, rnd.randrange(600, 2400, 16)]),
+            bedrooms=rnd.choice([None, 1, 2, 3, 4]),
+            bathrooms=rnd.choice([None, 1, 1.5, 2, 2.5]),
+            description=rnd.choice(["", "double wide", "single wide"]),
+        )
+        for _ in range(n)
+    ]
+
+
+def _loop_top_k(features, history, k):
+    scored = [(compute_similarity(features, h), i) for i, h in enumerate(history)]
+    scored.sort(key=lambda x: -x[0])
+    return scored[:k]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--listings", type=int, default=10000)
+    ap.add_argument("--history", type=int, default=5000)
+    ap.add_argument("--k", type=int, default=8)
+    ap.add_argument("--loop-sample", type=int, default=200, help="listings timed with the per-pair loop")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    rnd = random.Random(args.seed)
+    history = _history(args.history, rnd)
+    listings = _listings(args.listings, rnd)
+
+    t0 = time.perf_counter()
+    hist = HistoricalFeatures.from_records(history)
+    t_features = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    idx, sims = top_k_matches(listings, hist, args.k)
+    t_vec = time.perf_counter() - t0
+
+    sample = listings[:args.loop_sample]
+    t0 = time.perf_counter()
+    loop = [_loop_top_k(f, history, args.k) for f in sample]
+    t_loop_sample = time.perf_counter() - t0
+    t_loop = t_loop_sample / max(1, len(sample)) * len(listings)
+
+    mismatches = sum(
+        1 for row, picks in enumerate(loop)
+        if [i for _, i in picks] != idx[row].tolist() or [s for s, _ in picks] != sims[row].tolist()
+    )
+
+    print(f"{args.listings} listings × {args.history} historical houses, k={args.k}")
+    print(f"  feature arrays : {t_features * 1000:10.1f} ms (once per dataset load)")
+    print(f"  vectorized     : {t_vec * 1000:10.1f} ms  ({t_vec / args.listings * 1e6:.1f} µs/listing)")
+    print(f"  loop (est.)    : {t_loop * 1000:10.1f} ms  ({t_loop_sample / max(1, len(sample)) * 1e6:.1f} µs/listing, "
+          f"timed on {len(sample)})")
+    print(f"  speedup        : {t_loop / t_vec:10.1f}x")
+    print(f"  identical picks: {len(sample) - mismatches}/{len(sample)}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
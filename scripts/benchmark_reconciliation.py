@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bank-statement reconciliation matcher — indexed vs full scan.
+
+Generates a synthetic statement and ledger (no database needed) and times
+api.services.reconciliation.match_movements_to_transactions two ways:
+
+  indexed — as shipped: each movement only scores the ledger rows of its
+            direction inside the ±1% amount window.
+  scan    — same scorer, but every row of the movement's direction is a
+            candidate, i.e. the old O(movements × transactions) loop. Run on
+            --scan-sample movements and extrapolated.
+
+Both paths must return the same matches on the sample. Also times the
+global assignment (assign_movements_to_transactions) on the full input.
+
+    python scripts/benchmark_reconciliation.py
+    python scripts/benchmark_reconciliation.py --movements 2000 --transactions 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.services import reconciliation  # noqa: E402
+
+NAMES = ["Paquita Sanchez", "Manolo Santos", "Carlos Garcia", "Maria Lopez", "Juan Perez",
+         "AT&T Business Services", "Home Depot", "Clayton Homes", "Contratista", "Vendedor"]
+
+
+def _day(rng):
+    return f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+
+def _synthetic(n_movements, n_transactions, seed):
+    rng = random.Random(seed)
+    txns = [{
+        "id": f"txn-{i}",
+        "transaction_date": _day(rng),
+        "amount": round(rng.uniform(10, 20000), 2),
+        "is_income": rng.random() < 0.5,
+        "counterparty_name": rng.choice(NAMES),
+        "description": f"Venta contado - {rng.choice(NAMES)}",
+    } for i in range(n_transactions)]
+    movements = []
+    for i in range(n_movements):
+        # ~70% of the statement corresponds to a ledger row, the rest is noise.
+        if rng.random() < 0.7:
+            t = rng.choice(txns)
+            amount, is_credit, name, day = t["amount"], t["is_income"], t["counterparty_name"], t["transaction_date"]
+        else:
+            amount, is_credit, name, day = round(rng.uniform(10, 20000), 2), rng.random() < 0.5, rng.choice(NAMES), _day(rng)
+        movements.append({
+            "id": f"mv-{i}",
+            "movement_date": day,
+            "amount": amount if is_credit else -amount,
+            "is_credit": is_credit,
+            "counterparty": name.upper(),
+            "description": f"ZELLE PAYMENT FROM {name.upper()}",
+        })
+    return movements, txns
+
+
+def _full_scan(self, is_income, amount):
+    _, cands = self._sorted[is_income]
+    return sorted(cands, key=lambda c: c.pos)
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--movements", type=int, default=2000)
+    ap.add_argument("--transactions", type=int, default=50000)
+    ap.add_argument("--scan-sample", type=int, default=100,
+                    help="movements to run through the full scan (time is extrapolated)")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    movements, txns = _synthetic(args.movements, args.transactions, args.seed)
+    match = reconciliation.match_movements_to_transactions
+
+    indexed, indexed_s = _timed(lambda: match(movements, txns))
+
+    sample = movements[:args.scan_sample]
+    indexed_sample = match(sample, txns)
+    original = reconciliation.TransactionIndex.candidates
+    reconciliation.TransactionIndex.candidates = _full_scan
+    try:
+        scanned, scan_s = _timed(lambda: match(sample, txns))
+    finally:
+        reconciliation.TransactionIndex.candidates = original
+    scan_full_s = scan_s * len(movements) / max(1, len(sample))
+
+    print(f"movements={len(movements):,} transactions={len(txns):,} matches={len(indexed):,}")
+    print(f"  indexed : {indexed_s * 1000:10.1f} ms")
+    print(f"  scan    : {scan_full_s * 1000:10.1f} ms  (extrapolated from {len(sample)} movements)")
+    print(f"  speedup : {scan_full_s / indexed_s:10.1f}x")
+    optimal, optimal_s = _timed(lambda: reconciliation.assign_movements_to_transactions(movements, txns))
+    print(f"  optimal : {optimal_s * 1000:10.1f} ms  ({len(optimal):,} matches, "
+          f"score {sum(m['score'] for m in optimal):,} vs greedy {sum(m['score'] for m in indexed):,})")
+    if scanned != indexed_sample:
+        sys.exit("indexed matches differ from the full scan")
+    print("  match   :        yes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bytes and wall time saved by blocking heavy resources while scraping.
+
+Loads the same page twice per round in headless Chromium (needs
+`playwright install chromium`):
+
+  full    — everything loaded, as the scrapers did before;
+  blocked — routed through the source's BlockPolicy
+            (api/agents/buscador/resource_blocking.py).
+
+Bytes are the transfer sizes Chromium reports per finished request
+(headers + body); wall time is page.goto until `--wait-until`. Default
+target is a local synthetic listings page (cards, photos, a web font, a
+video) so the numbers are reproducible offline; pass --url to measure a
+real source page.
+
+    python scripts/benchmark_resource_blocking.py
+    python scripts/benchmark_resource_blocking.py --url https://www.mhvillage.com/homes/tx/houston --source mhvillage
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.agents.buscador.browser_pool import CHROMIUM_ARGS, CONTEXT_OPTIONS  # noqa: E402
+from api.agents.buscador.resource_blocking import (  # noqa: E402
+    ResourceStats,
+    policy_for,
+)
+from api.agents.buscador.resource_blocking import install as install_blocking  # noqa: E402
+
+ASSETS = {
+    "photo": ("image/jpeg", 250_000),
+    "font": ("font/woff2", 60_000),
+    "video": ("video/mp4", 1_500_000),
+}
+
+
+class _Site(BaseHTTPRequestHandler):
+    cards = 24
+    asset_delay = 0.02
+
+    def log_message(self, *_):
+        pass
+
+    def do_GET(self):
+        kind = self.path.strip("/").split("/")[0]
+        if kind in ASSETS:
+            ctype, size = ASSETS[kind]
+            time.sleep(self.asset_delay)
+            body = b"\0" * size
+        else:
+            ctype = "text/html"
+            cards = "".join(
+                f'<article class="card"><img src="/photo/{i}.jpg"><span>${20000 + i * 500:,}</span>'
+                f"<address>{100 + i} Main St, Houston, TX</address></article>"
+                for i in range(self.cards))
+            body = (
+                "<html><head><style>@font-face{font-family:f;src:url(/font/a.woff2)}"
+                "body{font-family:f}</style></head><body>"
+                f'<video src="/video/promo.mp4" autoplay muted></video>{cards}</body></html>'
+            ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+async def _load(browser, url, policy, wait_until):
+    context = await browser.new_context(**CONTEXT_OPTIONS)
+    page = await context.new_page()
+    stats = ResourceStats()
+    sizes = []
+
+    async def on_finished(request):
+        try:
+            s = await request.sizes()
+            sizes.append(s["responseHeadersSize"] + s["responseBodySize"])
+        except Exception:
+            pass
+
+    page.on("requestfinished", lambda r: asyncio.ensure_future(on_finished(r)))
+    if policy is not None:
+        await install_blocking(page, policy, stats)
+    t0 = time.perf_counter()
+    await page.goto(url, wait_until=wait_until, timeout=60000)
+    elapsed = time.perf_counter() - t0
+    await asyncio.sleep(0.2)  # let the last size callbacks land
+    await context.close()
+    return elapsed, sum(sizes), stats
+
+
+async def _run(args):
+    from playwright.async_api import async_playwright
+
+    server = None
+    url = args.url
+    if not url:
+        _Site.cards = args.cards
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _Site)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/listings"
+
+    policy = policy_for(args.source)
+    if policy is None:
+        sys.exit(f"blocking is disabled for source {args.source!r} (see SCRAPER_BLOCK_RESOURCES)")
+
+    results = {"full": [], "blocked": []}
+    blocked_stats = ResourceStats()
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+        for _ in range(args.rounds):
+            results["full"].append(await _load(browser, url, None, args.wait_until))
+            elapsed, size, stats = await _load(browser, url, policy, args.wait_until)
+            results["blocked"].append((elapsed, size, stats))
+            blocked_stats.add(stats)
+        await browser.close()
+    if server:
+        server.shutdown()
+
+    print(f"{url}  source={args.source}  rounds={args.rounds}  wait_until={args.wait_until}")
+    med = {}
+    for mode, runs in results.items():
+        t = statistics.median(r[0] for r in runs)
+        b = statistics.median(r[1] for r in runs)
+        med[mode] = (t, b)
+        print(f"  {mode:8}: {t * 1000:8.0f} ms  {b / 1024:10.0f} KB")
+    (tf, bf), (tb, bb) = med["full"], med["blocked"]
+    print(f"  saved   : {(tf - tb) * 1000:8.0f} ms  {(bf - bb) / 1024:10.0f} KB "
+          f"({100 * (bf - bb) / max(1, bf):.0f}% of bytes)")
+    print(f"  blocked per round: {blocked_stats.blocked_total / args.rounds:.0f} requests "
+          f"{ {k: v // args.rounds for k, v in blocked_stats.blocked.items()} }")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", help="page to load (default: local synthetic listings page)")
+    ap.add_argument("--source", default="mhvillage", help="policy to apply (resource_blocking.SOURCE_POLICIES)")
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--cards", type=int, default=24, help="listing cards (photos) on the synthetic page")
+    ap.add_argument("--wait-until", default="load", choices=["domcontentloaded", "load", "networkidle"])
+    asyncio.run(_run(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Load test: p50/p95/p99 latency of dashboard + portal traffic under concurrency.
+
+Shows whether slow PostgREST round-trips stall the event loop. Two ways to run:
+
+1. Against a running server (real Supabase, real data):
+
+    python scripts/load_test_async_routes.py --url http://localhost:8000 \
+        --key "$INTERNAL_API_KEY" --concurrency 20 --requests 200
+
+2. In-process, with a fake Supabase client whose every `.execute()` sleeps
+   `--latency-ms` (no network, no credentials). `--mode blocking` runs the
+   offloaded calls inline on the event loop — i.e. the behaviour before
+   tools/supabase_async existed — so before/after is one flag apart:
+
+    python scripts/load_test_async_routes.py --simulate --mode blocking
+    python scripts/load_test_async_routes.py --simulate --mode offload
+
+With blocking calls, /health and the portal queue behind every dashboard
+query and their p99 grows with concurrency; with offload they stay near the
+single-query latency.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Mix of staff dashboards (heavy, many queries) and client-portal reads (light).
+ENDPOINTS = [
+    "/api/accounting/dashboard?period=all",
+    "/api/capital/dashboard/kpis",
+    "/api/properties/financial-summary",
+    "/api/public/properties",
+    "/health",
+]
+
+
+class _FakeResult:
+    def __init__(self):
+        self.data = []
+        self.count = 0
+
+
+class _SlowQuery:
+    """Chainable stand-in for a postgrest query builder: any attribute or call
+    returns the builder itself; `.execute()` blocks like a network round-trip."""
+
+    def __init__(self, latency_s: float):
+        self._latency_s = latency_s
+
+    def __getattr__(self, name):
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def execute(self):
+        time.sleep(self._latency_s)
+        return _FakeResult()
+
+
+class _InlineExecutor:
+    """Executor that runs the job on the calling thread — reproduces the old
+    behaviour of calling `sb` directly inside `async def` routes."""
+
+    def submit(self, fn, *args, **kwargs):
+        fut = Future()
+        try:
+            fut.set_result(fn(*args, **kwargs))
+        except BaseException as e:  # noqa: BLE001 — forwarded to the awaiter
+            fut.set_exception(e)
+        return fut
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+async def _run(client, concurrency: int, total: int) -> dict:
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        path = ENDPOINTS[i % len(ENDPOINTS)]
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                r = await client.get(path)
+                if r.status_code >= 500:
+                    errors[path] += 1
+            except Exception:
+                errors[path] += 1
+            latencies[path].append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    wall = time.perf_counter() - t0
+    return {"latencies": latencies, "errors": errors, "wall_s": wall}
+
+
+def _report(title: str, res: dict, total: int):
+    print("=" * 78)
+    print(title)
+    print("=" * 78)
+    print(f"{'endpoint (latency ms)':<42}{'n':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'err':>5}")
+    everything = []
+    for path in ENDPOINTS:
+        lat = res["latencies"].get(path, [])
+        everything += lat
+        print(f"{path:<42}{len(lat):>5}{statistics.median(lat) if lat else 0:>9.0f}"
+              f"{_percentile(lat, 95):>9.0f}{_percentile(lat, 99):>9.0f}{res['errors'].get(path, 0):>5}")
+    print("-" * 78)
+    print(f"{'ALL':<42}{len(everything):>5}{statistics.median(everything) if everything else 0:>9.0f}"
+          f"{_percentile(everything, 95):>9.0f}{_percentile(everything, 99):>9.0f}")
+    print(f"wall: {res['wall_s']:.2f}s  throughput: {total / res['wall_s']:.1f} req/s")
+
+
+async def _live(args):
+    import httpx
+    headers = {"x-internal-key": args.key} if args.key else {}
+    async with httpx.AsyncClient(base_url=args.url, headers=headers, timeout=120) as client:
+        res = await _run(client, args.concurrency, args.requests)
+    _report(f"LIVE {args.url} — concurrency={args.concurrency}", res, args.requests)
+
+
+async def _simulate(args):
+    import httpx
+    os.environ.setdefault("SUPABASE_URL", "https://loadtest.supabase.co")
+    os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "loadtest-key")
+    os.environ.pop("INTERNAL_API_KEY", None)
+    fake = _SlowQuery(args.latency_ms / 1000)
+    with patch("supabase.create_client", return_value=fake):
+        from api.main import app
+        import tools.supabase_async as sa
+
+    if args.mode == "blocking":
+        sa._executor = _InlineExecutor()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120) as client:
+        res = await _run(client, args.concurrency, args.requests)
+    _report(f"SIMULATED mode={args.mode} latency={args.latency_ms}ms/query "
+            f"concurrency={args.concurrency}", res, args.requests)
+    sa.shutdown_executor()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", default="http://localhost:8000")
+    ap.add_argument("--key", default=os.getenv("INTERNAL_API_KEY", ""))
+    ap.add_argument("--concurrency", type=int, default=20)
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--simulate", action="store_true", help="in-process app + fake slow Supabase")
+    ap.add_argument("--mode", choices=["offload", "blocking"], default="offload")
+    ap.add_argument("--latency-ms", type=float, default=40.0)
+    args = ap.parse_args()
+    asyncio.run(_simulate(args) if args.simulate else _live(args))
+
+
+if __name__ == "__main__":
+    main()
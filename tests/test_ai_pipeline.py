@@ -0,0 +1,319 @@
+"""
+Tests for the concurrent AI classification pipeline (api/services/ai_pipeline.py,
+accounting._do_classify) against a local fake OpenAI server.
+
+Validates:
+  - TokenBucket paces acquisitions at its rate; map_bounded keeps input order
+    and never runs more than max_concurrency items at once; when one item
+    fails, the others are cancelled.
+  - _do_classify classifies batches in parallel (bounded), retries a
+    truncated JSON answer, saves every movement and streams progress to the
+    bank_statements row.
+  - resume=True only sends movements that have no suggestion yet.
+  - Movements matching a consistently confirmed pattern are answered by the
+    classification memo and never reach the model.
+"""
+import sys
+import os
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import api.routes.accounting as accounting_mod
+from api.services import ai_pipeline
+
+
+# ---------------------------------------------------------------------------
+# Fake OpenAI: /v1/chat/completions answering the classification prompt
+# ---------------------------------------------------------------------------
+
+class _FakeOpenAI(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, delay=0.05, truncate_first=True):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.delay = delay
+        self.truncate_first = truncate_first
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.seen_batches = defaultdict(int)
+        self.classified_lines = []
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *_a):
+        pass
+
+    def do_POST(self):
+        srv = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][-1]["content"]
+        with srv.lock:
+            srv.in_flight += 1
+            srv.max_in_flight = max(srv.max_in_flight, srv.in_flight)
+        try:
+            time.sleep(srv.delay)
+            lines = re.findall(r"^\d+\. \[.*$", prompt, re.M)
+            key = lines[0] if lines else ""
+            with srv.lock:
+                srv.seen_batches[key] += 1
+                first = srv.seen_batches[key] == 1
+                if not (first and srv.truncate_first):
+                    srv.classified_lines.extend(lines)
+            if first and srv.truncate_first:
+                content, finish = '[{"account_code": "6000", "acc', "length"
+            else:
+                content = json.dumps([{"account_code": "6000", "account_name": "Bank fees",
+                                       "transaction_type": "fee", "confidence": 0.9,
+                                       "reasoning": "fake"} for _ in lines])
+                finish = "stop"
+        finally:
+            with srv.lock:
+                srv.in_flight -= 1
+        payload = json.dumps({
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": finish,
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    srv = _FakeOpenAI()
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENAI_BASE_URL", srv.base_url)
+    monkeypatch.setenv("OPENAI_MAX_CONCURRENCY", "3")
+    monkeypatch.setattr(ai_pipeline, "RETRY_BASE_DELAY", 0.01)
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+# ---------------------------------------------------------------------------
+# In-memory Supabase fake (select / filters / update)
+# ---------------------------------------------------------------------------
+
+class _Res:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, db, table):
+        self.db, self.table = db, table
+        self.preds, self.patch = [], None
+        self.negate = False
+
+    def select(self, *_a, **_k): return self
+    def order(self, *_a, **_k): return self
+    def limit(self, *_a, **_k): return self
+    def or_(self, *_a, **_k): return self
+    def range(self, *_a, **_k): return self
+
+    @property
+    def not_(self):
+        self.negate = True
+        return self
+
+    def is_(self, col, val):
+        neg, self.negate = self.negate, False
+        self.preds.append(lambda r: (r.get(col) is None) != neg)
+        return self
+
+    def eq(self, col, val):
+        self.preds.append(lambda r: r.get(col) == val); return self
+
+    def in_(self, col, vals):
+        self.preds.append(lambda r: r.get(col) in vals); return self
+
+    def update(self, data):
+        self.patch = data; return self
+
+    def execute(self):
+        rows = [r for r in self.db.tables.get(self.table, []) if all(p(r) for p in self.preds)]
+        self.db.calls[self.table] += 1
+        if self.patch is not None:
+            self.db.updates[self.table].append(dict(self.patch))
+            for r in rows:
+                r.update(self.patch)
+        return _Res([dict(r) for r in rows])
+
+
+class _FakeDB:
+    def __init__(self, tables):
+        self.tables = tables
+        self.updates = defaultdict(list)
+        self.calls = defaultdict(int)
+
+    def table(self, name):
+        return _Query(self, name)
+
+
+def _fake_db(n_movements=23, preclassified=0):
+    movements = [{
+        "id": f"mv-{i}", "statement_id": "st-1", "status": "pending", "sort_order": i,
+        "movement_date": "2026-03-01", "description": f"ACH DEBIT - VENDOR {i}",
+        "amount": -10.0 - i, "is_credit": False, "counterparty": f"Vendor {i}",
+        "suggested_account_code": "6000" if i < preclassified else None,
+    } for i in range(n_movements)]
+    accounts = [
+        {"id": "root", "code": "PL_EXPENSES", "name": "Expenses", "account_type": "Expenses",
+         "is_header": True, "parent_account_id": None, "is_active": True},
+        {"id": "acct-fees", "code": "6000", "name": "Bank fees", "account_type": "Expenses",
+         "is_header": False, "parent_account_id": "root", "is_active": True},
+    ]
+    return _FakeDB({
+        "bank_statements": [{"id": "st-1", "status": "parsed", "classified_movements": 0}],
+        "statement_movements": movements,
+        "accounting_accounts": accounts,
+        "accounting_transactions": [],
+        "properties": [],
+    })
+
+
+# ---------------------------------------------------------------------------
+# Building blocks
+# ---------------------------------------------------------------------------
+
+def test_token_bucket_paces_requests():
+    async def run():
+        bucket = ai_pipeline.TokenBucket(rate=100, capacity=1)
+        t0 = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - t0
+    assert asyncio.run(run()) >= 0.045  # 5 refills at 10ms each
+
+
+def test_map_bounded_caps_concurrency_and_keeps_order():
+    state = {"now": 0, "max": 0}
+
+    async def work(x):
+        state["now"] += 1
+        state["max"] = max(state["max"], state["now"])
+        await asyncio.sleep(0.01 * (5 - x % 5))
+        state["now"] -= 1
+        return x * 2
+
+    limiter = ai_pipeline.OpenAILimiter(max_concurrency=3)
+    out = asyncio.run(ai_pipeline.map_bounded(list(range(10)), work, limiter=limiter))
+    assert out == [x * 2 for x in range(10)]
+    assert state["max"] == 3
+
+
+def test_map_bounded_cancels_the_rest_when_one_fails():
+    started, finished = [], []
+
+    async def work(x):
+        started.append(x)
+        if x == 0:
+            raise RuntimeError("classification failed")
+        await asyncio.sleep(0.2)
+        finished.append(x)
+
+    async def run():
+        limiter = ai_pipeline.OpenAILimiter(max_concurrency=3)
+        with pytest.raises(RuntimeError, match="classification failed"):
+            await ai_pipeline.map_bounded(list(range(10)), work, limiter=limiter)
+        await asyncio.sleep(0.3)
+
+    asyncio.run(run())
+    assert finished == [] and len(started) < 10
+
+
+def test_call_with_retries_gives_up_on_non_retryable():
+    calls = []
+
+    async def boom():
+        calls.append(1)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        asyncio.run(ai_pipeline.call_with_retries(boom, base_delay=0))
+    assert len(calls) == 1
+
+
+# ---------------------------------------------------------------------------
+# _do_classify end to end
+# ---------------------------------------------------------------------------
+
+def test_classify_runs_batches_concurrently_and_streams_progress(fake_openai, monkeypatch):
+    db = _fake_db(23)
+    monkeypatch.setattr(accounting_mod, "sb", db)
+
+    res = asyncio.run(accounting_mod._do_classify("st-1"))
+
+    assert res["classified"] == 23
+    movements = db.tables["statement_movements"]
+    assert all(m["suggested_account_id"] == "acct-fees" for m in movements)
+    assert all(m["status"] == "suggested" for m in movements)
+    # 5 batches, each retried once after the truncated first answer
+    assert len(fake_openai.seen_batches) == 5
+    assert all(n == 2 for n in fake_openai.seen_batches.values())
+    assert 1 < fake_openai.max_in_flight <= 3
+    # Progress: classifying → one bump per batch → review
+    stmt_updates = db.updates["bank_statements"]
+    assert stmt_updates[0]["status"] == "classifying"
+    assert len(stmt_updates) == 1 + 5 + 1
+    assert stmt_updates[-1] == {"status": "review", "classified_movements": 23}
+    # No per-movement account lookups: the code resolves from the chart
+    assert db.calls["accounting_accounts"] == 1
+
+
+def test_classify_resume_skips_classified_movements(fake_openai, monkeypatch):
+    db = _fake_db(12, preclassified=7)
+    monkeypatch.setattr(accounting_mod, "sb", db)
+
+    res = asyncio.run(accounting_mod._do_classify("st-1", resume=True))
+
+    assert res["classified"] == 12
+    sent = {re.search(r"VENDOR (\d+)", line).group(1) for line in fake_openai.classified_lines}
+    assert sent == {str(i) for i in range(7, 12)}
+    assert db.tables["bank_statements"][0]["classified_movements"] == 12
+
+
+def test_classify_answers_known_patterns_from_memo(fake_openai, monkeypatch):
+    db = _fake_db(4)
+    history = [{
+        "id": f"old-{i}", "statement_id": "st-0", "status": "confirmed", "sort_order": i,
+        "movement_date": "2026-02-01", "description": f"ACH DEBIT - HOME DEPOT #{i}",
+        "amount": -45.0 - i, "is_credit": False, "counterparty": "HOME DEPOT",
+        "suggested_account_id": None, "final_account_id": "acct-fees",
+    } for i in range(3)]
+    repeat = [{
+        "id": f"hd-{i}", "statement_id": "st-1", "status": "pending", "sort_order": 100 + i,
+        "movement_date": "2026-03-02", "description": f"ACH DEBIT - HOME DEPOT #{900 + i}",
+        "amount": -38.5, "is_credit": False, "counterparty": "Home Depot",
+    } for i in range(3)]
+    db.tables["statement_movements"] += history + repeat
+    monkeypatch.setattr(accounting_mod, "sb", db)
+
+    res = asyncio.run(accounting_mod._do_classify("st-1"))
+
+    assert res["classified"] == 7
+    assert res["memo"]["hits"] == 3 and res["memo"]["misses"] == 4
+    assert res["memo"]["hit_rate"] == round(3 / 7, 3) and res["memo"]["tokens_saved"] > 0
+    assert not any("HOME DEPOT" in line for line in fake_openai.classified_lines)
+    by_id = {m["id"]: m for m in db.tables["statement_movements"]}
+    assert all(by_id[f"hd-{i}"]["suggested_account_id"] == "acct-fees" for i in range(3))
+    assert by_id["hd-0"]["ai_reasoning"].startswith("Memoria: 3/3")
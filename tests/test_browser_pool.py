@@ -0,0 +1,194 @@
+"""
+Tests for the shared Playwright context pool (api/agents/buscador/browser_pool.py)
+against in-memory fake browser/context/page objects.
+
+Validates:
+  - One browser launch serves many pages; contexts are reset (cookies,
+    permissions, stray pages) and reused instead of created per page.
+  - Never more than max_contexts leased at once — extra leases wait.
+  - A context is recycled after max_pages_per_context pages, the browser
+    after max_pages_per_browser; idle contexts are evicted after their TTL
+    and the browser is closed once idle for browser_idle_ttl.
+  - dedicated_page contexts get their own options and are never reused.
+  - A scraper exception still hands the lease back (pool.page()).
+  - Used from a new event loop, the pool closes the old browser on its loop.
+"""
+import sys
+import os
+import asyncio
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from api.agents.buscador.browser_pool import BrowserPool
+
+
+class _Page:
+    def __init__(self, context):
+        self.context = context
+        self.closed = False
+
+    async def close(self):
+        if not self.closed:
+            self.closed = True
+            self.context.pages.remove(self)
+
+
+class _Context:
+    def __init__(self, browser, options):
+        self.browser, self.options = browser, options
+        self.pages, self.closed = [], False
+        self.cookie_clears = 0
+
+    async def new_page(self):
+        page = _Page(self)
+        self.pages.append(page)
+        return page
+
+    async def clear_cookies(self):
+        self.cookie_clears += 1
+
+    async def clear_permissions(self):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+class _Browser:
+    def __init__(self):
+        self.contexts, self.closed = [], False
+
+    def is_connected(self):
+        return not self.closed
+
+    async def new_context(self, **options):
+        ctx = _Context(self, options)
+        self.contexts.append(ctx)
+        return ctx
+
+    async def close(self):
+        self.closed = True
+
+
+class _Playwright:
+    async def stop(self):
+        pass
+
+
+def _pool(**kw):
+    browsers = []
+
+    async def launch():
+        browsers.append(_Browser())
+        return _Playwright(), browsers[-1]
+
+    pool = BrowserPool(launch, **kw)
+    return pool, browsers
+
+
+async def test_pages_reuse_one_browser_and_reset_contexts():
+    pool, browsers = _pool(max_contexts=2)
+    for _ in range(5):
+        page = await pool.new_page()
+        await pool.release(page)
+    assert len(browsers) == 1 and len(browsers[0].contexts) == 1
+    ctx = browsers[0].contexts[0]
+    assert ctx.cookie_clears == 5 and ctx.pages == [] and not ctx.closed
+    assert pool.stats["contexts_reused"] == 4
+    await pool.close()
+    assert browsers[0].closed and ctx.closed
+
+
+async def test_leases_are_bounded():
+    pool, browsers = _pool(max_contexts=2)
+    a = await pool.new_page()
+    b = await pool.new_page()
+    third = asyncio.ensure_future(pool.new_page())
+    await asyncio.sleep(0.02)
+    assert not third.done() and pool.leased == 2
+    await pool.release(a)
+    c = await asyncio.wait_for(third, 1)
+    assert c.context is a.context  # the freed context, reset and reused
+    await pool.release(b)
+    await pool.release(c)
+    await pool.release(c)  # double release is harmless
+    assert pool.leased == 0 and pool.idle == 2
+    await pool.close()
+
+
+async def test_context_and_browser_recycling():
+    pool, browsers = _pool(max_contexts=1, max_pages_per_context=3, max_pages_per_browser=7)
+    for _ in range(9):
+        await pool.release(await pool.new_page())
+    first = browsers[0]
+    # 3 pages per context → contexts recycled; 7 pages → new browser for the rest
+    assert [c.closed for c in first.contexts] == [True, True, True]
+    assert len(browsers) == 2 and first.closed and len(browsers[1].contexts) == 1
+    assert pool.stats["browser_recycles"] == 1
+    await pool.close()
+
+
+async def test_idle_eviction_and_browser_idle_close():
+    pool, browsers = _pool(context_idle_ttl=0.01, browser_idle_ttl=0.05)
+    await pool.release(await pool.new_page())
+    ctx = browsers[0].contexts[0]
+    await asyncio.sleep(0.02)
+    await pool.trim()
+    assert ctx.closed and pool.idle == 0 and not browsers[0].closed
+    await asyncio.sleep(0.1)
+    assert browsers[0].closed and pool.stats["idle_closes"] == 1
+    # next lease relaunches
+    await pool.release(await pool.new_page())
+    assert len(browsers) == 2
+    await pool.close()
+
+
+async def test_dedicated_contexts_are_not_reused():
+    pool, browsers = _pool()
+    page = await pool.dedicated_page(locale="en-US", proxy={"server": "http://p:1"})
+    ctx = page.context
+    assert ctx.options["proxy"] == {"server": "http://p:1"}
+    await pool.release(page)
+    assert ctx.closed and pool.idle == 0
+    pooled = await pool.new_page()
+    assert pooled.context is not ctx and "proxy" not in pooled.context.options
+    await pool.release(pooled)
+    await pool.close()
+
+
+async def test_page_context_manager_releases_on_error():
+    pool, _ = _pool(max_contexts=1)
+    with pytest.raises(RuntimeError):
+        async with pool.page() as page:
+            raise RuntimeError("parse failed")
+    assert page.closed and pool.leased == 0
+    async with pool.page():
+        pass
+    await pool.close()
+
+
+def test_loop_change_closes_the_previous_browser():
+    pool, browsers = _pool()
+
+    async def one_page():
+        await pool.release(await pool.new_page())
+
+    old = asyncio.new_event_loop()
+    thread = threading.Thread(target=old.run_forever, daemon=True)
+    thread.start()
+    try:
+        asyncio.run_coroutine_threadsafe(one_page(), old).result(1)
+        asyncio.run(one_page())
+        deadline = time.monotonic() + 1
+        while not browsers[0].closed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert browsers[0].closed and len(browsers) == 2 and not browsers[1].closed
+        assert pool.stats["browsers_discarded"] == 1
+    finally:
+        old.call_soon_threadsafe(old.stop)
+        thread.join(1)
+        old.close()
@@ -0,0 +1,69 @@
+"""
+Tests for the bank-statement classification memo (api/services/classification_memo.py).
+
+Validates:
+  - Keys ignore bank prefixes, reference numbers and case, but keep direction
+    and amount band apart.
+  - A pattern answers only with enough consistent confirmations.
+  - split() separates memo answers from movements for the model and counts hits.
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.services.classification_memo import ClassificationMemo, MemoStats, amount_band, memo_key
+
+ACCOUNTS = {
+    "acct-cogs": {"id": "acct-cogs", "code": "5000", "name": "Renovation materials"},
+    "acct-fees": {"id": "acct-fees", "code": "6000", "name": "Bank fees"},
+}
+
+
+def _row(description, amount, account, counterparty="", is_credit=False):
+    return {"description": description, "counterparty": counterparty, "amount": amount,
+            "is_credit": is_credit, "final_account_id": account}
+
+
+def test_memo_key_normalization_and_bands():
+    a = memo_key("ACH DEBIT - HOME DEPOT #4471", "", False, -52.10)
+    b = memo_key("home depot #0093", None, False, 48.00)
+    assert a == b == ("home depot", False, amount_band(50))
+    assert memo_key("HOME DEPOT", "", True, 50) != a           # direction
+    assert memo_key("HOME DEPOT", "", False, 5000) != a        # amount band
+    assert memo_key("#1234 - 5678", "", False, 10) is None     # nothing to recognize
+    assert amount_band(0) == 0 and amount_band(9.99) == 1 and amount_band(10) == 2
+
+
+def test_memo_requires_support_and_agreement():
+    history = [
+        _row("ACH DEBIT - HOME DEPOT #1", -40, "acct-cogs"),
+        _row("ACH DEBIT - HOME DEPOT #2", -45, "acct-cogs"),
+        _row("ACH DEBIT - HOME DEPOT #3", -41, "acct-cogs"),
+        _row("LOWES #22", -60, "acct-cogs"),                      # only once
+        _row("WIRE OUT - VANDERBILT", -30000, "acct-cogs"),
+        _row("WIRE OUT - VANDERBILT", -31000, "acct-fees"),      # 50/50 → ambiguous
+        _row("MONTHLY FEE", -15, "acct-gone"),                    # account not in chart
+        _row("MONTHLY FEE", -15, "acct-gone"),
+    ]
+    memo = ClassificationMemo.from_history(history, ACCOUNTS)
+
+    hit = memo.lookup({"description": "ACH DEBIT - HOME DEPOT #9", "amount": -39.9, "is_credit": False})
+    assert hit["account_code"] == "5000" and hit["source"] == "memo" and hit["confidence"] == 0.95
+    assert memo.lookup({"description": "LOWES #23", "amount": -60, "is_credit": False}) is None
+    assert memo.lookup({"description": "WIRE OUT - VANDERBILT", "amount": -30500, "is_credit": False}) is None
+    assert memo.lookup({"description": "MONTHLY FEE", "amount": -15, "is_credit": False}) is None
+
+
+def test_split_counts_hits_and_misses():
+    history = [_row("Zelle payment from Paquita Sanchez", 1000, "acct-cogs", "Paquita Sanchez", True)] * 2
+    memo = ClassificationMemo.from_history(history, ACCOUNTS)
+    movements = [
+        {"id": "a", "description": "ZELLE PAYMENT FROM PAQUITA SANCHEZ", "counterparty": "PAQUITA SANCHEZ",
+         "amount": 1200, "is_credit": True},
+        {"id": "b", "description": "ZELLE PAYMENT FROM JUAN PEREZ", "amount": 1200, "is_credit": True},
+    ]
+    stats = MemoStats()
+    hits, misses = memo.split(movements, stats)
+    assert [mv["id"] for mv, _ in hits] == ["a"] and [mv["id"] for mv in misses] == ["b"]
+    assert stats.as_dict() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "tokens_saved": 0}
@@ -0,0 +1,357 @@
+"""
+Tests for the outbound email outbox (migration 116, api/services/email_outbox.py),
+against the local fake Resend server (tools/fake_resend.py).
+
+Validates:
+  - A send in the request path only queues a row: it returns in
+    milliseconds while Resend takes half a second, and the drain delivers
+    it (message_id recorded).
+  - The drain sends chunks of up to 100 through the batch endpoint in
+    parallel, honors the rate limit (a 429 pauses and retries), and reports
+    per-type counts and throughput.
+  - Failures retry with exponential backoff and are dead-lettered after
+    MAX_ATTEMPTS; a rejected address is dead-lettered at once.
+  - Rows left 'sending' by a crashed drain are claimed again after their
+    lock expires; post-sale rows without a payload are rendered at send time.
+  - A drain settles only rows it still holds: once another drain took a
+    row over, the slow drain's result doesn't overwrite it.
+  - Only a missing outbox (migration 116 not applied) falls back: queue_email
+    sends directly. Without the claim RPC the drain sends nothing, since
+    every process runs it.
+    Any other database error raises from queue_email (so esign does not mark
+    the envelope sent) or skips the drain tick.
+"""
+import sys
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import resend
+
+import tools.email_tool as email_tool
+from api.services import email_outbox, email_service
+from api.services.email_outbox import RateLimiter, drain, queue_email
+from tools.fake_resend import FakeResend
+
+
+# ---------------------------------------------------------------------------
+# In-memory fake: scheduled_emails and claim_outbox_emails
+# ---------------------------------------------------------------------------
+
+def _iso(dt):
+    return dt.isoformat()
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class _Res:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, db):
+        self.db, self.preds, self.n, self.op = db, [], None, None
+
+    def select(self, *_a, **_k): return self
+    def order(self, *_a, **_k): return self
+
+    def eq(self, col, val):
+        self.preds.append(lambda r: r.get(col) == val); return self
+    def lte(self, col, val):
+        self.preds.append(lambda r: r.get(col) <= val); return self
+    def limit(self, n):
+        self.n = n; return self
+    def insert(self, row):
+        self.op = ("insert", row); return self
+    def update(self, values):
+        self.op = ("update", values); return self
+
+    def execute(self):
+        db = self.db
+        if db.broken:
+            raise RuntimeError("PGRST204 Could not find the 'payload' column")
+        if db.error:
+            raise db.error
+        with db.lock:
+            if self.op and self.op[0] == "insert":
+                row = db.add(self.op[1])
+                return _Res([dict(row)])
+            if self.op:
+                db.updates += 1
+                matched = [r for r in db.rows if all(p(r) for p in self.preds)]
+                for r in matched:
+                    r.update(self.op[1])
+                return _Res([dict(r) for r in matched])
+            matched = [dict(r) for r in db.rows if all(p(r) for p in self.preds)]
+            return _Res(matched[:self.n] if self.n else matched)
+
+
+class _Rpc:
+    def __init__(self, db, params):
+        self.db, self.params = db, params
+
+    def execute(self):
+        db, p = self.db, self.params
+        if db.rpc_error:
+            raise db.rpc_error
+        now = _iso(_now())
+        with db.lock:
+            due = [r for r in db.rows
+                   if (r["status"] == "pending" and r["scheduled_for"] <= now)
+                   or (r["status"] == "sending" and r["locked_until"] < now)]
+            due.sort(key=lambda r: r["scheduled_for"])
+            until = _iso(_now() + timedelta(seconds=p["p_lock_seconds"]))
+            for r in due[:p["p_limit"]]:
+                r.update(status="sending", locked_by=p["p_holder"], locked_until=until)
+            return _Res([dict(r) for r in due[:p["p_limit"]]])
+
+
+class _FakeDB:
+    def __init__(self):
+        self.rows, self.broken, self.updates = [], False, 0
+        self.error = self.rpc_error = None
+        self.lock = threading.Lock()
+
+    def add(self, row):
+        full = {"id": str(uuid.uuid4()), "attempts": 0, "sent_at": None, "last_error": None,
+                "message_id": None, "locked_by": None, "locked_until": None, "payload": None,
+                "metadata": {}, "created_at": _iso(_now()), **row}
+        self.rows.append(full)
+        return full
+
+    def table(self, name):
+        assert name == "scheduled_emails"
+        return _Query(self)
+
+    def rpc(self, name, params):
+        assert name == "claim_outbox_emails"
+        return _Rpc(self, params)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = _FakeDB()
+    monkeypatch.setattr(email_outbox, "_db", lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def fake_resend(monkeypatch):
+    monkeypatch.setattr(resend, "api_url", resend.api_url)   # restored afterwards
+    with FakeResend() as fake:
+        monkeypatch.setattr(email_tool, "RESEND_API_URL", fake.url)
+        monkeypatch.setattr(email_tool, "RESEND_API_KEY", "re_test")
+        monkeypatch.setattr(email_tool, "EMAIL_FROM", "Maninos <noreply@maninos.test>")
+        yield fake
+
+
+def _queue(db, n, email_type="sale_completed", to=None):
+    for i in range(n):
+        queue_email([to or f"client{i}@example.com"], f"Hola {i}", f"<p>{i}</p>", email_type)
+
+
+# ---------------------------------------------------------------------------
+
+
+def test_request_path_only_queues(db, fake_resend):
+    fake_resend.latency = 0.5
+
+    t0 = time.perf_counter()
+    result = email_service.send_welcome_email("ana@example.com", "Ana")
+    assert time.perf_counter() - t0 < 0.2
+    assert result["ok"] and result["queued"] and result["type"] == "welcome"
+    assert fake_resend.requests == []
+    (row,) = db.rows
+    assert row["status"] == "pending" and row["email_type"] == "welcome"
+    assert row["payload"]["to"] == ["ana@example.com"] and "Ana" in row["payload"]["html"]
+
+    out = drain(db)
+    assert out["sent"] == 1 and out["by_type"] == {"welcome": {"sent": 1}}
+    assert row["status"] == "sent" and row["message_id"] == fake_resend.sent[0]["id"]
+    assert row["locked_by"] is None and row["sent_at"]
+    assert fake_resend.sent[0]["subject"].endswith("Maninos Homes!")
+
+
+def test_drain_sends_batches_in_parallel(db, fake_resend):
+    fake_resend.latency = 0.3
+    _queue(db, 420)
+    _queue(db, 30, email_type="investor_followup")
+
+    t0 = time.perf_counter()
+    out = drain(db, workers=5, limiter=RateLimiter(rate=50))
+    elapsed = time.perf_counter() - t0
+
+    assert out["sent"] == 450 and out["failed"] == 0
+    assert out["by_type"] == {"sale_completed": {"sent": 420}, "investor_followup": {"sent": 30}}
+    assert [r["path"] for r in fake_resend.requests] == ["/emails/batch"] * 5
+    assert max(len(r["body"]) for r in fake_resend.requests) == 100
+    assert elapsed < 5 * 0.3, "chunks should go out concurrently"
+    assert db.updates == 450
+    assert email_outbox.metrics()["last_drain"]["sent"] == 450
+
+
+def test_rate_limited_chunk_waits_and_retries(db, fake_resend):
+    fake_resend.rate_limit = 2         # Resend answers 429 past 2 requests/s
+    _queue(db, 250)
+
+    out = drain(db, workers=3, limiter=RateLimiter(rate=100))
+
+    assert out["sent"] == 250 and out["rate_limited"] == 0
+    assert len(fake_resend.requests) == 4     # 3 chunks + 1 retry after the 429
+    assert len(fake_resend.sent) == 250
+
+
+def test_failures_back_off_then_dead_letter(db, fake_resend):
+    fake_resend.reject("bounce@example.com")
+    _queue(db, 1, to="bounce@example.com")
+    _queue(db, 1, email_type="payment_confirmation", to="ok@example.com")
+    bounced, flaky = db.rows
+
+    fake_resend.fail_next = 100
+    out = drain(db)
+    assert out["retried"] == 2 and out["sent"] == 0
+    for row in (bounced, flaky):
+        assert row["status"] == "pending" and row["attempts"] == 1
+        retry_in = datetime.fromisoformat(row["scheduled_for"]) - _now()
+        assert timedelta(seconds=50) < retry_in <= timedelta(seconds=60)
+
+    # Backoff doubles per attempt; after MAX_ATTEMPTS the row is dead-lettered
+    delays = []
+    for _ in range(email_outbox.MAX_ATTEMPTS - 1):
+        flaky["scheduled_for"] = bounced["scheduled_for"] = _iso(_now() - timedelta(seconds=1))
+        bounced["status"] = "failed"  # park it for now
+        drain(db)
+        if flaky["status"] == "pending":
+            delays.append(round((datetime.fromisoformat(flaky["scheduled_for"]) - _now()).total_seconds(), -1))
+    assert delays == [120, 240, 480]
+    assert flaky["status"] == "failed" and flaky["attempts"] == email_outbox.MAX_ATTEMPTS
+    assert "Internal server error" in flaky["last_error"]
+
+    # A rejected address is permanent: dead-lettered on its first real answer
+    fake_resend.fail_next = 0
+    bounced.update(status="pending", scheduled_for=_iso(_now() - timedelta(seconds=1)))
+    out = drain(db)
+    assert out["dead"] == 1 and bounced["status"] == "failed" and bounced["attempts"] == 2
+    assert "bounce@example.com" in bounced["last_error"]
+
+
+def test_crashed_claims_and_unrendered_rows(db, fake_resend):
+    past, future = _iso(_now() - timedelta(minutes=1)), _iso(_now() + timedelta(minutes=5))
+    db.add({"email_type": "sale_completed", "to_email": "a@example.com", "to_name": "A",
+            "subject": "S", "payload": {"to": ["a@example.com"], "html": "<p>a</p>"},
+            "scheduled_for": past, "status": "sending", "locked_by": "dead-host", "locked_until": past})
+    db.add({"email_type": "sale_completed", "to_email": "b@example.com", "to_name": "B",
+            "subject": "S", "payload": {"to": ["b@example.com"], "html": "<p>b</p>"},
+            "scheduled_for": past, "status": "sending", "locked_by": "live-host", "locked_until": future})
+    db.add({"email_type": "review_request", "to_email": "c@example.com", "to_name": "Carla",
+            "subject": "⭐ ¿Cómo fue tu experiencia? - Maninos Homes",
+            "metadata": {"property_address": "9 Elm Rd"}, "scheduled_for": past, "status": "pending"})
+    db.add({"email_type": "mystery", "to_email": "d@example.com", "to_name": "D",
+            "subject": "?", "scheduled_for": past, "status": "pending"})
+
+    out = drain(db)
+    assert out["sent"] == 2 and out["dead"] == 1
+    assert [r["status"] for r in db.rows] == ["sent", "sending", "sent", "failed"]
+    review = next(e for e in fake_resend.sent if e["to"] == ["c@example.com"])
+    assert "Carla" in review["html"] and "9 Elm Rd" in review["html"]
+    assert "Unknown email type" in db.rows[3]["last_error"]
+
+
+def test_expired_claim_is_not_overwritten(db, fake_resend, monkeypatch):
+    _queue(db, 1)
+    (row,) = db.rows
+    send = email_outbox._send_chunk
+
+    def slow_send(chunk, limiter):
+        # Our lock ran out mid-send; another drain claimed and delivered the row
+        row.update(status="sent", locked_by="other-host", message_id="msg-other")
+        return send(chunk, limiter)
+
+    monkeypatch.setattr(email_outbox, "_send_chunk", slow_send)
+    out = drain(db, holder="slow-host")
+    assert out["sent"] == 1
+    assert row["locked_by"] == "other-host" and row["message_id"] == "msg-other"
+
+
+def test_unwritable_outbox_sends_directly(db, fake_resend):
+    db.broken = True
+    result = queue_email(["ana@example.com"], "Hola", "<p>hola</p>", "welcome")
+    assert result["ok"] and result["queued"] is False and result["message_id"]
+    assert len(fake_resend.sent) == 1 and db.rows == []
+
+
+def test_other_insert_errors_do_not_send_directly(db, fake_resend):
+    db.error = RuntimeError("connection reset by peer")
+    with pytest.raises(ValueError, match="connection reset"):
+        queue_email(["ana@example.com"], "Hola", "<p>hola</p>", "welcome")
+    assert fake_resend.requests == []
+
+    result = email_service.send_welcome_email("ana@example.com", "Ana")
+    assert not result["ok"] and "connection reset" in result["error"]
+
+
+class _EsignDB:
+    """signature_envelopes / document_signatures for send_signing_emails."""
+
+    def __init__(self):
+        self.updates = []
+
+    def table(self, name):
+        return _EsignQuery(self, name)
+
+
+class _EsignQuery:
+    def __init__(self, db, name):
+        self.db, self.name, self.one = db, name, False
+
+    def select(self, *_a, **_k): return self
+    def eq(self, *_a, **_k): return self
+
+    def single(self):
+        self.one = True; return self
+
+    def update(self, values):
+        self.db.updates.append((self.name, values)); return self
+
+    def execute(self):
+        if self.name == "signature_envelopes":
+            return _Res({"id": "env-1", "name": "Contrato RTO"} if self.one else [])
+        return _Res([{"id": "sig-1", "token": "tok", "signer_email": "ana@example.com",
+                      "signer_name": "Ana", "signer_role": "buyer", "audit_log": []}])
+
+
+def test_failed_queue_does_not_mark_envelope_sent(db, fake_resend, monkeypatch):
+    from api.services import esign_service
+
+    esign = _EsignDB()
+    monkeypatch.setattr(esign_service, "_get_sb", lambda: esign)
+    db.error = RuntimeError("connection reset by peer")
+
+    result = esign_service.send_signing_emails("env-1")
+    assert result["sent"] == 0 and esign.updates == []
+
+
+def test_drain_waits_for_the_claim_rpc(db, fake_resend):
+    _queue(db, 2)
+
+    db.rpc_error = RuntimeError("canceling statement due to statement timeout")
+    out = drain(db)
+    assert out["processed"] == 0 and fake_resend.requests == []
+    assert [r["status"] for r in db.rows] == ["pending", "pending"]
+
+    db.rpc_error = RuntimeError("PGRST202 Could not find the function public.claim_outbox_emails")
+    out = drain(db)
+    assert out["processed"] == 0 and fake_resend.requests == []
+    assert [r["status"] for r in db.rows] == ["pending", "pending"]
+
+    db.rpc_error = None
+    out = drain(db)
+    assert out["sent"] == 2 and [r["status"] for r in db.rows] == ["sent", "sent"]
@@ -0,0 +1,162 @@
+"""
+Snapshot tests for the email templates (api/services/email_service.py,
+api/services/email_templates.py).
+
+Validates:
+  - Every email renders byte-for-byte the HTML in
+    tests/fixtures/email_snapshots/ (captured from the f-string templates
+    the compiled ones replaced), across the branches of each template:
+    reminder windows, singular/plural counts, optional blocks, empty lists.
+  - A reminder template bound to its window and batch-rendered gives the
+    same HTML as rendering each reminder on its own.
+  - The template compiler folds constants, rejects placeholders it cannot
+    compile, and reports missing values.
+
+UPDATE_EMAIL_SNAPSHOTS=1 rewrites the snapshots (review the diff!).
+"""
+import sys
+import os
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from api.services import email_service as es
+from api.services.email_templates import EmailTemplate
+
+SNAPSHOTS = Path(__file__).parent / "fixtures" / "email_snapshots"
+APP_URL = "http://localhost:3000"   # the snapshots' APP_URL
+
+
+class _FrozenDatetime(datetime):
+    @classmethod
+    def utcnow(cls):
+        return cls(2026, 3, 15, 9, 30)
+
+
+def _rto_application():
+    sent = []
+    real = es.send_email
+    es.send_email = lambda **kw: sent.append(kw) or {"ok": True}
+    try:
+        es.send_rto_application_email("ana@example.com", "Ana López", "12 Oak St", "Houston, TX", 48500)
+    finally:
+        es.send_email = real
+    return sent[0]["html"]
+
+
+_NOTE = {"loan_amount": 25000, "annual_rate": 12, "term_months": 3, "total_due": 25750,
+         "total_interest": 750, "paid_amount": 25750, "start_date": "2026-01-15",
+         "maturity_date": "2026-04-15", "lender_name": "Inversiones RG"}
+_OVERDUE = [
+    {"client_name": "Ana", "property_address": "12 Oak St", "amount": 850, "days_late": 9, "late_fee": 135},
+    {"client_name": "Luis", "amount": 1020.5, "days_late": 6, "late_fee": 90},
+]
+_MATURING = [
+    {"investor_name": "Rosa", "loan_amount": 10000, "total_due": 11200, "maturity_date": "2026-03-01", "days_remaining": -4},
+    {"investor_name": "Juan", "loan_amount": 20000, "total_due": 22400, "maturity_date": "2026-04-01", "days_remaining": 17},
+    {"investor_name": "Eva", "loan_amount": 5000, "total_due": 5600, "maturity_date": "2026-05-10", "days_remaining": 56},
+    {"investor_name": "Ida", "loan_amount": 7500, "total_due": 8400, "maturity_date": "2026-06-01", "days_remaining": 78},
+]
+_POST_PURCHASE = {
+    "financial_summary": {"purchase_price": 48500, "total_paid": 52300.75},
+    "options": [
+        {"key": "repurchase", "title": "Recompra", "description": "Compra otra casa",
+         "details": ["Descuento por lealtad", "Sin enganche"], "estimated_discount": 2500},
+        {"key": "upgrade", "title": "Upgrade", "description": "Cambia a una casa mayor",
+         "details": ["Tu casa cuenta como crédito"], "credit_amount": 30000},
+        {"key": "upgrade", "title": "Otra", "description": "Sin monto", "details": []},
+    ],
+    "loyalty_programs": {"title": "Lealtad", "programs": [
+        {"title": "Referidos", "description": "Gana por referir", "min_bonus": 500, "max_bonus": 1000},
+        {"title": "Reseñas", "description": "Deja una reseña"},
+    ]},
+}
+
+
+def _reminder(days):
+    return es._rto_payment_reminder_html("Ana López", "12 Oak St", 850.0, "15 de marzo, 2026", 4, 36, days)
+
+
+CASES = {
+    "welcome": lambda: es._welcome_html("Ana López"),
+    "payment_confirmation": lambda: es._payment_confirmation_html(
+        "Ana López", "12 Oak St", "Houston", 48500.5, "2026-03-15"),
+    "review_request": lambda: es._review_request_html("Ana López", "12 Oak St"),
+    "referral_request": lambda: es._referral_request_html("Ana López"),
+    "title_transferred": lambda: es._title_transferred_html("Ana López", "12 Oak St"),
+    "rto_application": _rto_application,
+    "transfer_reported": lambda: es._transfer_reported_html("Ana López", "12 Oak St", "Houston", 48500),
+    "sale_completed": lambda: es._sale_completed_html("Ana López", "12 Oak St", "Houston", 48500),
+    "sale_completed_docs_url": lambda: es._sale_completed_html(
+        "Ana López", "12 Oak St", "Houston", 48500, "https://docs.example/x"),
+    "rto_reminder_3_days_before": lambda: _reminder(3),
+    "rto_reminder_1_day_before": lambda: _reminder(1),
+    "rto_reminder_day_of": lambda: _reminder(0),
+    "rto_reminder_1_day_after": lambda: _reminder(-1),
+    "rto_reminder_4_days_after": lambda: _reminder(-4),
+    "rto_overdue_alert": lambda: es._rto_overdue_alert_html("Equipo", _OVERDUE, 1870.5),
+    "rto_overdue_alert_single": lambda: es._rto_overdue_alert_html("Equipo", _OVERDUE[:1], 850),
+    "rto_completed": lambda: es._rto_completed_html("Ana López", "12 Oak St"),
+    "promissory_maturity_alert": lambda: es._promissory_maturity_alert_html(_MATURING, 47600),
+    "promissory_maturity_alert_single": lambda: es._promissory_maturity_alert_html(_MATURING[1:2], 22400),
+    "investor_payment_reminder": lambda: es._investor_payment_reminder_html({
+        "pay_date": "2026-03-15",
+        "totals": {"count": 2, "total": 1450.5, "principal": 1000, "interest": 450.5},
+        "investors": [{"name": "Rosa", "total": 1200, "principal": 1000, "interest": 200},
+                      {"name": "Juan", "total": 250.5, "principal": 0, "interest": 250.5}]}),
+    "investor_payment_reminder_bad_date": lambda: es._investor_payment_reminder_html(
+        {"pay_date": "pronto", "investors": []}),
+    "investor_welcome": lambda: es._investor_welcome_html("Rosa Gómez", _NOTE),
+    "investor_followup": lambda: es._investor_followup_html("Rosa Gómez", {
+        "total_invested": 45000, "total_returned": 3200.25, "outstanding": 41800, "active_notes": 2,
+        "notes": [dict(_NOTE, status="active"), dict(_NOTE, status="paid", paid_amount=None),
+                  dict(_NOTE, status="defaulted", annual_rate=14.5)]}),
+    "investor_followup_single": lambda: es._investor_followup_html("Rosa Gómez", {"active_notes": 1}),
+    "investor_completion": lambda: es._investor_completion_html("Rosa Gómez", _NOTE),
+    "client_post_purchase": lambda: es._client_post_purchase_html("Ana López", "12 Oak St", _POST_PURCHASE),
+    "client_post_purchase_empty": lambda: es._client_post_purchase_html("Ana López", "12 Oak St", {}),
+}
+
+
+@pytest.fixture(autouse=True)
+def _frozen_clock(monkeypatch):
+    monkeypatch.setattr(es, "datetime", _FrozenDatetime)
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_email_matches_snapshot(name):
+    html = CASES[name]().replace(es.APP_URL, APP_URL)
+    path = SNAPSHOTS / f"{name}.html"
+    if os.getenv("UPDATE_EMAIL_SNAPSHOTS") == "1":
+        SNAPSHOTS.mkdir(parents=True, exist_ok=True)
+        path.write_text(html, encoding="utf-8")
+    assert html == path.read_text(encoding="utf-8")
+
+
+def test_batch_render_matches_single_render():
+    rows = [
+        {"client_name": f"Cliente {i}", "property_address": f"{i} Elm Rd", "monthly_rent": 700.0 + i,
+         "due_date": "15 de marzo, 2026", "payment_number": i, "total_payments": 36}
+        for i in range(1, 6)
+    ]
+    for days in (3, 0, -1):
+        batch = es._rto_reminder_template(days).render_many(rows)
+        assert batch == [es._rto_payment_reminder_html(days_until_due=days, **r) for r in rows]
+
+
+def test_compiler_folds_constants_and_checks_placeholders():
+    t = EmailTemplate("<a href='{url}/x'>{n:,.2f} {{literal}} {name}</a>", url="https://m.example")
+    assert t.fields == ("n", "name")
+    assert t.render(n=1234.5, name="Ana") == "<a href='https://m.example/x'>1,234.50 {literal} Ana</a>"
+    bound = t.bind(n=2)
+    assert bound.fields == ("name",) and bound.render(name="Eva") == \
+        "<a href='https://m.example/x'>2.00 {literal} Eva</a>"
+
+    with pytest.raises(TypeError):
+        t.render(n=1)
+    for bad in ("{p.get('x')}", "{x!r}", "{rows[0]}", "{x:{w}}", "{class}", "{x:'}"):
+        with pytest.raises(ValueError):
+            EmailTemplate(bad)
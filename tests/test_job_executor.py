@@ -0,0 +1,181 @@
+"""
+Tests for the scheduler's job executor (api/services/job_executor.py).
+
+Validates:
+  - /health latency stays flat while a long blocking job runs on an
+    AsyncIOScheduler using JobExecutor; the same job run inline on the loop
+    (what the manual triggers used to do) stalls every request behind it.
+  - A job past its timeout is reported (on_timeout) and cancelled:
+    check_cancelled() raises, run_coroutine() cancels the async body, and
+    remaining() shrinks blocking HTTP timeouts to the time left.
+  - cancel(job_id) stops a running job; running() lists it meanwhile.
+  - run_job_now awaits a job function on the pool and returns its result.
+"""
+import sys
+import os
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import pytest
+from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from api.services import job_executor, scheduler_service
+from api.services.job_executor import JobCancelled, JobExecutor, check_cancelled, remaining, run_coroutine
+
+JOB_SECONDS = 0.8
+
+
+async def _health_latencies(client, n=15, gap=0.02):
+    latencies = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        res = await client.get("/health")
+        latencies.append(time.perf_counter() - t0)
+        assert res.status_code == 200
+        await asyncio.sleep(gap)
+    return latencies
+
+
+async def test_health_stays_flat_while_a_long_job_runs():
+    from api.main import app
+
+    started, finished = threading.Event(), threading.Event()
+
+    def long_job():  # blocking, like the Apify call or a TDHCA run
+        started.set()
+        time.sleep(JOB_SECONDS)
+        finished.set()
+
+    executor = JobExecutor(max_workers=2)
+    scheduler = AsyncIOScheduler(executors={"default": executor})
+    scheduler.add_job(long_job, "interval", hours=1, id="long_job",
+                      next_run_time=datetime.now(timezone.utc))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        baseline = max(await _health_latencies(client, n=5))
+        scheduler.start()
+        try:
+            for _ in range(100):
+                if started.is_set():
+                    break
+                await asyncio.sleep(0.01)
+            assert started.is_set()
+            during = await _health_latencies(client)
+            assert not finished.is_set(), "job ended before the measurements"
+            assert max(during) < max(0.1, baseline * 5), during
+            assert executor.running() and "long_job" in executor.running()
+        finally:
+            scheduler.shutdown(wait=False)
+
+        # Control: the same job inline on the loop blocks /health for its whole run
+        async def inline_job():
+            long_job()
+
+        blocker = asyncio.ensure_future(inline_job())
+        t0 = time.perf_counter()
+        await client.get("/health")
+        assert time.perf_counter() - t0 >= JOB_SECONDS * 0.9
+        await blocker
+
+
+def test_timeout_cancels_cooperative_job():
+    timeouts = []
+    executor = JobExecutor(timeouts={"slow": 0.3}, on_timeout=lambda j, t: timeouts.append((j, t)))
+    seen = {}
+
+    def slow():
+        seen["http_timeout"] = remaining(320)
+        while True:
+            check_cancelled()
+            time.sleep(0.02)
+
+    t0 = time.perf_counter()
+    with pytest.raises(JobCancelled, match="slow timed out"):
+        executor.submit("slow", slow).result(timeout=5)
+    assert time.perf_counter() - t0 < 1.5
+    assert timeouts == [("slow", 0.3)]
+    assert seen["http_timeout"] <= 1.0
+    assert executor.running() == {}
+    executor.shutdown()
+
+
+def test_run_coroutine_is_cancelled_with_its_job():
+    executor = JobExecutor(timeouts={"scrape": 0.3})
+
+    def scrape():
+        return run_coroutine(asyncio.sleep(30))
+
+    t0 = time.perf_counter()
+    with pytest.raises(JobCancelled):
+        executor.submit("scrape", scrape).result(timeout=5)
+    assert time.perf_counter() - t0 < 1.5
+
+    # Outside a job, run_coroutine just runs the coroutine
+    async def answer():
+        return 42
+    assert executor.submit("other", run_coroutine, answer()).result(timeout=5) == 42
+    assert remaining(30) == 30
+    executor.shutdown()
+
+
+def test_cancel_stops_a_running_job():
+    executor = JobExecutor()
+    running = threading.Event()
+
+    def loop_forever():
+        running.set()
+        while True:
+            check_cancelled()
+            time.sleep(0.02)
+
+    future = executor.submit("portal_sync", loop_forever)
+    assert running.wait(2)
+    assert list(executor.running()) == ["portal_sync"]
+    assert executor.cancel("portal_sync") and not executor.cancel("title_monitor")
+    with pytest.raises(JobCancelled, match="portal_sync cancelled"):
+        future.result(timeout=5)
+    executor.shutdown()
+
+
+async def test_scheduler_reports_timed_out_job_as_error():
+    events = []
+    executor = JobExecutor(timeouts={"stuck": 0.2})
+    scheduler = AsyncIOScheduler(executors={"default": executor})
+    scheduler.add_listener(lambda e: events.append(e), EVENT_JOB_ERROR | EVENT_JOB_EXECUTED)
+
+    def stuck():
+        while True:
+            check_cancelled()
+            time.sleep(0.02)
+
+    scheduler.add_job(stuck, "interval", hours=1, id="stuck", next_run_time=datetime.now(timezone.utc))
+    scheduler.start()
+    try:
+        for _ in range(200):
+            if events:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        scheduler.shutdown(wait=False)
+    assert events and isinstance(events[0].exception, JobCancelled)
+
+
+async def test_run_job_now(monkeypatch):
+    monkeypatch.setattr(scheduler_service, "_executor", None)
+    seen = {}
+
+    def job(x):
+        seen["thread"] = threading.current_thread().name
+        seen["job"] = job_executor.current_job().job_id
+        return {"ok": True, "x": x}
+
+    assert await scheduler_service.run_job_now("title_monitor", job, 7) == {"ok": True, "x": 7}
+    assert seen["job"] == "title_monitor" and seen["thread"].startswith("scheduler-job")
+    assert scheduler_service._get_executor().timeout_for("title_monitor") == 3600
+    scheduler_service._get_executor().shutdown()
@@ -0,0 +1,300 @@
+"""
+Tests for the scheduler's run leases (migration 114, api/services/job_leases.py).
+
+Validates:
+  - Two schedulers firing the same run: exactly one claims and executes it,
+    and the outcome lands on that run's single scheduler_runs row.
+  - A holder that loses its lease (another process took the run over) has
+    its job cancelled by the heartbeat.
+  - A run left unfinished by a crashed holder is taken over once its lease
+    expires (attempts = 2); a run stopped by shutdown is handed back.
+  - An unreachable lease store fails open: the job still runs, unleased.
+  - Interval triggers are anchored, so processes agree on fire times;
+    SCHEDULER_ROLE=web keeps only the per-process jobs.
+"""
+import sys
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from api.services import scheduler_service
+from api.services.job_executor import JobExecutor, check_cancelled
+from api.services.job_leases import Lease, LeaseStore, run_key
+
+
+# ---------------------------------------------------------------------------
+# In-memory fake: scheduler_runs plus the two lease functions
+# ---------------------------------------------------------------------------
+
+class _Res:
+    def __init__(self, data):
+        self.data = data
+
+
+def _ts(dt):
+    return dt.isoformat()
+
+
+class _Rpc:
+    def __init__(self, db, name, params):
+        self.db, self.name, self.params = db, name, params
+
+    def execute(self):
+        if self.db.broken:
+            raise RuntimeError("PGRST202 Could not find the function")
+        with self.db.lock:
+            return _Res(getattr(self.db, self.name)(**self.params))
+
+
+class _Query:
+    def __init__(self, db):
+        self.db, self.preds, self.write = db, [], None
+        self.negate = False
+
+    def select(self, *_a, **_k): return self
+
+    def _where(self, pred):
+        negate, self.negate = self.negate, False
+        self.preds.append((lambda r: not pred(r)) if negate else pred)
+        return self
+
+    @property
+    def not_(self):
+        self.negate = True
+        return self
+
+    def eq(self, col, val): return self._where(lambda r: r.get(col) == val)
+    def in_(self, col, vals): return self._where(lambda r: r.get(col) in vals)
+    def is_(self, col, _null): return self._where(lambda r: r.get(col) is None)
+    def lt(self, col, val): return self._where(lambda r: r.get(col) is not None and r[col] < val)
+    def gte(self, col, val): return self._where(lambda r: r.get(col) is not None and r[col] >= val)
+
+    def update(self, values):
+        self.write = values
+        return self
+
+    def execute(self):
+        with self.db.lock:
+            matched = [r for r in self.db.runs if all(p(r) for p in self.preds)]
+            for r in matched:
+                if self.write:
+                    r.update(self.write)
+            return _Res([dict(r) for r in matched])
+
+
+class _FakeDB:
+    def __init__(self):
+        self.runs = []
+        self.lock = threading.Lock()
+        self.broken = False
+
+    def rpc(self, name, params):
+        return _Rpc(self, name, params)
+
+    def table(self, name):
+        assert name == "scheduler_runs"
+        return _Query(self)
+
+    # claim_scheduler_run / heartbeat_scheduler_run, as in migration 114
+    def claim_scheduler_run(self, p_job_name, p_run_key, p_holder, p_lease_seconds):
+        now = datetime.now(timezone.utc)
+        lease = {"holder": p_holder, "started_at": _ts(now), "heartbeat_at": _ts(now),
+                 "lease_expires_at": _ts(now + timedelta(seconds=p_lease_seconds))}
+        row = next((r for r in self.runs
+                    if r["job_name"] == p_job_name and r["run_key"] == p_run_key), None)
+        if row is None:
+            row = {"id": str(uuid.uuid4()), "job_name": p_job_name, "run_key": p_run_key,
+                   "attempts": 1, "finished_at": None, **lease}
+            self.runs.append(row)
+        elif row["finished_at"] is None and row["lease_expires_at"] < _ts(now):
+            row.update(lease, attempts=row["attempts"] + 1)
+        else:
+            return []
+        return [{"id": row["id"], "attempts": row["attempts"]}]
+
+    def heartbeat_scheduler_run(self, p_run_id, p_holder, p_lease_seconds):
+        now = datetime.now(timezone.utc)
+        for r in self.runs:
+            if r["id"] == p_run_id and r["holder"] == p_holder and r["finished_at"] is None:
+                r.update(heartbeat_at=_ts(now),
+                         lease_expires_at=_ts(now + timedelta(seconds=p_lease_seconds)))
+                return True
+        return False
+
+
+class _Job:
+    """What JobExecutor needs from an APScheduler job."""
+    _jobstore_alias = "default"
+    misfire_grace_time = None
+
+    def __init__(self, job_id, func):
+        self.id, self.func, self.args, self.kwargs = job_id, func, (), {}
+
+
+RUN_TIME = datetime(2026, 10, 16, 13, 0, tzinfo=timezone.utc)
+
+
+def _executor(db, holder, lease_seconds=120, **kw):
+    return JobExecutor(leases=LeaseStore(lambda: db, holder=holder, lease_seconds=lease_seconds), **kw)
+
+
+def _fire(executor, job, run_time=RUN_TIME):
+    return executor.submit(job.id, executor._run_leased, job, [run_time], run_key(run_time))
+
+
+# ---------------------------------------------------------------------------
+
+
+def test_each_run_executes_on_one_process_only():
+    db = _FakeDB()
+    calls = []
+    barrier = threading.Barrier(2)
+
+    def reminders():
+        calls.append(threading.current_thread().name)
+        return {"ok": True, "sent": 3}
+
+    executors = [_executor(db, "a"), _executor(db, "b")]
+    job = _Job("rto_payment_reminders", reminders)
+
+    def fire(ex):
+        barrier.wait()
+        return _fire(ex, job).result(timeout=5)
+
+    results = [None, None]
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, fire(executors[i])))
+               for i in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert sorted(len(r) for r in results) == [0, 1]          # the loser returns no events
+    (row,) = db.runs
+    assert row["run_key"] == "2026-10-16T13:00:00Z" and row["attempts"] == 1
+    assert row["ok"] is True and row["summary"] == {"sent": 3} and row["finished_at"]
+
+    # The next fire time is a new run
+    _fire(executors[0], job, RUN_TIME + timedelta(days=1)).result(timeout=5)
+    assert len(calls) == 2 and len(db.runs) == 2
+    for ex in executors:
+        ex.shutdown()
+
+
+def test_lost_lease_cancels_the_job():
+    db = _FakeDB()
+    executor = _executor(db, "a", lease_seconds=0.2)
+    running = threading.Event()
+
+    def portal_sync():
+        running.set()
+        while True:
+            check_cancelled()
+            time.sleep(0.01)
+
+    events_future = _fire(executor, _Job("portal_sync", portal_sync))
+    assert running.wait(2)
+    with db.lock:
+        db.runs[0]["holder"] = "b"     # taken over elsewhere
+    (event,) = events_future.result(timeout=5)
+    assert "cancelled" in str(event.exception)
+    assert db.runs[0]["finished_at"] is None   # the new holder's row is left alone
+    executor.shutdown()
+
+
+def test_abandoned_run_is_taken_over():
+    db = _FakeDB()
+    calls = []
+
+    # Process "a" claimed the run and died without finishing it
+    crashed = LeaseStore(lambda: db, holder="a", lease_seconds=120)
+    assert crashed.claim("title_monitor", run_key(RUN_TIME)).attempts == 1
+    store = LeaseStore(lambda: db, holder="b")
+    assert store.abandoned_runs(["title_monitor"]) == []              # lease still live
+    assert store.claim("title_monitor", run_key(RUN_TIME)) is None
+
+    db.runs[0]["lease_expires_at"] = _ts(datetime.now(timezone.utc) - timedelta(seconds=1))
+    assert [r["run_key"] for r in store.abandoned_runs(["title_monitor"])] == [run_key(RUN_TIME)]
+
+    class _Scheduler:
+        dispatched = []
+        def get_jobs(self):
+            return [_Job("title_monitor", lambda: calls.append(1) or {"ok": True})]
+        def _dispatch_event(self, event):
+            self.dispatched.append(event)
+
+    executor = _executor(db, "b")
+    executor._scheduler = _Scheduler()
+    assert executor.reclaim_abandoned()["reclaimed"] == 1
+    for _ in range(200):
+        if _Scheduler.dispatched:
+            break
+        time.sleep(0.01)
+    assert calls == [1] and _Scheduler.dispatched[0].retval == {"ok": True}
+    assert db.runs[0]["holder"] == "b" and db.runs[0]["attempts"] == 2 and db.runs[0]["ok"] is True
+    assert executor.reclaim_abandoned()["reclaimed"] == 0
+    executor.shutdown()
+
+
+def test_shutdown_hands_the_run_back():
+    db = _FakeDB()
+    executor = _executor(db, "a")
+    running = threading.Event()
+
+    def portal_sync():
+        running.set()
+        while True:
+            check_cancelled()
+            time.sleep(0.01)
+
+    future = _fire(executor, _Job("portal_sync", portal_sync))
+    assert running.wait(2)
+    executor.shutdown(wait=False)
+    future.result(timeout=5)
+    row = db.runs[0]
+    assert row["finished_at"] is None and row["lease_expires_at"] <= _ts(datetime.now(timezone.utc))
+    assert LeaseStore(lambda: db, holder="b").claim("portal_sync", run_key(RUN_TIME)).attempts == 2
+
+
+def test_unreachable_store_runs_unleased():
+    db = _FakeDB()
+    db.broken = True
+    calls = []
+    executor = _executor(db, "a")
+    (event,) = _fire(executor, _Job("portal_sync", lambda: calls.append(1) or {"ok": True})).result(timeout=5)
+    assert calls == [1] and event.retval == {"ok": True}
+    store = LeaseStore(lambda: db)
+    assert store.claim("portal_sync", "k") == Lease("portal_sync", "k", None)
+    assert store.heartbeat(Lease("portal_sync", "k", "id-1")) is None
+    executor.shutdown()
+
+
+def test_interval_fire_times_agree_across_processes():
+    now = datetime(2026, 10, 16, 14, 47, 12, tzinfo=timezone.utc)
+    fires = {scheduler_service._every(minutes=30).get_next_fire_time(None, now) for _ in range(2)}
+    assert fires == {datetime(2026, 10, 16, 15, 0, tzinfo=timezone.utc)}
+
+
+@pytest.mark.parametrize("role, expected", [
+    ("web", scheduler_service.LOCAL_JOB_IDS),
+    ("worker", None),
+    ("bogus", None),
+])
+def test_scheduler_role_filters_jobs(monkeypatch, role, expected):
+    monkeypatch.setenv("SCHEDULER_ROLE", role)
+    monkeypatch.setattr(scheduler_service, "_scheduler", None)
+    monkeypatch.setattr(scheduler_service, "_executor", None)
+    monkeypatch.setattr(scheduler_service.AsyncIOScheduler, "start", lambda self: None)
+    ids = {job.id for job in scheduler_service.init_scheduler().get_jobs()}
+    if expected is None:
+        assert {"rto_payment_reminders", "portal_sync", "reclaim_abandoned_runs"} <= ids
+    else:
+        assert ids == expected
+    assert scheduler_service._get_executor().local_jobs == scheduler_service.LOCAL_JOB_IDS
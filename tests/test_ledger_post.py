@@ -10,6 +10,8 @@ writer's logic without touching the real database. Validates:
   - Missing/unmapped bank raises ValueError loudly.
   - is_income totals net to zero across the pair.
   - bank_transfer posts against two different banks.
+  - The monthly accrual posts one batch per note; a failing note does not
+    stop the others.
 """
 import sys
 import os
@@ -20,7 +22,10 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import pytest
 
-from api.services.ledger import post_to_ledger, reset_caches, get_bank_balance, get_all_bank_balances
+from api.services.ledger import (
+    allocate_transaction_numbers, post_many_to_ledger, post_to_ledger, reset_caches,
+    get_bank_balance, get_all_bank_balances,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -34,6 +39,7 @@ class _FakeQuery:
         self.payload = payload
         self._filters: list[tuple[str, str, Any]] = []
         self._limit: int | None = None
+        self._offset = 0
         self._select: str | None = None
         self._update_payload: dict | None = None
 
@@ -62,6 +68,12 @@ class _FakeQuery:
     def limit(self, n):
         self._limit = n
         return self
+    def order(self, *_a, **_kw):
+        return self
+    def range(self, lo, hi):
+        self._offset = lo
+        self._limit = hi - lo + 1
+        return self
     def update(self, payload):
         self.op = "update"
         self._update_payload = payload
@@ -129,6 +141,8 @@ class _FakeTable:
 
     def _execute(self, q: _FakeQuery):
         rows = self.db.tables.setdefault(self.name, [])
+        if q.op != "select":
+            self.db.writes.append((self.name, q.op))
         if q.op == "insert":
             payload = q.payload if isinstance(q.payload, list) else [q.payload]
             inserted = []
@@ -141,7 +155,7 @@ class _FakeTable:
         if q.op == "select":
             matched = [r for r in rows if self._match(r, q._filters)]
             if q._limit is not None:
-                matched = matched[: q._limit]
+                matched = matched[q._offset: q._offset + q._limit]
             return _Result(matched)
         if q.op == "update":
             matched = [r for r in rows if self._match(r, q._filters)]
@@ -160,6 +174,7 @@ class _FakeTable:
 class FakeDB:
     def __init__(self):
         self.tables: dict[str, list[dict]] = {}
+        self.writes: list[tuple[str, str]] = []   # (table, op) per executed write
 
     def table(self, name):
         return _FakeTable(self, name)
@@ -508,3 +523,228 @@ def test_manual_expense_requires_caller_code(db):
     rows = _pair(db)
     debit = next(r for r in rows if r["id"] == debit_id)
     assert debit["account_id"] == "chart-Supplies & materials"
+
+
+def test_all_bank_balances_not_truncated_at_page_size(db):
+    """The old unpaginated query stopped at PostgREST's 1000-row cap."""
+    rows = db.tables.setdefault("accounting_transactions", [])
+    for i in range(2500):
+        rows.append({"id": f"t{i:05d}", "bank_account_id": "bank-dallas", "amount": 1,
+                     "is_income": True, "status": "confirmed", "transaction_date": "2026-05-20"})
+    assert get_all_bank_balances(db=db)["bank-dallas"] == 2500
+    assert get_bank_balance("bank-dallas", db=db) == 2500
+
+
+class _RpcResult:
+    def __init__(self, data):
+        self.data = data
+    def execute(self):
+        if isinstance(self.data, Exception):
+            raise self.data
+        return _Result(self.data)
+
+
+class RpcFakeDB(FakeDB):
+    """FakeDB + get_derived_bank_balances computed like the SQL function."""
+
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+        self.rpc_calls: list[tuple[str, dict]] = []
+        self.counters: dict[tuple[str, str], int] = {}
+
+    def rpc(self, name, params):
+        self.rpc_calls.append((name, params))
+        if self.fail:
+            return _RpcResult(RuntimeError("PGRST202 Could not find the function"))
+        if name == "allocate_txn_numbers":
+            key = (params["p_ledger"], params["p_day"])
+            self.counters[key] = self.counters.get(key, 0) + params["p_count"]
+            return _RpcResult(self.counters[key] - params["p_count"] + 1)
+        out: dict[str, float] = {}
+        for r in self.tables.get("accounting_transactions", []):
+            bid = r.get("bank_account_id")
+            if not bid or (r.get("status") or "") in params["p_excluded_statuses"]:
+                continue
+            if params["p_bank_account_id"] and bid != params["p_bank_account_id"]:
+                continue
+            if params["p_as_of"] and r["transaction_date"] > params["p_as_of"]:
+                continue
+            amt = float(r["amount"])
+            out[bid] = out.get(bid, 0.0) + (amt if r.get("is_income") else -amt)
+        return _RpcResult([{"bank_account_id": k, "balance": round(v, 2)} for k, v in out.items()])
+
+
+def _seed_bank_activity(d):
+    post_to_ledger(event_type="sale_contado_received", amount=50000, bank_account_id="bank-dallas",
+                   date="2026-05-20", counterparty_name="Buyer", description_data={"address": "X"}, db=d)
+    post_to_ledger(event_type="property_purchase_paid", amount=20000, bank_account_id="bank-dallas",
+                   date="2026-06-02", counterparty_name="Seller", description_data={"address": "X"}, db=d)
+
+
+def test_bank_balances_use_rpc_and_match_scan(db):
+    from api.services.ledger import HOMES_CONFIG, _scan_bank_balances
+    rpc_db = RpcFakeDB()
+    rpc_db.tables = db.tables
+    _seed_bank_activity(rpc_db)
+
+    assert get_bank_balance("bank-dallas", db=rpc_db) == 30000
+    assert get_bank_balance("bank-dallas", as_of="2026-05-31", db=rpc_db) == 50000
+    assert get_all_bank_balances(db=rpc_db) == _scan_bank_balances(db, HOMES_CONFIG, None, None)
+    assert [n for n, _ in rpc_db.rpc_calls].count("get_derived_bank_balances") == 3
+    name, params = rpc_db.rpc_calls[-1]
+    assert name == "get_derived_bank_balances"
+    assert params["p_ledger"] == "homes"
+    assert params["p_excluded_statuses"] == ["voided"]
+
+
+def test_bank_balances_fall_back_when_rpc_missing(db):
+    rpc_db = RpcFakeDB(fail=True)
+    rpc_db.tables = db.tables
+    _seed_bank_activity(rpc_db)
+    assert get_bank_balance("bank-dallas", db=rpc_db) == 30000
+    # The failed RPC is not retried on every read.
+    assert get_all_bank_balances(db=rpc_db) == {"bank-dallas": 30000}
+    assert [n for n, _ in rpc_db.rpc_calls].count("get_derived_bank_balances") == 1
+
+
+def test_capital_config_passes_its_excluded_statuses():
+    from api.services.capital_ledger import CAPITAL_CONFIG, get_all_capital_bank_balances
+    reset_caches()
+    rpc_db = RpcFakeDB()
+    get_all_capital_bank_balances(db=rpc_db)
+    _, params = rpc_db.rpc_calls[-1]
+    assert params["p_ledger"] == CAPITAL_CONFIG.ledger_key == "capital"
+    assert params["p_excluded_statuses"] == ["voided", "pending_confirmation", "draft"]
+
+
+def test_txn_number_fallback_skips_past_pair_suffixes(db):
+    """Without the RPC the next serial is max+1, ignoring -D/-C suffixes."""
+    _seed_bank_activity(db)
+    numbers = sorted(r["transaction_number"] for r in _pair(db))
+    assert [n[-5:] for n in numbers] == ["001-C", "001-D", "002-C", "002-D"]
+    nxt = allocate_transaction_numbers(3, db=db)
+    assert [n[-3:] for n in nxt] == ["003", "004", "005"]
+
+
+def test_txn_numbers_come_from_counter_rpc_in_blocks():
+    from api.services.capital_ledger import allocate_capital_transaction_numbers
+    reset_caches()
+    rpc_db = RpcFakeDB()
+    a = allocate_transaction_numbers(db=rpc_db)
+    block = allocate_transaction_numbers(4, db=rpc_db)
+    assert a[0].endswith("-001")
+    assert [n[-3:] for n in block] == ["002", "003", "004", "005"]
+    # Capital has its own counter.
+    assert allocate_capital_transaction_numbers(db=rpc_db)[0].endswith("-001")
+    assert {p["p_ledger"] for n, p in rpc_db.rpc_calls} == {"homes", "capital"}
+    # No LIKE scan of the ledger on the hot path.
+    assert "accounting_transactions" not in rpc_db.tables
+
+
+# ---------------------------------------------------------------------------
+# Batch posting
+# ---------------------------------------------------------------------------
+
+def _sale(amount, **kw):
+    return {"event_type": "sale_contado_received", "amount": amount, "bank_account_id": "bank-dallas",
+            "date": "2026-05-20", "counterparty_name": "Buyer", "description_data": {"address": "X"}, **kw}
+
+
+def test_post_to_ledger_links_both_legs_in_one_insert(db):
+    debit_id, credit_id = post_to_ledger(**_sale(1000), db=db)
+    by_id = {r["id"]: r for r in _pair(db)}
+    assert by_id[debit_id]["linked_transaction_id"] == credit_id
+    assert by_id[credit_id]["linked_transaction_id"] == debit_id
+    # one INSERT, no back-link UPDATE, no rollback DELETE
+    assert db.writes == [("accounting_transactions", "insert")]
+
+
+def test_post_many_to_ledger_single_insert(db):
+    ids = post_many_to_ledger([_sale(100 + i) for i in range(50)], db=db)
+    assert len(ids) == 50
+    assert db.writes == [("accounting_transactions", "insert")]
+    rows = _pair(db)
+    assert len(rows) == 100
+    by_id = {r["id"]: r for r in rows}
+    serials = set()
+    for i, (d, c) in enumerate(ids):
+        assert by_id[d]["linked_transaction_id"] == c and by_id[c]["linked_transaction_id"] == d
+        assert by_id[d]["amount"] == by_id[c]["amount"] == 100 + i
+        base = by_id[d]["transaction_number"][:-2]
+        assert by_id[d]["transaction_number"] == f"{base}-D"
+        assert by_id[c]["transaction_number"] == f"{base}-C"
+        serials.add(base)
+    assert len(serials) == 50
+    assert get_bank_balance("bank-dallas", db=db) == sum(100 + i for i in range(50))
+
+
+def test_post_many_to_ledger_is_all_or_nothing_on_bad_entry(db):
+    entries = [_sale(100), _sale(200, bank_account_id="bank-unlinked"), _sale(300)]
+    with pytest.raises(ValueError, match="entry 1"):
+        post_many_to_ledger(entries, db=db)
+    assert _pair(db) == []
+    assert db.writes == []
+
+
+def test_post_confirmed_movements_posts_statement_in_one_insert(db, monkeypatch):
+    import asyncio
+    import api.routes.accounting as accounting_mod
+    monkeypatch.setattr(accounting_mod, "sb", db)
+    db.tables["bank_statements"] = [{"id": "st-1", "bank_account_id": "bank-dallas",
+                                     "account_label": "Dallas", "original_filename": "x.pdf",
+                                     "total_movements": 3}]
+    db.tables["statement_movements"] = [
+        {"id": f"mv-{i}", "statement_id": "st-1", "status": "confirmed", "sort_order": i,
+         "movement_date": "2026-05-2%d" % i, "description": f"mov {i}", "amount": amt,
+         "is_credit": amt > 0, "final_account_id": acct, "final_transaction_type": ttype}
+        for i, (amt, acct, ttype) in enumerate([
+            (5000, "chart-House Sales", "sale_cash"),
+            (-25, "chart-Bank fees & service charges", "operating_expense"),
+            (-300, "chart-Supplies & materials", "operating_expense"),
+        ])
+    ]
+    res = asyncio.run(accounting_mod.post_confirmed_movements("st-1"))
+    assert res["posted"] == 3 and res["skipped"] == 0
+    assert db.writes.count(("accounting_transactions", "insert")) == 1
+    rows = _pair(db)
+    assert len(rows) == 6
+    assert all(r["status"] == "reconciled" and r["reconciled_at"] for r in rows)
+    bank_legs = [r for r in rows if r.get("bank_account_id") == "bank-dallas"]
+    assert len(bank_legs) == 3
+    # bank leg is the debit on deposits, the credit on withdrawals
+    assert sorted(r["transaction_number"][-1] for r in bank_legs) == ["C", "C", "D"]
+    assert get_bank_balance("bank-dallas", db=db) == 5000 - 25 - 300
+    by_id = {r["id"]: r for r in rows}
+    for mv in db.tables["statement_movements"]:
+        assert mv["status"] == "posted"
+        pnl = by_id[mv["transaction_id"]]
+        assert "bank_account_id" not in pnl
+        assert by_id[pnl["linked_transaction_id"]]["bank_account_id"] == "bank-dallas"
+
+
+def test_monthly_accrual_posts_each_note_on_its_own(db, monkeypatch):
+    import api.services.capital_interest_accrual as accrual
+    import api.services.ledger as ledger_mod
+    db.tables["promissory_notes"] = [
+        {"id": nid, "status": "active", "start_date": "2026-01-10", "lender_name": nid}
+        for nid in ("note-a", "note-bad", "note-c")
+    ]
+    monkeypatch.setattr(accrual, "sb", db)
+    monkeypatch.setattr(accrual, "accrued_account_ready", lambda: True)
+    monkeypatch.setattr(accrual, "_schedule", lambda note: [{"interest": 100.0}] * 12)
+    posted = []
+
+    def post_many(entries, db=None, config=None):
+        note_ids = {e["notes"].split("|")[1] for e in entries}
+        if "note-bad" in note_ids:
+            raise RuntimeError("insert failed")
+        posted.append((note_ids, len(entries)))
+        return [("d", "c")] * len(entries)
+
+    monkeypatch.setattr(ledger_mod, "post_many_to_ledger", post_many)
+
+    res = accrual.accrue_all_active_notes(as_of="2026-04-15")
+    # three periods elapsed; the failing note doesn't hold back the others
+    assert res == {"ok": True, "accrued": 600.0, "notes": 2}
+    assert posted == [({"note-a"}, 3), ({"note-c"}, 3)]
@@ -0,0 +1,261 @@
+"""
+Tests for the daily balance snapshots (migration 108, api/services/ledger_snapshots.py).
+
+Validates:
+  - Snapshot rows expand to ledger-shaped rows (in/out legs, zero legs skipped).
+  - Paging the snapshots returns every row exactly once, even when the
+    database returns rows that tie on the sort columns in a different order
+    on each read.
+  - diff_balances reports no drift when both sides agree, and flags drift.
+  - Income Statement, Balance Sheet and Cash Flow built from snapshots are
+    IDENTICAL to the full recompute over accounting_transactions.
+  - Reports fall back to the full scan when the snapshot table can't be read.
+"""
+import sys
+import os
+import asyncio
+import random
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import api.routes.accounting as accounting_mod
+from api.services import ledger_snapshots
+
+
+# ---------------------------------------------------------------------------
+# In-memory fake: enough of supabase-py for the report code paths
+# ---------------------------------------------------------------------------
+
+class _Res:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.preds, self.orders = [], []
+        self.lo, self.hi = 0, None
+
+    def select(self, *_a, **_k): return self
+
+    def order(self, col, *_a, **_k):
+        self.orders.append(col); return self
+    def or_(self, *_a, **_k): return self
+
+    def eq(self, col, val):
+        self.preds.append(lambda r: r.get(col) == val); return self
+    def neq(self, col, val):
+        self.preds.append(lambda r: r.get(col) is not None and r.get(col) != val); return self
+    def gte(self, col, val):
+        self.preds.append(lambda r: (r.get(col) or "") >= val); return self
+    def lte(self, col, val):
+        self.preds.append(lambda r: (r.get(col) or "") <= val); return self
+
+    def range(self, lo, hi):
+        self.lo, self.hi = lo, hi; return self
+
+    def execute(self):
+        if self.table in self.db.broken:
+            raise RuntimeError(f"PGRST205 Could not find the table {self.table}")
+        self.db.reads[self.table] += 1
+        rows = [r for r in self.db.tables.get(self.table, []) if all(p(r) for p in self.preds)]
+        if self.db.shuffle_ties:
+            # Postgres returns ties on the ORDER BY in no particular order
+            self.db.rnd.shuffle(rows)
+            rows.sort(key=lambda r: [(r.get(c) is None, r.get(c) or "") for c in self.orders])
+        if self.hi is not None:
+            rows = rows[self.lo:self.hi + 1]
+        return _Res(rows)
+
+
+class _FakeDB:
+    def __init__(self, tables, broken=()):
+        self.tables = tables
+        self.broken = set(broken)
+        self.reads = defaultdict(int)
+        self.shuffle_ties, self.rnd = False, random.Random(3)
+
+    def table(self, name):
+        return _Query(self, name)
+
+
+def _snapshot(transactions):
+    """What the migration-108 trigger maintains, computed in Python."""
+    agg = {}
+    for t in transactions:
+        if t.get("status") == "voided" or not t.get("account_id"):
+            continue
+        key = (t["account_id"], t["transaction_date"], t.get("property_id"), t.get("yard_id"))
+        row = agg.setdefault(key, {"account_id": key[0], "balance_date": key[1],
+                                   "property_id": key[2], "yard_id": key[3],
+                                   "in_amount": 0.0, "out_amount": 0.0})
+        row["in_amount" if t["is_income"] else "out_amount"] += t["amount"]
+    return list(agg.values())
+
+
+def _acct(aid, code, atype, parent=None, header=False):
+    return {"id": aid, "code": code, "name": code, "account_type": atype, "is_header": header,
+            "parent_account_id": parent, "display_order": 0, "is_active": True}
+
+
+ACCOUNTS = [
+    _acct("PL_INCOME", "PL_INCOME", "Income", header=True),
+    _acct("PL_OTHER_INCOME", "PL_OTHER_INCOME", "Other Income", header=True),
+    _acct("PL_COGS", "PL_COGS", "Cost of Goods Sold", header=True),
+    _acct("PL_EXPENSES", "PL_EXPENSES", "Expenses", header=True),
+    _acct("PL_OTHER_EXPENSES", "PL_OTHER_EXPENSES", "Other Expense", header=True),
+    _acct("BS_ASSETS", "BS_ASSETS", "Other Current Assets", header=True),
+    _acct("BS_LIABILITIES", "BS_LIABILITIES", "Other Current Liabilities", header=True),
+    _acct("BS_EQUITY", "BS_EQUITY", "Equity", header=True),
+    _acct("sales", "House Sales", "Income", "PL_INCOME"),
+    _acct("cogs", "House Sales - COGS", "Cost of Goods Sold", "PL_COGS"),
+    _acct("fees", "Bank fees & service charges", "Expenses", "PL_EXPENSES"),
+    _acct("bank", "Cuenta Houston", "Bank", "BS_ASSETS"),
+    _acct("inv", "Inventory", "Other Current Assets", "BS_ASSETS"),
+    _acct("ap", "Accounts Payable (A/P)", "Accounts payable (A/P)", "BS_LIABILITIES"),
+]
+
+
+def _txn(aid, amount, is_income, day, prop=None, yard=None, status="confirmed"):
+    return {"account_id": aid, "amount": amount, "is_income": is_income,
+            "transaction_date": day, "property_id": prop, "yard_id": yard, "status": status}
+
+
+TRANSACTIONS = [
+    _txn("bank", 50000, True, "2026-01-05", "p1", "y1"),
+    _txn("sales", 50000, True, "2026-01-05", "p1", "y1"),
+    _txn("cogs", 30000, False, "2026-01-05", "p1", "y1"),
+    _txn("inv", 30000, False, "2026-01-05", "p1", "y1"),
+    _txn("fees", 25, False, "2026-01-06"),
+    _txn("bank", 25, False, "2026-01-06"),
+    _txn("fees", 25, False, "2026-01-06"),             # same key, aggregates
+    _txn("bank", 25, False, "2026-01-06"),
+    _txn("inv", 20000, True, "2026-02-10", "p2", "y2"),
+    _txn("ap", 20000, True, "2026-02-10", "p2", "y2"),
+    _txn("sales", 999, True, "2026-02-11", status="voided"),
+    _txn("bank", 999, True, "2026-02-11", status="voided"),
+    _txn("fees", 10, True, "2026-03-01"),              # contra-expense credit
+    _txn("bank", 10, True, "2026-03-01"),
+]
+
+PROPERTIES = [{"id": "p1", "property_code": "H10"}, {"id": "p2", "property_code": "DFW2"}]
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = _FakeDB({
+        "accounting_accounts": ACCOUNTS,
+        "accounting_transactions": TRANSACTIONS,
+        "accounting_daily_balances": _snapshot(TRANSACTIONS),
+        "properties": PROPERTIES,
+    })
+    monkeypatch.setattr(accounting_mod, "sb", db)
+    ledger_snapshots.reset_availability()
+    yield db
+    ledger_snapshots.reset_availability()
+
+
+# ---------------------------------------------------------------------------
+# Unit
+# ---------------------------------------------------------------------------
+
+def test_snapshot_rows_expand_to_ledger_shape():
+    db = _FakeDB({"accounting_daily_balances": [
+        {"account_id": "a", "property_id": "p", "in_amount": 10, "out_amount": 0, "balance_date": "2026-01-01"},
+        {"account_id": "b", "property_id": None, "in_amount": 5, "out_amount": 7, "balance_date": "2026-01-02"},
+    ]})
+    rows = ledger_snapshots.fetch_snapshot_rows(db)
+    assert rows == [
+        {"account_id": "a", "amount": 10.0, "is_income": True, "property_id": "p"},
+        {"account_id": "b", "amount": 5.0, "is_income": True, "property_id": None},
+        {"account_id": "b", "amount": 7.0, "is_income": False, "property_id": None},
+    ]
+
+
+def test_snapshot_paging_returns_each_row_once(monkeypatch):
+    # Several properties / yards share each (date, account): only the full
+    # unique key orders them
+    snapshots = [
+        {"account_id": a, "balance_date": f"2026-01-0{d}", "property_id": p, "yard_id": y,
+         "in_amount": float(i + 1), "out_amount": 0}
+        for i, (d, a, p, y) in enumerate(
+            (d, a, p, y) for d in (1, 2) for a in ("a", "b") for p in ("p1", "p2", None) for y in ("y1", None))
+    ]
+    db = _FakeDB({"accounting_daily_balances": snapshots})
+    db.shuffle_ties = True
+    monkeypatch.setattr(ledger_snapshots, "_PAGE_SIZE", 5)
+
+    rows = ledger_snapshots.fetch_snapshot_rows(db)
+    assert sorted(r["amount"] for r in rows) == [float(i + 1) for i in range(len(snapshots))]
+
+
+def test_diff_balances_detects_drift():
+    ledger = [{"account_id": "a", "amount": 10, "is_income": True}]
+    assert ledger_snapshots.diff_balances(ledger, ledger)["ok"] is True
+    drift = ledger_snapshots.diff_balances(ledger, [{"account_id": "a", "amount": 9, "is_income": True}])
+    assert drift["ok"] is False
+    assert drift["mismatches"][0]["account_id"] == "a"
+
+
+# ---------------------------------------------------------------------------
+# Reports: snapshot path == full recompute
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("kwargs", [
+    {},
+    {"start_date": "2026-01-01", "end_date": "2026-01-31"},
+    {"start_date": "2026-01-01", "end_date": "2026-12-31", "yard_id": "y1"},
+])
+def test_income_statement_snapshot_equals_full_scan(fake_db, kwargs):
+    kwargs.setdefault("start_date", "2026-01-01")
+    fast = asyncio.run(accounting_mod.get_income_statement(**kwargs))
+    reads_after_fast = fake_db.reads["accounting_transactions"]
+    full = asyncio.run(accounting_mod.get_income_statement(**kwargs, full_recompute=True))
+    assert reads_after_fast == 0
+    assert fast == full
+    if "yard_id" not in kwargs and kwargs.get("end_date") == "2026-01-31":
+        assert fast["sections"]["total_income"] == 50000
+
+
+@pytest.mark.parametrize("as_of", [None, "2026-01-31", "2026-02-28"])
+def test_balance_sheet_snapshot_equals_full_scan(fake_db, as_of):
+    fast = asyncio.run(accounting_mod.get_balance_sheet(as_of_date=as_of))
+    full = asyncio.run(accounting_mod.get_balance_sheet(as_of_date=as_of, full_recompute=True))
+    assert fast == full
+
+
+def test_cash_flow_snapshot_equals_full_scan(fake_db):
+    fast = asyncio.run(accounting_mod.get_cash_flow_statement(start_date="2026-01-01", end_date="2026-12-31"))
+    full = asyncio.run(accounting_mod.get_cash_flow_statement(
+        start_date="2026-01-01", end_date="2026-12-31", full_recompute=True))
+    assert fast == full
+
+
+def test_consistency_check_endpoint(fake_db):
+    res = asyncio.run(accounting_mod.check_ledger_snapshots())
+    assert res["ok"] is True
+    fake_db.tables["accounting_daily_balances"][0]["in_amount"] += 1
+    res = asyncio.run(accounting_mod.check_ledger_snapshots())
+    assert res["ok"] is False and len(res["mismatches"]) == 1
+
+
+def test_reports_fall_back_when_snapshots_missing(monkeypatch):
+    db = _FakeDB({
+        "accounting_accounts": ACCOUNTS,
+        "accounting_transactions": TRANSACTIONS,
+        "properties": PROPERTIES,
+    }, broken={"accounting_daily_balances"})
+    monkeypatch.setattr(accounting_mod, "sb", db)
+    ledger_snapshots.reset_availability()
+    try:
+        res = asyncio.run(accounting_mod.get_income_statement(start_date="2026-01-01", end_date="2026-01-31"))
+        assert res["sections"]["total_income"] == 50000
+        assert db.reads["accounting_transactions"] > 0
+        assert ledger_snapshots.snapshots_available() is False
+    finally:
+        ledger_snapshots.reset_availability()
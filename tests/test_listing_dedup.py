@@ -0,0 +1,186 @@
+"""
+Tests for the market-listing dedup index (api/services/listing_dedup.py).
+
+Validates:
+  - normalize_address is unchanged from the per-call regex version.
+  - AddressIndex.find answers "one contains the other" exactly like a full
+    scan, including short history addresses.
+  - ListingDedupIndex.skip_reason agrees with the old three-check logic.
+  - create_listings_bulk reads history/inventory once per call (not once per
+    listing) and reports skip reasons.
+"""
+import sys
+import os
+import asyncio
+import random
+import re
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api.routes.market_listings as ml_mod
+from api.services.listing_dedup import (
+    REASON_ADDRESS, REASON_INVENTORY, REASON_STATUS, REASON_URL,
+    AddressIndex, ListingDedupIndex, normalize_address,
+)
+
+
+def _legacy_normalize(address):
+    if not address:
+        return ""
+    addr = address.strip().lower()
+    for pattern in [r'for\s+sale\.?', r'\bfeatured\b', r'\bmobile\s+home\b', r'\bsingle\s+section\b',
+                    r'\bdouble\s+wide\b', r'\bmanufactured\s+home\b', r'^(19|20)\d{2}\s+[a-z]+\s+']:
+        addr = re.sub(pattern, ' ', addr, flags=re.IGNORECASE)
+    addr = addr.replace('.', ' ')
+    addr = re.sub(r'\s*,\s*', ', ', addr)
+    addr = re.sub(r'\s*#\s*', ' #', addr)
+    addr = re.sub(r'\s+', ' ', addr).strip()
+    return addr.strip(', ')
+
+
+STREETS = ["Main St", "Oak Ave", "FM 1960 Rd", "Bliss Ln", "Cypress Creek Pkwy", "Hwy 59"]
+CITIES = ["Houston", "Conroe", "Dallas", "Katy"]
+
+
+def _address(rng):
+    kind = rng.random()
+    base = f"{rng.randint(1, 999)} {rng.choice(STREETS)}"
+    if kind < 0.2:
+        return f"2022 BLISS single section for sale. {base}"
+    if kind < 0.4:
+        return f"{base} #{rng.randint(1, 40)}, {rng.choice(CITIES)}, TX"
+    if kind < 0.45:
+        return rng.choice(CITIES)  # vague history rows match anything containing them
+    return f"{base}, {rng.choice(CITIES)}"
+
+
+def _legacy_skip(url, address, listings, properties):
+    if url and any(r["source_url"] == url and r["status"] in ("purchased", "rejected", "dismissed")
+                   for r in listings):
+        return REASON_URL
+    n = _legacy_normalize(address)
+    if len(n) < 10:
+        return None
+    for r in listings:
+        if r["status"] in ("purchased", "rejected", "dismissed"):
+            d = _legacy_normalize(r["address"])
+            if d and (n in d or d in n):
+                return REASON_ADDRESS
+    for p in properties:
+        d = _legacy_normalize(p["address"])
+        if d and (n in d or d in n):
+            return REASON_INVENTORY
+    return None
+
+
+def test_normalize_address_matches_legacy():
+    rng = random.Random(1)
+    samples = [_address(rng) for _ in range(300)] + [
+        "", "  Featured MOBILE HOME 12 Oak St.,Katy ", "1999 CLAYTON double wide # 4 Elm", "..., ,"]
+    for s in samples:
+        assert normalize_address(s) == _legacy_normalize(s), s
+
+
+def test_address_index_matches_full_scan():
+    rng = random.Random(2)
+    history = [normalize_address(_address(rng)) for _ in range(400)]
+    index = AddressIndex(history)
+    for _ in range(600):
+        q = normalize_address(_address(rng))
+        expected = any(h and (q in h or h in q) for h in history)
+        found = index.find(q)
+        assert (found is not None) == expected, q
+        if found:
+            assert found in q or q in found
+
+
+def test_skip_reason_matches_legacy_checks():
+    rng = random.Random(3)
+    statuses = ["available", "purchased", "rejected", "dismissed", "expired", "contacted"]
+    listings = [{"source_url": f"https://x/{i}", "status": rng.choice(statuses), "address": _address(rng)}
+                for i in range(300)]
+    properties = [{"id": f"p{i}", "address": _address(rng)} for i in range(80)]
+    index = ListingDedupIndex(listings, properties)
+    for i in range(500):
+        url, addr = f"https://x/{rng.randint(0, 600)}", _address(rng)
+        assert index.skip_reason(url, addr) == _legacy_skip(url, addr, listings, properties)
+
+
+# ---------------------------------------------------------------------------
+# create_listings_bulk against an in-memory Supabase fake
+# ---------------------------------------------------------------------------
+
+class _Res:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, db, table):
+        self.db, self.table = db, table
+        self.preds, self.window, self.rows = [], None, None
+
+    def select(self, *_a, **_k): return self
+    def order(self, *_a, **_k): return self
+
+    def neq(self, col, val):
+        self.preds.append(lambda r: r.get(col) != val); return self
+
+    def range(self, a, b):
+        self.window = (a, b); return self
+
+    def upsert(self, rows, **_k):
+        self.rows = rows; return self
+
+    def execute(self):
+        self.db.calls[self.table] += 1
+        if self.rows is not None:
+            saved = [dict(r, id=f"new-{i}") for i, r in enumerate(self.rows)]
+            self.db.upserted.extend(saved)
+            return _Res(saved)
+        rows = [r for r in self.db.tables.get(self.table, []) if all(p(r) for p in self.preds)]
+        if self.window:
+            rows = rows[self.window[0]:self.window[1] + 1]
+        return _Res(rows)
+
+
+class _FakeDB:
+    def __init__(self, tables):
+        self.tables = tables
+        self.calls = defaultdict(int)
+        self.upserted = []
+
+    def table(self, name):
+        return _Query(self, name)
+
+
+def test_bulk_ingest_loads_index_once(monkeypatch):
+    history = [{"source_url": f"https://mh/{i}", "status": "dismissed", "address": f"{i} Old Rd, Houston"}
+               for i in range(2500)]
+    history.append({"source_url": "https://mh/contacted", "status": "contacted", "address": "9 Elm St, Katy"})
+    db = _FakeDB({
+        "market_listings": history,
+        "properties": [{"id": "p1", "address": "500 Inventory Ln, Conroe"}],
+    })
+    monkeypatch.setattr(ml_mod, "supabase", db)
+
+    def listing(url, address):
+        return ml_mod.MarketListingCreate(source="mhvillage", source_url=url, address=address,
+                                          city="Houston", listing_price=30000)
+
+    batch = [listing(f"https://mh/new-{i}", f"{i} Fresh Ave, Houston") for i in range(40)]
+    batch += [
+        listing("https://mh/7", "7 Somewhere Else Blvd"),                # handled URL
+        listing("https://other/2499", "2022 BLISS for sale. 2499 Old Rd, Houston"),  # handled address
+        listing("https://other/inv", "500 Inventory Ln, Conroe, TX"),   # inventory
+        listing("https://mh/contacted", "9 Elm St, Katy"),              # existing non-available
+    ]
+
+    res = asyncio.run(ml_mod.create_listings_bulk(batch))
+
+    assert res["created"] == 40 and res["skipped"] == 4
+    assert res["skip_reasons"] == {REASON_URL: 1, REASON_ADDRESS: 1, REASON_INVENTORY: 1, REASON_STATUS: 1}
+    # 3 pages of history + 1 page of properties + the upsert — independent of batch size
+    assert db.calls["market_listings"] == 3 + 1
+    assert db.calls["properties"] == 1
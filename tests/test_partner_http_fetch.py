@@ -0,0 +1,202 @@
+"""
+Tests for the HTTP-first partner scrapers (api/services/scrapers/http_fetch.py,
+VMFHomesScraper / TwentyFirstMortgageScraper) against a local stub serving
+recorded feeds from tests/fixtures/partner_feeds/.
+
+Validates:
+  - 21st Mortgage and VMF are fetched over HTTP (gzip) and parsed/filtered
+    as before: TX only, price range, no pending / not-accepting-offers.
+  - A stale cached feed revalidates with If-None-Match / If-Modified-Since;
+    a 304 is answered from the response cache without re-downloading the
+    body, and within the TTL the cached feed is served with no request.
+  - Both scrapers share one pooled client (one TCP connection).
+  - A cached body that doesn't decode is dropped on a 304 and refetched.
+  - VMF falls back to the browser path only when the API answers with a
+    403 / WAF challenge page.
+"""
+import sys
+import os
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from api.services.scrapers import http_fetch
+from api.services.scrapers.http_fetch import FetchError, fetch_json
+from api.services.scrapers.partner_scrapers import TwentyFirstMortgageScraper, VMFHomesScraper
+from api.utils import response_cache
+from api.utils.response_cache import ResponseCache
+
+_FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "partner_feeds")
+FEEDS = {
+    "/repolist3.json": ("21st_repolist3.json", '"21st-v1"', None),
+    "/api/searchByState": ("vmf_search_by_state_tx.json", None, "Wed, 14 Oct 2026 10:00:00 GMT"),
+}
+
+
+class _Stub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.log = []          # (method, path, status, conditional headers)
+        self.ports = set()     # client ports seen (connection reuse)
+        self.waf = False
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *_):
+        pass
+
+    def _serve(self):
+        path = self.path.split("?")[0]
+        stub = self.server
+        stub.ports.add(self.client_address[1])
+        cond = (self.headers.get("If-None-Match"), self.headers.get("If-Modified-Since"))
+        if self.command == "POST":
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if path not in FEEDS:
+            return self._reply(404, b"not found", "text/plain", cond)
+        if path == "/api/searchByState" and stub.waf:
+            return self._reply(403, b"<html>Request blocked. CloudFront</html>", "text/html", cond)
+        name, etag, last_modified = FEEDS[path]
+        if (etag and cond[0] == etag) or (last_modified and cond[1] == last_modified):
+            return self._reply(304, b"", None, cond, etag=etag, last_modified=last_modified)
+        with open(os.path.join(_FIXTURES, name), "rb") as f:
+            body = f.read()
+        self._reply(200, body, "application/json", cond, etag=etag, last_modified=last_modified)
+
+    def _reply(self, status, body, ctype, cond, etag=None, last_modified=None):
+        self.server.log.append((self.command, self.path.split("?")[0], status, cond))
+        gz = "gzip" in (self.headers.get("Accept-Encoding") or "") and body
+        if gz:
+            body = gzip.compress(body)
+        self.send_response(status)
+        if ctype:
+            self.send_header("Content-Type", ctype)
+        if gz:
+            self.send_header("Content-Encoding", "gzip")
+        if etag:
+            self.send_header("ETag", etag)
+        if last_modified:
+            self.send_header("Last-Modified", last_modified)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _serve
+    do_POST = _serve
+
+
+@pytest.fixture
+def cache(tmp_path):
+    # TTL 0 for the stub: every fetch after the first revalidates
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"), ttls={"127.0.0.1": 0})
+    previous = response_cache.set_cache(cache)
+    yield cache
+    response_cache.set_cache(previous)
+    cache.close()
+
+
+@pytest.fixture
+def stub(monkeypatch, cache):
+    server = _Stub()
+    monkeypatch.setattr(TwentyFirstMortgageScraper, "JSON_URL", f"{server.url}/repolist3.json")
+    monkeypatch.setattr(VMFHomesScraper, "SEARCH_API", f"{server.url}/api/searchByState")
+    yield server
+    server.shutdown()
+
+
+async def test_21st_mortgage_over_http_with_revalidation(stub):
+    listings = await TwentyFirstMortgageScraper.scrape(min_price=5000, max_price=80000)
+    # LA home and the $92k one are filtered out; sorted by price
+    assert [l.source_id for l in listings] == ["482114", "482113", "482117"]
+    first = listings[1]
+    assert first.address == "415 Live Oak St, Lufkin, TX 75901"
+    assert first.sqft == 76 * 16 and first.listing_price == 38900.0
+    assert listings[0].thumbnail_url is None  # comingSoon placeholder
+
+    again = await TwentyFirstMortgageScraper.scrape(min_price=5000, max_price=80000)
+    assert [l.content_hash for l in again] == [l.content_hash for l in listings]
+    assert [entry[2] for entry in stub.log] == [200, 304]
+    assert stub.log[1][3][0] == '"21st-v1"'
+    await http_fetch.aclose()
+
+
+async def test_vmf_over_http_and_shared_connection(stub):
+    vmf = await VMFHomesScraper.scrape(min_price=5000, max_price=80000)
+    m21 = await TwentyFirstMortgageScraper.scrape(min_price=5000, max_price=80000)
+    # pending (910003), not accepting offers (910004) and >$80k (910005) dropped
+    assert [l.source_id for l in vmf] == ["910006", "910002", "910001"]
+    assert vmf[1].sqft == 56 * 14 and vmf[2].city == "Conroe"
+    assert len(m21) == 3
+    assert [entry[:3] for entry in stub.log] == [("POST", "/api/searchByState", 200),
+                                                  ("GET", "/repolist3.json", 200)]
+    assert len(stub.ports) == 1  # keep-alive on the pooled client
+
+    await VMFHomesScraper.scrape(min_price=5000, max_price=80000)
+    assert stub.log[-1][2] == 304 and stub.log[-1][3][1] == FEEDS["/api/searchByState"][2]
+    await http_fetch.aclose()
+
+
+async def test_fresh_cached_feed_is_served_without_a_request(stub, cache):
+    cache.ttls["127.0.0.1"] = 300
+    first = await fetch_json(f"{stub.url}/repolist3.json")
+    again = await fetch_json(f"{stub.url}/repolist3.json")
+    assert again.from_cache and again.data == first.data
+    assert len(stub.log) == 1
+
+    # bypass skips the fresh copy but still revalidates
+    forced = await fetch_json(f"{stub.url}/repolist3.json", bypass_cache=True)
+    assert forced.not_modified and [entry[2] for entry in stub.log] == [200, 304]
+    await http_fetch.aclose()
+
+
+async def test_corrupt_cached_body_is_refetched_on_304(stub, cache):
+    url = f"{stub.url}/repolist3.json"
+    first = await fetch_json(url)
+    cache.put(url, b"{truncated", headers={"etag": FEEDS["/repolist3.json"][1]})
+
+    again = await fetch_json(url)
+    assert again.data == first.data and not again.not_modified
+    assert [entry[2] for entry in stub.log] == [200, 304, 200]
+    assert cache.get(url, allow_stale=True).json() == first.data
+    await http_fetch.aclose()
+
+
+async def test_vmf_falls_back_to_browser_only_when_refused(stub, monkeypatch):
+    calls = []
+
+    async def browser_fetch():
+        calls.append(1)
+        return [{"listingId": 1, "address": "1 Main St", "city": "WACO", "state": "TX",
+                 "price": 30000, "isAcceptingOffers": True}]
+
+    monkeypatch.setattr(VMFHomesScraper, "_fetch_inventory_browser", staticmethod(browser_fetch))
+    assert len(await VMFHomesScraper.scrape()) == 3 and calls == []
+
+    stub.waf = True
+    listings = await VMFHomesScraper.scrape()
+    assert calls == [1] and [l.source_id for l in listings] == ["1"]
+    await http_fetch.aclose()
+
+
+async def test_fetch_json_rejects_non_json_and_errors(stub):
+    stub.waf = True
+    with pytest.raises(FetchError, match="HTTP 403"):
+        await fetch_json(f"{stub.url}/api/searchByState", method="POST")
+    with pytest.raises(FetchError, match="HTTP 404"):
+        await fetch_json(f"{stub.url}/missing.json")
+    with pytest.raises(FetchError):
+        await fetch_json("http://127.0.0.1:9/unreachable.json")
+    await http_fetch.aclose()
@@ -0,0 +1,173 @@
+"""
+Tests for the batched partner-listing save stage (api/services/partner_ingest.py).
+
+Validates:
+  - New listings are inserted, changed ones (different content_hash)
+    updated, identical ones not written — scraped_at is only bumped once it
+    is older than TOUCH_AFTER; listings in a non-available status are
+    preserved.
+  - A changed price is recorded as a market_listing_events row.
+  - Counts come back per source, in a handful of round-trips (chunked
+    lookups + chunked upserts), independent of the number of listings.
+  - A rejected upsert chunk is retried row by row; only the bad row fails.
+  - Duplicate source_urls in one scrape don't reach the multi-row upsert.
+  - A listing the scheduler saved unqualified is updated when the public
+    refresh marks it qualified, although its content_hash is the same.
+"""
+import sys
+import os
+from collections import defaultdict
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.services import partner_ingest
+from api.services.partner_ingest import ingest_partner_listings, partner_listing_row
+from api.services.scrapers.partner_scrapers import ScrapedListing
+
+
+class _Res:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, db, table):
+        self.db, self.table = db, table
+        self.urls, self.op, self.payload = None, "select", None
+
+    def select(self, *_a, **_k): return self
+
+    def in_(self, col, vals):
+        assert col == "source_url"
+        self.urls = set(vals); return self
+
+    def insert(self, rows):
+        self.op, self.payload = "insert", rows; return self
+
+    def upsert(self, rows, on_conflict=None):
+        assert on_conflict == "source_url"
+        self.op, self.payload = "upsert", rows; return self
+
+    def update(self, data):
+        self.op, self.payload = "update", data; return self
+
+    def execute(self):
+        self.db.calls[self.op] += 1
+        rows = self.db.rows
+        if self.op == "select":
+            return _Res([dict(r) for r in rows.values() if r["source_url"] in self.urls])
+        if self.op == "upsert":
+            urls = [r["source_url"] for r in self.payload]
+            if len(urls) != len(set(urls)):
+                raise RuntimeError("ON CONFLICT DO UPDATE command cannot affect row a second time")
+            if any(r["listing_price"] < 0 for r in self.payload):
+                raise RuntimeError("violates check constraint")
+            for r in self.payload:
+                rows[r["source_url"]] = {**rows.get(r["source_url"], {}), **r}
+            return _Res(self.payload)
+        if self.op == "insert":
+            self.db.events.extend(self.payload)
+            return _Res(self.payload)
+        for url in self.urls:
+            rows[url].update(self.payload)
+        return _Res([])
+
+
+class _FakeDB:
+    def __init__(self, rows=()):
+        self.rows = {r["source_url"]: dict(r) for r in rows}
+        self.calls = defaultdict(int)
+        self.events = []
+
+    def table(self, name):
+        assert name in ("market_listings", "market_listing_events")
+        return _Query(self, name)
+
+
+RECENT = datetime.now(timezone.utc).isoformat()
+
+
+def _listing(i, source="vmf", price=30000.0, photos=None):
+    return ScrapedListing(
+        source=source, source_url=f"https://{source}/{i}", source_id=str(i),
+        address=f"{i} Main St", city="Houston", state="TX", zip_code="77001",
+        listing_price=price, year_built=2005, sqft=1200, bedrooms=3, bathrooms=2.0,
+        photos=photos or [f"https://cdn/{i}.jpg"], thumbnail_url=None, scraped_at=RECENT,
+    )
+
+
+def test_content_hash_ignores_scrape_time_and_number_format():
+    a = _listing(1)
+    b = _listing(1, price=30000)
+    b.scraped_at = "2020-01-01T00:00:00"
+    assert a.content_hash == b.content_hash
+    assert a.content_hash != _listing(1, price=29999.0).content_hash
+    assert a.content_hash != _listing(1, photos=["https://cdn/other.jpg"]).content_hash
+
+
+def test_ingest_classifies_and_preserves_status():
+    old = [partner_listing_row(_listing(i)) for i in range(4)]
+    old[0]["status"] = "purchased"
+    old[1]["status"] = "dismissed"
+    old[2] = partner_listing_row(_listing(2, price=32000.0))  # price drops on re-scrape
+    old[3]["scraped_at"] = "2026-01-01T00:00:00"              # identical, but seen long ago
+    db = _FakeDB(old)
+
+    rows = [partner_listing_row(_listing(i)) for i in range(6)]
+    rows += [partner_listing_row(_listing(i, source="21st_mortgage")) for i in range(3)]
+    res = ingest_partner_listings(db, rows)
+
+    assert res["by_source"]["vmf"] == {"inserted": 2, "updated": 1, "unchanged": 1, "preserved": 2,
+                                       "failed": 0, "price_drops": 1}
+    assert res["by_source"]["21st_mortgage"]["inserted"] == 3
+    assert res["saved"] == 7
+    assert db.rows["https://vmf/0"]["status"] == "purchased"
+    assert db.rows["https://vmf/1"]["status"] == "dismissed"
+    assert db.rows["https://vmf/2"]["listing_price"] == 30000.0
+    assert db.rows["https://vmf/3"]["scraped_at"] > "2026-01-02"
+    assert db.events == [{"listing_id": None, "source": "vmf", "source_url": "https://vmf/2",
+                          "event_type": "price_drop", "old_price": 32000.0, "new_price": 30000.0}]
+    # lookup + upsert + stale scraped_at bump + event insert
+    assert res["round_trips"] == sum(db.calls.values()) == 4
+
+
+def test_ingest_round_trips_do_not_grow_per_listing(monkeypatch):
+    monkeypatch.setattr(partner_ingest, "LOOKUP_CHUNK", 150)
+    monkeypatch.setattr(partner_ingest, "UPSERT_CHUNK", 100)
+    db = _FakeDB()
+    res = ingest_partner_listings(db, [partner_listing_row(_listing(i)) for i in range(300)])
+    assert res["by_source"]["vmf"]["inserted"] == 300
+    assert db.calls["select"] == 2 and db.calls["upsert"] == 3
+    # Second run: nothing changed → lookups only, no writes at all
+    db.calls.clear()
+    res = ingest_partner_listings(db, [partner_listing_row(_listing(i)) for i in range(300)])
+    assert res["by_source"]["vmf"]["unchanged"] == 300
+    assert dict(db.calls) == {"select": 2}
+
+
+def test_bad_row_fails_alone_and_duplicates_collapse():
+    db = _FakeDB()
+    rows = [partner_listing_row(_listing(i)) for i in range(5)]
+    rows.append(partner_listing_row(_listing(1)))           # same url twice in one scrape
+    rows.append(partner_listing_row(_listing(9, price=-1)))  # rejected by the DB
+    res = ingest_partner_listings(db, rows)
+    assert res["by_source"]["vmf"] == {"inserted": 5, "updated": 0, "unchanged": 0, "preserved": 0,
+                                       "failed": 1, "price_drops": 0}
+    assert "https://vmf/9" not in db.rows and len(db.rows) == 5
+
+
+def test_public_refresh_qualifies_a_scheduler_row():
+    db = _FakeDB()
+    ingest_partner_listings(db, [partner_listing_row(_listing(1))])   # scheduler job
+    db.rows["https://vmf/1"]["is_qualified"] = False                   # column default
+
+    flags = dict(passes_70_rule=True, passes_age_rule=True, passes_location_rule=True,
+                 is_qualified=True)
+    res = ingest_partner_listings(db, [partner_listing_row(_listing(1), **flags)])
+    assert res["by_source"]["vmf"]["updated"] == 1
+    assert db.rows["https://vmf/1"]["is_qualified"] is True
+
+    # Same flags again: nothing to write
+    res = ingest_partner_listings(db, [partner_listing_row(_listing(1), **flags)])
+    assert res["by_source"]["vmf"]["unchanged"] == 1 and db.calls["upsert"] == 2
@@ -0,0 +1,193 @@
+"""
+Tests for the versioned price comps (migration 113, api/services/price_comps.py).
+
+Validates:
+  - build_comps = the 2025 seed + one record per house sold from SEED_CUTOFF
+    on (latest paid/completed sale; renovation override beats the latest
+    renovation; width decides SINGLE/DOUBLE), in the seed's record format.
+  - The content hash is the version: a snapshot holding just the seed has
+    the seed file's version, and re-publishing unchanged comps is a no-op.
+  - refresh_active_dataset swaps a newly published version in, predictions
+    report it as dataset_version, and re-publishing an old one rolls back.
+  - An unreachable table keeps the dataset already loaded.
+"""
+import sys
+import os
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from api.services import price_comps
+from api.utils import price_predictor as pp
+
+
+# ---------------------------------------------------------------------------
+# In-memory fake: enough of supabase-py for price_comps
+# ---------------------------------------------------------------------------
+
+class _Res:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, db, table):
+        self.db, self.table = db, table
+        self.preds, self.orders = [], []
+        self.lo, self.hi, self.n = 0, None, None
+        self.write = None
+
+    def select(self, *_a, **_k): return self
+
+    def eq(self, col, val):
+        self.preds.append(lambda r: r.get(col) == val); return self
+    def in_(self, col, vals):
+        self.preds.append(lambda r: r.get(col) in vals); return self
+    def order(self, col, desc=False):
+        self.orders.append((col, desc)); return self
+    def range(self, lo, hi):
+        self.lo, self.hi = lo, hi; return self
+    def limit(self, n):
+        self.n = n; return self
+    def insert(self, row):
+        self.write = ("insert", row); return self
+    def update(self, values):
+        self.write = ("update", values); return self
+
+    def execute(self):
+        if self.table in self.db.broken:
+            raise RuntimeError(f"PGRST205 Could not find the table {self.table}")
+        rows = self.db.tables.setdefault(self.table, [])
+        if self.write and self.write[0] == "insert":
+            rows.append(dict(self.write[1]))
+            return _Res([self.write[1]])
+        matched = [r for r in rows if all(p(r) for p in self.preds)]
+        if self.write:
+            for r in matched:
+                r.update(self.write[1])
+            return _Res(matched)
+        self.db.reads[self.table] += 1
+        for col, desc in reversed(self.orders):
+            matched.sort(key=lambda r: str(r.get(col) or ""), reverse=desc)
+        if self.hi is not None:
+            matched = matched[self.lo:self.hi + 1]
+        if self.n is not None:
+            matched = matched[:self.n]
+        return _Res([dict(r) for r in matched])
+
+
+class _FakeDB:
+    def __init__(self, tables, broken=()):
+        self.tables = tables
+        self.broken = set(broken)
+        self.reads = defaultdict(int)
+
+    def table(self, name):
+        return _Query(self, name)
+
+
+def _prop(pid, code, compra, width=16, length=76, beds=3, baths=2, reno=None):
+    return {"id": pid, "property_code": code, "purchase_price": compra, "sale_price": None,
+            "bedrooms": beds, "bathrooms": baths, "square_feet": None,
+            "width_ft": width, "length_ft": length, "renovation_cost": reno}
+
+
+def _sale(sid, pid, price, status="completed", completed="2026-03-02T15:00:00+00:00", created=None):
+    return {"id": sid, "property_id": pid, "sale_price": price, "status": status,
+            "completed_at": completed, "created_at": created or completed}
+
+
+@pytest.fixture
+def db():
+    return _FakeDB({
+        "properties": [
+            _prop("p1", "A201", 21000),
+            _prop("p2", "A202", 30000, width=28, length=64, beds=4, reno=6500),
+            _prop("p3", "A203", 0),             # no purchase price → not a comp
+            _prop("p4", "A110", 15000),         # sold in 2025 → already in the seed
+        ],
+        "sales": [
+            _sale("s1", "p1", 52000, completed="2026-02-10T12:00:00+00:00"),
+            _sale("s1b", "p1", 55000, status="paid", completed=None, created="2026-04-01T12:00:00+00:00"),
+            _sale("s2", "p2", 71000),
+            _sale("s3", "p3", 40000),
+            _sale("s4", "p4", 33000, completed="2025-11-20T12:00:00+00:00"),
+            _sale("s5", "p2", 90000, status="cancelled", completed="2026-05-01T12:00:00+00:00"),
+        ],
+        "renovations": [
+            {"property_id": "p1", "total_cost": 4000, "created_at": "2026-01-05"},
+            {"property_id": "p1", "total_cost": 7250.5, "created_at": "2026-01-20"},
+            {"property_id": "p2", "total_cost": 9999, "created_at": "2026-01-20"},
+        ],
+        "price_comp_snapshots": [],
+    })
+
+
+@pytest.fixture(autouse=True)
+def _restore_dataset(monkeypatch):
+    monkeypatch.setattr(pp, "_dataset", pp.get_dataset())
+
+
+def test_build_comps_appends_houses_sold_since_the_seed(db):
+    records, sources = price_comps.build_comps(db)
+    seed = pp.usable_records(pp.load_seed_records())
+    assert records[:len(seed)] == seed
+    assert sources == {"seed_2025": len(seed), "sales": 2}
+
+    a202, a201 = records[len(seed):]  # oldest sale first
+    assert a201["id"] == "A201" and a201["sale_id"] == "s1b" and a201["fecha_venta"] == "2026-04-01"
+    assert a201["tipo"] == "SINGLE" and a201["sqft"] == 16 * 76
+    assert a201["remodelacion"] == 7250.5 and a201["precio_venta"] == 55000
+    assert a201["ganancia_con_remo"] == round(55000 - 21000 - 7250.5, 2)
+    assert a201["margen_con_remo_pct"] == round((55000 - 28250.5) / 28250.5 * 100, 1)
+    assert a202["tipo"] == "DOUBLE" and a202["remodelacion"] == 6500
+    assert set(seed[0]) - set(a201) <= {"movida", "comision_venta", "gastos_total"}
+
+
+def test_publish_refresh_and_rollback(db):
+    seed_version = pp.get_dataset().version
+    assert seed_version == pp.dataset_version(pp.usable_records(pp.load_seed_records()))
+
+    # Nothing published yet: keep the seed
+    assert price_comps.refresh_active_dataset(db)["changed"] is False
+
+    result = price_comps.rebuild_and_publish(db)
+    new_version = result["version"]
+    assert result["published"] and result["previous_version"] is None
+    assert result["refresh"]["changed"] and result["refresh"]["previous_version"] == seed_version
+    dataset = pp.get_dataset()
+    assert dataset.version == new_version and dataset.source == "store"
+    assert len(dataset.records) == result["record_count"]
+    assert pp.get_summary_stats()["dataset_version"] == new_version
+
+    pred = pp.predict_price(listing_price=30000, sqft=1792, bedrooms=4, bathrooms=2)
+    assert pred["dataset_version"] == new_version
+    assert pp.predict_batch([{"id": 1, "listing_price": 30000}])[0]["dataset_version"] == new_version
+
+    # Unchanged comps: nothing new stored, and a refresh reads only the version
+    assert price_comps.rebuild_and_publish(db)["published"] is False
+    assert len(db.tables["price_comp_snapshots"]) == 1
+    reads = db.reads["price_comp_snapshots"]
+    assert price_comps.refresh_active_dataset(db) == {"version": new_version, "changed": False}
+    assert db.reads["price_comp_snapshots"] == reads + 1
+
+    # Re-publishing the seed-only set is a rollback to the seed's version
+    seed = pp.usable_records(pp.load_seed_records())
+    db.tables["price_comp_snapshots"][0]["published_at"] = "2000-01-01T00:00:00+00:00"
+    rollback = price_comps.publish_snapshot(db, seed, {"seed_2025": len(seed)})
+    assert rollback["version"] == seed_version
+    price_comps.refresh_active_dataset(db)
+    assert pp.get_dataset().version == seed_version
+    stored = next(r for r in db.tables["price_comp_snapshots"] if r["version"] == new_version)
+    assert price_comps.publish_snapshot(db, stored["records"])["published"]
+    assert len(db.tables["price_comp_snapshots"]) == 2
+    assert price_comps.active_snapshot(db)["version"] == new_version
+
+
+def test_unreachable_store_keeps_current_dataset():
+    before = pp.get_dataset()
+    result = price_comps.refresh_active_dataset(_FakeDB({}, broken={"price_comp_snapshots"}))
+    assert result["changed"] is False and "PGRST205" in result["error"]
+    assert pp.get_dataset() is before
@@ -0,0 +1,95 @@
+"""
+Tests for the vectorized k-NN matching in api/utils/price_predictor.py.
+
+Validates:
+  - similarity_matrix equals compute_similarity bit for bit on the real
+    2025 history, including missing / zero features, non-integral sqft and
+    sqft far outside the historical range.
+  - top_k_matches picks what a stable sort of the scalar scores picks —
+    ties resolved in historical order — for any k and block size.
+  - predict_batch returns exactly what predict_price returns per listing.
+"""
+import sys
+import os
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from api.utils import price_predictor as pp
+
+
+@pytest.fixture(scope="module")
+def history():
+    data = pp._load_data()
+    assert data, "data/historico_2025.json missing"
+    return data
+
+
+def _random_features(n, seed=11):
+    rnd = random.Random(seed)
+    return [
+        pp._listing_features(
+            listing_price=rnd.choice([0, 8000, 20000.0, rnd.uniform(1000, 90000)]),
+            sqft=rnd.choice([None, 0, 960, 1216.5, 1792, 30000, rnd.randint(500, 3000)]),
+            bedrooms=rnd.choice([None, 0, 1, 2, 3, 4]),
+            bathrooms=rnd.choice([None, 0, 1, 1.25, 1.5, 2, 3]),
+            description=rnd.choice(["", "double wide", "single wide"]),
+        )
+        for _ in range(n)
+    ]
+
+
+def _stable_top_k(features, records, k):
+    scored = [(pp.compute_similarity(features, h), i) for i, h in enumerate(records)]
+    scored.sort(key=lambda x: -x[0])
+    return scored[:k]
+
+
+def test_similarity_matrix_matches_scalar(history):
+    features = _random_features(400)
+    scores = pp.similarity_matrix(features, pp.get_historical_features())
+    expected = np.array([[pp.compute_similarity(f, h) for h in history] for f in features])
+    assert scores.shape == (400, len(history))
+    assert np.array_equal(scores, expected)
+
+
+@pytest.mark.parametrize("k", [1, 3, 8, 40])
+def test_top_k_ties_follow_historical_order(monkeypatch, k):
+    # Many exact duplicates → ties straddle the k-th place
+    rnd = random.Random(5)
+    base = [{"tipo": "SINGLE", "sqft": 1216.0, "cuartos": 3, "banos": 2, "precio_compra": 20000.0},
+            {"tipo": "DOUBLE", "sqft": 1792.0, "cuartos": 4, "banos": 2, "precio_compra": 35000.0},
+            {"tipo": "SINGLE", "sqft": None, "cuartos": None, "banos": None, "precio_compra": 9000.0}]
+    records = [dict(rnd.choice(base)) for _ in range(60)]
+    hist = pp.HistoricalFeatures.from_records(records)
+    features = _random_features(50, seed=k)
+
+    monkeypatch.setattr(pp, "_BLOCK_CELLS", 7 * len(records))  # several blocks
+    idx, sims = pp.top_k_matches(features, hist, k)
+    for row, f in enumerate(features):
+        expected = _stable_top_k(f, records, k)
+        assert idx[row].tolist() == [i for _, i in expected]
+        assert sims[row].tolist() == [s for s, _ in expected]
+
+
+def test_predict_batch_equals_predict_price(history):
+    rnd = random.Random(2)
+    listings = [
+        {"id": i, "listing_price": rnd.uniform(3000, 80000), "sqft": rnd.choice([None, 1216, 1600]),
+         "bedrooms": rnd.choice([None, 2, 3]), "bathrooms": rnd.choice([None, 1, 2]),
+         "address": "123 Main St", "description": rnd.choice([None, "double wide"])}
+        for i in range(60)
+    ]
+    batch = pp.predict_batch(listings)
+    for listing, pred in zip(listings, batch):
+        single = pp.predict_price(
+            listing_price=listing["listing_price"], sqft=listing["sqft"],
+            bedrooms=listing["bedrooms"], bathrooms=listing["bathrooms"],
+            description=listing["address"] + " " + (listing["description"] or ""),
+        )
+        single["listing_id"] = listing["id"]
+        assert pred == single
+    assert batch[0]["similar_houses"] and batch[0]["confidence"] in ("alta", "media", "baja")
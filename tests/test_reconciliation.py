@@ -1,9 +1,14 @@
 """Tests for the bank statement reconciliation matching algorithm."""
 import sys
+import itertools
 import os
+import random
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from api.routes.accounting import _match_movements_to_transactions, _name_similarity, _normalize_name
+from api.routes.accounting import (
+    _assign_movements_to_transactions, _match_movements_to_invoices, _match_movements_to_transactions, _name_similarity, _normalize_name,
+)
+from api.services import reconciliation
 
 
 # === Test data matching the real Chase bank statement (March 2026) ===
@@ -319,6 +324,119 @@ def test_wizard_state_preserved_after_confirm():
     print("  ✓ test_wizard_state_preserved_after_confirm passed")
 
 
+def _random_ledger(seed, n_movements, n_txns):
+    """Movements + ledger rows with many near-duplicate amounts (incl. the 1%
+    edges), repeated names and a few missing/bad dates."""
+    rng = random.Random(seed)
+    names = ["Paquita Sanchez", "Manolo Santos", "Carlos Garcia", "AT&T Business", "Vendedor", ""]
+    bases = [100.0, 350.0, 589.0, 1000.0, 5000.0, 13500.0]
+
+    def amount():
+        base = rng.choice(bases)
+        return round(rng.choice([base, base * 0.99, base * 1.01, base + 0.005, base * rng.uniform(0.97, 1.03)]), 2)
+
+    def day():
+        if rng.random() < 0.05:
+            return rng.choice(["", "not-a-date"])
+        return f"2026-03-{rng.randint(1, 28):02d}"
+
+    movements = [{"id": f"mv-{i}", "movement_date": day(), "amount": amount() * rng.choice([1, -1]),
+                  "is_credit": rng.random() < 0.5, "counterparty": rng.choice(names),
+                  "description": "ZELLE PAYMENT FROM " + rng.choice(names)} for i in range(n_movements)]
+    txns = [{"id": f"txn-{i}", "transaction_date": day(), "amount": amount(),
+             "is_income": rng.random() < 0.5, "counterparty_name": rng.choice(names),
+             "description": rng.choice(["Venta contado - ", "Compra: "]) + rng.choice(names)}
+            for i in range(n_txns)]
+    return movements, txns
+
+
+def test_indexed_matching_equals_full_scan():
+    """The amount index only prunes rows the scorer would reject anyway."""
+    def full_scan(self, is_income, amount):
+        _, cands = self._sorted[is_income]
+        return sorted(cands, key=lambda c: c.pos)
+
+    for seed in range(5):
+        movements, txns = _random_ledger(seed, 150, 400)
+        indexed = _match_movements_to_transactions(movements, txns)
+        original = reconciliation.TransactionIndex.candidates
+        reconciliation.TransactionIndex.candidates = full_scan
+        try:
+            scanned = _match_movements_to_transactions(movements, txns)
+        finally:
+            reconciliation.TransactionIndex.candidates = original
+        assert indexed == scanned
+        assert indexed, "fixture should produce matches"
+    print("  ✓ test_indexed_matching_equals_full_scan passed")
+
+
+def test_invoice_split_payment_allocates_remaining():
+    """Two $500 deposits settle one $1000 factura; a third finds nothing left."""
+    invoices = [
+        {"id": "inv-ap", "direction": "payable", "balance_due": 500, "counterparty_name": "Paquita Sanchez",
+         "invoice_number": "F-0002", "due_date": "2026-03-10", "issue_date": "2026-03-01"},
+        {"id": "inv-ar", "direction": "receivable", "balance_due": 1000, "counterparty_name": "Paquita Sanchez",
+         "invoice_number": "F-0001", "due_date": "2026-03-10", "issue_date": "2026-03-01"},
+    ]
+    mv = [{"id": f"mv-{i}", "movement_date": "2026-03-10", "amount": 500.0, "is_credit": True,
+           "counterparty": "PAQUITA SANCHEZ", "description": "ZELLE PAYMENT FROM PAQUITA SANCHEZ"}
+          for i in range(3)]
+    matches = _match_movements_to_invoices(mv, invoices)
+    assert [(m["movement_id"], m["invoice_id"], m["partial"]) for m in matches] == [
+        ("mv-0", "inv-ar", True), ("mv-1", "inv-ar", False)]
+    assert matches[1]["confidence"] == "high"
+    print("  ✓ test_invoice_split_payment_allocates_remaining passed")
+
+
+def test_optimal_assignment_fixes_greedy_steal():
+    """A same-day but nameless movement must not take the transaction a later,
+    perfectly matching movement needs when another corroborated row fits it."""
+    mv = [
+        {"id": "mv-weak", "movement_date": "2026-03-10", "amount": 1000.0, "is_credit": True,
+         "counterparty": "DEPOSIT", "description": "ATM DEPOSIT"},
+        {"id": "mv-paquita", "movement_date": "2026-03-10", "amount": 1000.0, "is_credit": True,
+         "counterparty": "PAQUITA SANCHEZ", "description": "ZELLE PAYMENT FROM PAQUITA SANCHEZ"},
+    ]
+    txns = [
+        {"id": "txn-paquita", "transaction_date": "2026-03-10", "amount": 1000.0, "is_income": True,
+         "counterparty_name": "Paquita Sanchez", "description": "Venta contado - Paquita Sanchez"},
+        {"id": "txn-deposit", "transaction_date": "2026-03-20", "amount": 1000.0, "is_income": True,
+         "counterparty_name": "Deposit", "description": "Deposit"},
+    ]
+    greedy = _match_movements_to_transactions(mv, txns)
+    assert [(m["movement_id"], m["transaction_id"]) for m in greedy] == [("mv-weak", "txn-paquita")]
+
+    optimal = _assign_movements_to_transactions(mv, txns)
+    assert [(m["movement_id"], m["transaction_id"]) for m in optimal] == [
+        ("mv-weak", "txn-deposit"), ("mv-paquita", "txn-paquita")]
+    assert optimal[1]["confidence"] == "high" and optimal[1]["signals"]["name"] is True
+    assert optimal[0]["caveat"]  # name matches, dates 10 days apart
+    print("  ✓ test_optimal_assignment_fixes_greedy_steal passed")
+
+
+def test_optimal_assignment_maximizes_total_score():
+    """Never worse than greedy, and each movement/transaction used once."""
+    for seed in range(5):
+        movements, txns = _random_ledger(seed, 120, 150)
+        greedy = _match_movements_to_transactions(movements, txns)
+        optimal = _assign_movements_to_transactions(movements, txns)
+        assert len({m["transaction_id"] for m in optimal}) == len(optimal)
+        assert len({m["movement_id"] for m in optimal}) == len(optimal)
+        assert sum(m["score"] for m in optimal) >= sum(m["score"] for m in greedy)
+
+    # Exhaustive check of the matcher on small graphs
+    rng = random.Random(0)
+    for _ in range(300):
+        edges = [(a, b, rng.randint(1, 120)) for a in range(4) for b in range(4) if rng.random() < 0.5]
+        weights = {(a, b): w for a, b, w in edges}
+        best = 0
+        for perm in itertools.permutations(range(4)):
+            best = max(best, sum(weights.get((a, b), 0) for a, b in enumerate(perm)))
+        pairs = reconciliation.max_weight_matching(edges)
+        assert sum(weights[p] for p in pairs) == best
+    print("  ✓ test_optimal_assignment_maximizes_total_score passed")
+
+
 if __name__ == "__main__":
     print("Running reconciliation matching tests...\n")
     test_name_normalization()
@@ -333,4 +451,8 @@ if __name__ == "__main__":
     test_reconciled_transactions_excluded_from_future()
     test_step2_only_shows_unreconciled_movements()
     test_wizard_state_preserved_after_confirm()
+    test_indexed_matching_equals_full_scan()
+    test_invoice_split_payment_allocates_remaining()
+    test_optimal_assignment_fixes_greedy_steal()
+    test_optimal_assignment_maximizes_total_score()
     print("\n✅ All tests passed!")
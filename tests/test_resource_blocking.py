@@ -0,0 +1,152 @@
+"""
+Tests for request interception on the shared scraper browser
+(api/agents/buscador/resource_blocking.py + BrowserPool).
+
+Validates:
+  - The default policy aborts images, media, fonts and tracker hosts
+    (subdomains included) and lets documents, scripts and XHR through;
+    allow_types / allow_hosts override it per source.
+  - SCRAPER_BLOCK_RESOURCES=0 / SCRAPER_UNBLOCKED_SOURCES switch it off.
+  - A page leased for a source is routed through its policy, and what was
+    blocked / loaded is added to the pool's per-source stats on release.
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.agents.buscador.browser_pool import BrowserPool
+from api.agents.buscador.resource_blocking import DEFAULT_POLICY, BlockPolicy, policy_for
+
+
+def test_default_policy():
+    p = DEFAULT_POLICY
+    assert p.block_reason("image", "https://cdn.mhvillage.com/p/1.jpg") == "image"
+    assert p.block_reason("font", "https://fonts.gstatic.com/x.woff2") == "font"
+    assert p.block_reason("media", "https://www.zillow.com/v.mp4") == "media"
+    assert p.block_reason("script", "https://www.googletagmanager.com/gtm.js") == "tracker"
+    assert p.block_reason("xhr", "https://bat.bing.com/action/0") == "tracker"
+    assert p.block_reason("document", "https://www.mhvillage.com/homes/tx/houston") is None
+    assert p.block_reason("script", "https://www.zillow.com/static/app.js") is None
+    assert p.block_reason("script", "https://notbing.com/a.js") is None
+
+    keep_photos = BlockPolicy(allow_types=frozenset({"image"}), allow_hosts=("hotjar.com",))
+    assert keep_photos.block_reason("image", "https://cdn/1.jpg") is None
+    assert keep_photos.block_reason("script", "https://static.hotjar.com/c.js") is None
+    assert keep_photos.block_reason("font", "https://cdn/f.woff") == "font"
+
+
+def test_policy_switches(monkeypatch):
+    assert policy_for("mhvillage") is DEFAULT_POLICY
+    assert policy_for("facebook").block_reason("script", "https://connect.facebook.net/sdk.js") is None
+    assert policy_for(None) is None
+    monkeypatch.setenv("SCRAPER_UNBLOCKED_SOURCES", "zillow, craigslist")
+    assert policy_for("zillow") is None and policy_for("mhvillage") is not None
+    monkeypatch.setenv("SCRAPER_BLOCK_RESOURCES", "0")
+    assert policy_for("mhvillage") is None
+
+
+class _Request:
+    def __init__(self, url, resource_type):
+        self.url, self.resource_type = url, resource_type
+
+
+class _Route:
+    def __init__(self, log, request):
+        self.log, self.request = log, request
+
+    async def abort(self, reason):
+        self.log.append(("abort", self.request.url))
+
+    async def continue_(self):
+        self.log.append(("continue", self.request.url))
+
+
+class _Response:
+    def __init__(self, size):
+        self.headers = {"content-length": str(size)}
+
+
+class _Page:
+    def __init__(self, context):
+        self.context, self.handler, self.listeners = context, None, {}
+
+    async def route(self, pattern, handler):
+        assert pattern == "**/*"
+        self.handler = handler
+
+    def on(self, event, fn):
+        self.listeners[event] = fn
+
+    async def close(self):
+        pass
+
+    async def load(self, requests):
+        """Replay a page load: route every request, report allowed responses."""
+        log = []
+        for url, rtype, size in requests:
+            await self.handler(_Route(log, _Request(url, rtype)), _Request(url, rtype))
+            if log[-1][0] == "continue":
+                self.listeners["response"](_Response(size))
+        return log
+
+
+class _Context:
+    pages = ()
+
+    async def new_page(self):
+        return _Page(self)
+
+    async def clear_cookies(self):
+        pass
+
+    async def clear_permissions(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+class _Browser:
+    def is_connected(self):
+        return True
+
+    async def new_context(self, **_):
+        return _Context()
+
+    async def close(self):
+        pass
+
+
+class _Playwright:
+    async def stop(self):
+        pass
+
+
+async def test_pool_routes_pages_and_records_per_source_stats():
+    async def launch():
+        return _Playwright(), _Browser()
+
+    pool = BrowserPool(launch)
+    page = await pool.new_page("mhvillage")
+    log = await page.load([
+        ("https://www.mhvillage.com/homes/tx/houston", "document", 60_000),
+        ("https://www.mhvillage.com/app.js", "script", 200_000),
+        ("https://cdn.mhvillage.com/1.jpg", "image", 300_000),
+        ("https://cdn.mhvillage.com/2.jpg", "image", 300_000),
+        ("https://fonts.gstatic.com/a.woff2", "font", 40_000),
+        ("https://www.google-analytics.com/collect", "xhr", 1_000),
+    ])
+    assert [a for a, _ in log] == ["continue", "continue", "abort", "abort", "abort", "abort"]
+    await pool.release(page)
+
+    stats = pool.resource_stats["mhvillage"].summary()
+    assert stats["requests"] == 6 and stats["blocked"] == 4
+    assert stats["blocked_by_reason"] == {"image": 2, "font": 1, "tracker": 1}
+    assert stats["kb_loaded"] == round(260_000 / 1024, 1)
+
+    # No source → no routing installed
+    plain = await pool.new_page()
+    assert plain.handler is None
+    await pool.release(plain)
+    await pool.close()
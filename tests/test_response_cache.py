@@ -0,0 +1,188 @@
+"""
+Tests for the on-disk response cache (api/utils/response_cache.py) and the
+callers that share it: BrowserPool.fetch_html (buscador scrapers) and the
+TDHCA title search (api/services/tdhca_lookup.py).
+
+Validates:
+  - Entries are keyed by method + URL + params, fresh for the host's TTL
+    (most specific host wins, RESPONSE_CACHE_TTLS overrides) and kept
+    stale for revalidation; refresh() restarts the TTL.
+  - The file stays under max_bytes, evicting least-recently-used first.
+  - RESPONSE_CACHE_BYPASS / bypass_cache skip reads but still store.
+  - fetch_html serves a fresh page without leasing a browser page, and
+    never caches a non-2xx (bot check) response; the same URL loaded
+    with other wait_until / settle options is a separate entry.
+  - A cached TDHCA lookup is answered without launching Playwright.
+"""
+import sys
+import os
+import random
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from api.agents.buscador.browser_pool import BrowserPool
+from api.services import tdhca_lookup
+from api.utils import response_cache
+from api.utils.response_cache import ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"))
+    previous = response_cache.set_cache(cache)
+    yield cache
+    response_cache.set_cache(previous)
+    cache.close()
+
+
+def test_keys_ttls_and_revalidation(cache, monkeypatch):
+    url = "https://www.mhvillage.com/homes/tx/houston"
+    cache.put(url, b"<html>houston</html>", headers={"ETag": '"v1"', "Set-Cookie": "x"})
+    hit = cache.get(url)
+    assert hit.text() == "<html>houston</html>" and hit.etag == '"v1"'
+    assert "set-cookie" not in hit.headers
+    assert cache.get(url, {"page": 2}) is None
+    assert cache.get(url, method="POST") is None
+
+    assert cache.ttl_for(url) == 900
+    assert cache.ttl_for("https://mhweb.tdhca.state.tx.us/mhweb/title_view.jsp") == 3600
+    assert cache.ttl_for("https://houston.craigslist.org/search/mha") == 900
+    assert cache.ttl_for("https://example.com/") == response_cache.DEFAULT_TTL
+    monkeypatch.setenv("RESPONSE_CACHE_TTLS", "www.zillow.com=60, bad")
+    assert response_cache._env_ttls() == {"www.zillow.com": 60}
+    assert ResponseCache(cache.path, ttls=response_cache._env_ttls()).ttl_for(
+        "https://www.zillow.com/houston-tx/mobile-homes/") == 60
+
+    cache.put(url, b"old", ttl=0)
+    assert cache.get(url) is None
+    stale = cache.get(url, allow_stale=True)
+    assert stale.body == b"old" and not stale.fresh
+    cache.refresh(url, headers={"etag": '"v2"'})
+    assert cache.get(url).etag == '"v2"'
+
+    cache.invalidate(url)
+    assert cache.get(url, allow_stale=True) is None
+    assert cache.stats["hit"] >= 2 and cache.stats["miss"] >= 1
+
+
+def test_lru_eviction_keeps_file_bounded(cache):
+    cache.max_bytes = 45_000
+    rnd = random.Random(7)
+
+    def body():  # incompressible, ~10 KB stored
+        return bytes(rnd.getrandbits(8) for _ in range(10_000))
+
+    for i in range(3):
+        cache.put(f"https://www.zillow.com/p/{i}", body())
+        time.sleep(0.01)
+    cache.get("https://www.zillow.com/p/0")  # most recently used now
+    for i in range(3, 6):
+        cache.put(f"https://www.zillow.com/p/{i}", body())
+        time.sleep(0.01)
+
+    assert cache.size_bytes() <= 45_000 and cache.stats["evicted"] >= 2
+    assert cache.get("https://www.zillow.com/p/0") is not None
+    assert cache.get("https://www.zillow.com/p/1") is None
+    assert cache.get("https://www.zillow.com/p/5") is not None
+
+
+def test_bypass_flag(monkeypatch):
+    assert not response_cache.bypassed()
+    assert response_cache.bypassed(True)
+    monkeypatch.setenv("RESPONSE_CACHE_BYPASS", "1")
+    assert response_cache.bypassed()
+
+
+class _Response:
+    def __init__(self, status):
+        self.status = status
+
+
+class _Page:
+    def __init__(self, html, status):
+        self.html, self.status, self.visited = html, status, []
+
+    async def goto(self, url, **_):
+        self.visited.append(url)
+        return _Response(self.status)
+
+    async def content(self):
+        return self.html
+
+
+class _FakePool(BrowserPool):
+    """Leases scripted pages instead of driving Chromium."""
+
+    def __init__(self, html, status=200):
+        super().__init__()
+        self.html, self.status, self.pages = html, status, []
+
+    async def new_page(self, source=None):
+        page = _Page(self.html, self.status)
+        self.pages.append(page)
+        return page
+
+    async def release(self, page):
+        pass
+
+
+async def test_fetch_html_uses_cache(cache, monkeypatch):
+    url = "https://www.mhvillage.com/homes/tx/waco"
+    pool = _FakePool("<html>cards</html>")
+    assert await pool.fetch_html(url, "mhvillage") == "<html>cards</html>"
+    assert await pool.fetch_html(url, "mhvillage") == "<html>cards</html>"
+    assert len(pool.pages) == 1 and pool.stats["cache_hits"] == 1
+
+    await pool.fetch_html(url, "mhvillage", bypass_cache=True)
+    assert len(pool.pages) == 2
+
+    blocked = _FakePool("<html>Press & Hold</html>", status=403)
+    zurl = "https://www.zillow.com/waco-tx/mobile-homes/"
+    await blocked.fetch_html(zurl, "zillow")
+    await blocked.fetch_html(zurl, "zillow")
+    assert len(blocked.pages) == 2 and cache.get(zurl) is None
+
+
+async def test_fetch_html_keys_cache_by_render_options(cache):
+    url = "https://www.zillow.com/homedetails/123-main-st/"
+    pool = _FakePool("<html>home</html>")
+    await pool.fetch_html(url, "zillow", wait_until="domcontentloaded", settle=3)
+    await pool.fetch_html(url, "zillow", wait_until="networkidle", settle=2)
+    assert len(pool.pages) == 2 and pool.stats["cache_hits"] == 0
+
+    await pool.fetch_html(url, "zillow", wait_until="networkidle", settle=2)
+    assert len(pool.pages) == 2 and pool.stats["cache_hits"] == 1
+
+
+DETAIL_HTML = """<html><body><table>
+<tr><td>Certificate #</td><td>MH00123456</td></tr>
+<tr><td>Manufacturer</td><td>CLAYTON HOMES</td></tr>
+<tr><td>Wind Zone</td><td>I</td></tr>
+</table><a href="title_print.jsp?certnum=MH00123456">Print</a></body></html>"""
+
+
+async def test_tdhca_lookup_served_from_cache(cache, monkeypatch):
+    calls = []
+
+    async def live_search(search_type, search_value):
+        calls.append((search_type, search_value))
+        page = tdhca_lookup.TdhcaPage(search_type, search_value, DETAIL_HTML,
+                                      "https://mhweb.tdhca.state.tx.us/mhweb/title_detail.jsp?x=1",
+                                      found=True)
+        return page, True
+
+    monkeypatch.setattr(tdhca_lookup, "_search", live_search)
+    first = await tdhca_lookup.fetch_title_page("label", "txs123456")
+    again = await tdhca_lookup.fetch_title_page("label", "TXS123456 ")
+    assert calls == [("label", "txs123456")]
+    assert again.from_cache and again.found and again.content == first.content
+    assert again.url.endswith("title_detail.jsp?x=1")
+    assert again.print_url == "https://mhweb.tdhca.state.tx.us/mhweb/title_print.jsp?certnum=MH00123456"
+
+    await tdhca_lookup.fetch_title_page("label", "TXS123456", bypass_cache=True)
+    assert len(calls) == 2
+    await tdhca_lookup.fetch_title_page("serial", "TXS123456")
+    assert len(calls) == 3
@@ -0,0 +1,129 @@
+"""
+Tests for the set-based RTO reminder run (api/services/email_service.py,
+migration 115). Delivery is the outbox drain's job (test_email_outbox.py).
+
+Validates:
+  - One run = one payments query for the three windows, one dedupe-key
+    query and one bulk outbox upsert, whatever the number of payments.
+  - Each payment gets the reminder of its window (3 days before / day of /
+    1 day after) as a pending outbox row (migration 116), keyed
+    rto_reminder_<label>:<payment_id>; clients without email are skipped.
+  - Re-running queues only reminders not already in the outbox.
+"""
+import sys
+import os
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from api.services import email_service
+
+
+# ---------------------------------------------------------------------------
+# In-memory fake: enough of supabase-py for process_rto_reminders
+# ---------------------------------------------------------------------------
+
+class _Res:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, db, table):
+        self.db, self.table = db, table
+        self.preds, self.upsert_rows = [], None
+
+    def select(self, *_a, **_k): return self
+
+    def in_(self, col, vals):
+        self.preds.append(lambda r: r.get(col) in vals); return self
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False):
+        assert on_conflict == "dedupe_key" and ignore_duplicates
+        self.upsert_rows = rows; return self
+
+    def execute(self):
+        rows = self.db.tables.setdefault(self.table, [])
+        if self.upsert_rows is not None:
+            self.db.calls[(self.table, "upsert")] += 1
+            keys = {r.get("dedupe_key") for r in rows}
+            new = [dict(r) for r in self.upsert_rows if r["dedupe_key"] not in keys]
+            rows.extend(new)
+            return _Res(new)
+        self.db.calls[(self.table, "select")] += 1
+        return _Res([dict(r) for r in rows if all(p(r) for p in self.preds)])
+
+
+class _FakeDB:
+    def __init__(self, tables):
+        self.tables = tables
+        self.calls = Counter()
+
+    def table(self, name):
+        return _Query(self, name)
+
+
+def _payment(pid, due, email="ana@example.com", status="pending"):
+    return {"id": pid, "amount": 850, "due_date": due.isoformat(), "payment_number": 4,
+            "status": status,
+            "rto_contracts": {"id": "c-" + pid, "term_months": 36,
+                              "clients": {"name": "Ana", "email": email},
+                              "properties": {"address": "12 Oak St"}}}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    today = date.today()
+    fake = _FakeDB({
+        "rto_payments": [
+            _payment("p1", today + timedelta(days=3)),
+            _payment("p2", today),
+            _payment("p3", today - timedelta(days=1)),
+            _payment("p4", today, email=None),
+            _payment("p5", today + timedelta(days=10)),
+        ],
+        "scheduled_emails": [],
+    })
+    monkeypatch.setattr(email_service, "_job_db", lambda: fake)
+    return fake
+
+
+def test_reminders_are_queued_in_one_upsert(db):
+    result = email_service.process_rto_reminders()
+
+    assert result["ok"] and result["total_queued"] == 3 and result["already_queued"] == 0
+    assert {d["label"]: d["queued"] for d in result["details"]} == \
+        {"3_days_before": 1, "day_of": 1, "1_day_after": 1}
+    assert db.calls == {("rto_payments", "select"): 1, ("scheduled_emails", "select"): 1,
+                        ("scheduled_emails", "upsert"): 1}
+    outbox = db.tables["scheduled_emails"]
+    assert [r["subject"] for r in outbox] == [
+        "📅 Recordatorio: Tu pago RTO vence en 3 días",
+        "⚠️ HOY vence tu pago RTO - Maninos Homes",
+        "🚨 Pago RTO atrasado (1 días) - Maninos Homes",
+    ]
+    assert [r["dedupe_key"] for r in outbox] == [
+        "rto_reminder_3_days_before:p1", "rto_reminder_day_of:p2", "rto_reminder_1_day_after:p3",
+    ]
+    first = outbox[0]
+    assert first["status"] == "pending" and first["email_type"] == "rto_reminder_3_days_before"
+    assert first["payload"]["to"] == ["ana@example.com"] and "12 Oak St" in first["payload"]["html"]
+    assert first["metadata"] == {"payment_id": "p1", "contract_id": "c-p1"}
+
+
+def test_rerun_queues_only_new_reminders(db):
+    email_service.process_rto_reminders()
+    # p4's client gets an email address after the first run
+    db.tables["rto_payments"][3]["rto_contracts"]["clients"]["email"] = "luis@example.com"
+
+    again = email_service.process_rto_reminders()
+    assert again["total_queued"] == 1 and again["already_queued"] == 3
+    assert [r["dedupe_key"] for r in db.tables["scheduled_emails"]][-1] == "rto_reminder_day_of:p4"
+    assert db.calls[("scheduled_emails", "upsert")] == 2
+
+    third = email_service.process_rto_reminders()
+    assert third["total_queued"] == 0 and third["already_queued"] == 4
+    assert db.calls[("scheduled_emails", "upsert")] == 2     # nothing to write, no call
@@ -0,0 +1,130 @@
+"""
+Tests for the concurrent scrape runner (api/services/scrapers/orchestrator.py).
+
+Validates:
+  - Sources run concurrently: a run takes about as long as its slowest
+    source, and results are yielded in finishing order.
+  - A source past its timeout is cancelled and reported as 'timeout'; a
+    raising source as 'error'; the others still return their data.
+  - Browser sources never hold more than browser_slots pages at once, and a
+    source's concurrency cap holds across overlapping runs.
+  - SCRAPER_DISABLED_SOURCES switches a source off.
+  - record_scrape_run writes one scrape_source_runs row per source.
+"""
+import sys
+import os
+import asyncio
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.services.scrapers.orchestrator import (
+    SourceSpec,
+    iter_sources,
+    record_scrape_run,
+    run_sources,
+)
+
+
+def _source(name, delay, result=None, exc=None, **kw):
+    async def scrape():
+        await asyncio.sleep(delay)
+        if exc:
+            raise exc
+        return result if result is not None else [f"{name}-{i}" for i in range(3)]
+    return SourceSpec(name, scrape, **kw)
+
+
+async def test_sources_run_concurrently_and_stream_in_finish_order():
+    specs = [_source("slow", 0.3), _source("fast", 0.05), _source("mid", 0.15)]
+    t0 = time.monotonic()
+    order = [r.source async for r in iter_sources(specs)]
+    elapsed = time.monotonic() - t0
+    assert order == ["fast", "mid", "slow"]
+    assert elapsed < 0.45  # sequential would be 0.5s
+
+
+async def test_timeout_and_error_do_not_sink_the_run():
+    cancelled = []
+
+    async def hangs():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    run = await run_sources([
+        SourceSpec("hung", hangs, timeout=0.1),
+        _source("broken", 0.01, exc=RuntimeError("403")),
+        _source("ok", 0.02),
+    ])
+    assert run.results["hung"].status == "timeout" and cancelled == [True]
+    assert run.results["broken"].status == "error" and "403" in run.results["broken"].error
+    assert run.data("ok") == ["ok-0", "ok-1", "ok-2"]
+    assert run.data("hung", []) == []
+    m = run.metrics()["sources"]
+    assert m["ok"]["listings"] == 3 and m["hung"]["listings"] == 0
+    assert m["hung"]["latency_ms"] >= 100
+
+
+async def test_browser_slots_and_per_source_cap():
+    live = {"browser": 0, "peak": 0, "mhv": 0, "mhv_peak": 0}
+
+    def tracked(name):
+        async def scrape():
+            live["browser"] += 1
+            live["peak"] = max(live["peak"], live["browser"])
+            if name == "mhv":
+                live["mhv"] += 1
+                live["mhv_peak"] = max(live["mhv_peak"], live["mhv"])
+            await asyncio.sleep(0.05)
+            live["browser"] -= 1
+            if name == "mhv":
+                live["mhv"] -= 1
+            return [name]
+        return SourceSpec(name, scrape, browser=True)
+
+    specs = [tracked(n) for n in ("a", "b", "c", "d", "e")]
+    run = await run_sources(specs, browser_slots=2)
+    assert live["peak"] == 2 and all(r.ok for r in run.results.values())
+
+    # Two overlapping runs both scraping "mhv" (concurrency=1)
+    await asyncio.gather(run_sources([tracked("mhv")]), run_sources([tracked("mhv")]))
+    assert live["mhv_peak"] == 1
+
+
+async def test_disabled_sources_and_recorded_metrics(monkeypatch):
+    monkeypatch.setenv("SCRAPER_DISABLED_SOURCES", "zillow_arv, other")
+    arv = _source("zillow_arv", 0.01, result={"comparables_count": 7})
+    run = await run_sources([_source("mhvillage", 0.01), arv,
+                             _source("mobilehome", 0.01, enabled=False)])
+    assert run.results["zillow_arv"].status == "disabled"
+    assert run.results["mobilehome"].status == "disabled"
+    assert run.results["mhvillage"].ok
+
+    inserted = []
+
+    class _DB:
+        def table(self, name):
+            assert name == "scrape_source_runs"
+            return self
+
+        def insert(self, rows):
+            inserted.extend(rows)
+            return self
+
+        def execute(self):
+            return None
+
+    record_scrape_run(_DB(), run, "test")
+    assert sorted(r["source"] for r in inserted) == ["mhvillage", "mobilehome", "zillow_arv"]
+    assert {r["run_id"] for r in inserted} == {run.run_id}
+    assert all(r["trigger"] == "test" for r in inserted)
+
+
+async def test_custom_count_for_non_list_results():
+    arv = _source("zillow_arv", 0.01, result={"comparables_count": 7},
+                  count=lambda d: d.get("comparables_count", 0))
+    run = await run_sources([arv])
+    assert run.results["zillow_arv"].listings == 7
@@ -0,0 +1,360 @@
+"""
+Tests for streaming bank-statement ingestion (api/services/statement_stream.py,
+accounting._stream_statement_movements / _parse_statement_background).
+
+Validates:
+  - iter_text_chunks cuts like the old whole-text splitter and never buffers
+    more than one chunk; PDF pages and Excel rows are extracted lazily.
+  - _iter_csv_movements parses row by row with the same results as before.
+  - A multi-page PDF is parsed against a local fake OpenAI server and its
+    movements are inserted chunk by chunk, in statement order, with
+    total_movements bumped after each insert — the first rows land while
+    later pages haven't been read yet.
+  - CSV statements are inserted in CSV_INSERT_BATCH-row batches.
+"""
+import sys
+import os
+import asyncio
+import io
+import json
+import re
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import api.routes.accounting as accounting_mod
+from api.services import ai_pipeline, statement_stream
+
+
+LINE_RE = re.compile(r"^(\d{4}-\d{2}-\d{2}) (.+?) (-?\d+\.\d{2})$", re.M)
+
+
+def _statement_pages(n_pages, per_page=25):
+    return [
+        "\n".join(
+            f"2026-01-{1 + (p + i) % 28:02d} ZELLE PAYMENT FROM BUYER {p * per_page + i} "
+            f"{(-1) ** i * (100 + p * per_page + i):.2f}"
+            for i in range(per_page)
+        )
+        for p in range(n_pages)
+    ]
+
+
+def _pdf(pages):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=letter)
+    for page in pages:
+        y = 750
+        for line in page.splitlines():
+            c.drawString(40, y, line)
+            y -= 14
+        c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# Fake OpenAI: parses "YYYY-MM-DD description amount" lines out of the prompt
+# ---------------------------------------------------------------------------
+
+class _FakeOpenAI(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *_a):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][-1]["content"]
+        with self.server.lock:
+            self.server.requests += 1
+        text = prompt.split("BANK STATEMENT TEXT", 1)[1]
+        movements = [{"date": d, "description": desc, "amount": float(amt), "is_credit": float(amt) > 0}
+                     for d, desc, amt in LINE_RE.findall(text)]
+        if "(chunk 1" in prompt and movements:
+            movements[0].update({"bank_name": "Bank of America", "period_start": "2026-01-01",
+                                 "period_end": "2026-01-31", "ending_balance": 1234.5})
+        payload = json.dumps({
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": json.dumps({"movements": movements})}}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    srv = _FakeOpenAI()
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENAI_BASE_URL", srv.base_url)
+    monkeypatch.setenv("OPENAI_MAX_CONCURRENCY", "2")
+    monkeypatch.setattr(ai_pipeline, "RETRY_BASE_DELAY", 0.01)
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+# ---------------------------------------------------------------------------
+# In-memory Supabase fake (insert / update / delete by eq)
+# ---------------------------------------------------------------------------
+
+class _Res:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, db, table):
+        self.db, self.table = db, table
+        self.preds, self.op, self.payload = [], None, None
+
+    def eq(self, col, val):
+        self.preds.append(lambda r: r.get(col) == val); return self
+
+    def insert(self, data):
+        self.op, self.payload = "insert", data; return self
+
+    def update(self, data):
+        self.op, self.payload = "update", data; return self
+
+    def delete(self):
+        self.op = "delete"; return self
+
+    def execute(self):
+        rows = self.db.tables[self.table]
+        if self.op == "insert":
+            batch = self.payload if isinstance(self.payload, list) else [self.payload]
+            self.db.log.append(("insert", self.table, len(batch)))
+            rows.extend(dict(r) for r in batch)
+            return _Res(batch)
+        hit = [r for r in rows if all(p(r) for p in self.preds)]
+        if self.op == "update":
+            self.db.log.append(("update", self.table, dict(self.payload)))
+            for r in hit:
+                r.update(self.payload)
+        elif self.op == "delete":
+            self.db.log.append(("delete", self.table, len(hit)))
+            self.db.tables[self.table] = [r for r in rows if r not in hit]
+        return _Res(hit)
+
+
+class _FakeDB:
+    def __init__(self):
+        self.tables = defaultdict(list)
+        self.tables["bank_statements"].append({"id": "st-1", "status": "parsing"})
+        self.log = []
+
+    def table(self, name):
+        return _Query(self, name)
+
+
+# ---------------------------------------------------------------------------
+# Building blocks
+# ---------------------------------------------------------------------------
+
+def _legacy_chunks(raw_text, chunk_size=6000):
+    """The whole-text splitter _ai_parse_movements used before streaming."""
+    if len(raw_text) <= chunk_size:
+        return [raw_text]
+    chunks, remaining = [], raw_text
+    while remaining:
+        if len(remaining) <= chunk_size:
+            chunks.append(remaining)
+            break
+        break_at = remaining.rfind("\n\n", 0, chunk_size)
+        if break_at < chunk_size // 2:
+            break_at = remaining.rfind("\n", 0, chunk_size)
+        if break_at < chunk_size // 2:
+            break_at = chunk_size
+        chunks.append(remaining[:break_at])
+        remaining = remaining[break_at:].lstrip()
+    return chunks
+
+
+def test_text_chunks_match_whole_text_split_and_stay_lazy():
+    pages = _statement_pages(40)
+    whole = "\n\n".join(pages)
+    assert list(statement_stream.iter_text_chunks([whole])) == _legacy_chunks(whole)
+
+    pulled = []
+
+    def pages_iter():
+        for p in pages:
+            pulled.append(p)
+            yield p
+
+    chunks = statement_stream.iter_text_chunks(pages_iter())
+    first = next(chunks)
+    assert len(first) <= statement_stream.CHUNK_SIZE
+    assert len(pulled) < 10  # only enough pages for one chunk were read
+    rest = list(chunks)
+    assert all(len(c) <= statement_stream.CHUNK_SIZE for c in rest)
+    assert re.sub(r"\s+", " ", " ".join([first, *rest])) == re.sub(r"\s+", " ", whole)
+
+
+def test_text_preview_keeps_head_and_length():
+    preview = statement_stream.TextPreview(limit=10, sep="\n")
+    assert list(preview.tap(["abcdef", "ghijkl", "mn"])) == ["abcdef", "ghijkl", "mn"]
+    assert preview.text == "abcdef\nghi"
+    assert preview.length == len("abcdef\nghijkl\nmn")
+
+
+def test_pdf_pages_and_excel_rows_are_iterated():
+    import openpyxl
+
+    pages = _statement_pages(3, per_page=4)
+    got = list(statement_stream.iter_pdf_pages(_pdf(pages)))
+    assert len(got) == 3
+    assert "BUYER 5" in got[1]
+    assert accounting_mod._extract_text_from_pdf(_pdf(pages)).count("ZELLE") == 12
+
+    wb = openpyxl.Workbook()
+    wb.active.append(["Date", "Description", "Amount"])
+    wb.active.append(["2026-01-02", "FEE", -5])
+    buf = io.BytesIO()
+    wb.save(buf)
+    assert list(statement_stream.iter_excel_rows(buf.getvalue())) == [
+        "Date | Description | Amount", "2026-01-02 | FEE | -5"]
+
+
+def test_csv_rows_stream_with_same_results():
+    csv_bytes = ("﻿Fecha,Concepto,Cargo,Abono\n"
+                 "2026-01-02,Home Depot,45.10,\n"
+                 ",,,\n"
+                 "2026-01-03,Zelle de Juan,,1500\n").encode()
+    it = accounting_mod._iter_csv_movements(csv_bytes)
+    assert next(it) == {"date": "2026-01-02", "description": "Home Depot", "amount": -45.1, "is_credit": False}
+    assert accounting_mod._parse_csv_movements(csv_bytes)[1]["amount"] == 1500.0
+
+    positional = b"2026-01-02,FEE,-5.00\n2026-01-03,DEP,10.00\n"
+    assert [m["amount"] for m in accounting_mod._parse_csv_movements(positional)] == [-5.0, 10.0]
+
+    with pytest.raises(ValueError):
+        accounting_mod._parse_csv_movements(b"date,description\n2026-01-02,x\n")
+
+
+def test_map_ordered_yields_in_order_with_bounded_read_ahead():
+    pulled = []
+
+    def items():
+        for i in range(12):
+            pulled.append(i)
+            yield i
+
+    async def work(x):
+        await asyncio.sleep(0.001 * (12 - x))
+        return x * 10
+
+    async def run():
+        out = []
+        async for item, result in ai_pipeline.map_ordered(items(), work, window=3):
+            out.append((item, result, len(pulled)))
+        return out
+
+    out = asyncio.run(run())
+    assert [(i, r) for i, r, _ in out] == [(i, i * 10) for i in range(12)]
+    assert all(n <= i + 3 for i, _, n in out)
+
+
+# ---------------------------------------------------------------------------
+# _parse_statement_background end to end
+# ---------------------------------------------------------------------------
+
+def test_pdf_statement_streams_movements_into_db(fake_openai, monkeypatch):
+    db = _FakeDB()
+    monkeypatch.setattr(accounting_mod, "sb", db)
+    pages = _statement_pages(30)
+    pulled = []
+    pulled_at_first_insert = []
+
+    real_pages = accounting_mod.iter_pdf_pages
+
+    def counting_pages(content):
+        for page in real_pages(content):
+            pulled.append(page)
+            yield page
+
+    real_insert = accounting_mod._insert_statement_movements
+
+    async def spy_insert(rows):
+        if not pulled_at_first_insert:
+            pulled_at_first_insert.append(len(pulled))
+        await real_insert(rows)
+
+    monkeypatch.setattr(accounting_mod, "iter_pdf_pages", counting_pages)
+    monkeypatch.setattr(accounting_mod, "_insert_statement_movements", spy_insert)
+
+    asyncio.run(accounting_mod._parse_statement_background("st-1", _pdf(pages), "pdf", "main"))
+
+    stmt = db.tables["bank_statements"][0]
+    assert stmt["status"] == "parsed", stmt.get("error_message")
+    rows = db.tables["statement_movements"]
+    assert len(rows) == 30 * 25 == stmt["total_movements"]
+    assert [r["sort_order"] for r in rows] == list(range(len(rows)))
+    assert rows[0]["description"].endswith("BUYER 0") and rows[-1]["description"].endswith("BUYER 749")
+    assert stmt["bank_name"] == "Bank of America" and stmt["ending_balance"] == 1234.5
+    assert "BUYER 0" in stmt["raw_extracted_text"]
+
+    inserts = [e for e in db.log if e[:2] == ("insert", "statement_movements")]
+    assert len(inserts) == fake_openai.requests > 1
+    progress = [e[2]["total_movements"] for e in db.log
+                if e[:2] == ("update", "bank_statements") and "status" not in e[2]]
+    assert progress == sorted(progress) and progress[-1] == len(rows)
+    # The first chunk was saved before the end of the PDF had been read.
+    assert pulled_at_first_insert[0] < len(pages)
+
+
+def test_csv_statement_inserts_in_batches(monkeypatch):
+    db = _FakeDB()
+    monkeypatch.setattr(accounting_mod, "sb", db)
+    lines = ["date,description,amount"] + [f"2026-02-{1 + i % 28:02d},ROW {i},{i + 1}.00" for i in range(450)]
+
+    asyncio.run(accounting_mod._parse_statement_background(
+        "st-1", "\n".join(lines).encode(), "csv", "main"))
+
+    assert db.tables["bank_statements"][0]["status"] == "parsed"
+    assert db.tables["bank_statements"][0]["total_movements"] == 450
+    inserts = [e[2] for e in db.log if e[:2] == ("insert", "statement_movements")]
+    assert inserts == [200, 200, 50]
+    assert db.tables["statement_movements"][449]["description"] == "ROW 449"
+
+
+def test_failed_parse_removes_partial_movements(monkeypatch):
+    db = _FakeDB()
+    monkeypatch.setattr(accounting_mod, "sb", db)
+
+    async def broken_stream(*_a, **_k):
+        yield [{"date": "2026-01-02", "description": "FIRST", "amount": 1.0}]
+        raise ValueError("Could not read PDF: truncated file")
+
+    monkeypatch.setattr(accounting_mod, "_stream_statement_movements", broken_stream)
+
+    asyncio.run(accounting_mod._parse_statement_background("st-1", b"%PDF", "pdf", "main"))
+
+    stmt = db.tables["bank_statements"][0]
+    assert stmt["status"] == "error" and "truncated" in stmt["error_message"]
+    assert db.tables["statement_movements"] == []
@@ -0,0 +1,99 @@
+"""
+Tests for tools/supabase_async — the thread-pool facade that keeps blocking
+Supabase calls off the event loop.
+
+Validates:
+  - aexecute returns the query's result and propagates its exceptions.
+  - gather_execute keeps argument order and can return exceptions in place.
+  - A slow `.execute()` does NOT freeze the loop: a concurrent ticker keeps
+    running while the query sleeps (the whole point of the facade).
+"""
+import sys
+import os
+import asyncio
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from tools.supabase_async import aexecute, gather_execute, run_sync
+
+
+class _Result:
+    def __init__(self, data):
+        self.data = data
+
+
+class _SlowQuery:
+    def __init__(self, data, delay=0.0, error=None):
+        self._data = data
+        self._delay = delay
+        self._error = error
+
+    def execute(self):
+        time.sleep(self._delay)
+        if self._error:
+            raise self._error
+        return _Result(self._data)
+
+
+def test_aexecute_returns_result():
+    res = asyncio.run(aexecute(_SlowQuery([{"id": 1}])))
+    assert res.data == [{"id": 1}]
+
+
+def test_aexecute_propagates_errors():
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(aexecute(_SlowQuery([], error=RuntimeError("boom"))))
+
+
+def test_gather_execute_keeps_order_and_returns_exceptions():
+    async def go():
+        return await gather_execute(
+            _SlowQuery(["a"], delay=0.05),
+            _SlowQuery([], error=ValueError("bad")),
+            _SlowQuery(["c"]),
+            return_exceptions=True,
+        )
+
+    first, second, third = asyncio.run(go())
+    assert first.data == ["a"]
+    assert isinstance(second, ValueError)
+    assert third.data == ["c"]
+
+
+def test_run_sync_passes_args():
+    assert asyncio.run(run_sync(lambda a, b=0: a + b, 2, b=3)) == 5
+
+
+def test_slow_query_does_not_block_event_loop():
+    """While a 300ms query runs, a 10ms ticker must keep firing."""
+    async def go():
+        ticks = 0
+        done = asyncio.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not done.is_set():
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        t = asyncio.create_task(ticker())
+        await aexecute(_SlowQuery([], delay=0.3))
+        done.set()
+        await t
+        return ticks
+
+    # Inline (blocking) execution would give ~1 tick.
+    assert asyncio.run(go()) >= 10
+
+
+def test_parallel_queries_overlap():
+    """Five 200ms queries finish in well under 5 × 200ms."""
+    async def go():
+        t0 = time.perf_counter()
+        await gather_execute(*(_SlowQuery([], delay=0.2) for _ in range(5)))
+        return time.perf_counter() - t0
+
+    assert asyncio.run(go()) < 0.6
@@ -8,6 +8,28 @@ import logfire  # Logfire for event tracking
 # Resend API Configuration
 RESEND_API_KEY = os.getenv("RESEND_API_KEY")
 EMAIL_FROM = os.getenv("RESEND_EMAIL_FROM")
+# Override for a local stand-in (python -m tools.fake_resend)
+RESEND_API_URL = os.getenv("RESEND_API_URL")
+
+
+def _resend():
+    import resend
+    resend.api_key = RESEND_API_KEY
+    if RESEND_API_URL:
+        resend.api_url = RESEND_API_URL
+    return resend
+
+
+def _failure(error: Exception) -> dict:
+    """A failed send as a result dict: the HTTP code, and Retry-After on a 429."""
+    headers = {k.lower(): v for k, v in (getattr(error, "headers", None) or {}).items()}
+    try:
+        retry_after = float(headers["retry-after"]) if "retry-after" in headers else None
+    except ValueError:
+        retry_after = None
+    code = getattr(error, "code", None)
+    return {"ok": False, "error": str(error), "code": int(code) if str(code).isdigit() else None,
+            "retry_after": retry_after}
 
 def send_email(to: List[str], subject: str, html: str, attachments: List[tuple[str, bytes]] = None):
     import logging
@@ -30,8 +52,7 @@ def send_email(to: List[str], subject: str, html: str, attachments: List[tuple[s
     logger.info(f"[send_email] Using Resend API (cloud-friendly, no SMTP ports)")
     
     try:
-        import resend
-        resend.api_key = RESEND_API_KEY
+        resend = _resend()
         
         # Prepare email payload
         email_data = {
@@ -96,3 +117,57 @@ def send_email(to: List[str], subject: str, html: str, attachments: List[tuple[s
     except Exception as e:
         logger.error(f"[send_email] ❌ Error sending email via Resend: {e}", exc_info=True)
         raise
+
+
+# Resend's batch endpoint takes at most 100 emails per call
+BATCH_LIMIT = 100
+
+
+def send_email_batch(messages: List[dict], idempotency_key: str = None) -> List[dict]:
+    """Send many emails through Resend's batch endpoint (POST /emails/batch).
+
+    `messages` are {"to": [...], "subject": ..., "html": ...} dicts. Returns
+    one result per message, in order: {"ok": True, "message_id": ...} or
+    {"ok": False, "error", "code", "retry_after"} (code 422 for an email the
+    batch rejected, the HTTP code of the call when the whole chunk failed).
+    Validation runs in permissive mode, so one bad address fails only its
+    own email. `idempotency_key` is sent per
+    chunk (suffixed with the chunk number), which makes a retried run within
+    Resend's 24h window a no-op instead of a second send.
+    """
+    import logging
+    logger = logging.getLogger(__name__)
+
+    if not RESEND_API_KEY:
+        raise ValueError("Resend API key missing. Please set RESEND_API_KEY in .env")
+
+    resend = _resend()
+
+    results: List[dict] = []
+    for start in range(0, len(messages), BATCH_LIMIT):
+        chunk = messages[start:start + BATCH_LIMIT]
+        params = [{"from": EMAIL_FROM, **m} for m in chunk]
+        options = {"batch_validation": "permissive"}
+        if idempotency_key:
+            options["idempotency_key"] = f"{idempotency_key}:{start // BATCH_LIMIT}"
+        try:
+            response = resend.Batch.send(params, options)
+        except Exception as e:
+            logger.error(f"[send_email_batch] ❌ Batch of {len(chunk)} failed: {e}")
+            results.extend(_failure(e) for _ in chunk)
+            continue
+
+        # Permissive mode: data holds the accepted emails in order, errors the
+        # rejected ones by index
+        errors = {err["index"]: err["message"] for err in (response.get("errors") or [])}
+        accepted = iter(response.get("data") or [])
+        for i in range(len(chunk)):
+            if i in errors:
+                results.append({"ok": False, "error": errors[i], "code": 422, "retry_after": None})
+            else:
+                results.append({"ok": True, "message_id": next(accepted, {}).get("id")})
+        logger.info(f"[send_email_batch] ✅ {len(chunk) - len(errors)}/{len(chunk)} emails accepted")
+
+    logfire.info("email_batch_sent", count=len(messages),
+                 failed=sum(1 for r in results if not r["ok"]))
+    return results
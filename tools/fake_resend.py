@@ -0,0 +1,176 @@
+"""
+Local stand-in for the Resend API, for running and testing email delivery
+offline.
+
+    python -m tools.fake_resend --port 8025
+    RESEND_API_URL=http://127.0.0.1:8025 RESEND_API_KEY=re_fake uvicorn api.main:app
+
+It serves POST /emails and POST /emails/batch the way Resend does. The batch
+endpoint honors x-batch-validation: permissive, and both honor
+Idempotency-Key, where a replayed key returns the first response.
+Throttled (429) and failed (5xx) calls are not remembered under their key,
+so a retry goes through. It keeps every accepted email in `.sent`. Knobs
+for tests:
+
+  - latency: seconds to wait before answering (a slow Resend);
+  - rate_limit: requests per second before answering 429 with Retry-After,
+    like Resend's per-team limit (0 = unlimited);
+  - fail_next: answer the next N requests with 500;
+  - reject(address): addresses answered with a 422 validation error.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Set
+
+
+class FakeResend:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, *, latency: float = 0.0,
+                 rate_limit: float = 0.0):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.fail_next = 0
+        self.rejected: Set[str] = set()
+        self.sent: List[dict] = []
+        self.requests: List[dict] = []
+        self._replies: Dict[str, tuple] = {}
+        self._window: List[float] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reject(self, address: str) -> None:
+        self.rejected.add(address)
+
+    def start(self) -> "FakeResend":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-resend", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeResend":
+        return self.start()
+
+    def __exit__(self, *_exc) -> None:
+        self.stop()
+
+    # ------------------------------------------------------------ behaviour
+
+    def _throttled(self) -> bool:
+        if not self.rate_limit:
+            return False
+        now = time.monotonic()
+        self._window = [t for t in self._window if now - t < 1.0]
+        if len(self._window) >= self.rate_limit:
+            return True
+        self._window.append(now)
+        return False
+
+    def _invalid(self, email: dict) -> Optional[str]:
+        for field in ("from", "to", "subject"):
+            if not email.get(field):
+                return f"Missing `{field}` field."
+        bad = [a for a in email["to"] if a in self.rejected or "@" not in a]
+        return f"Invalid `to` field: {bad[0]}" if bad else None
+
+    def _accept(self, email: dict) -> dict:
+        sent = {"id": str(uuid.uuid4()), **email}
+        self.sent.append(sent)
+        return {"id": sent["id"]}
+
+    def handle(self, path: str, headers: dict, body) -> tuple:
+        """(status, payload, extra headers) for one API call."""
+        with self._lock:
+            self.requests.append({"path": path, "headers": headers, "body": body})
+            key = headers.get("idempotency-key")
+            if key and key in self._replies:
+                return self._replies[key]
+            if self._throttled():
+                return 429, {"statusCode": 429, "name": "rate_limit_exceeded",
+                             "message": "Too many requests."}, {"Retry-After": "1"}
+            if self.fail_next:
+                self.fail_next -= 1
+                return 500, {"statusCode": 500, "name": "application_error",
+                             "message": "Internal server error."}, {}
+
+            if path == "/emails":
+                error = self._invalid(body)
+                reply = (422, {"statusCode": 422, "name": "validation_error", "message": error}, {}) \
+                    if error else (200, self._accept(body), {})
+            elif path == "/emails/batch":
+                permissive = headers.get("x-batch-validation") == "permissive"
+                errors = [(i, self._invalid(e)) for i, e in enumerate(body)]
+                errors = [(i, msg) for i, msg in errors if msg]
+                if errors and not permissive:
+                    reply = (422, {"statusCode": 422, "name": "validation_error",
+                                   "message": errors[0][1]}, {})
+                else:
+                    bad = {i for i, _ in errors}
+                    data = [self._accept(e) for i, e in enumerate(body) if i not in bad]
+                    payload = {"data": data}
+                    if permissive:
+                        payload["errors"] = [{"index": i, "message": msg} for i, msg in errors]
+                    reply = (200, payload, {})
+            else:
+                reply = (404, {"statusCode": 404, "name": "not_found", "message": "Not found"}, {})
+            if key and reply[0] < 500:
+                self._replies[key] = reply
+            return reply
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"null")
+                if fake.latency:
+                    time.sleep(fake.latency)
+                status, payload, extra = fake.handle(
+                    self.path, {k.lower(): v for k, v in self.headers.items()}, body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in extra.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *_args):
+                pass
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local fake Resend API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    args = parser.parse_args()
+    fake = FakeResend(args.host, args.port, latency=args.latency, rate_limit=args.rate_limit)
+    print(f"Fake Resend listening on {fake.url} (set RESEND_API_URL={fake.url})")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
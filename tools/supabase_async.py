@@ -0,0 +1,95 @@
+"""
+Async facade over the synchronous Supabase client.
+
+`tools.supabase_client.sb` is a sync client: every `.execute()` is a blocking
+HTTP round-trip to PostgREST. Calling it inline from an `async def` route
+freezes the uvicorn event loop until Postgres answers, so one slow report
+stalls every other request (portal, health check, ...) queued behind it.
+
+This module offloads those calls to a bounded thread pool. The query builder
+is still assembled on the event loop (cheap, no I/O — and it keeps the order
+in which tables are touched deterministic); only `.execute()` runs in a worker.
+All workers share the single `sb` client, so they reuse its pooled httpx
+connections instead of opening one per request.
+
+Routes adopt it module by module:
+
+    from tools.supabase_async import aexecute, gather_execute, run_sync
+
+    rows = (await aexecute(sb.table("sales").select("*").eq("id", sid))).data
+    sales, props = await gather_execute(
+        sb.table("sales").select("*"),
+        sb.table("properties").select("id, status"),
+    )
+    accounts = await run_sync(_fetch_all_accounts, active_only=False)
+
+Pool size: SUPABASE_IO_THREADS (default 16). It caps how many PostgREST calls
+are in flight at once per process, so a burst of dashboard loads cannot
+exhaust the client's connection pool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_MAX_WORKERS = int(os.getenv("SUPABASE_IO_THREADS", "16"))
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Create the shared pool lazily (import must stay side-effect free)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=_MAX_WORKERS, thread_name_prefix="sb-io",
+                )
+    return _executor
+
+
+async def run_sync(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking callable (a Supabase helper, a whole sync service
+    function, ...) in the shared I/O pool and await its result."""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(fn, *args, **kwargs) if (args or kwargs) else fn
+    return await loop.run_in_executor(_get_executor(), call)
+
+
+async def aexecute(query: Any) -> Any:
+    """Await `query.execute()` without blocking the event loop."""
+    return await run_sync(query.execute)
+
+
+async def gather_execute(*queries: Any, return_exceptions: bool = False) -> list:
+    """Execute several independent queries concurrently.
+
+    Results come back in argument order. With `return_exceptions=True` a
+    failed query yields its exception instead of cancelling the rest — the
+    same "log and carry on" behaviour the dashboards already have per query.
+    """
+    return await asyncio.gather(
+        *(aexecute(q) for q in queries), return_exceptions=return_exceptions,
+    )
+
+
+def shutdown_executor(wait: bool = False) -> None:
+    """Stop the I/O pool (called from the FastAPI lifespan on shutdown)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait, cancel_futures=True)
+            _executor = None
+            logger.info("[supabase_async] I/O pool stopped")
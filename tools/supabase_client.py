@@ -1,5 +1,6 @@
 from __future__ import annotations
 import os
+import threading
 from supabase import create_client, Client
 
 _url = os.getenv("SUPABASE_URL")
@@ -23,6 +24,24 @@ def get_supabase_client(url: str | None = None, key: str | None = None) -> Clien
     return create_client(url_use, key_use)
 
 
+_background_client: Client | None = None
+_background_lock = threading.Lock()
+
+
+def get_background_client() -> Client:
+    """
+    Return the shared client for background work (scheduler jobs, the email
+    outbox). It is separate from `sb`, so a job paging through a table never
+    holds the request handlers' connections. Created on first use.
+    """
+    global _background_client
+    if _background_client is None:
+        with _background_lock:
+            if _background_client is None:
+                _background_client = get_supabase_client()
+    return _background_client
+
+
 def get_staging_client() -> Client:
     """
     Return a Supabase client for STAGING_* env vars.